@@ -6,7 +6,7 @@ from .models import (
     Pemeriksaan, Exam, Modaliti, Daftar, Part, Region, PacsConfig, PacsExam, 
     MediaDistribution, PacsServer, RejectCategory, RejectReason, RejectAnalysis, 
     RejectIncident, AIGeneratedReport, RadiologistReport, ReportCollaboration,
-    AIModelPerformance, AIConfiguration
+    AIModelPerformance, AIConfiguration, AIReportJob, DicomUploadJob
 )
 from ordered_model.admin import (
     OrderedModelAdmin,
@@ -474,6 +474,7 @@ class AIGeneratedReportAdmin(admin.ModelAdmin):
         'critical_findings', 'critical_findings_confidence', 'requires_urgent_review',
         'orthanc_study_id', 'orthanc_series_ids', 'dicom_metadata',
         'processing_time_seconds', 'processing_errors', 'processing_warnings',
+        'generation_status', 'generation_stage', 'generation_progress',
         'created', 'modified'
     )
     date_hierarchy = 'created'
@@ -510,7 +511,10 @@ class AIGeneratedReportAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Processing Information', {
-            'fields': ('processing_errors', 'processing_warnings'),
+            'fields': (
+                ('generation_status', 'generation_stage', 'generation_progress'),
+                'processing_errors', 'processing_warnings'
+            ),
             'classes': ('collapse',)
         }),
         ('System Information', {
@@ -761,7 +765,8 @@ class AIModelPerformanceAdmin(admin.ModelAdmin):
         ('Efficiency Metrics', {
             'fields': (
                 ('average_processing_time', 'average_time_saved'),
-                ('user_satisfaction_score', 'system_uptime_percentage', 'error_rate')
+                ('user_satisfaction_score', 'system_uptime_percentage', 'error_rate'),
+                ('cache_hits', 'cache_misses')
             )
         }),
         ('Analysis', {
@@ -845,6 +850,13 @@ class AIConfigurationAdmin(admin.ModelAdmin):
         ('System Settings', {
             'fields': ('enable_ai_reporting', 'maintenance_mode')
         }),
+        ('Batch Reporting', {
+            'fields': (
+                'enable_batch_reporting', 'batch_modalities',
+                ('batch_start_hour', 'batch_end_hour'),
+                ('batch_concurrency', 'batch_lookback_days')
+            )
+        }),
         ('System Information', {
             'fields': ('modified_by', 'created', 'modified'),
             'classes': ('collapse',)
@@ -862,3 +874,31 @@ class AIConfigurationAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         obj.modified_by = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(AIReportJob)
+class AIReportJobAdmin(admin.ModelAdmin):
+    """Admin for queued AI report generation jobs"""
+    list_display = ('id', 'pemeriksaan', 'status', 'priority', 'model_name', 'attempts', 'worker', 'created', 'finished_at')
+    list_filter = ('status', 'priority', 'model_name', 'created')
+    search_fields = ('pemeriksaan__no_xray', 'pemeriksaan__accession_number', 'worker')
+    readonly_fields = (
+        'pemeriksaan', 'ai_report', 'model_name', 'attempts', 'worker', 'error', 'requested_by',
+        'created', 'started_at', 'heartbeat_at', 'finished_at'
+    )
+    date_hierarchy = 'created'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('pemeriksaan')
+
+
+@admin.register(DicomUploadJob)
+class DicomUploadJobAdmin(admin.ModelAdmin):
+    """Admin for background DICOM uploads"""
+    list_display = ('id', 'status', 'stage', 'total_files', 'uploaded_files', 'failed_files', 'requested_by', 'created', 'finished_at')
+    list_filter = ('status', 'created')
+    readonly_fields = (
+        'status', 'stage', 'total_files', 'uploaded_files', 'failed_files', 'result', 'error', 'spool_dir',
+        'requested_by', 'created', 'started_at', 'heartbeat_at', 'finished_at'
+    )
+    date_hierarchy = 'created'
@@ -0,0 +1,101 @@
+"""
+AI result cache
+
+Regenerating a report for the same examination (a retry, or a regenerate
+after review) sends the same images and prompts to Ollama again. Results are
+cached by a hash of the model, the prompt, the image bytes and
+AI_PROMPT_VERSION, so an identical request is answered without inference.
+Bump AI_PROMPT_VERSION when prompts or response parsing change in a way the
+prompt text alone does not show.
+
+Entries live in the default cache for AI_RESULT_CACHE_TIMEOUT seconds and are
+evicted by the backend (LocMemCache MAX_ENTRIES, Redis maxmemory policy);
+a timeout of 0 disables caching. Hits and misses are counted per model in
+AIModelPerformance (monthly record, all modalities).
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+AI_PROMPT_VERSION = 1
+DEFAULT_AI_RESULT_CACHE_TIMEOUT = 7 * 24 * 3600  # seconds
+
+
+def result_cache_timeout() -> int:
+    return getattr(settings, 'AI_RESULT_CACHE_TIMEOUT', DEFAULT_AI_RESULT_CACHE_TIMEOUT)
+
+
+def image_content_hash(images: Optional[Iterable[bytes]]) -> str:
+    """SHA-256 over the image bytes, in order"""
+    digest = hashlib.sha256()
+    for image in images or []:
+        digest.update(hashlib.sha256(image).digest())
+    return digest.hexdigest()
+
+
+def ai_result_cache_key(model: str, prompt: str, images: Optional[Iterable[bytes]] = None) -> str:
+    """Cache key for one inference"""
+    digest = hashlib.sha256()
+    for part in (str(AI_PROMPT_VERSION), model, prompt, image_content_hash(images)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return f"ai_result:{digest.hexdigest()}"
+
+
+def get_cached_result(key: str) -> Optional[Dict[str, Any]]:
+    if not result_cache_timeout():
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"AI result cache unavailable: {e}")
+        return None
+
+
+def set_cached_result(key: str, result: Dict[str, Any]):
+    timeout = result_cache_timeout()
+    if not timeout:
+        return
+    try:
+        cache.set(key, result, timeout)
+    except Exception as e:
+        logger.warning(f"Failed to cache AI result: {e}")
+
+
+def record_cache_lookup(model_version: str, model_type: str, hit: bool):
+    """
+    Count a cache hit or miss on the model's AIModelPerformance record for this month
+
+    Args:
+        model_version: Ollama model name
+        model_type: AIModelPerformance.model_type
+        hit: Whether the result came from the cache
+    """
+    from .models import AIModelPerformance
+
+    counter = 'cache_hits' if hit else 'cache_misses'
+    lookup = {
+        'model_version': model_version,
+        'analysis_date': timezone.localdate().replace(day=1),
+        'modality': None,
+    }
+    try:
+        if AIModelPerformance.objects.filter(**lookup).update(**{counter: F(counter) + 1}):
+            return
+        try:
+            with transaction.atomic():
+                AIModelPerformance.objects.create(model_type=model_type, **lookup, **{counter: 1})
+        except IntegrityError:
+            AIModelPerformance.objects.filter(**lookup).update(**{counter: F(counter) + 1})
+    except Exception as e:
+        logger.warning(f"Failed to record AI cache {'hit' if hit else 'miss'} for {model_version}: {e}")
@@ -0,0 +1,357 @@
+"""
+AI report generation queue
+
+Generating a report takes an Orthanc image download and three Ollama
+inferences (analysis, report, QA), which can take minutes. Instead of holding
+a web worker for that, the generate endpoints enqueue an AIReportJob with a
+placeholder AIGeneratedReport (generation_status 'queued') and return
+immediately; clients poll the job or the report for progress.
+
+Jobs are processed by `manage.py run_ai_worker` (AIJobWorker), without Celery:
+- Jobs are claimed by priority (STAT examinations first), then age, with a
+  conditional UPDATE so several workers never run the same job.
+- Each Ollama model runs at most AI_MODEL_CONCURRENCY requests at once: jobs
+  for a vision model at its limit stay queued, and every Ollama request in a
+  worker holds a per-model slot (ollama_model_slot).
+- Workers heartbeat their running jobs; jobs of a worker that died are
+  requeued after AI_JOB_STALE_SECONDS, up to AI_JOB_MAX_ATTEMPTS.
+
+When AIConfiguration.enable_batch_reporting is on, workers also queue reports
+for completed examinations nobody asked for yet (schedule_batch_reports), so
+they are ready before the radiologist opens the study. Batch jobs run at the
+lowest priority, only inside the configured off-peak window, only while no
+requested job is waiting, and at most batch_concurrency at a time.
+"""
+
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import AIConfiguration, AIGeneratedReport, AIReportJob, Pemeriksaan
+from .ai_services import model_concurrency_limit
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_AI_WORKER_CONCURRENCY = 2
+DEFAULT_AI_JOB_POLL_INTERVAL = 2  # seconds
+DEFAULT_AI_JOB_STALE_SECONDS = 120
+DEFAULT_AI_JOB_MAX_ATTEMPTS = 2
+DEFAULT_AI_BATCH_SCHEDULE_INTERVAL = 60  # seconds
+
+BATCH_PRIORITY = 4
+AI_BATCH_SCHEDULE_LOCK_KEY = 'ai_batch_schedule_lock'
+
+# Daftar.study_priority -> AIReportJob.priority
+STUDY_PRIORITY_ORDER = {'STAT': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def job_priority(pemeriksaan: Pemeriksaan) -> int:
+    """Queue priority of an examination, from its registration's study priority"""
+    daftar = pemeriksaan.daftar
+    return STUDY_PRIORITY_ORDER.get(getattr(daftar, 'study_priority', None) or 'MEDIUM', 2)
+
+
+def enqueue_ai_report(pemeriksaan: Pemeriksaan, requested_by=None, force_regenerate: bool = False,
+                      priority: Optional[int] = None) -> AIReportJob:
+    """
+    Queue AI report generation for an examination
+
+    Args:
+        pemeriksaan: Examination instance
+        requested_by: User who asked for the report
+        force_regenerate: Delete existing reports of the examination first
+        priority: Queue priority, from the study priority by default
+
+    Returns:
+        The new job, or the examination's job already queued/running
+    """
+    with transaction.atomic():
+        active = (
+            AIReportJob.objects.select_for_update()
+            .filter(pemeriksaan=pemeriksaan, status__in=ACTIVE_STATUSES)
+            .first()
+        )
+        if active:
+            return active
+
+        if force_regenerate:
+            AIGeneratedReport.objects.filter(pemeriksaan=pemeriksaan).delete()
+
+        config = AIConfiguration.get_current_config()
+        ai_report = AIGeneratedReport.objects.create(
+            pemeriksaan=pemeriksaan,
+            ai_model_version=config.vision_language_model,
+            ai_model_type='vision_language',
+            generated_report='',
+            confidence_score=0.0,
+            generation_status='queued',
+            generation_stage='queued',
+            generation_progress=0
+        )
+        job = AIReportJob.objects.create(
+            pemeriksaan=pemeriksaan,
+            ai_report=ai_report,
+            priority=job_priority(pemeriksaan) if priority is None else priority,
+            model_name=config.vision_language_model,
+            requested_by=requested_by
+        )
+    logger.info(f"Queued AI report job {job.pk} for examination {pemeriksaan.no_xray} (priority {job.priority})")
+    return job
+
+
+def claim_next_job(worker_id: str) -> Optional[AIReportJob]:
+    """
+    Claim the highest priority queued job whose model has a free slot
+
+    Returns:
+        The claimed job (now 'running'), or None if nothing can run
+    """
+    running = dict(
+        AIReportJob.objects.filter(status='running')
+        .values('model_name').annotate(count=Count('pk')).order_by()
+        .values_list('model_name', 'count')
+    )
+    busy_models = [model for model, count in running.items() if count >= model_concurrency_limit(model)]
+
+    candidates = (
+        AIReportJob.objects.filter(status='queued')
+        .exclude(model_name__in=busy_models)
+        .order_by('priority', 'created')
+        .values_list('pk', flat=True)[:10]
+    )
+    for pk in candidates:
+        now = timezone.now()
+        claimed = AIReportJob.objects.filter(pk=pk, status='queued').update(
+            status='running', worker=worker_id, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return AIReportJob.objects.select_related('pemeriksaan__daftar', 'ai_report').get(pk=pk)
+    return None
+
+
+def _finish_job(job: AIReportJob, status: str, error: str = ''):
+    AIReportJob.objects.filter(pk=job.pk).update(status=status, error=error, finished_at=timezone.now())
+
+
+def _failure_reason(ai_report: AIGeneratedReport) -> str:
+    """Why the service could not complete a report, for AIReportJob.error"""
+    errors = [str(error) for error in ai_report.processing_errors or [] if error]
+    if errors:
+        return '\n'.join(errors)
+    return ai_report.generated_report or f"AI report generation ended as {ai_report.generation_status}"
+
+
+def run_job(job: AIReportJob) -> AIReportJob:
+    """Generate the report for a claimed job, recording progress on the report"""
+    from .ai_services import AIReportingService
+
+    ai_report = job.ai_report
+
+    def progress(stage, percent):
+        if ai_report is not None:
+            AIGeneratedReport.objects.filter(pk=ai_report.pk).update(
+                generation_status='running', generation_stage=stage, generation_progress=percent
+            )
+        AIReportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+
+    try:
+        progress('starting', 0)
+        ai_report = AIReportingService().generate_ai_report(job.pemeriksaan, ai_report=ai_report, progress=progress)
+    except Exception as e:
+        # The service could not be set up (configuration, PACS client)
+        error = str(e) or type(e).__name__
+        logger.error(f"AI report job {job.pk} failed: {error}")
+        if ai_report is not None:
+            AIGeneratedReport.objects.filter(pk=ai_report.pk).update(
+                generation_status='failed', generation_stage='', generation_progress=100,
+                review_status='rejected', generated_report=f"AI report generation failed: {error}"
+            )
+        _finish_job(job, 'failed', error)
+    else:
+        if ai_report.generation_status == 'completed':
+            _finish_job(job, 'completed')
+        else:
+            _finish_job(job, 'failed', _failure_reason(ai_report))
+        if job.ai_report_id != ai_report.pk:
+            AIReportJob.objects.filter(pk=job.pk).update(ai_report=ai_report)
+
+    job.refresh_from_db()
+    return job
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Requeue running jobs whose worker stopped heartbeating
+
+    Returns:
+        Number of jobs requeued or failed
+    """
+    stale_seconds = getattr(settings, 'AI_JOB_STALE_SECONDS', DEFAULT_AI_JOB_STALE_SECONDS)
+    max_attempts = getattr(settings, 'AI_JOB_MAX_ATTEMPTS', DEFAULT_AI_JOB_MAX_ATTEMPTS)
+    stale = AIReportJob.objects.filter(
+        status='running', heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_seconds)
+    )
+    failed = stale.filter(attempts__gte=max_attempts)
+    failed_reports = list(failed.values_list('ai_report_id', flat=True))
+    count = failed.update(status='failed', error='Worker stopped responding', finished_at=timezone.now())
+    AIGeneratedReport.objects.filter(pk__in=failed_reports).update(
+        generation_status='failed', generation_stage='', review_status='rejected'
+    )
+
+    requeued_reports = list(stale.values_list('ai_report_id', flat=True))
+    count += stale.update(status='queued', worker='', heartbeat_at=None)
+    AIGeneratedReport.objects.filter(pk__in=requeued_reports).update(
+        generation_status='queued', generation_stage='queued', generation_progress=0
+    )
+    if count:
+        logger.warning(f"Recovered {count} stale AI report jobs")
+    return count
+
+
+def cancel_job(job: AIReportJob) -> bool:
+    """Cancel a job that has not started, removing its placeholder report"""
+    with transaction.atomic():
+        if not AIReportJob.objects.filter(pk=job.pk, status='queued').update(
+            status='cancelled', finished_at=timezone.now()
+        ):
+            return False
+        if job.ai_report_id:
+            AIGeneratedReport.objects.filter(pk=job.ai_report_id, generation_status='queued').delete()
+    return True
+
+
+def batch_candidates(config: AIConfiguration):
+    """
+    Completed examinations that should get a pre-emptive AI report
+
+    Completed examinations in the configured modalities, registered within
+    batch_lookback_days, with an accession number, and without an AI report,
+    a previous job or a radiologist report. Oldest first.
+    """
+    since = timezone.now() - timedelta(days=config.batch_lookback_days)
+    queryset = (
+        Pemeriksaan.objects.filter(exam_status='COMPLETED', created__gte=since)
+        .exclude(accession_number__isnull=True).exclude(accession_number='')
+        .filter(ai_reports__isnull=True, ai_report_jobs__isnull=True, manual_reports__isnull=True)
+    )
+    if config.batch_modalities:
+        queryset = queryset.filter(exam__modaliti__singkatan__in=config.batch_modalities)
+    return queryset.select_related('daftar').order_by('created')
+
+
+def schedule_batch_reports(now=None) -> int:
+    """
+    Top up the queue with batch jobs while the AI models are otherwise idle
+
+    Returns:
+        Number of jobs queued
+    """
+    config = AIConfiguration.get_current_config()
+    if not config.enable_batch_reporting or not config.enable_ai_reporting or config.maintenance_mode:
+        return 0
+    if not config.batch_window_open(now):
+        return 0
+
+    active = AIReportJob.objects.filter(status__in=ACTIVE_STATUSES)
+    if active.filter(priority__lt=BATCH_PRIORITY).exists():
+        # Requested reports first, batch work waits for an idle queue
+        return 0
+    free = config.batch_concurrency - active.filter(priority=BATCH_PRIORITY).count()
+    if free <= 0:
+        return 0
+
+    queued = 0
+    for pemeriksaan in batch_candidates(config)[:free]:
+        enqueue_ai_report(pemeriksaan, priority=BATCH_PRIORITY)
+        queued += 1
+    if queued:
+        logger.info(f"Queued {queued} batch AI report jobs")
+    return queued
+
+
+class AIJobWorker:
+    """
+    Processes queued AI report jobs in a thread pool
+
+    Args:
+        concurrency: Jobs run at once, AI_WORKER_CONCURRENCY by default
+        poll_interval: Seconds between queue polls when idle
+        worker_id: Name recorded on claimed jobs, host:pid by default
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, poll_interval: Optional[float] = None,
+                 worker_id: Optional[str] = None):
+        self.concurrency = concurrency or getattr(settings, 'AI_WORKER_CONCURRENCY', DEFAULT_AI_WORKER_CONCURRENCY)
+        self.poll_interval = poll_interval or getattr(settings, 'AI_JOB_POLL_INTERVAL', DEFAULT_AI_JOB_POLL_INTERVAL)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.schedule_interval = getattr(settings, 'AI_BATCH_SCHEDULE_INTERVAL', DEFAULT_AI_BATCH_SCHEDULE_INTERVAL)
+        self.stopping = False
+
+    def schedule_batch(self):
+        """Run schedule_batch_reports at most once per interval across all workers"""
+        try:
+            if cache.add(AI_BATCH_SCHEDULE_LOCK_KEY, self.worker_id, self.schedule_interval):
+                schedule_batch_reports()
+        except Exception as e:
+            logger.error(f"Failed to schedule batch AI reports: {e}")
+
+    def _run(self, job: AIReportJob):
+        try:
+            return run_job(job)
+        finally:
+            close_old_connections()
+
+    def run(self, once: bool = False):
+        """
+        Process jobs until stop() is called
+
+        Args:
+            once: Return when the queue is empty and all claimed jobs finished
+        """
+        logger.info(f"AI worker {self.worker_id} started with concurrency {self.concurrency}")
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ai-job') as executor:
+            while not self.stopping:
+                requeue_stale_jobs()
+                if not once:
+                    self.schedule_batch()
+
+                for future in [future for future in running if future.done()]:
+                    job_id = running.pop(future)
+                    if future.exception():
+                        logger.error(f"AI report job {job_id} crashed: {future.exception()}")
+
+                if running:
+                    AIReportJob.objects.filter(pk__in=running.values(), status='running').update(
+                        heartbeat_at=timezone.now()
+                    )
+
+                claimed = False
+                while len(running) < self.concurrency:
+                    job = claim_next_job(self.worker_id)
+                    if job is None:
+                        break
+                    claimed = True
+                    running[executor.submit(self._run, job)] = job.pk
+
+                if once and not running and not claimed:
+                    break
+                time.sleep(self.poll_interval)
+        logger.info(f"AI worker {self.worker_id} stopped")
+
+    def stop(self):
+        self.stopping = True
@@ -9,11 +9,14 @@ This module provides AI-powered report generation services with:
 """
 
 import logging
+import threading
 import time
 import json
 import requests
 import asyncio
-from typing import Dict, List, Optional, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from datetime import datetime
 from decimal import Decimal
 
@@ -23,209 +26,38 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 
 from .models import (
-    AIGeneratedReport, AIConfiguration, Pemeriksaan, PacsServer,
+    AIGeneratedReport, AIConfiguration, Pemeriksaan,
     AIModelPerformance, ReportCollaboration
 )
+from .orthanc_client import OrthancPACSClient, get_orthanc_client
+from .ai_streaming import ReportStreamRelay, streaming_enabled
+from .ai_cache import ai_result_cache_key, get_cached_result, record_cache_lookup, set_cached_result
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_AI_MODEL_CONCURRENCY = 1
+DEFAULT_AI_IMAGE_FETCH_WORKERS = 4
+DEFAULT_AI_IMAGE_INPUT_SIZE = 336  # pixels, LLaVA's vision encoder input
 
-class OrthancPACSClient:
-    """
-    Client for interfacing with Orthanc PACS server
-    Handles DICOM image retrieval and metadata extraction
-    """
-    
-    def __init__(self, pacs_server: Optional[PacsServer] = None):
-        """
-        Initialize Orthanc client with PACS server configuration
-        
-        Args:
-            pacs_server: PacsServer instance, defaults to primary server
-        """
-        if pacs_server is None:
-            pacs_server = PacsServer.objects.filter(is_primary=True, is_active=True).first()
-            if not pacs_server:
-                raise ValueError("No active primary PACS server configured")
-        
-        self.pacs_server = pacs_server
-        self.base_url = pacs_server.orthancurl.rstrip('/')
-        self.session = requests.Session()
-        
-        # Set timeout for requests
-        self.timeout = 30
-        
-        logger.info(f"Initialized Orthanc client for {self.base_url}")
-    
-    def get_study_info(self, study_id: str) -> Optional[Dict[str, Any]]:
-        """
-        Get study information from Orthanc
-        
-        Args:
-            study_id: Orthanc study ID
-            
-        Returns:
-            Study information dict or None if not found
-        """
-        try:
-            url = f"{self.base_url}/studies/{study_id}"
-            response = self.session.get(url, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
-                logger.warning(f"Study {study_id} not found in PACS")
-                return None
-            else:
-                logger.error(f"Error getting study {study_id}: {response.status_code}")
-                return None
-                
-        except requests.RequestException as e:
-            logger.error(f"Request error getting study {study_id}: {e}")
-            return None
-    
-    def get_study_series(self, study_id: str) -> List[Dict[str, Any]]:
-        """
-        Get all series for a study
-        
-        Args:
-            study_id: Orthanc study ID
-            
-        Returns:
-            List of series information dicts
-        """
-        try:
-            url = f"{self.base_url}/studies/{study_id}/series"
-            response = self.session.get(url, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                series_ids = response.json()
-                series_info = []
-                
-                for series_id in series_ids:
-                    series_url = f"{self.base_url}/series/{series_id}"
-                    series_response = self.session.get(series_url, timeout=self.timeout)
-                    
-                    if series_response.status_code == 200:
-                        series_info.append(series_response.json())
-                    
-                return series_info
-            else:
-                logger.error(f"Error getting series for study {study_id}: {response.status_code}")
-                return []
-                
-        except requests.RequestException as e:
-            logger.error(f"Request error getting series for study {study_id}: {e}")
-            return []
-    
-    def get_series_instances(self, series_id: str) -> List[str]:
-        """
-        Get all instance IDs for a series
-        
-        Args:
-            series_id: Orthanc series ID
-            
-        Returns:
-            List of instance IDs
-        """
-        try:
-            url = f"{self.base_url}/series/{series_id}/instances"
-            response = self.session.get(url, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Error getting instances for series {series_id}: {response.status_code}")
-                return []
-                
-        except requests.RequestException as e:
-            logger.error(f"Request error getting instances for series {series_id}: {e}")
-            return []
-    
-    def get_instance_image(self, instance_id: str, format: str = 'png') -> Optional[bytes]:
-        """
-        Get image data for an instance
-        
-        Args:
-            instance_id: Orthanc instance ID
-            format: Image format ('png', 'jpeg', etc.)
-            
-        Returns:
-            Image bytes or None if error
-        """
-        try:
-            url = f"{self.base_url}/instances/{instance_id}/preview"
-            response = self.session.get(url, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                return response.content
-            else:
-                logger.error(f"Error getting image for instance {instance_id}: {response.status_code}")
-                return None
-                
-        except requests.RequestException as e:
-            logger.error(f"Request error getting image for instance {instance_id}: {e}")
-            return None
-    
-    def get_instance_dicom_tags(self, instance_id: str) -> Optional[Dict[str, Any]]:
-        """
-        Get DICOM tags for an instance
-        
-        Args:
-            instance_id: Orthanc instance ID
-            
-        Returns:
-            DICOM tags dict or None if error
-        """
-        try:
-            url = f"{self.base_url}/instances/{instance_id}/tags"
-            response = self.session.get(url, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Error getting tags for instance {instance_id}: {response.status_code}")
-                return None
-                
-        except requests.RequestException as e:
-            logger.error(f"Request error getting tags for instance {instance_id}: {e}")
-            return None
-    
-    def find_study_by_accession(self, accession_number: str) -> Optional[str]:
-        """
-        Find study ID by accession number
-        
-        Args:
-            accession_number: Study accession number
-            
-        Returns:
-            Orthanc study ID or None if not found
-        """
-        try:
-            query_data = {
-                "Level": "Study",
-                "Query": {
-                    "AccessionNumber": accession_number
-                }
-            }
-            
-            url = f"{self.base_url}/tools/find"
-            response = self.session.post(url, json=query_data, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                results = response.json()
-                if results:
-                    return results[0]  # Return first match
-                else:
-                    logger.info(f"No study found for accession {accession_number}")
-                    return None
-            else:
-                logger.error(f"Error finding study by accession {accession_number}: {response.status_code}")
-                return None
-                
-        except requests.RequestException as e:
-            logger.error(f"Request error finding study by accession {accession_number}: {e}")
-            return None
+_model_slots = {}
+_model_slots_lock = threading.Lock()
+
+
+def model_concurrency_limit(model: str) -> int:
+    """Maximum parallel Ollama requests for a model (AI_MODEL_CONCURRENCY)"""
+    limits = getattr(settings, 'AI_MODEL_CONCURRENCY', {}) or {}
+    return max(int(limits.get(model, getattr(settings, 'AI_MODEL_CONCURRENCY_DEFAULT', DEFAULT_AI_MODEL_CONCURRENCY))), 1)
+
+
+@contextmanager
+def ollama_model_slot(model: str):
+    """Hold one of the model's concurrency slots in this process for the duration of a request"""
+    with _model_slots_lock:
+        slot = _model_slots.get(model)
+        if slot is None:
+            slot = _model_slots[model] = threading.BoundedSemaphore(model_concurrency_limit(model))
+    with slot:
+        yield
 
 
 class DICOMProcessor:
@@ -234,27 +66,39 @@ class DICOMProcessor:
     Extracts metadata and prepares images for ML models
     """
     
-    def __init__(self, orthanc_client: OrthancPACSClient):
+    def __init__(self, orthanc_client: OrthancPACSClient, max_workers: Optional[int] = None,
+                 image_size: Optional[int] = None):
         """
         Initialize DICOM processor
         
         Args:
             orthanc_client: Configured Orthanc client
+            max_workers: Parallel image/tag downloads, AI_IMAGE_FETCH_WORKERS by default
+            image_size: Longest edge of images sent to the model, AI_IMAGE_INPUT_SIZE
+                by default (None or 0 sends full-size previews)
         """
         self.orthanc_client = orthanc_client
+        self.max_workers = max_workers or getattr(settings, 'AI_IMAGE_FETCH_WORKERS', DEFAULT_AI_IMAGE_FETCH_WORKERS)
+        self.image_size = image_size if image_size is not None else getattr(
+            settings, 'AI_IMAGE_INPUT_SIZE', DEFAULT_AI_IMAGE_INPUT_SIZE
+        )
         self.logger = logging.getLogger(__name__ + '.DICOMProcessor')
     
-    def extract_study_metadata(self, study_id: str) -> Dict[str, Any]:
+    def extract_study_metadata(self, study_id: str, study_info: Optional[Dict[str, Any]] = None,
+                               modalities: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Extract relevant metadata from a study
         
         Args:
             study_id: Orthanc study ID
+            study_info: Study resource already fetched from Orthanc
+            modalities: Study modalities, used for the 'modality' field
             
         Returns:
             Structured metadata dict
         """
-        study_info = self.orthanc_client.get_study_info(study_id)
+        if study_info is None:
+            study_info = self.orthanc_client.get_study_info(study_id)
         if not study_info:
             return {}
         
@@ -273,24 +117,26 @@ class DICOMProcessor:
             'patient_name': patient_tags.get('PatientName'),
             'patient_birth_date': patient_tags.get('PatientBirthDate'),
             'patient_sex': patient_tags.get('PatientSex'),
-            'modality': None,  # Will be determined from series
+            'modality': modalities[0] if modalities else None,
             'series_count': len(study_info.get('Series', [])),
             'instances_count': study_info.get('CountInstances', 0)
         }
         
         return metadata
     
-    def get_study_modalities(self, study_id: str) -> List[str]:
+    def get_study_modalities(self, study_id: str, series_list: Optional[List[Dict[str, Any]]] = None) -> List[str]:
         """
         Get all modalities in a study
         
         Args:
             study_id: Orthanc study ID
+            series_list: Expanded series already fetched from Orthanc
             
         Returns:
             List of modality strings
         """
-        series_list = self.orthanc_client.get_study_series(study_id)
+        if series_list is None:
+            series_list = self.orthanc_client.get_study_series(study_id)
         modalities = set()
         
         for series in series_list:
@@ -298,31 +144,39 @@ class DICOMProcessor:
             if modality:
                 modalities.add(modality)
         
-        return list(modalities)
+        return sorted(modalities)
     
-    def select_representative_images(self, study_id: str, max_images: int = 5) -> List[Tuple[str, str]]:
+    def select_representative_images(self, study_id: str, max_images: int = 5,
+                                     series_list: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, str]]:
         """
         Select representative images from a study for AI analysis
         
         Args:
             study_id: Orthanc study ID
             max_images: Maximum number of images to select
+            series_list: Expanded series already fetched from Orthanc
             
         Returns:
             List of (series_id, instance_id) tuples
         """
-        series_list = self.orthanc_client.get_study_series(study_id)
+        if series_list is None:
+            series_list = self.orthanc_client.get_study_series(study_id)
         selected_images = []
         
         # Sort series by instance count (prefer series with more images)
-        series_list.sort(key=lambda x: x.get('CountInstances', 0), reverse=True)
+        series_list = sorted(
+            series_list, key=lambda x: x.get('CountInstances', len(x.get('Instances', []))), reverse=True
+        )
         
         for series in series_list:
             if len(selected_images) >= max_images:
                 break
             
             series_id = series['ID']
-            instances = self.orthanc_client.get_series_instances(series_id)
+            # Expanded series carry their instance IDs, no extra request needed
+            instances = series.get('Instances')
+            if instances is None:
+                instances = self.orthanc_client.get_series_instances(series_id)
             
             if instances:
                 # Select middle instance from series (often most representative)
@@ -332,10 +186,30 @@ class DICOMProcessor:
         
         return selected_images
     
+    def _fetch_instance(self, series_id: str, instance_id: str) -> Optional[Dict[str, Any]]:
+        """Download one instance's image (scaled to the model input) and DICOM tags"""
+        image_bytes = self.orthanc_client.get_instance_image(instance_id, max_size=self.image_size or None)
+        if not image_bytes:
+            return None
+        
+        # Get DICOM tags for context
+        dicom_tags = self.orthanc_client.get_instance_dicom_tags(instance_id)
+        
+        return {
+            'series_id': series_id,
+            'instance_id': instance_id,
+            'image_data': image_bytes,
+            'dicom_tags': dicom_tags
+        }
+    
     def prepare_images_for_ai(self, study_id: str) -> Dict[str, Any]:
         """
         Prepare images and metadata for AI processing
         
+        The study and its expanded series are fetched once; the selected
+        instances are then downloaded in parallel (max_workers), already
+        scaled down to the model's input size by Orthanc.
+        
         Args:
             study_id: Orthanc study ID
             
@@ -345,29 +219,23 @@ class DICOMProcessor:
         start_time = time.time()
         
         try:
+            study_info = self.orthanc_client.get_study_info(study_id)
+            series_list = self.orthanc_client.get_study_series(study_id)
+            
             # Extract metadata
-            metadata = self.extract_study_metadata(study_id)
-            modalities = self.get_study_modalities(study_id)
+            modalities = self.get_study_modalities(study_id, series_list=series_list)
+            metadata = self.extract_study_metadata(study_id, study_info=study_info, modalities=modalities)
             
             # Select representative images
-            selected_images = self.select_representative_images(study_id)
+            selected_images = self.select_representative_images(study_id, series_list=series_list)
             
-            # Prepare image data
+            # Prepare image data, keeping the selection order
             images_data = []
-            for series_id, instance_id in selected_images:
-                # Get image
-                image_bytes = self.orthanc_client.get_instance_image(instance_id)
-                if image_bytes:
-                    # Get DICOM tags for context
-                    dicom_tags = self.orthanc_client.get_instance_dicom_tags(instance_id)
-                    
-                    image_info = {
-                        'series_id': series_id,
-                        'instance_id': instance_id,
-                        'image_data': image_bytes,
-                        'dicom_tags': dicom_tags
-                    }
-                    images_data.append(image_info)
+            if selected_images:
+                workers = min(self.max_workers, len(selected_images))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dicom-fetch') as executor:
+                    fetched = executor.map(lambda image: self._fetch_instance(*image), selected_images)
+                    images_data = [image_info for image_info in fetched if image_info]
             
             processing_time = time.time() - start_time
             
@@ -438,7 +306,8 @@ class OllamaAIService:
             self.logger.error(f"Cannot connect to Ollama server: {e}")
             return False
     
-    def _generate_with_ollama(self, model: str, prompt: str, images: List[bytes] = None) -> Dict[str, Any]:
+    def _generate_with_ollama(self, model: str, prompt: str, images: List[bytes] = None,
+                              on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Generate text using Ollama API
         
@@ -446,6 +315,8 @@ class OllamaAIService:
             model: Model name to use
             prompt: Text prompt
             images: Optional list of image bytes for vision models
+            on_text: Optional callback receiving the text generated so far;
+                when given, Ollama's NDJSON stream is read incrementally
             
         Returns:
             Generation result dict
@@ -454,7 +325,7 @@ class OllamaAIService:
             request_data = {
                 "model": model,
                 "prompt": prompt,
-                "stream": False,
+                "stream": on_text is not None,
                 "options": {
                     "temperature": 0.3,  # Lower temperature for medical accuracy
                     "top_p": 0.9
@@ -470,12 +341,16 @@ class OllamaAIService:
                     encoded_images.append(encoded)
                 request_data["images"] = encoded_images
             
-            start_time = time.time()
-            response = requests.post(
-                f"{self.config.ollama_server_url}/api/generate",
-                json=request_data,
-                timeout=self.config.max_processing_time_seconds
-            )
+            if on_text is not None:
+                return self._stream_with_ollama(model, request_data, on_text)
+            
+            with ollama_model_slot(model):
+                start_time = time.time()
+                response = requests.post(
+                    f"{self.config.ollama_server_url}/api/generate",
+                    json=request_data,
+                    timeout=self.config.max_processing_time_seconds
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -512,13 +387,101 @@ class OllamaAIService:
                 'processing_time': 0
             }
     
-    def analyze_images(self, images: List[bytes], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    def _stream_with_ollama(self, model: str, request_data: Dict[str, Any],
+                            on_text: Callable[[str], None]) -> Dict[str, Any]:
+        """
+        Read Ollama's NDJSON stream, passing the accumulated text to on_text
+        
+        Returns:
+            Generation result dict, same as the non-streaming request
+        """
+        max_time = self.config.max_processing_time_seconds
+        with ollama_model_slot(model):
+            start_time = time.time()
+            with requests.post(
+                f"{self.config.ollama_server_url}/api/generate",
+                json=request_data,
+                stream=True,
+                timeout=(10, max_time)  # connect, then per read
+            ) as response:
+                if response.status_code != 200:
+                    self.logger.error(f"Ollama API error {response.status_code}: {response.text}")
+                    return {
+                        'success': False,
+                        'error': f"API error {response.status_code}",
+                        'processing_time': time.time() - start_time
+                    }
+                
+                text = ''
+                final = {}
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        self.logger.error(f"Ollama stream error for model {model}: {chunk['error']}")
+                        return {
+                            'success': False,
+                            'error': chunk['error'],
+                            'processing_time': time.time() - start_time
+                        }
+                    if chunk.get('response'):
+                        text += chunk['response']
+                        on_text(text)
+                    if chunk.get('done'):
+                        final = chunk
+                        break
+                    if time.time() - start_time > max_time:
+                        raise requests.Timeout(f"Generation exceeded {max_time}s")
+        
+        return {
+            'success': True,
+            'response': text,
+            'model': model,
+            'processing_time': time.time() - start_time,
+            'token_count': final.get('eval_count', 0),
+            'prompt_tokens': final.get('prompt_eval_count', 0)
+        }
+    
+    def _cached_generate(self, model: str, model_type: str, prompt: str, images: List[bytes] = None,
+                         on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        _generate_with_ollama through the AI result cache
+        
+        Args:
+            model: Model name to use
+            model_type: AIModelPerformance.model_type, for hit/miss counts
+            prompt: Text prompt
+            images: Optional list of image bytes for vision models
+            on_text: Optional streaming callback, given the whole text on a hit
+            
+        Returns:
+            Generation result dict ('cached' is True for a hit)
+        """
+        key = ai_result_cache_key(model, prompt, images)
+        cached = get_cached_result(key)
+        if cached is not None:
+            record_cache_lookup(model, model_type, hit=True)
+            self.logger.info(f"AI result cache hit for {model}")
+            if on_text:
+                on_text(cached['response'])
+            return {**cached, 'processing_time': 0.0, 'cached': True}
+        
+        record_cache_lookup(model, model_type, hit=False)
+        result = self._generate_with_ollama(model=model, prompt=prompt, images=images, on_text=on_text)
+        if result['success']:
+            set_cached_result(key, result)
+        return result
+    
+    def analyze_images(self, images: List[bytes], metadata: Dict[str, Any],
+                       on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Analyze medical images using vision-language model
         
         Args:
             images: List of image bytes
             metadata: Study metadata for context
+            on_text: Optional callback for the streamed analysis text
             
         Returns:
             Analysis result dict
@@ -548,10 +511,12 @@ class OllamaAIService:
         If you identify any critical findings, clearly state them at the beginning.
         """
         
-        result = self._generate_with_ollama(
+        result = self._cached_generate(
             model=self.config.vision_language_model,
+            model_type='vision_language',
             prompt=prompt,
-            images=images
+            images=images,
+            on_text=on_text
         )
         
         if result['success']:
@@ -570,13 +535,15 @@ class OllamaAIService:
                 'processing_time': result.get('processing_time', 0)
             }
     
-    def generate_report(self, image_analysis: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_report(self, image_analysis: Dict[str, Any], metadata: Dict[str, Any],
+                        on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Generate structured radiology report from image analysis
         
         Args:
             image_analysis: Results from image analysis
             metadata: Study metadata
+            on_text: Optional callback for the streamed report text
             
         Returns:
             Generated report dict
@@ -618,9 +585,11 @@ class OllamaAIService:
         If critical findings were identified, mention them prominently in both FINDINGS and IMPRESSION.
         """
         
-        result = self._generate_with_ollama(
+        result = self._cached_generate(
             model=self.config.medical_llm_model,
-            prompt=prompt
+            model_type='medical_llm',
+            prompt=prompt,
+            on_text=on_text
         )
         
         if result['success']:
@@ -681,8 +650,9 @@ class OllamaAIService:
         Format your response clearly with these sections.
         """
         
-        result = self._generate_with_ollama(
+        result = self._cached_generate(
             model=self.config.qa_model,
+            model_type='qa_model',
             prompt=prompt
         )
         
@@ -840,17 +810,22 @@ class AIReportingService:
     def __init__(self):
         """Initialize the AI reporting service"""
         self.config = AIConfiguration.get_current_config()
-        self.orthanc_client = OrthancPACSClient()
+        self.orthanc_client = get_orthanc_client()
         self.dicom_processor = DICOMProcessor(self.orthanc_client)
         self.ai_service = OllamaAIService(self.config)
         self.logger = logging.getLogger(__name__ + '.AIReportingService')
     
-    def generate_ai_report(self, pemeriksaan: Pemeriksaan) -> AIGeneratedReport:
+    def generate_ai_report(self, pemeriksaan: Pemeriksaan, ai_report: Optional[AIGeneratedReport] = None,
+                           progress: Optional[Callable[[str, int], None]] = None) -> AIGeneratedReport:
         """
         Generate complete AI report for an examination
         
         Args:
             pemeriksaan: Examination instance
+            ai_report: Placeholder report to fill in (queued jobs), a new
+                report is created when omitted
+            progress: Optional callback receiving (stage, percent) as the
+                pipeline advances
             
         Returns:
             AIGeneratedReport instance
@@ -859,6 +834,15 @@ class AIReportingService:
         processing_errors = []
         processing_warnings = []
         
+        def report_progress(stage, percent):
+            if progress:
+                progress(stage, percent)
+        
+        # Live preview of the analysis/report text for the reporting UI
+        relay = None
+        if ai_report is not None and streaming_enabled():
+            relay = ReportStreamRelay(ai_report.pk, parse_sections=self.ai_service._parse_report_sections)
+        
         try:
             # Check if AI reporting is enabled
             if not self.config.enable_ai_reporting:
@@ -872,6 +856,7 @@ class AIReportingService:
             if not accession_number:
                 raise ValueError("No accession number available for examination")
             
+            report_progress('fetching_images', 5)
             study_id = self.orthanc_client.find_study_by_accession(accession_number)
             if not study_id:
                 raise ValueError(f"Study not found in PACS for accession {accession_number}")
@@ -887,28 +872,37 @@ class AIReportingService:
                 processing_warnings.append("No images available for AI analysis")
                 raise ValueError("No images available for AI analysis")
             
+            report_progress('analyzing_images', 20)
             images = [img['image_data'] for img in dicom_data['images']]
-            analysis_result = self.ai_service.analyze_images(images, dicom_data['metadata'])
+            analysis_result = self.ai_service.analyze_images(
+                images, dicom_data['metadata'],
+                on_text=relay.stage_callback('analyzing_images') if relay else None
+            )
             
             if not analysis_result['success']:
                 processing_errors.append(f"Image analysis failed: {analysis_result.get('error', 'Unknown error')}")
                 raise ValueError("AI image analysis failed")
             
             # Generate report
-            report_result = self.ai_service.generate_report(analysis_result, dicom_data['metadata'])
+            report_progress('generating_report', 55)
+            report_result = self.ai_service.generate_report(
+                analysis_result, dicom_data['metadata'],
+                on_text=relay.stage_callback('generating_report') if relay else None
+            )
             if not report_result['success']:
                 processing_errors.append(f"Report generation failed: {report_result.get('error', 'Unknown error')}")
                 raise ValueError("AI report generation failed")
             
             # Quality assurance check
+            report_progress('quality_check', 85)
             qa_result = self.ai_service.quality_assurance_check(report_result)
             
             # Calculate total processing time
             total_processing_time = time.time() - start_time
             
             # Create AI report record
-            ai_report = AIGeneratedReport.objects.create(
-                pemeriksaan=pemeriksaan,
+            ai_report = self._save_report(
+                pemeriksaan, ai_report,
                 ai_model_version=self.config.vision_language_model,
                 ai_model_type='vision_language',
                 generated_report=report_result['full_report'],
@@ -923,12 +917,18 @@ class AIReportingService:
                 dicom_metadata=dicom_data['metadata'],
                 processing_time_seconds=total_processing_time,
                 processing_errors=processing_errors,
-                processing_warnings=processing_warnings
+                processing_warnings=processing_warnings,
+                generation_status='completed',
+                generation_stage='',
+                generation_progress=100
             )
             
             # Set review status based on confidence and QA
             self._set_initial_review_status(ai_report, qa_result)
             
+            if relay:
+                relay.done('completed')
+            
             # Send notifications if critical findings detected
             if ai_report.requires_urgent_review:
                 self._send_critical_findings_notification(ai_report)
@@ -940,8 +940,8 @@ class AIReportingService:
             self.logger.error(f"Error generating AI report for examination {pemeriksaan.no_xray}: {e}")
             
             # Create failed report record
-            ai_report = AIGeneratedReport.objects.create(
-                pemeriksaan=pemeriksaan,
+            ai_report = self._save_report(
+                pemeriksaan, ai_report,
                 ai_model_version=self.config.vision_language_model,
                 ai_model_type='vision_language',
                 generated_report=f"AI report generation failed: {str(e)}",
@@ -957,11 +957,25 @@ class AIReportingService:
                 dicom_metadata={},
                 processing_time_seconds=time.time() - start_time,
                 processing_errors=processing_errors + [str(e)],
-                processing_warnings=processing_warnings
+                processing_warnings=processing_warnings,
+                generation_status='failed',
+                generation_stage='',
+                generation_progress=100
             )
+            if relay:
+                relay.done('failed')
             
             return ai_report
     
+    def _save_report(self, pemeriksaan: Pemeriksaan, ai_report: Optional[AIGeneratedReport], **fields) -> AIGeneratedReport:
+        """Create the report, or fill in the queued placeholder"""
+        if ai_report is None:
+            return AIGeneratedReport.objects.create(pemeriksaan=pemeriksaan, **fields)
+        for name, value in fields.items():
+            setattr(ai_report, name, value)
+        ai_report.save()
+        return ai_report
+    
     def _calculate_section_confidence(self, report_result: Dict[str, Any]) -> Dict[str, float]:
         """Calculate confidence scores for each report section"""
         base_confidence = report_result.get('confidence_score', 0.5)
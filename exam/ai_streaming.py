@@ -0,0 +1,93 @@
+"""
+Live AI report text
+
+While a worker generates a report, Ollama's output is streamed token by token
+(OllamaAIService with on_text) and relayed to the report's channel-layer
+group, where AIReportStreamConsumer (ws/ai-reports/<id>/stream/) forwards it
+to the reporting UI. The final text is still parsed and saved by
+AIReportingService as before; the stream is only a preview.
+
+Messages:
+- {'type': 'partial', 'stage': 'analyzing_images' | 'generating_report',
+   'text': '...', 'sections': {...}}  (sections for the report stage only)
+- {'type': 'done', 'generation_status': 'completed' | 'failed'}
+
+Partial messages are throttled to one per AI_STREAM_INTERVAL seconds. The
+latest message is also kept in the cache, so a client that connects halfway
+through starts from the current text.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_AI_STREAM_INTERVAL = 0.25  # seconds
+STREAM_CACHE_TIMEOUT = 600
+
+
+def ai_report_stream_group(report_id) -> str:
+    return f"ai_report_{report_id}"
+
+
+def ai_report_stream_cache_key(report_id) -> str:
+    return f"ai_report_stream:{report_id}"
+
+
+def streaming_enabled() -> bool:
+    return getattr(settings, 'AI_STREAM_REPORTS', True)
+
+
+class ReportStreamRelay:
+    """
+    Relays partial generation output for one report to its WebSocket group
+
+    Args:
+        report_id: AIGeneratedReport primary key
+        parse_sections: Parser for partial report text (OllamaAIService._parse_report_sections)
+    """
+
+    def __init__(self, report_id, parse_sections: Optional[Callable[[str], Dict]] = None):
+        self.report_id = report_id
+        self.group = ai_report_stream_group(report_id)
+        self.cache_key = ai_report_stream_cache_key(report_id)
+        self.parse_sections = parse_sections
+        self.interval = getattr(settings, 'AI_STREAM_INTERVAL', DEFAULT_AI_STREAM_INTERVAL)
+        self.channel_layer = get_channel_layer()
+        self.last_sent = 0.0
+
+    def _publish(self, message: Dict, timeout: int = STREAM_CACHE_TIMEOUT):
+        try:
+            cache.set(self.cache_key, message, timeout)
+            if self.channel_layer is not None:
+                async_to_sync(self.channel_layer.group_send)(self.group, {'type': 'report.stream', 'message': message})
+        except Exception as e:
+            # The preview is best effort, generation carries on without it
+            logger.warning(f"Failed to relay AI report {self.report_id} stream: {e}")
+
+    def partial(self, stage: str, text: str, force: bool = False):
+        """Send the text generated so far for a stage (throttled unless forced)"""
+        now = time.monotonic()
+        if not force and now - self.last_sent < self.interval:
+            return
+        self.last_sent = now
+
+        message = {'type': 'partial', 'stage': stage, 'text': text}
+        if stage == 'generating_report' and self.parse_sections:
+            message['sections'] = self.parse_sections(text).get('report_sections', {})
+        self._publish(message)
+
+    def stage_callback(self, stage: str) -> Callable[[str], None]:
+        """on_text callback for OllamaAIService that relays one stage"""
+        return lambda text: self.partial(stage, text)
+
+    def done(self, generation_status: str):
+        """Tell clients the report is saved and can be loaded"""
+        self._publish({'type': 'done', 'generation_status': generation_status}, timeout=60)
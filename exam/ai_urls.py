@@ -16,6 +16,7 @@ from .ai_views import (
     RadiologistReportViewSet,
     ReportCollaborationViewSet,
     AIModelPerformanceViewSet,
+    AIReportJobViewSet,
     AIConfigurationView,
     AIConnectionTestView,
     AIReportingDashboardView,
@@ -33,6 +34,7 @@ router.register(r'ai-reports', AIGeneratedReportViewSet, basename='ai-reports')
 router.register(r'radiologist-reports', RadiologistReportViewSet, basename='radiologist-reports')
 router.register(r'collaborations', ReportCollaborationViewSet, basename='collaborations')
 router.register(r'performance', AIModelPerformanceViewSet, basename='performance')
+router.register(r'jobs', AIReportJobViewSet, basename='ai-jobs')
 
 # Manual reporting (AI-independent)
 router.register(r'manual-reports', ManualRadiologyReportViewSet, basename='manual-reports')
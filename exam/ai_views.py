@@ -13,9 +13,9 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Dict, Any
 
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db import transaction
 from django.db.models import Q, Count, Avg, Sum
 from django.core.cache import cache
 from django.http import JsonResponse
@@ -28,15 +28,15 @@ from rest_framework.pagination import PageNumberPagination
 
 from .models import (
     AIGeneratedReport, RadiologistReport, ReportCollaboration, 
-    AIModelPerformance, AIConfiguration, Pemeriksaan, Modaliti
+    AIModelPerformance, AIConfiguration, AIReportJob, Pemeriksaan, Modaliti
 )
 from .serializers import (
     AIGeneratedReportSerializer, AIGeneratedReportListSerializer,
     RadiologistReportSerializer, RadiologistReportListSerializer,
     ReportCollaborationSerializer, AIModelPerformanceSerializer,
-    AIConfigurationSerializer, PemeriksaanSerializer
+    AIConfigurationSerializer, AIReportJobSerializer, PemeriksaanSerializer
 )
-from .ai_services import AIReportingService
+from .ai_jobs import cancel_job, enqueue_ai_report, run_job
 from staff.permissions import CanReport, CanViewReport
 
 logger = logging.getLogger(__name__)
@@ -49,6 +49,27 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
+def queue_ai_report(pemeriksaan, user, force_regenerate=False) -> Response:
+    """
+    Queue report generation and respond with the job and placeholder report
+
+    With AI_REPORT_JOBS_INLINE (no worker running, e.g. development) the job
+    is processed before responding, like the old synchronous endpoints.
+    """
+    job = enqueue_ai_report(pemeriksaan, requested_by=user, force_regenerate=force_regenerate)
+    if getattr(settings, 'AI_REPORT_JOBS_INLINE', False) and job.status == 'queued':
+        job = run_job(job)
+
+    report = AIGeneratedReport.objects.filter(pk=job.ai_report_id).first()
+    finished = job.status in ('completed', 'failed')
+    return Response({
+        'message': 'AI report generated' if finished else 'AI report generation queued',
+        'job': AIReportJobSerializer(job).data,
+        'report': AIGeneratedReportSerializer(report).data if report else None,
+        'existed': False
+    }, status=status.HTTP_201_CREATED if finished else status.HTTP_202_ACCEPTED)
+
+
 class AIGeneratedReportViewSet(viewsets.ModelViewSet):
     """
     ViewSet for AI-generated reports
@@ -137,28 +158,21 @@ class AIGeneratedReportViewSet(viewsets.ModelViewSet):
             
             pemeriksaan = get_object_or_404(Pemeriksaan, id=pemeriksaan_id)
             
-            # Check if AI report already exists
+            # Check if AI report already exists (or is being generated)
             existing_report = AIGeneratedReport.objects.filter(pemeriksaan=pemeriksaan).first()
             if existing_report:
                 return Response(
                     {
                         'message': 'AI report already exists for this examination',
                         'report_id': existing_report.id,
-                        'review_status': existing_report.review_status
+                        'review_status': existing_report.review_status,
+                        'generation_status': existing_report.generation_status
                     },
                     status=status.HTTP_409_CONFLICT
                 )
             
-            # Generate AI report asynchronously (in production, use Celery)
-            ai_service = AIReportingService()
-            ai_report = ai_service.generate_ai_report(pemeriksaan)
-            
-            serializer = AIGeneratedReportSerializer(ai_report)
-            
-            return Response({
-                'message': 'AI report generated successfully',
-                'report': serializer.data
-            }, status=status.HTTP_201_CREATED)
+            # Generated by the AI worker (manage.py run_ai_worker), poll the job for progress
+            return queue_ai_report(pemeriksaan, request.user)
             
         except Exception as e:
             logger.error(f"Error generating AI report: {e}")
@@ -216,8 +230,8 @@ class AIGeneratedReportViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            from .ai_services import OrthancPACSClient
-            orthanc_client = OrthancPACSClient()
+            from .orthanc_client import get_orthanc_client
+            orthanc_client = get_orthanc_client()
             
             # Get study information
             study_info = orthanc_client.get_study_info(ai_report.orthanc_study_id)
@@ -518,7 +532,7 @@ class AIModelPerformanceViewSet(viewsets.ModelViewSet):
         ai_reports_stats = AIGeneratedReport.objects.filter(
             created__date__gte=start_date,
             created__date__lte=end_date
-        ).aggregate(
+        ).exclude(generation_status__in=['queued', 'running']).aggregate(
             total_generated=Count('id'),
             pending_review=Count('id', filter=Q(review_status='pending')),
             approved=Count('id', filter=Q(review_status='approved')),
@@ -538,6 +552,42 @@ class AIModelPerformanceViewSet(viewsets.ModelViewSet):
         })
 
 
+class AIReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for queued AI report generation jobs
+    Clients poll a job until its status is completed or failed
+    """
+    serializer_class = AIReportJobSerializer
+    pagination_class = StandardResultsSetPagination
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        """Get jobs, optionally filtered by status or examination"""
+        queryset = AIReportJob.objects.select_related('pemeriksaan', 'ai_report')
+        
+        job_status = self.request.query_params.get('status')
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        
+        pemeriksaan_id = self.request.query_params.get('pemeriksaan_id')
+        if pemeriksaan_id:
+            queryset = queryset.filter(pemeriksaan_id=pemeriksaan_id)
+        
+        return queryset.order_by('-created')
+    
+    @action(detail=True, methods=['post'], permission_classes=[CanReport])
+    def cancel(self, request, pk=None):
+        """Cancel a job that has not started yet"""
+        job = self.get_object()
+        if not cancel_job(job):
+            return Response(
+                {'error': f'Job is {job.status} and can no longer be cancelled'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job.refresh_from_db()
+        return Response(AIReportJobSerializer(job).data)
+
+
 class AIConfigurationView(APIView):
     """
     API view for AI system configuration management
@@ -625,11 +675,11 @@ class AIReportingDashboardView(APIView):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
-        # Basic AI report statistics
+        # Basic AI report statistics (reports still being generated are left out)
         ai_reports = AIGeneratedReport.objects.filter(
             created__date__gte=start_date,
             created__date__lte=end_date
-        )
+        ).exclude(generation_status__in=['queued', 'running'])
         
         basic_stats = {
             'total_ai_reports': ai_reports.count(),
@@ -790,21 +840,8 @@ class AIReportGenerationAPIView(APIView):
                     'existed': True
                 })
             
-            # Generate or regenerate report
-            with transaction.atomic():
-                if existing_report and force_regenerate:
-                    existing_report.delete()
-                
-                ai_service = AIReportingService()
-                ai_report = ai_service.generate_ai_report(pemeriksaan)
-                
-                serializer = AIGeneratedReportSerializer(ai_report)
-                
-                return Response({
-                    'message': 'AI report generated successfully',
-                    'report': serializer.data,
-                    'existed': False
-                }, status=status.HTTP_201_CREATED)
+            # Generate or regenerate report in the AI worker
+            return queue_ai_report(pemeriksaan, request.user, force_regenerate=bool(existing_report and force_regenerate))
                 
         except Exception as e:
             logger.error(f"Error in AI report generation API: {e}")
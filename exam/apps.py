@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ExamConfig(AppConfig):
     name = 'exam'
+
+    def ready(self):
+        # Register signal handlers (dashboard statistics cache)
+        from . import signals  # noqa: F401
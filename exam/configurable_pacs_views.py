@@ -1,7 +1,8 @@
 """
 Configurable PACS endpoint views based on PacsConfig.endpoint_style
 """
-import requests
+from django.conf import settings
+from django.core.cache import cache
 from django.http import StreamingHttpResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -13,7 +14,20 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 import json
+import logging
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import requests
+
 from .models import PacsConfig
+from .orthanc_client import get_orthanc_client
+from .dicom_cache import dicom_file_cache
+from .study_manifest import get_study_manifest, get_manifest_series
+
+logger = logging.getLogger(__name__)
 
 """
 Fixed WADO-RS metadata endpoint with proper DICOM tag handling
@@ -50,7 +64,7 @@ def configurable_dicom_metadata(request, orthanc_id):
             from .models import PacsServer
             try:
                 pacs_server = PacsServer.objects.get(id=pacs_server_id, is_active=True, is_deleted=False)
-                orthanc_url = pacs_server.orthancurl
+                client = get_orthanc_client(pacs_server)
             except PacsServer.DoesNotExist:
                 return JsonResponse({'error': f'PACS server {pacs_server_id} not found or inactive'}, status=404)
         else:
@@ -58,11 +72,11 @@ def configurable_dicom_metadata(request, orthanc_id):
             pacs_config = PacsConfig.objects.first()
             if not pacs_config:
                 return JsonResponse({'error': 'PACS configuration not found'}, status=500)
-            orthanc_url = pacs_config.orthancurl
+            client = get_orthanc_client(pacs_config)
         
         
         # Get metadata from Orthanc in standard DICOM tag format
-        metadata_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}/tags", timeout=30)
+        metadata_response = client.get(f"/instances/{orthanc_id}/tags", timeout=30)
         
         if not metadata_response.ok:
             return JsonResponse({'error': f'Failed to get metadata: {metadata_response.status_code}'}, status=500)
@@ -109,7 +123,7 @@ def configurable_dicom_metadata(request, orthanc_id):
                 formatted_metadata[formatted_tag] = value
         
         # Get instance statistics for accurate dimensions
-        stats_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}/statistics", timeout=10)
+        stats_response = client.get(f"/instances/{orthanc_id}/statistics", timeout=10)
         if stats_response.ok:
             stats = stats_response.json()
             
@@ -161,7 +175,7 @@ def configurable_dicom_metadata(request, orthanc_id):
         actual_cols = None
         
         # Get instance metadata first to get reliable dimensions
-        instance_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}", timeout=10)
+        instance_response = client.get(f"/instances/{orthanc_id}", timeout=10)
         instance_data = {}
         if instance_response.ok:
             instance_data = instance_response.json()
@@ -213,7 +227,7 @@ def configurable_dicom_metadata(request, orthanc_id):
         # Let's also check if we can get dimensions from the DICOM file itself
         try:
             # Try to get image metadata directly from Orthanc's simplified tags
-            simplified_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}/simplified-tags", timeout=10)
+            simplified_response = client.get(f"/instances/{orthanc_id}/simplified-tags", timeout=10)
             if simplified_response.ok:
                 simplified_tags = simplified_response.json()
                 
@@ -406,6 +420,9 @@ def configurable_dicom_frames(request, orthanc_id, frame_number):
     """
     Get DICOM frame data for WADO-RS
     
+    The working upstream strategy (raw frame, /file, or DICOMweb) is remembered
+    per PACS server, so a frame normally costs a single Orthanc request.
+    
     URL format: /api/pacs/instances/{orthanc_id}/frames/{frame_number}
     """
     # Handle CORS preflight
@@ -420,6 +437,15 @@ def configurable_dicom_frames(request, orthanc_id, frame_number):
     auth_header = request.META.get('HTTP_AUTHORIZATION', '')
     if not auth_header.startswith('Bearer '):
         return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    # Serve decoded frames from the local cache without touching Orthanc
+    frame_kind = f"frame-{frame_number}"
+    cached_response = dicom_file_cache.response(orthanc_id, frame_kind, 'application/octet-stream')
+    if cached_response is not None:
+        cached_response['Access-Control-Allow-Origin'] = '*'
+        cached_response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        cached_response['Access-Control-Allow-Headers'] = '*'
+        return cached_response
         
     try:
         # Check if specific PACS server requested
@@ -430,7 +456,7 @@ def configurable_dicom_frames(request, orthanc_id, frame_number):
             from .models import PacsServer
             try:
                 pacs_server = PacsServer.objects.get(id=pacs_server_id, is_active=True, is_deleted=False)
-                orthanc_url = pacs_server.orthancurl
+                client = get_orthanc_client(pacs_server)
             except PacsServer.DoesNotExist:
                 return JsonResponse({'error': f'PACS server {pacs_server_id} not found or inactive'}, status=404)
         else:
@@ -438,125 +464,329 @@ def configurable_dicom_frames(request, orthanc_id, frame_number):
             pacs_config = PacsConfig.objects.first()
             if not pacs_config:
                 return JsonResponse({'error': 'PACS configuration not found'}, status=500)
-            orthanc_url = pacs_config.orthancurl
-        
+            client = get_orthanc_client(pacs_config)
         
-        # First check if this is a multi-frame image and get image dimensions
-        instance_info = requests.get(f"{orthanc_url}/instances/{orthanc_id}", timeout=10)
-        if instance_info.ok:
-            instance_data = instance_info.json()
-            main_tags = instance_data.get('MainDicomTags', {})
-            number_of_frames = int(main_tags.get('NumberOfFrames', '1'))
-            
-        else:
-            number_of_frames = 1
+        content_type, content = _open_frame(client, orthanc_id, frame_number)
+        if content_type is not None:
+            response = StreamingHttpResponse(content, content_type=content_type)
+            response['Access-Control-Allow-Origin'] = '*'
+            response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+            response['Access-Control-Allow-Headers'] = '*'
+            return response
         
-        # For multi-frame images, try the frames endpoint
-        if number_of_frames > 1:
-            try:
-                # Orthanc uses 0-based indexing for frames
-                orthanc_frame_index = frame_number - 1
-                frames_response = requests.get(
-                    f"{orthanc_url}/instances/{orthanc_id}/frames/{orthanc_frame_index}/raw",
-                    stream=True,
-                    timeout=30
-                )
-                
-                if frames_response.ok:
-                    response = StreamingHttpResponse(
-                        frames_response.iter_content(chunk_size=32768),
-                        content_type='application/octet-stream'
-                    )
-                    response['Access-Control-Allow-Origin'] = '*'
-                    response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-                    response['Access-Control-Allow-Headers'] = '*'
-                    return response
-            except Exception:
-                pass
-        
-        # For single-frame images, try to get raw pixel data first
+        last_status = content
+        return HttpResponse(f'Failed to get DICOM file: {last_status}', status=404)
         
+    except Exception as e:
+        return HttpResponse(f'DICOM frame failed: {str(e)}', status=500)
+
+
+DEFAULT_FRAME_BATCH_MAX_FRAMES = 200
+DEFAULT_FRAME_BATCH_PREFETCH = 4
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def configurable_series_frames(request, study_uid, series_uid):
+    """
+    Get many frames of a series in one multipart/related response (WADO-RS frame retrieval)
+    
+    Frames are selected either by Orthanc instance ID or by a range in
+    InstanceNumber order (same order and paging as get_series_bulk_images), and
+    always frame 1 of each instance. Each part carries the frame as
+    application/octet-stream with a Content-Location pointing at the single
+    frame URL, so the viewer can map parts back to image IDs. Parts are streamed
+    in request order while the next few frames are fetched from Orthanc in the
+    background; instances that cannot be retrieved are skipped.
+    
+    URL format: /api/pacs/studies/{study_uid}/series/{series_uid}/frames?instances=id1,id2
+                /api/pacs/studies/{study_uid}/series/{series_uid}/frames?start=0&count=50
+    """
+    max_frames = getattr(settings, 'FRAME_BATCH_MAX_FRAMES', DEFAULT_FRAME_BATCH_MAX_FRAMES)
+    try:
+        start = max(int(request.GET.get('start', 0)), 0)
+        count = min(int(request.GET.get('count', max_frames)), max_frames)
+    except ValueError:
+        return Response({'error': 'start and count must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    pacs_server_id = request.GET.get('pacs_server_id')
+    if pacs_server_id:
+        from .models import PacsServer
         try:
-            # Try Orthanc's raw pixel data endpoint (this gives us JUST the pixel data)
-            # Note: For single-frame images, frame 1 in URL corresponds to frame 0 in Orthanc
-            orthanc_frame_index = frame_number - 1  # Convert 1-based to 0-based
-            raw_response = requests.get(
-                f"{orthanc_url}/instances/{orthanc_id}/frames/{orthanc_frame_index}/raw",
-                stream=True,
-                timeout=30
-            )
+            pacs_server = PacsServer.objects.get(id=pacs_server_id, is_active=True, is_deleted=False)
+        except PacsServer.DoesNotExist:
+            return Response({'error': f'PACS server {pacs_server_id} not found or inactive'}, status=status.HTTP_404_NOT_FOUND)
+        client = get_orthanc_client(pacs_server)
+    else:
+        pacs_config = PacsConfig.objects.first()
+        if not pacs_config:
+            return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        client = get_orthanc_client(pacs_config)
+    
+    try:
+        manifest = get_study_manifest(client, study_uid)
+    except requests.exceptions.RequestException as e:
+        return Response({'error': f'Network error: {str(e)}'}, status=status.HTTP_502_BAD_GATEWAY)
+    series_data = get_manifest_series(manifest, series_uid) if manifest else None
+    if series_data is None:
+        return Response({'error': f'Series not found: {series_uid}'}, status=status.HTTP_404_NOT_FOUND)
+    
+    series_ids = [instance['ID'] for instance in series_data['Instances']]
+    requested = request.GET.get('instances')
+    if requested:
+        # Only instances of this series can be requested through this URL
+        in_series = set(series_ids)
+        instance_ids = [i for i in requested.split(',') if i in in_series]
+        if len(instance_ids) > max_frames:
+            return Response({'error': f'At most {max_frames} frames per request'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        instance_ids = series_ids[start:start + count]
+    
+    if not instance_ids:
+        return Response({'error': f'No instances selected in series: {series_uid}'}, status=status.HTTP_404_NOT_FOUND)
+    
+    boundary = uuid.uuid4().hex
+    response = StreamingHttpResponse(
+        _multipart_frames(client, instance_ids, boundary),
+        content_type=f'multipart/related; type="application/octet-stream"; boundary={boundary}'
+    )
+    response['X-Frame-Count'] = str(len(instance_ids))
+    response['Access-Control-Allow-Origin'] = '*'
+    response['Access-Control-Expose-Headers'] = 'X-Frame-Count'
+    return response
+
+
+def _read_frame(client, orthanc_id, frame_number=1):
+    """Read one whole frame from the cache or Orthanc, None if it can't be retrieved"""
+    cached_path = dicom_file_cache.get(orthanc_id, f"frame-{frame_number}")
+    if cached_path:
+        try:
+            with open(cached_path, 'rb') as f:
+                return 'application/octet-stream', f.read()
+        except OSError:
+            pass  # Evicted between the lookup and the open
+    
+    content_type, content = _open_frame(client, orthanc_id, frame_number)
+    if content_type is None:
+        logger.warning(f"Frame {frame_number} of instance {orthanc_id} not retrievable (status {content})")
+        return None
+    return content_type, b''.join(content)
+
+
+def _multipart_frames(client, instance_ids, boundary):
+    """
+    Yield a multipart/related body with frame 1 of each instance, in order
+    
+    Up to FRAME_BATCH_PREFETCH frames are fetched ahead of the part being written.
+    """
+    prefetch = max(getattr(settings, 'FRAME_BATCH_PREFETCH', DEFAULT_FRAME_BATCH_PREFETCH), 1)
+    pending = deque()
+    remaining = iter(instance_ids)
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    try:
+        for orthanc_id in islice(remaining, prefetch):
+            pending.append((orthanc_id, executor.submit(_read_frame, client, orthanc_id)))
+        
+        while pending:
+            orthanc_id, future = pending.popleft()
+            next_id = next(remaining, None)
+            if next_id is not None:
+                pending.append((next_id, executor.submit(_read_frame, client, next_id)))
             
-            if raw_response.ok:
-                response = StreamingHttpResponse(
-                    raw_response.iter_content(chunk_size=32768),
-                    content_type='application/octet-stream'
-                )
-                response['Access-Control-Allow-Origin'] = '*'
-                response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-                response['Access-Control-Allow-Headers'] = '*'
-                return response
-            else:
-                pass
-        except Exception:
-            pass
+            try:
+                frame = future.result()
+            except Exception as e:
+                logger.warning(f"Frame of instance {orthanc_id} failed: {e}")
+                frame = None
+            if frame is None:
+                continue
+            
+            content_type, data = frame
+            yield (
+                f"--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Location: /api/pacs/instances/{orthanc_id}/frames/1\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"\r\n"
+            ).encode()
+            yield data
+            yield b"\r\n"
+        
+        yield f"--{boundary}--\r\n".encode()
+    finally:
+        # Client went away: drop queued fetches instead of finishing them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ========== Endpoint strategy and UID memoisation ==========
+
+# Frame strategies in order of preference
+FRAME_STRATEGIES = ['raw', 'file', 'dicomweb']
+# Instance strategies for endpoint_style='auto' in order of preference
+INSTANCE_STRATEGIES = ['dicomweb', 'attachment', 'file']
+
+DEFAULT_ENDPOINT_STRATEGY_TTL = 600  # Re-probe the preferred order every 10 minutes
+DEFAULT_INSTANCE_UID_TIMEOUT = 86400  # Orthanc IDs are derived from UIDs, they never change
+
+
+def _strategy_key(pacs_server, purpose):
+    return f"pacs_endpoint_strategy:{type(pacs_server).__name__}:{pacs_server.pk}:{purpose}"
+
+
+def _get_strategy(pacs_server, purpose):
+    """Working endpoint strategy last detected for a PACS server, or None"""
+    return cache.get(_strategy_key(pacs_server, purpose))
+
+
+def _remember_strategy(pacs_server, purpose, strategy):
+    """
+    Remember the strategy that worked for a PACS server
+    
+    Expires after ENDPOINT_STRATEGY_TTL so the preferred order is probed again
+    periodically (e.g. after Orthanc storage or plugins are fixed).
+    """
+    cache.set(
+        _strategy_key(pacs_server, purpose),
+        strategy,
+        getattr(settings, 'ENDPOINT_STRATEGY_TTL', DEFAULT_ENDPOINT_STRATEGY_TTL)
+    )
+
+
+def _forget_strategy(pacs_server, purpose):
+    cache.delete(_strategy_key(pacs_server, purpose))
+
+
+def _get_instance_uids(client, orthanc_id):
+    """
+    Study/series/SOP instance UIDs for an Orthanc instance, memoised
+    
+    The instance -> series -> study walk is only done the first time; series
+    UIDs are memoised separately so other instances of the same series need a
+    single /instances/{id} request.
+    
+    Returns:
+        (study_uid, series_uid, sop_uid) tuple, or None if the instance is unknown
+    """
+    timeout = getattr(settings, 'INSTANCE_UID_CACHE_TIMEOUT', DEFAULT_INSTANCE_UID_TIMEOUT)
+    instance_key = f"orthanc_instance_uids:{orthanc_id}"
+    uids = cache.get(instance_key)
+    if uids:
+        return uids
+    
+    instance_response = client.get(f"/instances/{orthanc_id}", timeout=10)
+    if not instance_response.ok:
+        return None
+    instance_data = instance_response.json()
+    parent_series = instance_data.get('ParentSeries')
+    sop_uid = instance_data.get('MainDicomTags', {}).get('SOPInstanceUID')
+    if not parent_series or not sop_uid:
+        return None
+    
+    series_key = f"orthanc_series_uids:{parent_series}"
+    series_uids = cache.get(series_key)
+    if not series_uids:
+        series_response = client.get(f"/series/{parent_series}", timeout=10)
+        if not series_response.ok:
+            return None
+        series_data = series_response.json()
+        parent_study = series_data.get('ParentStudy')
+        if not parent_study:
+            return None
         
-        # If raw pixel data fails, fall back to full DICOM file
+        study_response = client.get(f"/studies/{parent_study}", timeout=10)
+        if not study_response.ok:
+            return None
+        study_uid = study_response.json().get('MainDicomTags', {}).get('StudyInstanceUID')
+        series_uid = series_data.get('MainDicomTags', {}).get('SeriesInstanceUID')
+        if not study_uid or not series_uid:
+            return None
+        series_uids = (study_uid, series_uid)
+        cache.set(series_key, series_uids, timeout)
+    
+    uids = (series_uids[0], series_uids[1], sop_uid)
+    cache.set(instance_key, uids, timeout)
+    return uids
+
+
+def _open_frame(client, orthanc_id, frame_number):
+    """
+    Open one frame from Orthanc (or the cached DICOM file)
+    
+    Tries the strategy remembered for the PACS server first, then the rest in
+    order of preference: raw pixel data (frame 1 in the URL is frame 0 in
+    Orthanc), full DICOM file, DICOMweb instance. Complete downloads are
+    written to the local DICOM cache as they are consumed.
+    
+    The caller checks the frame cache first (frame-N entries).
+    
+    Returns:
+        (content_type, chunk iterator) on success, or (None, last upstream status)
+    """
+    frame_kind = f"frame-{frame_number}"
+    remembered = _get_strategy(client.pacs_server, 'frames')
+    strategies = [remembered] if remembered else []
+    strategies += [name for name in FRAME_STRATEGIES if name != remembered]
+    
+    last_status = None
+    for name in strategies:
+        if name == 'file':
+            cached_path = dicom_file_cache.get(orthanc_id, 'file')
+            if cached_path:
+                return 'application/dicom', _read_file_chunks(cached_path)
         
-        dicom_response = requests.get(
-            f"{orthanc_url}/instances/{orthanc_id}/file",
+        try:
+            upstream = _fetch_frame_upstream(client, name, orthanc_id, frame_number)
+        except Exception:
+            upstream = None
+        
+        if upstream is None or not upstream.ok:
+            last_status = getattr(upstream, 'status_code', last_status)
+            if upstream is not None:
+                # Hand the streamed connection back to the pool before the next strategy
+                upstream.close()
+            if name == remembered:
+                _forget_strategy(client.pacs_server, 'frames')
+            continue
+        
+        if name != remembered:
+            _remember_strategy(client.pacs_server, 'frames', name)
+        
+        content = upstream.iter_content(chunk_size=32768)
+        if name == 'raw':
+            return 'application/octet-stream', dicom_file_cache.stream_and_store(orthanc_id, frame_kind, content)
+        if name == 'file':
+            return 'application/dicom', dicom_file_cache.stream_and_store(orthanc_id, 'file', content)
+        return 'application/dicom', content
+    
+    return None, last_status
+
+
+def _read_file_chunks(path, chunk_size=32768):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _fetch_frame_upstream(client, strategy, orthanc_id, frame_number):
+    """Single upstream request for a frame strategy; None if it can't be attempted"""
+    if strategy == 'raw':
+        return client.get(f"/instances/{orthanc_id}/frames/{frame_number - 1}/raw", stream=True, timeout=30)
+    if strategy == 'file':
+        return client.get(f"/instances/{orthanc_id}/file", stream=True, timeout=60)
+    if strategy == 'dicomweb':
+        uids = _get_instance_uids(client, orthanc_id)
+        if not uids:
+            return None
+        study_uid, series_uid, sop_uid = uids
+        return client.get(
+            f"/dicom-web/studies/{study_uid}/series/{series_uid}/instances/{sop_uid}",
             stream=True,
             timeout=60
         )
-        
-        if not dicom_response.ok:
-            # Try the DICOMweb endpoint as fallback
-            try:
-                # Get instance metadata to construct DICOMweb URL
-                instance_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}", timeout=10)
-                if instance_response.ok:
-                    instance_data = instance_response.json()
-                    parent_series = instance_data.get('ParentSeries')
-                    
-                    if parent_series:
-                        series_response = requests.get(f"{orthanc_url}/series/{parent_series}", timeout=10)
-                        if series_response.ok:
-                            series_data = series_response.json()
-                            parent_study = series_data.get('ParentStudy')
-                            
-                            if parent_study:
-                                study_response = requests.get(f"{orthanc_url}/studies/{parent_study}", timeout=10)
-                                if study_response.ok:
-                                    study_data = study_response.json()
-                                    
-                                    study_uid = study_data.get('MainDicomTags', {}).get('StudyInstanceUID')
-                                    series_uid = series_data.get('MainDicomTags', {}).get('SeriesInstanceUID')
-                                    sop_uid = instance_data.get('MainDicomTags', {}).get('SOPInstanceUID')
-                                    
-                                    if all([study_uid, series_uid, sop_uid]):
-                                        dicomweb_url = f"{orthanc_url}/dicom-web/studies/{study_uid}/series/{series_uid}/instances/{sop_uid}"
-                                        dicom_response = requests.get(dicomweb_url, stream=True, timeout=60)
-                                        
-                                        if dicom_response.ok:
-                                            pass
-            except Exception:
-                pass
-            
-            if not dicom_response.ok:
-                return HttpResponse(f'Failed to get DICOM file: {dicom_response.status_code}', status=404)
-        
-        # Stream the DICOM file
-        response = StreamingHttpResponse(
-            dicom_response.iter_content(chunk_size=32768),
-            content_type='application/dicom'
-        )
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-        response['Access-Control-Allow-Headers'] = '*'
-        
-        return response
-        
-    except Exception as e:
-        return HttpResponse(f'DICOM frame failed: {str(e)}', status=500)
+    return None
 
 
 @api_view(['GET'])
@@ -573,31 +803,31 @@ def configurable_dicom_instance_proxy(request, orthanc_id):
         if not pacs_config:
             return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        orthanc_url = pacs_config.orthancurl
+        client = get_orthanc_client(pacs_config)
         endpoint_style = pacs_config.endpoint_style
         
         
         # Strategy selection based on configuration
         if endpoint_style == 'file':
-            return _try_file_endpoint(orthanc_url, orthanc_id)
+            return _try_file_endpoint(client, orthanc_id)
         elif endpoint_style == 'attachment':
-            return _try_attachment_endpoint(orthanc_url, orthanc_id)
+            return _try_attachment_endpoint(client, orthanc_id)
         elif endpoint_style == 'dicomweb':
-            return _try_dicomweb_endpoint(orthanc_url, orthanc_id)
+            return _try_dicomweb_endpoint(client, orthanc_id)
         elif endpoint_style == 'auto':
-            return _try_auto_detect_endpoint(orthanc_url, orthanc_id)
+            return _try_auto_detect_endpoint(client, orthanc_id)
         else:
             # Default to dicomweb
-            return _try_dicomweb_endpoint(orthanc_url, orthanc_id)
+            return _try_dicomweb_endpoint(client, orthanc_id)
             
     except Exception as e:
         return Response({'error': f'DICOM proxy failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _try_file_endpoint(orthanc_url, orthanc_id):
+def _try_file_endpoint(client, orthanc_id):
     """Direct /file endpoint (may not work with PostgreSQL storage)"""
     try:
-        file_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}/file", stream=True, timeout=30)
+        file_response = client.get(f"/instances/{orthanc_id}/file", stream=True, timeout=30)
         if file_response.ok:
             response = StreamingHttpResponse(
                 file_response.iter_content(chunk_size=32768),
@@ -615,11 +845,10 @@ def _try_file_endpoint(orthanc_url, orthanc_id):
         return Response({'error': f'/file endpoint error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _try_attachment_endpoint(orthanc_url, orthanc_id):
+def _try_attachment_endpoint(client, orthanc_id):
     """Raw attachment data endpoint"""
     try:
-        attachment_url = f"{orthanc_url}/instances/{orthanc_id}/attachments/1/data"
-        attachment_response = requests.get(attachment_url, stream=True, timeout=30)
+        attachment_response = client.get(f"/instances/{orthanc_id}/attachments/1/data", stream=True, timeout=30)
         if attachment_response.ok:
             response = StreamingHttpResponse(
                 attachment_response.iter_content(chunk_size=32768),
@@ -637,50 +866,21 @@ def _try_attachment_endpoint(orthanc_url, orthanc_id):
         return Response({'error': f'Attachment endpoint error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _try_dicomweb_endpoint(orthanc_url, orthanc_id):
+def _try_dicomweb_endpoint(client, orthanc_id):
     """OHIF-style DICOMweb endpoint (cleanest, most reliable)"""
     try:
-        instance_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}", timeout=10)
-        if not instance_response.ok:
-            return Response({'error': f'Instance metadata not found: {instance_response.status_code}'}, status=status.HTTP_404_NOT_FOUND)
-            
-        instance_data = instance_response.json()
-        parent_series = instance_data.get('ParentSeries')
-        
-        if not parent_series:
-            return Response({'error': 'Parent series not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-        # Get series metadata
-        series_response = requests.get(f"{orthanc_url}/series/{parent_series}", timeout=10)
-        if not series_response.ok:
-            return Response({'error': f'Series metadata not found: {series_response.status_code}'}, status=status.HTTP_404_NOT_FOUND)
-            
-        series_data = series_response.json()
-        parent_study = series_data.get('ParentStudy')
-        
-        if not parent_study:
-            return Response({'error': 'Parent study not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-        # Get study metadata
-        study_response = requests.get(f"{orthanc_url}/studies/{parent_study}", timeout=10)
-        if not study_response.ok:
-            return Response({'error': f'Study metadata not found: {study_response.status_code}'}, status=status.HTTP_404_NOT_FOUND)
-            
-        study_data = study_response.json()
-        
-        # Extract required UIDs for DICOMweb
-        study_uid = study_data.get('MainDicomTags', {}).get('StudyInstanceUID')
-        series_uid = series_data.get('MainDicomTags', {}).get('SeriesInstanceUID')
-        sop_uid = instance_data.get('MainDicomTags', {}).get('SOPInstanceUID')
-        if not all([study_uid, series_uid, sop_uid]):
-            return Response({'error': 'Missing required DICOM UIDs'}, status=status.HTTP_404_NOT_FOUND)
+        # Memoised instance -> series -> study UID lookup
+        uids = _get_instance_uids(client, orthanc_id)
+        if not uids:
+            return Response({'error': 'Instance, series or study UIDs not found'}, status=status.HTTP_404_NOT_FOUND)
+        study_uid, series_uid, sop_uid = uids
             
         # Try BOTH URL formats: internal IP and external domain path
         # Your OHIF uses: https://dicom.resakse.com/orthanc/dicom-web/...
         # We're trying: http://192.168.20.172:8042/dicom-web/...
         
         # Get the full DICOM file from DICOMweb instance endpoint (not frames)
-        instance_url = f"{orthanc_url}/dicom-web/studies/{study_uid}/series/{series_uid}/instances/{sop_uid}"
+        instance_path = f"/dicom-web/studies/{study_uid}/series/{series_uid}/instances/{sop_uid}"
         
         # Use headers that request DICOM file format
         headers = {
@@ -688,7 +888,7 @@ def _try_dicomweb_endpoint(orthanc_url, orthanc_id):
             'Accept-Encoding': 'identity',  # No compression to avoid parsing issues
         }
         
-        dicom_response = requests.get(instance_url, headers=headers, stream=True, timeout=60)
+        dicom_response = client.get(instance_path, headers=headers, stream=True, timeout=60)
         
         if not dicom_response.ok:
             return Response({'error': f'DICOMweb instance endpoint failed: {dicom_response.status_code}'}, status=status.HTTP_404_NOT_FOUND)
@@ -713,30 +913,30 @@ def _try_dicomweb_endpoint(orthanc_url, orthanc_id):
         return Response({'error': f'DICOMweb endpoint error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _try_auto_detect_endpoint(orthanc_url, orthanc_id):
-    """Try endpoints in order of reliability: dicomweb -> attachment -> file"""
-    # Try DICOMweb first (most reliable)
-    try:
-        response = _try_dicomweb_endpoint(orthanc_url, orthanc_id)
-        if response.status_code == 200:
-            return response
-    except:
-        pass
-        
-    # Try attachment second
-    try:
-        response = _try_attachment_endpoint(orthanc_url, orthanc_id)
-        if response.status_code == 200:
-            return response
-    except:
-        pass
-        
-    # Try file last
-    try:
-        response = _try_file_endpoint(orthanc_url, orthanc_id)
+def _try_auto_detect_endpoint(client, orthanc_id):
+    """
+    Try the strategy remembered for this PACS server first, then probe in order
+    of reliability: dicomweb -> attachment -> file
+    """
+    handlers = {
+        'dicomweb': _try_dicomweb_endpoint,
+        'attachment': _try_attachment_endpoint,
+        'file': _try_file_endpoint,
+    }
+    remembered = _get_strategy(client.pacs_server, 'instance')
+    strategies = [remembered] if remembered in handlers else []
+    strategies += [name for name in INSTANCE_STRATEGIES if name != remembered]
+    
+    for name in strategies:
+        try:
+            response = handlers[name](client, orthanc_id)
+        except Exception:
+            continue
         if response.status_code == 200:
+            if name != remembered:
+                _remember_strategy(client.pacs_server, 'instance', name)
             return response
-    except:
-        pass
+        if name == remembered:
+            _forget_strategy(client.pacs_server, 'instance')
         
-    return Response({'error': 'All auto-detect endpoints failed'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+    return Response({'error': 'All auto-detect endpoints failed'}, status=status.HTTP_404_NOT_FOUND)
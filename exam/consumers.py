@@ -1,80 +1,111 @@
 import json
 import asyncio
+import logging
 import psutil
 import os
 import shutil
+import time
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.exceptions import StopConsumer
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
 
-class DashboardConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        await self.accept()
-        # Start sending live updates for non-chart data only
-        self.task = asyncio.create_task(self.send_live_updates())
+from .dashboard_stats import DASHBOARD_GROUP, sample_interval, send_pending_dashboard_stats
+from .ai_streaming import ai_report_stream_cache_key, ai_report_stream_group
+from .dicom_upload import dicom_upload_cache_key, dicom_upload_group
 
-    async def disconnect(self, close_code):
-        # Cancel the background task
-        if hasattr(self, 'task'):
+logger = logging.getLogger(__name__)
+
+DASHBOARD_SAMPLE_LOCK_KEY = 'dashboard_sampler_tick'
+DEFAULT_DASHBOARD_STORAGE_INTERVAL = 10  # seconds
+
+
+class DashboardSampler:
+    """
+    One sampler task per process for all open dashboards
+
+    Samples system resources every DASHBOARD_SAMPLE_INTERVAL seconds (storage
+    every DASHBOARD_STORAGE_INTERVAL) and sends them to the DASHBOARD_GROUP
+    channel-layer group. It runs only while this process has dashboard
+    connections, and a cache lock lets a single process sample each tick when
+    several ASGI workers have dashboards open. CPU usage is read without an
+    interval (since the previous tick), so the event loop never blocks.
+    """
+
+    def __init__(self):
+        self.subscribers = 0
+        self.task = None
+        self.latest = {}  # Last message of each type, sent to new connections
+
+    def subscribe(self):
+        self.subscribers += 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def unsubscribe(self):
+        self.subscribers = max(self.subscribers - 1, 0)
+        if self.subscribers == 0 and self.task is not None:
             self.task.cancel()
-        raise StopConsumer()
+            self.task = None
 
-    async def send_live_updates(self):
-        """Send live updates for system resources and storage info only - NO CHARTS"""
+    async def run(self):
+        channel_layer = get_channel_layer()
+        interval = sample_interval()
+        storage_every = max(int(getattr(settings, 'DASHBOARD_STORAGE_INTERVAL', DEFAULT_DASHBOARD_STORAGE_INTERVAL) // interval), 1)
+        tick = 0
+        psutil.cpu_percent(interval=None)  # Prime the counter, the first reading is meaningless
         try:
             while True:
-                # 1. System Resources (live)
-                cpu_percent = psutil.cpu_percent(interval=1)
-                memory = psutil.virtual_memory()
-                disk_io = psutil.disk_io_counters()
-                
-                system_resources = {
-                    'cpu_usage_percent': round(cpu_percent, 1),
-                    'ram_total_gb': round(memory.total / (1024**3), 2),
-                    'ram_used_gb': round(memory.used / (1024**3), 2),
-                    'ram_available_gb': round(memory.available / (1024**3), 2),
-                    'ram_usage_percent': round(memory.percent, 1),
-                    'disk_read_mb': round(disk_io.read_bytes / (1024**2), 2) if disk_io else 0,
-                    'disk_write_mb': round(disk_io.write_bytes / (1024**2), 2) if disk_io else 0
-                }
-                
-                # Send system resources update
-                await self.send(text_data=json.dumps({
-                    'type': 'system_resources',
-                    'data': system_resources
-                }))
-                
-                # 2. Storage Info (live but less frequent)
-                # Only update storage every 10 seconds to avoid too much disk I/O
-                if not hasattr(self, 'storage_counter'):
-                    self.storage_counter = 0
-                
-                self.storage_counter += 1
-                if self.storage_counter >= 5:  # Every 10 seconds (5 * 2 seconds)
-                    storage_info = await self.get_storage_info()
-                    if storage_info:
-                        await self.send(text_data=json.dumps({
-                            'type': 'storage_info',
-                            'data': storage_info
-                        }))
-                    self.storage_counter = 0
-                
-                # Wait 2 seconds before next update
-                await asyncio.sleep(2)
-                
+                await asyncio.sleep(interval)
+                try:
+                    slot = int(time.time() // interval)
+                    if not await cache.aadd(f"{DASHBOARD_SAMPLE_LOCK_KEY}:{slot}", True, int(interval * 2) + 1):
+                        continue  # Another worker sampled this tick
+                    tick += 1
+                    await self.publish(channel_layer, 'system_resources', self.get_system_resources())
+                    if tick % storage_every == 0:
+                        storage_info = self.get_storage_info()
+                        if storage_info:
+                            await self.publish(channel_layer, 'storage_info', storage_info)
+                    # Trailing update for counter changes throttled by broadcast_dashboard_stats()
+                    await database_sync_to_async(send_pending_dashboard_stats)()
+                except Exception as e:
+                    logger.warning(f"Dashboard sampler error: {e}")
         except asyncio.CancelledError:
-            # Task was cancelled, exit gracefully
             pass
-        except Exception as e:
-            # Log error and close connection
-            print(f"Error in dashboard WebSocket: {e}")
-            await self.close()
 
-    async def get_storage_info(self):
+    async def publish(self, channel_layer, message_type, data):
+        self.latest[message_type] = data
+        await channel_layer.group_send(DASHBOARD_GROUP, {
+            'type': 'dashboard.update',
+            'message_type': message_type,
+            'data': data,
+        })
+
+    def get_system_resources(self):
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk_io = psutil.disk_io_counters()
+
+        return {
+            'cpu_usage_percent': round(cpu_percent, 1),
+            'ram_total_gb': round(memory.total / (1024**3), 2),
+            'ram_used_gb': round(memory.used / (1024**3), 2),
+            'ram_available_gb': round(memory.available / (1024**3), 2),
+            'ram_usage_percent': round(memory.percent, 1),
+            'disk_read_mb': round(disk_io.read_bytes / (1024**2), 2) if disk_io else 0,
+            'disk_write_mb': round(disk_io.write_bytes / (1024**2), 2) if disk_io else 0
+        }
+
+    def get_storage_info(self):
         """Get storage information without affecting charts"""
         try:
             # Simple storage check for primary paths
             storage_paths = ['/var/lib/orthanc/db', '/data/orthanc', '/opt/orthanc/data', os.getcwd()]
-            
+
             for path in storage_paths:
                 if os.path.exists(path):
                     total, used, free = shutil.disk_usage(path)
@@ -82,7 +113,7 @@ class DashboardConsumer(AsyncWebsocketConsumer):
                     used_gb = used / (1024**3)
                     free_gb = free / (1024**3)
                     usage_percentage = (used / total) * 100 if total > 0 else 0
-                    
+
                     return {
                         'primary_storage': {
                             'total_gb': round(total_gb, 2),
@@ -100,4 +131,146 @@ class DashboardConsumer(AsyncWebsocketConsumer):
                     }
             return None
         except Exception:
-            return None
\ No newline at end of file
+            return None
+
+
+# Process-wide sampler shared by every DashboardConsumer
+sampler = DashboardSampler()
+
+
+class DashboardConsumer(AsyncWebsocketConsumer):
+    """
+    Live dashboard updates: system resources, storage info and the period
+    counters (dashboard_stats), all received through the DASHBOARD_GROUP group.
+    Chart data is still loaded over REST.
+    """
+
+    async def connect(self):
+        self.subscribed = False
+        try:
+            await self.channel_layer.group_add(DASHBOARD_GROUP, self.channel_name)
+        except Exception as e:
+            logger.warning(f"Dashboard WebSocket could not join the channel layer group: {e}")
+            await self.close()
+            return
+        await self.accept()
+        sampler.subscribe()
+        self.subscribed = True
+
+        # Don't make new dashboards wait for the next tick
+        for message_type, data in sampler.latest.items():
+            await self.send(text_data=json.dumps({'type': message_type, 'data': data}))
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'subscribed', False):
+            sampler.unsubscribe()
+            self.subscribed = False
+            try:
+                await self.channel_layer.group_discard(DASHBOARD_GROUP, self.channel_name)
+            except Exception as e:
+                logger.warning(f"Dashboard WebSocket could not leave the channel layer group: {e}")
+        raise StopConsumer()
+
+    async def dashboard_update(self, event):
+        await self.send(text_data=json.dumps({
+            'type': event['message_type'],
+            'data': event['data']
+        }))
+
+
+class StreamConsumer(AsyncWebsocketConsumer):
+    """
+    Forwards the messages of one channel-layer group to a WebSocket
+
+    Clients authenticate with their session or a JWT access token in the
+    ?token= query parameter. Subclasses name the group and the cache key of
+    the latest message, which is sent on connect so late clients catch up.
+    """
+
+    def stream_group(self, kwargs) -> str:
+        raise NotImplementedError
+
+    def stream_cache_key(self, kwargs) -> str:
+        raise NotImplementedError
+
+    async def connect(self):
+        self.group = None
+        if not await self.is_authenticated():
+            await self.close(code=4401)
+            return
+
+        kwargs = self.scope['url_route']['kwargs']
+        self.group = self.stream_group(kwargs)
+        try:
+            await self.channel_layer.group_add(self.group, self.channel_name)
+        except Exception as e:
+            logger.warning(f"{self.group} stream could not join the channel layer group: {e}")
+            self.group = None
+            await self.close()
+            return
+        await self.accept()
+
+        # Catch up with messages sent before connecting
+        latest = await cache.aget(self.stream_cache_key(kwargs))
+        if latest:
+            await self.send(text_data=json.dumps(latest))
+
+    async def is_authenticated(self):
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated:
+            return True
+
+        token = parse_qs(self.scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if not token:
+            return False
+        try:
+            from rest_framework_simplejwt.tokens import AccessToken
+            AccessToken(token)
+            return True
+        except Exception:
+            return False
+
+    async def disconnect(self, close_code):
+        if self.group:
+            try:
+                await self.channel_layer.group_discard(self.group, self.channel_name)
+            except Exception as e:
+                logger.warning(f"{self.group} stream could not leave the channel layer group: {e}")
+        raise StopConsumer()
+
+    async def forward(self, event):
+        await self.send(text_data=json.dumps(event['message']))
+
+
+class AIReportStreamConsumer(StreamConsumer):
+    """
+    Live text of an AI report while a worker generates it (ws/ai-reports/<id>/stream/)
+
+    Clients reload the report when 'done' arrives.
+    """
+
+    def stream_group(self, kwargs) -> str:
+        return ai_report_stream_group(kwargs['report_id'])
+
+    def stream_cache_key(self, kwargs) -> str:
+        return ai_report_stream_cache_key(kwargs['report_id'])
+
+    async def report_stream(self, event):
+        await self.forward(event)
+
+
+class DicomUploadProgressConsumer(StreamConsumer):
+    """
+    Progress of a background DICOM upload (ws/dicom-uploads/<id>/progress/)
+
+    Clients load the job's result when 'done' arrives.
+    """
+
+    def stream_group(self, kwargs) -> str:
+        return dicom_upload_group(kwargs['job_id'])
+
+    def stream_cache_key(self, kwargs) -> str:
+        return dicom_upload_cache_key(kwargs['job_id'])
+
+    async def upload_progress(self, event):
+        await self.forward(event)
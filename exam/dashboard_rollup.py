@@ -0,0 +1,256 @@
+"""
+Daily dashboard rollups
+
+DashboardDailyRollup holds examination/registration counts per exam date
+(Daftar.tarikh, local time) x modality x body part x exam x ward x gender x
+age group. The dashboard endpoints sum these rows for their periods, so their
+cost depends on the number of days and dimensions, not on years of
+Pemeriksaan/Daftar rows.
+
+A date is rebuilt as a whole (two grouped queries over that day's rows) rather
+than incremented, which keeps the rollup exact through edits, status changes
+and deletes. Writes only mark their dates as pending, and the rebuild happens
+when the rollup is next read:
+- The signal handlers in exam/signals.py insert a DashboardRollupPendingDate
+  row for each affected date inside the same transaction as the change. These
+  are plain inserts without a unique key, so concurrent registrations of one
+  day never wait on each other.
+- Bulk operations (registration serializer, DICOM upload and PACS import)
+  wrap their work in defer_rollups() to mark each touched date once at the end.
+- period_sums() rebuilds the pending dates before summing, so the dashboards
+  see every committed change. Rebuilds of one date run one at a time under a
+  lock on its DashboardRollupDate row, so a rebuild waiting on another counts
+  the other's committed rows instead of adding a second copy of the day.
+- The rebuild_dashboard_rollups management command rebuilds pending dates
+  (--pending) and backfills history.
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Q, Sum, Value, When
+from django.utils import timezone
+
+
+_deferred = threading.local()
+
+
+def years_before(day: date, years: int) -> date:
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - years, day=28)
+
+
+def age_group_expression(field: str, on_day: date, umur_field: Optional[str] = None) -> Case:
+    """
+    SQL expression for the dashboard age group of a birth date column
+
+    Args:
+        field: Path to Pesakit.tarikh_lahir
+        on_day: Date the age is computed for
+        umur_field: Path to Pesakit.umur; patients with an unparseable umur
+            and no birth date are counted as adults
+    """
+    # Under 18 if born after adult_cutoff, 65 or under if born after senior_cutoff
+    adult_cutoff = years_before(on_day, 18)
+    senior_cutoff = years_before(on_day, 66)
+    whens = [
+        When(**{f'{field}__gt': adult_cutoff}, then=Value('0-17')),
+        When(**{f'{field}__gt': senior_cutoff}, then=Value('18-65')),
+        When(**{f'{field}__isnull': False}, then=Value('65+')),
+    ]
+    if umur_field:
+        whens.append(When(Q(**{f'{umur_field}__isnull': False}) & ~Q(**{umur_field: ''}), then=Value('18-65')))
+    return Case(*whens, default=Value(''), output_field=CharField())
+
+
+def local_date(value: datetime) -> date:
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def day_range(day: date) -> tuple:
+    """Start and end (exclusive) of a local date, for indexed range filters on Daftar.tarikh"""
+    start = datetime.combine(day, time.min)
+    end = datetime.combine(day + timedelta(days=1), time.min)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start), timezone.make_aware(end)
+    return start, end
+
+
+def rebuild_day(day: date) -> int:
+    """
+    Replace the rollup rows for one exam date
+
+    Returns:
+        Number of rollup rows written
+    """
+    from .models import DashboardDailyRollup, DashboardRollupDate, DashboardRollupPendingDate
+
+    with transaction.atomic():
+        # Wait for any other rebuild of this date; the counts below then
+        # include the rows it committed
+        DashboardRollupDate.objects.select_for_update().get_or_create(date=day)
+        # Changes committed after this point leave a new pending row behind
+        DashboardRollupPendingDate.objects.filter(date=day).delete()
+        rows = _count_day(day)
+        DashboardDailyRollup.objects.filter(date=day).delete()
+        DashboardDailyRollup.objects.bulk_create([
+            DashboardDailyRollup(
+                date=day, modaliti_id=modaliti, part_id=part, exam_id=exam, rujukan_id=rujukan,
+                jantina=jantina, age_group=age_group,
+                examinations=counts[0], registrations=counts[1], studies_completed=counts[2]
+            )
+            for (modaliti, part, exam, rujukan, jantina, age_group), counts in rows.items()
+        ])
+    return len(rows)
+
+
+def _count_day(day: date) -> dict:
+    """Examination/registration counts of one exam date keyed by rollup dimensions"""
+    from .models import Daftar, Pemeriksaan
+
+    start, end = day_range(day)
+    rows = {}
+
+    examinations = (
+        Pemeriksaan.objects
+        .filter(daftar__tarikh__gte=start, daftar__tarikh__lt=end)
+        .annotate(age_group=age_group_expression('daftar__pesakit__tarikh_lahir', day, 'daftar__pesakit__umur'))
+        .values(
+            'exam__modaliti_id', 'exam__part_id', 'exam_id', 'daftar__rujukan_id',
+            'daftar__pesakit__jantina', 'age_group'
+        )
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for row in examinations:
+        key = (
+            row['exam__modaliti_id'], row['exam__part_id'], row['exam_id'], row['daftar__rujukan_id'],
+            row['daftar__pesakit__jantina'] or '', row['age_group']
+        )
+        rows.setdefault(key, [0, 0, 0])[0] += row['count']
+
+    registrations = (
+        Daftar.objects
+        .filter(tarikh__gte=start, tarikh__lt=end)
+        .annotate(age_group=age_group_expression('pesakit__tarikh_lahir', day, 'pesakit__umur'))
+        .values('rujukan_id', 'pesakit__jantina', 'age_group')
+        .annotate(count=Count('pk'), completed=Count('pk', filter=Q(study_status='COMPLETED')))
+        .order_by()
+    )
+    for row in registrations:
+        key = (None, None, None, row['rujukan_id'], row['pesakit__jantina'] or '', row['age_group'])
+        counts = rows.setdefault(key, [0, 0, 0])
+        counts[1] += row['count']
+        counts[2] += row['completed']
+    return rows
+
+
+def mark_days_pending(days: Iterable[date]):
+    """Queue the given dates for a rebuild, or collect them inside defer_rollups()"""
+    from .models import DashboardRollupPendingDate
+
+    days = {day for day in days if day}
+    deferred = getattr(_deferred, 'days', None)
+    if deferred is not None:
+        deferred.update(days)
+        return
+    DashboardRollupPendingDate.objects.bulk_create([DashboardRollupPendingDate(date=day) for day in sorted(days)])
+
+
+def rebuild_pending_days() -> int:
+    """
+    Rebuild every date with pending changes
+
+    Returns:
+        Number of dates rebuilt
+    """
+    from .models import DashboardRollupPendingDate
+
+    days = sorted(DashboardRollupPendingDate.objects.values_list('date', flat=True).distinct())
+    for day in days:
+        rebuild_day(day)
+    return len(days)
+
+
+@contextmanager
+def defer_rollups():
+    """Collect dates touched inside the block and mark each of them once at the end"""
+    if getattr(_deferred, 'days', None) is not None:
+        # Nested, the outermost block marks
+        yield
+        return
+    _deferred.days = set()
+    try:
+        yield
+    finally:
+        days, _deferred.days = _deferred.days, None
+    mark_days_pending(days)
+
+
+# ========== Reading ==========
+
+def get_period_dates(now: Optional[datetime] = None) -> Dict[str, tuple]:
+    """First/last exam date of each dashboard period (whole local days)"""
+    today = timezone.localtime(now or timezone.now()).date()
+    return {
+        'today': (today, today),
+        'week': (today - timedelta(days=7), today),
+        'month': (today - timedelta(days=30), today),
+        'year': (date(today.year, 1, 1), date(today.year, 12, 31)),
+    }
+
+
+def period_sums(fields: Iterable[str], periods: Dict[str, tuple], group_by: Iterable[str] = ()):
+    """
+    Sum rollup measures per period, optionally grouped by dimensions
+
+    Pending dates are rebuilt first.
+
+    Returns:
+        Aggregate dict (no grouping) or list of dicts (grouped) with keys
+        '{period}_{field}' and 'all_time_{field}'
+    """
+    from .models import DashboardDailyRollup
+
+    rebuild_pending_days()
+    sums = {}
+    for field in fields:
+        sums[f'all_time_{field}'] = Sum(field, default=0)
+        for period, (start, end) in periods.items():
+            sums[f'{period}_{field}'] = Sum(field, filter=Q(date__range=(start, end)), default=0)
+
+    queryset = DashboardDailyRollup.objects.all()
+    group_by = list(group_by)
+    if not group_by:
+        return queryset.aggregate(**sums)
+    return list(queryset.values(*group_by).annotate(**sums).order_by())
+
+
+def distribution(group_field: str, label: str, periods: Dict[str, tuple], unknown: Optional[str] = None):
+    """
+    Examination counts per value of one dimension for each period
+
+    Returns:
+        {period: [{label: value, 'count': n, 'percentage': p}, ...]} sorted by count
+    """
+    rows = period_sums(['examinations'], periods, group_by=[group_field])
+    result = {}
+    for period in [*periods, 'all_time']:
+        key = f'{period}_examinations'
+        total = sum(row[key] for row in rows)
+        entries = [
+            {
+                label: row[group_field] if row[group_field] is not None else unknown,
+                'count': row[key],
+                'percentage': round((row[key] / total) * 100, 1)
+            }
+            for row in rows if row[key] and (row[group_field] is not None or unknown is not None)
+        ]
+        result[period] = sorted(entries, key=lambda entry: -entry['count'])
+    return result
@@ -0,0 +1,273 @@
+"""
+Dashboard statistics
+
+The dashboard polls period counts (today/week/month/year/all time) for
+patients, registrations, examinations and completed studies. Registration and
+examination counts are sums over the daily rollup (exam/dashboard_rollup.py);
+patients are one conditional aggregation over Pesakit. The result is kept in
+the Django cache:
+
+- New Pesakit/Daftar/Pemeriksaan rows are added to the cached snapshot by the
+  post_save handlers in exam/signals.py, so polling browsers don't trigger a
+  recount for every registration.
+- Updates (e.g. study_status changes) and deletes drop the snapshot; the next
+  poll recomputes it.
+- The snapshot expires after DASHBOARD_STATS_CACHE_TIMEOUT and at midnight.
+
+Open dashboards also receive the snapshot over the DashboardConsumer
+WebSocket: the signal handlers call broadcast_dashboard_stats() after each
+commit, which sends it to the DASHBOARD_GROUP channel-layer group at most once
+per DASHBOARD_SAMPLE_INTERVAL. Changes inside that window are flagged in the
+cache and sent by the shared sampler in exam/consumers.py on its next tick.
+
+Periods are whole local days. Demographics (age group, gender, race per
+period) are one grouped query over Pesakit using the stored tarikh_lahir
+column, since they count patients rather than examinations.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .dashboard_rollup import age_group_expression, get_period_dates, local_date, period_sums
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_STATS_CACHE_KEY = 'dashboard_stats'
+DEFAULT_DASHBOARD_STATS_CACHE_TIMEOUT = 300  # 5 minutes
+
+DASHBOARD_GROUP = 'dashboard'
+DASHBOARD_BROADCAST_LOCK_KEY = 'dashboard_stats_broadcast'
+DASHBOARD_BROADCAST_PENDING_KEY = 'dashboard_stats_pending'
+DEFAULT_DASHBOARD_SAMPLE_INTERVAL = 2  # seconds
+
+PERIOD_DAYS = {'today': 1, 'week': 7, 'month': 30, 'year': 365}
+
+
+def _cases_per_day(examinations: int, days: int) -> float:
+    return round(examinations / days, 1) if days > 0 else 0
+
+
+def compute_dashboard_stats(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Compute the dashboard snapshot (three small queries)
+
+    Returns:
+        Snapshot dict with 'stats' (the API payload), 'periods', 'first_exam'
+        and 'computed_on'
+    """
+    from pesakit.models import Pesakit
+    from .models import DashboardDailyRollup
+
+    now = now or timezone.now()
+    periods = get_period_dates(now)
+
+    patient_counts = {'total': Count('pk')}
+    for period, (start, end) in periods.items():
+        patient_counts[period] = Count('pk', filter=Q(created__date__range=(start, end)))
+    patients = Pesakit.objects.aggregate(**patient_counts)
+
+    sums = period_sums(['registrations', 'examinations', 'studies_completed'], periods)
+    first_exam = DashboardDailyRollup.objects.filter(examinations__gt=0).aggregate(first=Min('date'))['first']
+
+    snapshot = {
+        'stats': {},
+        'periods': periods,
+        'first_exam': first_exam,
+        'computed_on': local_date(now),
+    }
+    for period in [*PERIOD_DAYS, 'all_time']:
+        snapshot['stats'][period] = {
+            'patients': patients['total' if period == 'all_time' else period],
+            'registrations': sums[f'{period}_registrations'],
+            'examinations': sums[f'{period}_examinations'],
+            'studies_completed': sums[f'{period}_studies_completed'],
+        }
+    _update_cases_per_day(snapshot, now)
+    return snapshot
+
+
+def _update_cases_per_day(snapshot: Dict[str, Any], now: datetime):
+    stats = snapshot['stats']
+    for period, days in PERIOD_DAYS.items():
+        stats[period]['cases_per_day'] = _cases_per_day(stats[period]['examinations'], days)
+    if snapshot['first_exam']:
+        total_days = (local_date(now) - snapshot['first_exam']).days or 1
+        stats['all_time']['cases_per_day'] = _cases_per_day(stats['all_time']['examinations'], total_days)
+    else:
+        stats['all_time']['cases_per_day'] = 0
+
+
+def _cache_timeout() -> int:
+    return getattr(settings, 'DASHBOARD_STATS_CACHE_TIMEOUT', DEFAULT_DASHBOARD_STATS_CACHE_TIMEOUT)
+
+
+def get_dashboard_stats() -> Dict[str, Any]:
+    """Dashboard period statistics, from the cache when possible"""
+    now = timezone.now()
+    snapshot = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if snapshot is None or snapshot['expires_at'] <= now or snapshot['computed_on'] != local_date(now):
+        snapshot = compute_dashboard_stats(now)
+        snapshot['expires_at'] = now + timedelta(seconds=_cache_timeout())
+        cache.set(DASHBOARD_STATS_CACHE_KEY, snapshot, _cache_timeout())
+    return snapshot['stats']
+
+
+def record_new_row(metric: str, when: datetime, completed: bool = False):
+    """
+    Add a newly created row to the cached snapshot, if there is one
+
+    Args:
+        metric: 'patients', 'registrations' or 'examinations'
+        when: The row's date for period matching (created or tarikh)
+        completed: Registration already has study_status COMPLETED
+    """
+    snapshot = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if snapshot is None:
+        return
+
+    day = local_date(when)
+    stats = snapshot['stats']
+    for period, (start, end) in snapshot['periods'].items():
+        if start <= day <= end:
+            stats[period][metric] += 1
+            if completed:
+                stats[period]['studies_completed'] += 1
+    stats['all_time'][metric] += 1
+    if completed:
+        stats['all_time']['studies_completed'] += 1
+    if metric == 'examinations' and (snapshot['first_exam'] is None or day < snapshot['first_exam']):
+        snapshot['first_exam'] = day
+
+    _update_cases_per_day(snapshot, timezone.now())
+    # expires_at is unchanged, so new rows never extend the snapshot's lifetime
+    cache.set(DASHBOARD_STATS_CACHE_KEY, snapshot, _cache_timeout())
+
+
+def invalidate_dashboard_stats():
+    """Drop the cached snapshot so the next request recomputes it"""
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+
+def sample_interval() -> float:
+    return getattr(settings, 'DASHBOARD_SAMPLE_INTERVAL', DEFAULT_DASHBOARD_SAMPLE_INTERVAL)
+
+
+def send_dashboard_stats():
+    """Send the current snapshot to every open dashboard"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(DASHBOARD_GROUP, {
+        'type': 'dashboard.update',
+        'message_type': 'dashboard_stats',
+        'data': get_dashboard_stats(),
+    })
+
+
+def broadcast_dashboard_stats():
+    """
+    Push the updated counters to open dashboards, throttled across processes
+
+    The first change in each DASHBOARD_SAMPLE_INTERVAL is sent immediately;
+    later ones only set a pending flag, which the dashboard sampler turns into
+    a single trailing update. Broadcast failures (e.g. Redis down) are logged
+    and never fail the save that triggered them.
+    """
+    if not getattr(settings, 'DASHBOARD_LIVE_UPDATES', True):
+        return
+    interval = sample_interval()
+    try:
+        if not cache.add(DASHBOARD_BROADCAST_LOCK_KEY, True, interval):
+            cache.set(DASHBOARD_BROADCAST_PENDING_KEY, True, max(interval * 5, 60))
+            return
+        send_dashboard_stats()
+    except Exception as e:
+        logger.warning(f"Failed to broadcast dashboard stats: {e}")
+
+
+def send_pending_dashboard_stats() -> bool:
+    """Send the trailing update for throttled changes, if any (called by the sampler)"""
+    if not cache.get(DASHBOARD_BROADCAST_PENDING_KEY):
+        return False
+    cache.delete(DASHBOARD_BROADCAST_PENDING_KEY)
+    send_dashboard_stats()
+    return True
+
+
+AGE_GROUPS = ['0-17', '18-65', '65+']
+
+
+def compute_demographics(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Age group, gender and race distribution per period in a single query
+
+    Patients are grouped by (age group, jantina, bangsa) with one conditional
+    count per period; the handful of resulting rows are folded in Python.
+    Patients whose age is unknown but who have an unparseable umur are counted
+    as adults, the rest without a date of birth are left out of the age groups.
+
+    Returns:
+        {'by_period': {period: {'age_groups': [...], 'gender': [...], 'race': [...]}}}
+    """
+    from pesakit.models import Pesakit
+
+    now = now or timezone.now()
+    periods = get_period_dates(now)
+
+    period_counts = {
+        period: Count('pk', filter=Q(created__date__range=(start, end)))
+        for period, (start, end) in periods.items()
+    }
+    rows = (
+        Pesakit.objects
+        .annotate(age_group=age_group_expression('tarikh_lahir', local_date(now), 'umur'))
+        .values('age_group', 'jantina', 'bangsa')
+        .annotate(all_time=Count('pk'), **period_counts)
+        .order_by()
+    )
+
+    buckets = {period: {'total': 0, 'age': {}, 'gender': {}, 'race': {}} for period in [*periods, 'all_time']}
+    for row in rows:
+        for period, bucket in buckets.items():
+            count = row[period]
+            if not count:
+                continue
+            bucket['total'] += count
+            if row['age_group']:
+                bucket['age'][row['age_group']] = bucket['age'].get(row['age_group'], 0) + count
+            bucket['gender'][row['jantina']] = bucket['gender'].get(row['jantina'], 0) + count
+            bucket['race'][row['bangsa']] = bucket['race'].get(row['bangsa'], 0) + count
+
+    def percentage(count, total):
+        return round((count / total) * 100, 1) if total > 0 else 0
+
+    demographics = {'by_period': {}}
+    for period, bucket in buckets.items():
+        total = bucket['total']
+        if total == 0:
+            demographics['by_period'][period] = {'age_groups': [], 'gender': [], 'race': []}
+            continue
+        demographics['by_period'][period] = {
+            'age_groups': [
+                {'range': group, 'count': bucket['age'].get(group, 0),
+                 'percentage': percentage(bucket['age'].get(group, 0), total)}
+                for group in AGE_GROUPS
+            ],
+            'gender': [
+                {'gender': 'M' if jantina == 'L' else 'F', 'count': count, 'percentage': percentage(count, total)}
+                for jantina, count in bucket['gender'].items()
+            ],
+            'race': [
+                {'race': bangsa, 'count': count, 'percentage': percentage(count, total)}
+                for bangsa, count in bucket['race'].items()
+            ],
+        }
+    return demographics
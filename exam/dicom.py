@@ -1,8 +1,5 @@
-import requests
-
 from exam.models import PacsExam, Exam, Pemeriksaan
-
-url = 'http://localhost:8042/tools/find'
+from exam.orthanc_client import get_orthanc_client
 
 
 # curl --request POST --url http://localhost:8042/tools/find   --data '{
@@ -23,7 +20,7 @@ def get_dicom(noxray):
             "Limit": 101,
             "Query": {"StudyDate": "", "AccessionNumber": str(noxray)}
         }
-        r = requests.post(url, json=predataa)
+        r = get_orthanc_client().post('/tools/find', json=predataa)
         response = r.json()
         if response:
             data = {
@@ -0,0 +1,297 @@
+"""
+Local on-disk DICOM cache for the instance/frame proxies
+
+Instance files and raw frames fetched from Orthanc are written to a bounded
+directory (DICOM_CACHE_DIR, DICOM_CACHE_MAX_BYTES) as they are streamed to the
+client, and later requests are served straight from disk with FileResponse.
+
+Entries are content-addressed by Orthanc ID. Orthanc IDs are derived from the
+DICOM UIDs, so an ID always refers to the same content and entries never need
+revalidation; they only leave the cache through LRU eviction (file mtime is
+bumped on every hit).
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_MAX_BYTES = 5 * 1024 ** 3  # 5 GB
+# Evict down to this fraction of the budget so we don't evict on every store
+EVICT_TARGET_RATIO = 0.9
+
+
+class RangeNotSatisfiable(Exception):
+    """Requested byte range lies outside the entry"""
+
+
+def parse_range_header(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=" Range header
+
+    Args:
+        header: Range header value, e.g. 'bytes=0-1023', 'bytes=1024-', 'bytes=-500'
+        size: Total size of the entity
+
+    Returns:
+        Inclusive (start, end) tuple, or None if the header should be ignored
+        (malformed or multiple ranges), in which case the full body is sent
+
+    Raises:
+        RangeNotSatisfiable: The range starts beyond the end of the entity
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if first == '':
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start > end:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class DicomFileCache:
+    """
+    Bounded LRU file cache for DICOM instances and frames
+
+    Hit/miss/store/eviction counters are kept per process and reported by stats().
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self._root = root
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # Lazily computed on first store
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    # ========== Configuration ==========
+
+    @property
+    def root(self) -> str:
+        return self._root or getattr(
+            settings, 'DICOM_CACHE_DIR', os.path.join(settings.BASE_DIR, 'dicom_cache')
+        )
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return getattr(settings, 'DICOM_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'DICOM_CACHE_ENABLED', True) and self.max_bytes > 0
+
+    def path_for(self, orthanc_id: str, kind: str = 'file') -> str:
+        """
+        Cache path for an Orthanc resource
+
+        Args:
+            orthanc_id: Orthanc instance ID
+            kind: 'file' for the full DICOM instance, 'frame-N' for raw frame N (1-based)
+        """
+        safe_id = ''.join(c for c in orthanc_id if c.isalnum() or c == '-')
+        return os.path.join(self.root, safe_id[:2], safe_id, kind)
+
+    # ========== Lookup ==========
+
+    def get(self, orthanc_id: str, kind: str = 'file') -> Optional[str]:
+        """Return the cached file path and mark it recently used, or None on a miss"""
+        if not self.enabled:
+            return None
+        path = self.path_for(orthanc_id, kind)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def etag_for(self, orthanc_id: str, kind: str = 'file') -> str:
+        """Strong ETag for an entry; content never changes for a given Orthanc ID"""
+        return f'"{orthanc_id}-{kind}"'
+
+    def response(self, orthanc_id: str, kind: str = 'file',
+                 content_type: str = 'application/dicom',
+                 range_header: Optional[str] = None) -> Optional[HttpResponse]:
+        """
+        Response for a cached entry, or None on a miss
+
+        Full bodies are a FileResponse (served via wsgi.file_wrapper/sendfile);
+        a single "bytes=" Range is answered with 206 Partial Content.
+        """
+        path = self.get(orthanc_id, kind)
+        if path is None:
+            return None
+        try:
+            size = os.path.getsize(path)
+            byte_range = parse_range_header(range_header, size) if range_header else None
+            if byte_range is None:
+                response = FileResponse(open(path, 'rb'), content_type=content_type)
+            else:
+                start, end = byte_range
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    response = HttpResponse(f.read(end - start + 1), content_type=content_type, status=206)
+                response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+        except OSError:
+            # Evicted between the lookup and the open
+            return None
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = self.etag_for(orthanc_id, kind)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    # ========== Storage ==========
+
+    def stream_and_store(self, orthanc_id: str, kind: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass chunks through to the caller while writing them to the cache
+
+        The entry is only committed once the whole body has been streamed; an
+        aborted download (client disconnect, Orthanc error) leaves nothing behind.
+        """
+        if not self.enabled:
+            yield from chunks
+            return
+
+        path = self.path_for(orthanc_id, kind)
+        tmp = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.tmp-', delete=False)
+        except OSError as e:
+            logger.warning(f"DICOM cache not writable at {path}: {e}")
+            yield from chunks
+            return
+
+        completed = False
+        size = 0
+        try:
+            for chunk in chunks:
+                if chunk:
+                    tmp.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            tmp.close()
+            if completed and size:
+                os.replace(tmp.name, path)
+                self._account(size)
+            else:
+                try:
+                    os.unlink(tmp.name)
+                except OSError:
+                    pass
+
+    def store(self, orthanc_id: str, kind: str, data: bytes):
+        """Write a complete entry that is already in memory"""
+        for _ in self.stream_and_store(orthanc_id, kind, [data]):
+            pass
+
+    def _account(self, size: int):
+        with self._lock:
+            self.stores += 1
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _scan_size(self) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under budget"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                evicted += 1
+            except OSError:
+                pass
+
+        with self._lock:
+            self._size = total
+            self.evictions += evicted
+        if evicted:
+            logger.info(f"DICOM cache evicted {evicted} entries, {total} bytes remaining")
+
+    # ========== Stats ==========
+
+    def stats(self) -> Dict[str, object]:
+        """Hit-rate counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.stores = self.evictions = 0
+
+
+# Process-wide cache used by the proxy views
+dicom_file_cache = DicomFileCache()
@@ -0,0 +1,846 @@
+"""
+DICOM upload pipeline
+
+upload_dicom_files registers uploaded DICOM files as patients, registrations
+and examinations, then stores them in Orthanc:
+
+- Files are spooled to disk in chunks and only their headers are parsed
+  (stop_before_pixels, large values deferred), so pixel data is never loaded
+  to read the tags.
+- Files are sent to Orthanc's /instances DICOM_UPLOAD_WORKERS at a time over
+  the shared pooled client (get_orthanc_client) instead of one new connection
+  per file.
+- With background=true the view answers at once with a DicomUploadJob, and a
+  thread of the web process (DICOM_UPLOAD_JOB_WORKERS per process) runs the
+  upload. Progress is written to the job, for polling
+  (/api/upload/dicom/jobs/<id>/), and published to the job's channel-layer
+  group, where DicomUploadProgressConsumer (ws/dicom-uploads/<id>/progress/)
+  forwards it.
+
+Progress messages:
+- {'type': 'progress', 'stage': 'reading' | 'registering' | 'uploading',
+   'total': n, 'read': n, 'uploaded': n, 'failed': n}
+- {'type': 'done', 'status': 'completed' | 'failed', 'error': '...'}
+
+Progress messages are throttled to one per DICOM_UPLOAD_PROGRESS_INTERVAL
+seconds (stage changes are always sent), and the latest one is kept in the
+cache for clients that connect late. Jobs live in the process that received
+the files, so a restart loses them: running jobs without a heartbeat and
+queued jobs not started within DICOM_UPLOAD_JOB_STALE_SECONDS are marked
+failed and their spool directories removed.
+
+Models are imported inside functions because consumers.py imports this module
+before the app registry is ready.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pydicom
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .dashboard_rollup import defer_rollups
+from .study_manifest import invalidate_study_manifest
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DICOM_UPLOAD_WORKERS = 4
+DEFAULT_DICOM_UPLOAD_JOB_WORKERS = 2
+DEFAULT_DICOM_UPLOAD_PROGRESS_INTERVAL = 0.5  # seconds
+DEFAULT_DICOM_UPLOAD_JOB_STALE_SECONDS = 600
+PROGRESS_CACHE_TIMEOUT = 3600
+
+# Values larger than this are read from the file only if accessed
+HEADER_DEFER_SIZE = '64 KB'
+
+
+class DicomUploadError(Exception):
+    """An upload that cannot be registered, with the error response it should produce"""
+
+    def __init__(self, error: str, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.error = error
+        self.message = message
+        self.status_code = status_code
+
+
+def dicom_upload_group(job_id) -> str:
+    return f"dicom_upload_{job_id}"
+
+
+def dicom_upload_cache_key(job_id) -> str:
+    return f"dicom_upload_progress:{job_id}"
+
+
+def spool_uploaded_files(uploaded_files) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Write uploaded files to a new spool directory, chunk by chunk
+
+    Returns:
+        (spool directory, [{'filename', 'temp_path'}]), remove the directory with shutil.rmtree
+    """
+    spool_dir = tempfile.mkdtemp(prefix='dicom-upload-', dir=getattr(settings, 'DICOM_UPLOAD_SPOOL_DIR', None))
+    files = []
+    try:
+        for index, uploaded_file in enumerate(uploaded_files):
+            temp_path = os.path.join(spool_dir, f"{index:05d}.dcm")
+            with open(temp_path, 'wb') as temp_file:
+                for chunk in uploaded_file.chunks():
+                    temp_file.write(chunk)
+            files.append({'filename': uploaded_file.name, 'temp_path': temp_path})
+    except Exception:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
+    return spool_dir, files
+
+
+def read_dicom_header(temp_path: str) -> pydicom.Dataset:
+    """Parse a DICOM file up to its pixel data"""
+    return pydicom.dcmread(temp_path, stop_before_pixels=True, defer_size=HEADER_DEFER_SIZE)
+
+
+def dicom_file_metadata(dcm: pydicom.Dataset, filename: str, temp_path: str) -> Dict[str, Any]:
+    """Registration metadata of one uploaded file (same approach as PACS Browser import)"""
+    patient_name = str(getattr(dcm, 'PatientName', 'Unknown')).replace('^', ' ')
+    patient_id = getattr(dcm, 'PatientID', '')
+    patient_birth_date = getattr(dcm, 'PatientBirthDate', '')  # YYYYMMDD format
+    patient_sex = getattr(dcm, 'PatientSex', '')  # M/F
+    patient_age = getattr(dcm, 'PatientAge', '')  # e.g., "034Y"
+    study_description = getattr(dcm, 'StudyDescription', '')
+    referring_physician = str(getattr(dcm, 'ReferringPhysicianName', '')).replace('^', ' ')
+    accession_number = getattr(dcm, 'AccessionNumber', '')
+    modality = getattr(dcm, 'Modality', 'OT')
+
+    # Extract additional tags for custom accession generation
+    requesting_service = getattr(dcm, 'RequestingService', '')
+    institution_name = getattr(dcm, 'InstitutionName', '')
+    study_date = getattr(dcm, 'StudyDate', '')
+
+    # Extract examination-specific DICOM tags
+    body_part_examined = getattr(dcm, 'BodyPartExamined', '')
+    acquisition_device_processing_description = getattr(dcm, 'AcquisitionDeviceProcessingDescription', '')
+    operators_name = str(getattr(dcm, 'OperatorsName', '')).replace('^', ' ')
+    patient_position = getattr(dcm, 'PatientPosition', '')
+    view_position = getattr(dcm, 'ViewPosition', '')
+    series_description = getattr(dcm, 'SeriesDescription', '')
+    laterality = getattr(dcm, 'Laterality', '')  # L/R
+
+    # Extract DICOM Date/Time with multiple fallback options and track source
+    date_source = ""
+    time_source = ""
+
+    # Find best available date
+    if getattr(dcm, 'ContentDate', ''):
+        content_date = dcm.ContentDate
+        date_source = "ContentDate"
+    elif getattr(dcm, 'StudyDate', ''):
+        content_date = dcm.StudyDate
+        date_source = "StudyDate"
+    elif getattr(dcm, 'SeriesDate', ''):
+        content_date = dcm.SeriesDate
+        date_source = "SeriesDate"
+    elif getattr(dcm, 'AcquisitionDate', ''):
+        content_date = dcm.AcquisitionDate
+        date_source = "AcquisitionDate"
+    elif getattr(dcm, 'InstanceCreationDate', ''):
+        content_date = dcm.InstanceCreationDate
+        date_source = "InstanceCreationDate"
+    else:
+        content_date = ""
+
+    # Find best available time
+    if getattr(dcm, 'ContentTime', ''):
+        content_time = dcm.ContentTime
+        time_source = "ContentTime"
+    elif getattr(dcm, 'StudyTime', ''):
+        content_time = dcm.StudyTime
+        time_source = "StudyTime"
+    elif getattr(dcm, 'SeriesTime', ''):
+        content_time = dcm.SeriesTime
+        time_source = "SeriesTime"
+    elif getattr(dcm, 'AcquisitionTime', ''):
+        content_time = dcm.AcquisitionTime
+        time_source = "AcquisitionTime"
+    elif getattr(dcm, 'InstanceCreationTime', ''):
+        content_time = dcm.InstanceCreationTime
+        time_source = "InstanceCreationTime"
+    else:
+        content_time = ""
+
+    # Create datetime source description
+    if date_source and time_source:
+        datetime_source = f"{date_source}/{time_source}"
+    elif date_source:
+        datetime_source = f"{date_source} (no time)"
+    else:
+        datetime_source = ""
+
+    logger.debug(
+        f"DICOM Date/Time extraction for {filename}: content_date={content_date} (from {date_source}), "
+        f"content_time={content_time} (from {time_source}), source={datetime_source}"
+    )
+
+    # Store metadata for processing
+    file_metadata = {
+        'filename': filename,
+        'temp_path': temp_path,
+        'patient_name': patient_name,
+        'patient_id': patient_id,
+        'patient_birth_date': patient_birth_date,
+        'patient_sex': patient_sex,
+        'patient_age': patient_age,
+        'study_instance_uid': getattr(dcm, 'StudyInstanceUID', ''),
+        'series_instance_uid': getattr(dcm, 'SeriesInstanceUID', ''),
+        'sop_instance_uid': getattr(dcm, 'SOPInstanceUID', ''),
+        'modality': modality,
+        'study_date': study_date,
+        'study_time': getattr(dcm, 'StudyTime', ''),
+        'study_description': study_description,
+        'series_description': series_description,
+        'referring_physician': referring_physician,
+        'accession_number': accession_number,
+        'requesting_service': requesting_service,
+        'institution_name': institution_name,
+        'instance_number': getattr(dcm, 'InstanceNumber', 1),
+        # Examination-specific metadata
+        'body_part_examined': body_part_examined,
+        'acquisition_device_processing_description': acquisition_device_processing_description,
+        'operators_name': operators_name,
+        'patient_position': patient_position,
+        'view_position': view_position,
+        'laterality': laterality,
+        # DICOM Content Date/Time
+        'content_date': content_date,
+        'content_time': content_time,
+        'datetime_source': datetime_source,
+    }
+    return file_metadata
+
+
+def register_dicom_files(processed_files: List[Dict[str, Any]], registration_data: Dict[str, Any], user):
+    """
+    Create patients, registrations (Daftar) and examinations for uploaded files
+
+    Args:
+        processed_files: dicom_file_metadata of each file
+        registration_data: Optional overrides from the upload form
+        user: Uploading user
+
+    Returns:
+        (all_results with 'patients', 'daftars' and 'examinations', examinations to link to the PACS study)
+    """
+    from exam.models import Daftar, Modaliti
+    from .utils import generate_custom_accession, find_or_create_patient
+
+    # Use shared patient creation function with manual override support
+    def find_or_create_patient_with_override(file_metadata):
+        """Wrapper for shared function with manual patient ID override"""
+        manual_patient_id = registration_data.get('patient_id')
+        return find_or_create_patient(file_metadata, manual_patient_id)
+
+    # Process each file individually to ensure separate patients get separate daftars
+    all_results = {
+        'patients': {},
+        'daftars': {},
+        'examinations': []
+    }
+
+    for file_metadata in processed_files:
+        # Get patient for this specific file  
+        patient = find_or_create_patient_with_override(file_metadata)
+        patient_key = f"{patient.nric}_{patient.nama}"
+        all_results['patients'][patient_key] = patient
+
+        # Generate accession for this file
+        accession_number = generate_custom_accession(file_metadata)
+
+        # Create or find Daftar for this patient/study
+        study_instance_uid = file_metadata.get('study_instance_uid', '')
+        daftar_key = f"{patient.id}_{study_instance_uid or accession_number}"
+
+        logger.debug(f"Daftar key: {daftar_key}")
+        logger.debug(f"Study UID: '{study_instance_uid}', Accession: '{accession_number}'")
+
+        if daftar_key in all_results['daftars']:
+            daftar = all_results['daftars'][daftar_key]
+            logger.debug(f"Using existing daftar: {daftar.id}")
+        else:
+            logger.debug(f"Creating new daftar for patient {patient.id}")
+            # Create new daftar for this patient/study
+            modality_name = registration_data.get('modality') or file_metadata.get('modality', 'OT')
+            referring_physician = (registration_data.get('referring_physician') or 
+                                 file_metadata.get('referring_physician') or 'Upload')
+            study_description = (registration_data.get('study_description') or 
+                               file_metadata.get('study_description') or 'Uploaded Study')
+
+            # Parse StudyDate from DICOM or fallback to today
+            study_date_str = file_metadata.get('study_date', '')
+            if study_date_str and len(study_date_str) == 8:
+                try:
+                    # Convert DICOM date format (YYYYMMDD) to Django datetime
+                    from datetime import datetime
+                    study_date = datetime.strptime(study_date_str, '%Y%m%d').date()
+                    tarikh = timezone.make_aware(datetime.combine(study_date, datetime.min.time()))
+                except ValueError:
+                    # Invalid date format, use today
+                    tarikh = timezone.now()
+            else:
+                # No valid StudyDate, use today
+                tarikh = timezone.now()
+
+            logger.debug(f"About to create daftar with pesakit={patient.id}, modality='{modality_name}', study_uid='{study_instance_uid}', accession='{accession_number}', study_date='{study_date_str}'")
+            daftar = Daftar.objects.create(
+                pesakit=patient,
+                pemohon=referring_physician,
+                study_description=study_description,
+                modality=modality_name,
+                study_instance_uid=study_instance_uid,
+                parent_accession_number=accession_number or None,
+                accession_number=accession_number or None,
+                jxr=user,
+                study_status='COMPLETED',
+                tarikh=tarikh
+            )
+            logger.debug(f"Created daftar ID {daftar.id} for patient {patient.id} with accession '{daftar.parent_accession_number}'")
+
+            # Add ward if specified
+            if registration_data.get('ward_id'):
+                try:
+                    from wad.models import Ward
+                    ward = Ward.objects.get(id=registration_data['ward_id'])
+                    daftar.rujukan = ward
+                    daftar.save()
+                except Ward.DoesNotExist:
+                    pass
+
+            all_results['daftars'][daftar_key] = daftar
+
+    # Create examination records (Pemeriksaan) - parse DICOM metadata like PACS Browser import
+    created_examinations = []
+    from exam.models import Exam, Part, Pemeriksaan
+
+    # Helper function to parse examination details from DICOM metadata
+    def parse_dicom_examination_details(file_metadata):
+        body_part = file_metadata.get('body_part_examined', '').upper()
+        acquisition_desc = file_metadata.get('acquisition_device_processing_description', '')
+        modality = file_metadata.get('modality', 'OT')
+
+        # Parse exam type and position from AcquisitionDeviceProcessingDescription
+        # e.g., "CHEST,ERECT P->A" -> exam_type="CHEST", position="PA ERECT"
+        exam_type = body_part or modality  # Default to body part or modality
+        position = file_metadata.get('patient_position', '')
+
+        if acquisition_desc:
+            # Parse acquisition description (e.g., "CHEST,ERECT P->A")
+            parts = acquisition_desc.split(',')
+            if len(parts) >= 1:
+                exam_type = parts[0].strip().upper()
+            if len(parts) >= 2:
+                pos_desc = parts[1].strip()
+                # Parse position description (e.g., "ERECT P->A" -> "PA ERECT")
+                if 'P->A' in pos_desc or 'P-A' in pos_desc:
+                    position = f"PA {pos_desc.replace('P->A', '').replace('P-A', '').strip()}"
+                elif 'A->P' in pos_desc or 'A-P' in pos_desc:
+                    position = f"AP {pos_desc.replace('A->P', '').replace('A-P', '').strip()}"
+                elif 'LAT' in pos_desc.upper():
+                    position = f"LAT {pos_desc.replace('LAT', '').strip()}"
+                else:
+                    position = pos_desc
+
+        # Get radiographer name
+        radiographer_name = file_metadata.get('operators_name', '').strip()
+
+        # Get laterality (L/R)
+        laterality = file_metadata.get('laterality', '').upper()
+
+        return {
+            'exam_type': (exam_type or f"{modality} Study").strip(),
+            'body_part': body_part.strip() if body_part else '',
+            'position': position.strip() if position else '',
+            'laterality': laterality.strip() if laterality else '',
+            'radiographer_name': radiographer_name.strip() if radiographer_name else '',
+            'modality': modality.strip() if modality else 'OT'
+        }
+
+    # Now create examination for each file and daftar
+    for file_metadata in processed_files:
+        # Get the daftar for this file
+        patient = find_or_create_patient(file_metadata)
+        study_instance_uid = file_metadata.get('study_instance_uid', '')
+        accession_number = generate_custom_accession(file_metadata)
+        daftar_key = f"{patient.id}_{study_instance_uid or accession_number}"
+        daftar = all_results['daftars'][daftar_key]
+        logger.debug(f"Processing file: {file_metadata['filename']}")
+        exam_details = parse_dicom_examination_details(file_metadata)
+        logger.debug(f"Parsed exam details: {exam_details}")
+
+        # Find or create modality (ensure it exists)
+        file_modality_name = exam_details['modality']
+        file_modality, _ = Modaliti.objects.get_or_create(
+            nama=file_modality_name,
+            defaults={'singkatan': file_modality_name[:5]}
+        )
+
+        # Find or create body part
+        part = None
+        if exam_details['body_part']:
+            part, _ = Part.objects.get_or_create(
+                part=exam_details['body_part']
+            )
+
+        # Find or create exam type - handle constraint with atomic transaction
+        try:
+            with transaction.atomic():
+                exam, created = Exam.objects.get_or_create(
+                    exam=exam_details['exam_type'],
+                    modaliti=file_modality,
+                    part=part,
+                    defaults={'catatan': 'Created from DICOM upload'}
+                )
+                logger.debug(f"Exam {'created' if created else 'found'}: {exam.id} - {exam.exam}/{exam.modaliti.nama}/{exam.part.part if exam.part else None}")
+        except Exception as e:
+            logger.debug(f"Exam creation failed: {e}")
+            logger.debug(f"Trying to find existing exam: {exam_details['exam_type']}/{file_modality.nama}/{part.part if part else None}")
+
+            # Debug: Check what exams exist with similar names
+            if logger.isEnabledFor(logging.DEBUG):
+                similar_exams = Exam.objects.filter(exam__icontains='CHEST')
+                logger.debug(f"Found {similar_exams.count()} exams containing 'CHEST':")
+                for se in similar_exams[:5]:  # Show first 5
+                    logger.debug(f"  - ID:{se.id} '{se.exam}' | Modality:{se.modaliti.nama}({se.modaliti.id}) | Part:{se.part.part if se.part else None}({se.part.id if se.part else None})")
+
+            # Check modality and part values
+            logger.debug(f"Our values - Modality:{file_modality.nama}({file_modality.id}) | Part:{part.part if part else None}({part.id if part else None})")
+
+            # Try exact match with different queries
+            exam = Exam.objects.filter(
+                exam=exam_details['exam_type'],
+                modaliti=file_modality,
+                part=part
+            ).first()
+
+            if exam:
+                logger.debug(f"Found existing exam after error: {exam.id}")
+            else:
+                # Try without part filter in case part is the issue
+                exam_no_part = Exam.objects.filter(
+                    exam=exam_details['exam_type'],
+                    modaliti=file_modality,
+                    part__isnull=True
+                ).first()
+
+                if exam_no_part:
+                    logger.debug(f"Found exam without part: {exam_no_part.id}")
+                    exam = exam_no_part
+                else:
+                    logger.debug("Still no exam found, this is definitely a database issue")
+                    # Just use any CHEST exam with same modality as fallback
+                    fallback_exam = Exam.objects.filter(
+                        exam__iexact='CHEST',
+                        modaliti=file_modality
+                    ).first()
+
+                    if fallback_exam:
+                        logger.debug(f"Using fallback exam: {fallback_exam.id}")
+                        exam = fallback_exam
+                    else:
+                        raise Exception(f"Cannot create or find any suitable exam for: {exam_details['exam_type']}/{file_modality.nama}/{part.part if part else None}")
+
+        # Map position to patient_position
+        patient_position_mapped = None
+        if exam_details['position']:
+            pos = exam_details['position'].upper()
+            position_map = {
+                'AP': 'AP',
+                'PA': 'PA', 
+                'LAT': 'LAT',
+                'LATERAL': 'LAT',
+                'LEFT': 'LATERAL_LEFT',
+                'RIGHT': 'LATERAL_RIGHT',
+                'OBL': 'OBLIQUE',
+                'OBLIQUE': 'OBLIQUE'
+            }
+            for key, value in position_map.items():
+                if key in pos:
+                    patient_position_mapped = value
+                    break
+            if not patient_position_mapped:
+                patient_position_mapped = exam_details['position']
+
+        # Find radiographer user
+        radiographer = user  # Default to uploading user
+        if exam_details['radiographer_name']:
+            try:
+                from django.contrib.auth import get_user_model
+                User = get_user_model()
+                # Try to find user by name parts
+                name_parts = exam_details['radiographer_name'].split()
+                if len(name_parts) >= 1:
+                    radiographer = User.objects.filter(
+                        first_name__icontains=name_parts[0]
+                    ).first() or user
+            except:
+                pass
+
+        # Build comprehensive notes from DICOM metadata
+        notes_parts = [f"File: {file_metadata['filename']}"]
+        if file_metadata.get('series_description'):
+            notes_parts.append(f"Series: {file_metadata['series_description']}")
+        if exam_details['laterality']:
+            notes_parts.append(f"Laterality: {exam_details['laterality']}")
+        if file_metadata.get('acquisition_device_processing_description'):
+            notes_parts.append(f"Acquisition: {file_metadata['acquisition_device_processing_description']}")
+        if exam_details['radiographer_name']:
+            notes_parts.append(f"Operator: {exam_details['radiographer_name']}")
+
+        # Create examination record
+        logger.debug(f"About to create Pemeriksaan for daftar {daftar.id}, exam {exam.id}")
+        pemeriksaan = Pemeriksaan.objects.create(
+            daftar=daftar,
+            exam=exam,
+            accession_number=accession_number or None,
+            no_xray=accession_number or f"UPL{timezone.now().strftime('%Y%m%d%H%M%S')}_{len(all_results['examinations'])+1}",
+            patient_position=patient_position_mapped,
+            catatan=", ".join(notes_parts),
+            jxr=radiographer,
+            exam_status='COMPLETED'
+        )
+        logger.debug(f"Created Pemeriksaan ID {pemeriksaan.id} with accession '{pemeriksaan.accession_number}'")
+        all_results['examinations'].append(pemeriksaan)
+
+    return all_results, created_examinations
+
+
+def _upload_instance(client, file_data: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        # Whole file in the body so the pooled session can retry the POST
+        with open(file_data['temp_path'], 'rb') as dicom_file:
+            content = dicom_file.read()
+        response = client.post('/instances', data=content, headers={'Content-Type': 'application/dicom'})
+        if response.status_code == 200:
+            return {
+                'filename': file_data['filename'],
+                'orthanc_id': response.json().get('ID'),
+                'status': 'uploaded'
+            }
+        return {
+            'filename': file_data['filename'],
+            'status': 'failed',
+            'error': f'HTTP {response.status_code}'
+        }
+    except Exception as upload_error:
+        return {
+            'filename': file_data['filename'],
+            'status': 'failed',
+            'error': str(upload_error)
+        }
+
+
+def upload_to_orthanc(processed_files: List[Dict[str, Any]],
+                      on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Store files in the configured Orthanc, DICOM_UPLOAD_WORKERS at a time
+
+    Args:
+        processed_files: Files with 'filename' and 'temp_path'
+        on_result: Called in this thread with each file's result as it finishes
+
+    Returns:
+        Upload result of each file, in the order given
+    """
+    from .models import PacsConfig
+    from .orthanc_client import get_orthanc_client
+
+    pacs_config = PacsConfig.objects.first()
+    if not pacs_config:
+        raise Exception("PACS server not configured")
+    client = get_orthanc_client(pacs_config)
+
+    workers = getattr(settings, 'DICOM_UPLOAD_WORKERS', DEFAULT_DICOM_UPLOAD_WORKERS)
+    results = [None] * len(processed_files)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dicom-upload') as executor:
+        futures = {
+            executor.submit(_upload_instance, client, file_data): index
+            for index, file_data in enumerate(processed_files)
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if on_result:
+                on_result(result)
+
+    # Viewers must see the new instances, not a cached series/instance tree
+    study_uids = {
+        file_data.get('study_instance_uid')
+        for file_data, result in zip(processed_files, results) if result['status'] == 'uploaded'
+    }
+    for study_uid in filter(None, study_uids):
+        invalidate_study_manifest(client.pacs_server, study_uid)
+    return results
+
+
+def process_dicom_upload(files: List[Dict[str, str]], registration_data: Dict[str, Any], user,
+                         progress: Optional[Callable[..., None]] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Read, register and store spooled DICOM files
+
+    Args:
+        files: spool_uploaded_files entries
+        registration_data: Optional overrides from the upload form
+        user: Uploading user
+        progress: Called as progress(stage, read=n, uploaded=n, failed=n)
+
+    Returns:
+        (message, response data)
+
+    Raises:
+        DicomUploadError: A file is not DICOM or the study could not be registered
+    """
+    report = progress or (lambda stage, **counts: None)
+
+    processed_files = []
+    for file_data in files:
+        filename = file_data['filename']
+        try:
+            dcm = read_dicom_header(file_data['temp_path'])
+        except Exception as e:
+            raise DicomUploadError(f'Invalid DICOM file: {filename}', f'File format error: {str(e)}')
+        try:
+            processed_files.append(dicom_file_metadata(dcm, filename, file_data['temp_path']))
+        except Exception as e:
+            raise DicomUploadError(f'Error processing {filename}', str(e), status_code=500)
+        report('reading', read=len(processed_files))
+
+    report('registering', read=len(processed_files))
+    try:
+        # Mark each study date for a dashboard rollup rebuild once, not once per file
+        with defer_rollups():
+            all_results, created_examinations = register_dicom_files(processed_files, registration_data, user)
+    except Exception as e:
+        raise DicomUploadError('Failed to create study registration', str(e), status_code=500)
+
+    counts = {'uploaded': 0, 'failed': 0}
+
+    def count_upload(result):
+        counts['uploaded' if result['status'] == 'uploaded' else 'failed'] += 1
+        report('uploading', read=len(processed_files), **counts)
+
+    report('uploading', read=len(processed_files), **counts)
+    try:
+        uploaded_instances = upload_to_orthanc(processed_files, on_result=count_upload)
+    except Exception as e:
+        # PACS upload failed, but registration was successful
+        logger.warning(f"DICOM upload to PACS failed: {e}")
+        uploaded_instances = []
+
+    # Link to PACS study (same as PACS Browser import)
+    if created_examinations and uploaded_instances:
+        try:
+            from exam.models import PacsExam
+            study_instance_uid = processed_files[0]['study_instance_uid']
+            # Create PacsExam link for the first examination
+            first_uploaded = next((i for i in uploaded_instances if i['status'] == 'uploaded'), None)
+            if first_uploaded:
+                PacsExam.objects.create(
+                    exam=created_examinations[0],  # OneToOneField to first Pemeriksaan
+                    orthanc_id=first_uploaded.get('orthanc_id', ''),
+                    study_id=study_instance_uid,
+                    study_instance=study_instance_uid
+                )
+        except Exception as pacs_link_error:
+            # Non-critical error - continue
+            logger.warning(f"Failed to create PACS link: {pacs_link_error}")
+
+    success_count = len([i for i in uploaded_instances if i['status'] == 'uploaded'])
+    total_count = len(uploaded_instances)
+
+    message = f'Successfully processed {success_count}/{total_count} DICOM files for {len(all_results["patients"])} patients'
+    data = {
+        'patients_created': len(all_results["patients"]),
+        'patients': [
+            {
+                'id': patient.id,
+                'name': patient.nama,
+                'nric': patient.nric,
+                'mrn': patient.mrn
+            } for patient in all_results["patients"].values()
+        ],
+        'daftars_created': len(all_results["daftars"]),
+        'daftars': [
+            {
+                'id': daftar.id,
+                'patient_id': daftar.pesakit.id,
+                'accession_number': daftar.parent_accession_number,
+                'study_instance_uid': daftar.study_instance_uid
+            } for daftar in all_results["daftars"].values()
+        ],
+        'examination_ids': [exam.id for exam in all_results["examinations"]],
+        'examination_count': len(all_results["examinations"]),
+        'uploaded_files': uploaded_instances,
+        'pacs_status': 'uploaded' if success_count > 0 else 'failed'
+    }
+    return message, data
+
+
+class UploadProgressRelay:
+    """
+    Records a background upload's progress on its job and relays it to the job's group
+
+    Args:
+        job_id: DicomUploadJob primary key
+        total: Number of files in the upload
+    """
+
+    def __init__(self, job_id, total: int):
+        self.job_id = job_id
+        self.total = total
+        self.group = dicom_upload_group(job_id)
+        self.cache_key = dicom_upload_cache_key(job_id)
+        self.interval = getattr(settings, 'DICOM_UPLOAD_PROGRESS_INTERVAL', DEFAULT_DICOM_UPLOAD_PROGRESS_INTERVAL)
+        self.channel_layer = get_channel_layer()
+        self.stage = None
+        self.last_sent = 0.0
+
+    def _publish(self, message: Dict[str, Any]):
+        try:
+            cache.set(self.cache_key, message, PROGRESS_CACHE_TIMEOUT)
+            if self.channel_layer is not None:
+                async_to_sync(self.channel_layer.group_send)(self.group, {'type': 'upload.progress', 'message': message})
+        except Exception as e:
+            # Clients can still poll the job
+            logger.warning(f"Failed to relay DICOM upload {self.job_id} progress: {e}")
+
+    def progress(self, stage: str, read: int = 0, uploaded: int = 0, failed: int = 0):
+        """Record progress (throttled, except when the stage changes)"""
+        from .models import DicomUploadJob
+
+        now = time.monotonic()
+        if stage == self.stage and now - self.last_sent < self.interval:
+            return
+        self.stage = stage
+        self.last_sent = now
+
+        DicomUploadJob.objects.filter(pk=self.job_id).update(
+            stage=stage, uploaded_files=uploaded, failed_files=failed, heartbeat_at=timezone.now()
+        )
+        self._publish({
+            'type': 'progress', 'stage': stage, 'total': self.total,
+            'read': read, 'uploaded': uploaded, 'failed': failed
+        })
+
+    def done(self, status: str, error: str = ''):
+        """Tell clients the job finished and its result can be loaded"""
+        self._publish({'type': 'done', 'status': status, 'error': error})
+
+
+def run_upload_job(job_id, spool_dir: str, files: List[Dict[str, str]], registration_data: Dict[str, Any], user_id):
+    """Process a background upload, then remove its spool directory"""
+    from django.contrib.auth import get_user_model
+    from .models import DicomUploadJob
+
+    relay = UploadProgressRelay(job_id, len(files))
+    try:
+        now = timezone.now()
+        if not DicomUploadJob.objects.filter(pk=job_id, status='queued').update(
+                status='running', started_at=now, heartbeat_at=now):
+            # Failed as stale while waiting for a worker
+            return
+        user = get_user_model().objects.get(pk=user_id)
+        message, data = process_dicom_upload(files, registration_data, user, progress=relay.progress)
+    except Exception as e:
+        error = f"{e.error}: {e.message}" if isinstance(e, DicomUploadError) else str(e)
+        logger.error(f"DICOM upload job {job_id} failed: {error}")
+        DicomUploadJob.objects.filter(pk=job_id).update(status='failed', error=error, finished_at=timezone.now())
+        relay.done('failed', error)
+    else:
+        uploaded = len([i for i in data['uploaded_files'] if i['status'] == 'uploaded'])
+        DicomUploadJob.objects.filter(pk=job_id).update(
+            status='completed', stage='done', result={'message': message, 'data': data},
+            uploaded_files=uploaded, failed_files=len(data['uploaded_files']) - uploaded,
+            finished_at=timezone.now()
+        )
+        relay.done('completed')
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        close_old_connections()
+
+
+_job_executor_instance = None
+_job_executor_lock = threading.Lock()
+
+
+def _job_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for background uploads"""
+    global _job_executor_instance
+    with _job_executor_lock:
+        if _job_executor_instance is None:
+            _job_executor_instance = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DICOM_UPLOAD_JOB_WORKERS', DEFAULT_DICOM_UPLOAD_JOB_WORKERS),
+                thread_name_prefix='dicom-upload-job'
+            )
+    return _job_executor_instance
+
+
+def start_upload_job(uploaded_files, registration_data: Dict[str, Any], user):
+    """
+    Spool the uploaded files and process them in the background
+
+    Returns:
+        The queued DicomUploadJob, started once the current transaction commits
+    """
+    from .models import DicomUploadJob
+
+    spool_dir, files = spool_uploaded_files(uploaded_files)
+    try:
+        job = DicomUploadJob.objects.create(total_files=len(files), spool_dir=spool_dir, requested_by=user)
+    except Exception:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
+    transaction.on_commit(
+        lambda: _job_executor().submit(run_upload_job, job.pk, spool_dir, files, registration_data, user.pk)
+    )
+    logger.info(f"Queued DICOM upload job {job.pk} with {len(files)} files")
+    return job
+
+
+def fail_stale_upload_jobs() -> int:
+    """
+    Fail jobs whose process stopped reporting progress or never started them
+
+    Running jobs without a heartbeat and queued jobs older than
+    DICOM_UPLOAD_JOB_STALE_SECONDS are failed and their spool directories
+    removed.
+
+    Returns:
+        Number of jobs failed
+    """
+    from .models import DicomUploadJob
+
+    stale_seconds = getattr(settings, 'DICOM_UPLOAD_JOB_STALE_SECONDS', DEFAULT_DICOM_UPLOAD_JOB_STALE_SECONDS)
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    stale = DicomUploadJob.objects.filter(
+        Q(status='running', heartbeat_at__lt=cutoff) | Q(status='queued', created__lt=cutoff)
+    )
+    failed = 0
+    for job_id, status, spool_dir in stale.values_list('pk', 'status', 'spool_dir'):
+        # Only fail the job if no worker moved it on in the meantime
+        if DicomUploadJob.objects.filter(pk=job_id, status=status).update(
+                status='failed', error='Upload worker stopped responding', finished_at=timezone.now()):
+            failed += 1
+            if spool_dir:
+                shutil.rmtree(spool_dir, ignore_errors=True)
+    return failed
@@ -0,0 +1,85 @@
+"""
+Management command to fill the PACS daily image counts used by reject analysis.
+
+Run once after migrating to count history, then reject-rate dashboards only
+query the PACS for today and yesterday. Dates are counted on a thread pool,
+in batches so progress is reported as it goes.
+
+Usage:
+    python manage.py backfill_pacs_image_counts                 # Last 90 days, missing dates only
+    python manage.py backfill_pacs_image_counts --days 365 --workers 8
+    python manage.py backfill_pacs_image_counts --from 2024-01-01 --to 2024-12-31 --refresh
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from exam.models import PacsDailyImageCount
+from exam.utils import count_pacs_daily_images, reject_analysis_pacs_servers
+
+BATCH_SIZE = 50
+
+
+class Command(BaseCommand):
+    help = 'Count PACS images per day and modality for reject analysis'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Count the last N days (default: 90)',
+        )
+        parser.add_argument('--from', dest='date_from', help='First date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last date (YYYY-MM-DD, default: today)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Parallel PACS queries (default: PACS_IMAGE_COUNT_WORKERS)',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Recount dates that are already stored',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        date_to = parse_date(options['date_to']) if options['date_to'] else today
+        if options['date_from']:
+            date_from = parse_date(options['date_from'])
+        else:
+            date_from = date_to - timedelta(days=options['days'] - 1)
+        if not date_from or not date_to or date_from > date_to:
+            raise CommandError('Invalid date range')
+
+        servers = reject_analysis_pacs_servers()
+        if not servers:
+            raise CommandError('No active PACS servers configured for reject analysis')
+
+        days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+        counted = set()
+        if not options['refresh']:
+            counted = set(
+                PacsDailyImageCount.objects.filter(
+                    pacs_server__in=servers, date__range=(date_from, date_to), modality=''
+                ).values_list('pacs_server_id', 'date')
+            )
+        pairs = [(server, day) for server in servers for day in days if (server.pk, day) not in counted]
+
+        failures = []
+        for start in range(0, len(pairs), BATCH_SIZE):
+            failures += count_pacs_daily_images(pairs[start:start + BATCH_SIZE], workers=options['workers'])
+            self.stdout.write(f"Counted {min(start + BATCH_SIZE, len(pairs))}/{len(pairs)} server days...")
+
+        for server, day, error in failures:
+            self.stderr.write(f"{server.name} {day}: {error}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Counted {len(pairs) - len(failures)} server days, {len(failures)} failed, "
+                f"{len(days) * len(servers) - len(pairs)} already stored"
+            )
+        )
@@ -0,0 +1,67 @@
+"""
+Management command to render series thumbnails for recent studies.
+
+Meant to run from cron shortly after studies arrive, so the PACS browser and
+worklist grids are served from the rendition cache instead of Orthanc's renderer.
+
+Usage:
+    python manage.py pregenerate_thumbnails
+    python manage.py pregenerate_thumbnails --days 3 --size 128
+    python manage.py pregenerate_thumbnails --pacs-server 2
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from exam.models import PacsConfig, PacsServer
+from exam.orthanc_client import get_orthanc_client
+from exam.renditions import pregenerate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Render and cache series thumbnails for recent studies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Render studies from the last N days (default: 1)',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=None,
+            help='Thumbnail size in pixels (default: THUMBNAIL_SIZE)',
+        )
+        parser.add_argument(
+            '--pacs-server',
+            type=int,
+            default=None,
+            help='Only scan this PACS server (default: all active servers)',
+        )
+
+    def handle(self, *args, **options):
+        servers = PacsServer.objects.filter(is_active=True, is_deleted=False)
+        if options['pacs_server']:
+            servers = servers.filter(id=options['pacs_server'])
+            if not servers.exists():
+                raise CommandError(f'PACS server {options["pacs_server"]} not found or inactive')
+        servers = list(servers)
+        if not servers:
+            pacs_config = PacsConfig.objects.first()
+            if not pacs_config:
+                raise CommandError('No PACS server configured')
+            servers = [pacs_config]
+
+        for server in servers:
+            name = getattr(server, 'name', server.orthancurl)
+            try:
+                counts = pregenerate_thumbnails(get_orthanc_client(server), options['days'], options['size'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'{name}: {e}'))
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{name}: {counts["studies"]} studies, {counts["rendered"]} rendered, '
+                    f'{counts["cached"]} already cached, {counts["failed"]} failed'
+                )
+            )
@@ -0,0 +1,67 @@
+"""
+Management command to rebuild the dashboard daily rollup.
+
+Run once after migrating to backfill history, and optionally nightly as a
+safety net for changes made outside the ORM (raw SQL, bulk_update, imports).
+
+Usage:
+    python manage.py rebuild_dashboard_rollups              # Last 2 days
+    python manage.py rebuild_dashboard_rollups --days 30
+    python manage.py rebuild_dashboard_rollups --all        # Every exam date
+    python manage.py rebuild_dashboard_rollups --pending    # Dates changed since their last rebuild
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from exam.models import Daftar, DashboardDailyRollup, DashboardRollupPendingDate
+from exam.dashboard_rollup import rebuild_day
+from exam.dashboard_stats import invalidate_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild dashboard daily rollups from registrations and examinations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Rebuild the last N days (default: 2)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild every date that has registrations',
+        )
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Rebuild only dates with changes not yet rolled up',
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            days = set(DashboardRollupPendingDate.objects.values_list('date', flat=True).distinct())
+        elif options['all']:
+            days = set(
+                Daftar.objects.annotate(day=TruncDate('tarikh')).values_list('day', flat=True).distinct()
+            )
+            # Dates whose registrations are all gone
+            days |= set(DashboardDailyRollup.objects.values_list('date', flat=True).distinct())
+        else:
+            today = timezone.localdate()
+            days = {today - timedelta(days=offset) for offset in range(options['days'])}
+
+        total_rows = 0
+        for i, day in enumerate(sorted(days), 1):
+            total_rows += rebuild_day(day)
+            if i % 100 == 0:
+                self.stdout.write(f"Rebuilt {i}/{len(days)} days...")
+
+        invalidate_dashboard_stats()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {len(days)} days ({total_rows} rollup rows)")
+        )
@@ -0,0 +1,56 @@
+"""
+Management command to process queued AI report jobs.
+
+Run one or more of these next to the web server (e.g. as a systemd service);
+the generate endpoints only queue jobs. Running workers also queue batch
+reports for new examinations when batch reporting is enabled in the AI
+configuration.
+
+Usage:
+    python manage.py run_ai_worker                   # Run until stopped
+    python manage.py run_ai_worker --concurrency 4
+    python manage.py run_ai_worker --once            # Drain the queue and exit (no batch scheduling)
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+from exam.ai_jobs import AIJobWorker
+
+
+class Command(BaseCommand):
+    help = 'Process queued AI report generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='Jobs processed at once (default: AI_WORKER_CONCURRENCY)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Seconds between queue polls when idle (default: AI_JOB_POLL_INTERVAL)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        worker = AIJobWorker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after running jobs finish...")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"AI worker {worker.worker_id} processing jobs (concurrency {worker.concurrency})")
+        )
+        worker.run(once=options['once'])
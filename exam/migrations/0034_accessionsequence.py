@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0033_manualradiologyreport_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessionSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20)),
+                ('year', models.PositiveIntegerField()),
+                ('modality', models.CharField(blank=True, default='', max_length=10)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='pemeriksaan',
+            name='accession_number',
+            field=models.CharField(blank=True, db_index=True, help_text='Individual accession number for this examination (e.g., KKP202500000001)', max_length=20, null=True, verbose_name='Accession Number'),
+        ),
+        migrations.AddConstraint(
+            model_name='accessionsequence',
+            constraint=models.UniqueConstraint(fields=('prefix', 'year', 'modality'), name='unique_accession_sequence'),
+        ),
+    ]
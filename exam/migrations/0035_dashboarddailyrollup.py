@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wad', '0001_initial'),
+        ('exam', '0034_accessionsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('jantina', models.CharField(blank=True, default='', max_length=2)),
+                ('age_group', models.CharField(blank=True, default='', max_length=10)),
+                ('examinations', models.PositiveIntegerField(default=0)),
+                ('registrations', models.PositiveIntegerField(default=0)),
+                ('studies_completed', models.PositiveIntegerField(default=0)),
+                ('exam', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='exam.exam')),
+                ('modaliti', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='exam.modaliti')),
+                ('part', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='exam.part')),
+                ('rujukan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wad.ward')),
+            ],
+            options={
+                'verbose_name': 'Dashboard Daily Rollup',
+                'verbose_name_plural': 'Dashboard Daily Rollups',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:46
+
+import auto_prefetch
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('exam', '0035_dashboarddailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aigeneratedreport',
+            name='generation_progress',
+            field=models.PositiveSmallIntegerField(default=100, help_text='Generation progress as percentage'),
+        ),
+        migrations.AddField(
+            model_name='aigeneratedreport',
+            name='generation_stage',
+            field=models.CharField(blank=True, help_text='Current step of the generation pipeline (fetching_images, analyzing_images, ...)', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='aigeneratedreport',
+            name='generation_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Generating'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='completed', help_text='Whether the report is still waiting for or being generated by an AI worker', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='AIReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=20)),
+                ('priority', models.PositiveSmallIntegerField(choices=[(0, 'STAT'), (1, 'High'), (2, 'Medium'), (3, 'Low')], default=2, help_text='Lower runs first, STAT examinations are 0')),
+                ('model_name', models.CharField(help_text='Ollama vision model the job runs on, used for per-model concurrency limits', max_length=100)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, help_text='Worker processing the job', max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('ai_report', auto_prefetch.ForeignKey(blank=True, help_text='Report filled in by this job', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='exam.aigeneratedreport')),
+                ('pemeriksaan', auto_prefetch.ForeignKey(help_text='Examination to generate the AI report for', on_delete=django.db.models.deletion.CASCADE, related_name='ai_report_jobs', to='exam.pemeriksaan')),
+                ('requested_by', auto_prefetch.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ai_report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI Report Job',
+                'verbose_name_plural': 'AI Report Jobs',
+                'ordering': ['priority', 'created'],
+                'abstract': False,
+                'base_manager_name': 'prefetch_manager',
+                'indexes': [models.Index(fields=['status', 'priority', 'created'], name='exam_airepo_status_d58e95_idx'), models.Index(fields=['model_name', 'status'], name='exam_airepo_model_n_d91036_idx')],
+            },
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('prefetch_manager', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0036_aireportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodelperformance',
+            name='cache_hits',
+            field=models.PositiveIntegerField(default=0, help_text='Inferences answered from the AI result cache'),
+        ),
+        migrations.AddField(
+            model_name='aimodelperformance',
+            name='cache_misses',
+            field=models.PositiveIntegerField(default=0, help_text='Inferences sent to the model because no cached result existed'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0037_aimodelperformance_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconfiguration',
+            name='batch_concurrency',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Batch jobs queued or running at once'),
+        ),
+        migrations.AddField(
+            model_name='aiconfiguration',
+            name='batch_end_hour',
+            field=models.PositiveSmallIntegerField(default=7, help_text='Hour (0-23) the off-peak batch window closes, same as start for all day'),
+        ),
+        migrations.AddField(
+            model_name='aiconfiguration',
+            name='batch_lookback_days',
+            field=models.PositiveSmallIntegerField(default=3, help_text='Only examinations registered within this many days are batch reported'),
+        ),
+        migrations.AddField(
+            model_name='aiconfiguration',
+            name='batch_modalities',
+            field=models.JSONField(blank=True, default=list, help_text='Modality abbreviations to report automatically (e.g. ["CR", "DX"]), empty for all'),
+        ),
+        migrations.AddField(
+            model_name='aiconfiguration',
+            name='batch_start_hour',
+            field=models.PositiveSmallIntegerField(default=20, help_text='Hour (0-23) the off-peak batch window opens'),
+        ),
+        migrations.AddField(
+            model_name='aiconfiguration',
+            name='enable_batch_reporting',
+            field=models.BooleanField(default=False, help_text='Queue AI reports for completed examinations without waiting for a request'),
+        ),
+        migrations.AlterField(
+            model_name='aireportjob',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'STAT'), (1, 'High'), (2, 'Medium'), (3, 'Low'), (4, 'Batch')], default=2, help_text='Lower runs first, STAT examinations are 0'),
+        ),
+    ]
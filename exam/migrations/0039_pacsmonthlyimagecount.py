@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0038_aiconfiguration_batch_reporting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PacsMonthlyImageCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the counted month')),
+                ('total_images', models.PositiveIntegerField(default=0)),
+                ('total_studies', models.PositiveIntegerField(default=0)),
+                ('modality_breakdown', models.JSONField(default=dict, help_text="{modality: {'images': n, 'studies': n}}")),
+                ('counted_at', models.DateTimeField(auto_now=True)),
+                ('pacs_server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_image_counts', to='exam.pacsserver')),
+            ],
+            options={
+                'verbose_name': 'PACS Monthly Image Count',
+                'verbose_name_plural': 'PACS Monthly Image Counts',
+                'ordering': ['-month', 'pacs_server'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pacsmonthlyimagecount',
+            constraint=models.UniqueConstraint(fields=('pacs_server', 'month'), name='unique_pacs_monthly_image_count'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0039_pacsmonthlyimagecount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PacsDailyImageCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('modality', models.CharField(blank=True, default='', help_text='DICOM Modality, empty for the day total', max_length=16)),
+                ('images', models.PositiveIntegerField(default=0)),
+                ('studies', models.PositiveIntegerField(default=0)),
+                ('counted_at', models.DateTimeField(auto_now=True)),
+                ('pacs_server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_image_counts', to='exam.pacsserver')),
+            ],
+            options={
+                'verbose_name': 'PACS Daily Image Count',
+                'verbose_name_plural': 'PACS Daily Image Counts',
+                'ordering': ['-date', 'pacs_server', 'modality'],
+                'indexes': [models.Index(fields=['date', 'modality'], name='exam_pacsda_date_5b3b2b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pacsdailyimagecount',
+            constraint=models.UniqueConstraint(fields=('pacs_server', 'date', 'modality'), name='unique_pacs_daily_image_count'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:13
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_daily_entry_date(apps, schema_editor):
+    """Date the existing daily entries, keeping the latest one per date, reason and reporter"""
+    RejectIncident = apps.get_model('exam', 'RejectIncident')
+    
+    seen = set()
+    daily_entries = RejectIncident.objects.filter(examination__isnull=True).order_by('-modified', '-id')
+    for incident in daily_entries.iterator():
+        entry_date = timezone.localtime(incident.reject_date).date()
+        key = (entry_date, incident.reject_reason_id, incident.reported_by_id)
+        if key in seen:
+            continue  # Older duplicate, left undated
+        seen.add(key)
+        RejectIncident.objects.filter(pk=incident.pk).update(daily_entry_date=entry_date)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0040_pacsdailyimagecount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rejectincident',
+            name='daily_entry_date',
+            field=models.DateField(blank=True, editable=False, help_text='Local date of a daily reject entry (incidents without an examination), one per reason and reporter', null=True),
+        ),
+        migrations.RunPython(populate_daily_entry_date, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rejectincident',
+            constraint=models.UniqueConstraint(fields=('daily_entry_date', 'reject_reason', 'reported_by'), name='unique_daily_reject_entry'),
+        ),
+    ]
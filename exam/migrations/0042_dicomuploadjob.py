@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:17
+
+import auto_prefetch
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('exam', '0041_rejectincident_daily_entry_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DicomUploadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('stage', models.CharField(choices=[('queued', 'Queued'), ('reading', 'Reading headers'), ('registering', 'Registering study'), ('uploading', 'Uploading to PACS'), ('done', 'Done')], default='queued', max_length=20)),
+                ('total_files', models.PositiveIntegerField(default=0)),
+                ('uploaded_files', models.PositiveIntegerField(default=0)),
+                ('failed_files', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, default=dict, help_text='Response data of a finished upload')),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', auto_prefetch.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dicom_upload_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'DICOM Upload Job',
+                'verbose_name_plural': 'DICOM Upload Jobs',
+                'ordering': ['-created'],
+                'abstract': False,
+                'base_manager_name': 'prefetch_manager',
+            },
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('prefetch_manager', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0042_dicomuploadjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='daftar',
+            name='tarikh',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='DashboardRollupDate',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('rebuilt', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Rollup Date',
+                'verbose_name_plural': 'Dashboard Rollup Dates',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0043_daftar_tarikh_index_dashboardrollupdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dicomuploadjob',
+            name='spool_dir',
+            field=models.CharField(blank=True, help_text='Directory holding the uploaded files until the job finishes', max_length=500),
+        ),
+    ]
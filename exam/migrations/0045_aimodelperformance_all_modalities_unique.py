@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:35
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_records(apps, schema_editor):
+    """Fold duplicate all-modalities records into the oldest one before adding the constraint"""
+    AIModelPerformance = apps.get_model('exam', 'AIModelPerformance')
+    duplicates = (
+        AIModelPerformance.objects.filter(modality__isnull=True)
+        .values('model_version', 'analysis_date')
+        .annotate(count=Count('pk'), keep=Min('pk'))
+        .filter(count__gt=1)
+    )
+    for group in duplicates:
+        rows = AIModelPerformance.objects.filter(
+            modality__isnull=True, model_version=group['model_version'], analysis_date=group['analysis_date']
+        )
+        extra = rows.exclude(pk=group['keep'])
+        kept = rows.get(pk=group['keep'])
+        for row in extra:
+            kept.cache_hits += row.cache_hits
+            kept.cache_misses += row.cache_misses
+        kept.save(update_fields=['cache_hits', 'cache_misses'])
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0044_dicomuploadjob_spool_dir'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='aimodelperformance',
+            constraint=models.UniqueConstraint(condition=models.Q(('modality__isnull', True)), fields=('model_version', 'analysis_date'), name='unique_performance_per_model_date_all_modalities'),
+        ),
+    ]
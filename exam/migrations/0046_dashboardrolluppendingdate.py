@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0045_aimodelperformance_all_modalities_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollupPendingDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Rollup Pending Date',
+                'verbose_name_plural': 'Dashboard Rollup Pending Dates',
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -8,6 +8,7 @@ from reez import settings
 from custom.katanama import titlecase
 from ordered_model.models import OrderedModel
 import auto_prefetch
+import re
 import uuid
 from decimal import Decimal
 
@@ -309,53 +310,104 @@ lateral_choices = (
 )
 
 
-def generate_study_accession(modality_code="XR"):
-    """Generate parent accession number for study (e.g., KKP2025XR0000001)"""
+class AccessionSequence(models.Model):
+    """
+    Last accession number issued per clinic prefix, year and modality
+
+    Exam-level (child) accessions use an empty modality. Rows are created on
+    first use and seeded from the highest accession already in the database.
+    """
+    prefix = models.CharField(max_length=20)
+    year = models.PositiveIntegerField()
+    modality = models.CharField(max_length=10, blank=True, default='')
+    last_value = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'year', 'modality'], name='unique_accession_sequence')
+        ]
+
+    def __str__(self):
+        return f"{self.prefix}{self.year}{self.modality}: {self.last_value}"
+
+
+def _highest_accession(model, field, prefix, digits):
+    """Highest number already used for a prefix (one indexed query, only when seeding a sequence)"""
+    latest = (
+        model.objects
+        .filter(**{f'{field}__startswith': prefix, f'{field}__regex': rf'^{re.escape(prefix)}[0-9]{{{digits}}}$'})
+        .order_by(f'-{field}')
+        .values_list(field, flat=True)
+        .first()
+    )
+    return int(latest[-digits:]) if latest else 0
+
+
+def allocate_accession_numbers(modality_code="", count=1):
+    """
+    Atomically reserve a block of accession numbers
+
+    The sequence row is locked with select_for_update, so concurrent
+    registrations never get the same number. Numbers reserved by a transaction
+    that is later rolled back are returned with it; numbers reserved but not
+    saved are simply skipped.
+
+    Args:
+        modality_code: Modality for study (parent) accessions, '' for exam accessions
+        count: How many numbers to reserve, e.g. for bulk import
+
+    Returns:
+        List of accession number strings in ascending order
+    """
     tahun = timezone.now().year
     prefix = f"{settings.KLINIKSHORT}{tahun}{modality_code}"
-    
-    # Get all existing accession numbers with same prefix
-    existing = Daftar.objects.filter(
-        parent_accession_number__startswith=prefix
-    ).values_list('parent_accession_number', flat=True)
-    
-    # Find the highest number used
-    max_number = 0
-    for acc in existing:
-        if acc and len(acc) >= 7:  # Ensure we have a valid accession number
-            try:
-                number = int(acc[-7:])  # Last 7 digits
-                max_number = max(max_number, number)
-            except (ValueError, IndexError):
-                continue
-    
-    new_number = max_number + 1
-    return f"{prefix}{str(new_number).zfill(7)}"
+    if modality_code:
+        model, field, digits = Daftar, 'parent_accession_number', 7
+    else:
+        model, field, digits = Pemeriksaan, 'accession_number', 10
+
+    with transaction.atomic():
+        sequences = AccessionSequence.objects.select_for_update()
+        lookup = {'prefix': settings.KLINIKSHORT, 'year': tahun, 'modality': modality_code}
+        try:
+            sequence = sequences.get(**lookup)
+        except AccessionSequence.DoesNotExist:
+            sequence, _ = sequences.get_or_create(
+                **lookup, defaults={'last_value': _highest_accession(model, field, prefix, digits)}
+            )
+        first = sequence.last_value + 1
+        sequence.last_value += count
+        sequence.save(update_fields=['last_value', 'updated'])
+
+    return [f"{prefix}{str(number).zfill(digits)}" for number in range(first, first + count)]
+
+
+def peek_accession_number(modality_code=""):
+    """Next accession number without reserving it, for display in registration forms"""
+    tahun = timezone.now().year
+    prefix = f"{settings.KLINIKSHORT}{tahun}{modality_code}"
+    digits = 7 if modality_code else 10
+    sequence = AccessionSequence.objects.filter(
+        prefix=settings.KLINIKSHORT, year=tahun, modality=modality_code
+    ).first()
+    if sequence:
+        last_value = sequence.last_value
+    elif modality_code:
+        last_value = _highest_accession(Daftar, 'parent_accession_number', prefix, digits)
+    else:
+        last_value = _highest_accession(Pemeriksaan, 'accession_number', prefix, digits)
+    return f"{prefix}{str(last_value + 1).zfill(digits)}"
+
+
+def generate_study_accession(modality_code="XR"):
+    """Generate parent accession number for study (e.g., KKP2025XR0000001)"""
+    return allocate_accession_numbers(modality_code)[0]
 
 
 def generate_exam_accession():
     """Generate child accession number for individual examination (e.g., KKP202500000001)"""
-    tahun = timezone.now().year
-    prefix = f"{settings.KLINIKSHORT}{tahun}"
-    
-    # Get all existing accession numbers with same prefix
-    existing = Pemeriksaan.objects.filter(
-        accession_number__startswith=prefix
-    ).values_list('accession_number', flat=True)
-    
-    # Find the highest number used
-    max_number = 0
-    for acc in existing:
-        if acc and len(acc) >= 10:  # Ensure we have a valid accession number
-            try:
-                # For exam accessions, we use last 10 digits
-                number = int(acc[-10:])
-                max_number = max(max_number, number)
-            except (ValueError, IndexError):
-                continue
-    
-    new_number = max_number + 1
-    return f"{prefix}{str(new_number).zfill(10)}"
+    return allocate_accession_numbers()[0]
 
 
 ambulatori_choice = [
@@ -391,7 +443,7 @@ patient_position_choices = [
 
 
 class Daftar(auto_prefetch.Model):
-    tarikh = models.DateTimeField(default=timezone.now)
+    tarikh = models.DateTimeField(default=timezone.now, db_index=True)
 
     pesakit = auto_prefetch.ForeignKey(Pesakit, on_delete=models.CASCADE)
     no_resit = models.CharField(max_length=50, blank=True, null=True)
@@ -516,7 +568,7 @@ class Pemeriksaan(auto_prefetch.Model):
     
     # Individual examination identifiers
     accession_number = models.CharField(
-        verbose_name="Accession Number", blank=True, null=True, max_length=20,
+        verbose_name="Accession Number", blank=True, null=True, max_length=20, db_index=True,
         help_text="Individual accession number for this examination (e.g., KKP202500000001)"
     )
     no_xray = models.CharField(
@@ -625,6 +677,71 @@ class Pemeriksaan(auto_prefetch.Model):
         super(Pemeriksaan, self).save(*args, **kwargs)
 
 
+class DashboardDailyRollup(models.Model):
+    """
+    Examination and registration counts per exam date and dashboard dimension
+
+    Rows for a date are rebuilt from Daftar/Pemeriksaan after a registration,
+    examination or patient of that date changes (see
+    exam/dashboard_rollup.py), so the dashboard only sums a few rows per day.
+    Registrations are counted on rows without exam dimensions.
+    """
+    date = models.DateField(db_index=True)
+    modaliti = models.ForeignKey(Modaliti, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    part = models.ForeignKey(Part, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    exam = models.ForeignKey(Exam, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    rujukan = models.ForeignKey(Ward, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    jantina = models.CharField(max_length=2, blank=True, default='')
+    age_group = models.CharField(max_length=10, blank=True, default='')
+
+    examinations = models.PositiveIntegerField(default=0)
+    registrations = models.PositiveIntegerField(default=0)
+    studies_completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Dashboard Daily Rollup"
+        verbose_name_plural = "Dashboard Daily Rollups"
+
+    def __str__(self):
+        return f"{self.date}: {self.examinations} exams, {self.registrations} registrations"
+
+
+class DashboardRollupDate(models.Model):
+    """
+    One row per rolled-up exam date
+
+    Locked while the rollup rows of its date are rebuilt, so concurrent
+    registrations on the same date rebuild one after the other.
+    """
+    date = models.DateField(primary_key=True)
+    rebuilt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Dashboard Rollup Date"
+        verbose_name_plural = "Dashboard Rollup Dates"
+
+    def __str__(self):
+        return str(self.date)
+
+
+class DashboardRollupPendingDate(models.Model):
+    """
+    Exam date changed since its rollup rows were last rebuilt
+
+    Inserted by the Daftar/Pemeriksaan/Pesakit signal handlers in the same
+    transaction as the change; deleted when the date is rebuilt. Not unique,
+    so concurrent writers never wait on each other.
+    """
+    date = models.DateField(db_index=True)
+
+    class Meta:
+        verbose_name = "Dashboard Rollup Pending Date"
+        verbose_name_plural = "Dashboard Rollup Pending Dates"
+
+    def __str__(self):
+        return str(self.date)
+
+
 class PacsExam(models.Model):
     exam = models.OneToOneField(Pemeriksaan, on_delete=models.CASCADE)
     orthanc_id = models.CharField(max_length=100, blank=True, null=True)
@@ -964,6 +1081,10 @@ class RejectIncident(auto_prefetch.Model):
         default=timezone.now,
         help_text="Date and time when reject was identified"
     )
+    daily_entry_date = models.DateField(
+        null=True, blank=True, editable=False,
+        help_text="Local date of a daily reject entry (incidents without an examination), one per reason and reporter"
+    )
     
     # Technical details
     retake_count = models.PositiveSmallIntegerField(
@@ -1028,6 +1149,12 @@ class RejectIncident(auto_prefetch.Model):
             models.Index(fields=['analysis', 'reject_date']),
             models.Index(fields=['examination']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['daily_entry_date', 'reject_reason', 'reported_by'],
+                name='unique_daily_reject_entry'
+            )
+        ]
     
     def __str__(self):
         return f"{self.examination.no_xray} - {self.reject_reason.reason} ({self.reject_date.strftime('%d/%m/%Y')})"
@@ -1209,6 +1336,75 @@ class RejectAnalysisTargetSettings(models.Model):
         return settings
 
 
+class PacsMonthlyImageCount(models.Model):
+    """
+    Image and study counts of one PACS server for a closed month
+
+    Filled by get_orthanc_monthly_images (exam/utils.py) once a month is past
+    PACS_MONTH_CLOSE_DAYS, so reject analysis for old months does not query
+    the PACS again.
+    """
+    pacs_server = models.ForeignKey(
+        PacsServer,
+        on_delete=models.CASCADE,
+        related_name='monthly_image_counts'
+    )
+    month = models.DateField(help_text="First day of the counted month")
+    total_images = models.PositiveIntegerField(default=0)
+    total_studies = models.PositiveIntegerField(default=0)
+    modality_breakdown = models.JSONField(
+        default=dict,
+        help_text="{modality: {'images': n, 'studies': n}}"
+    )
+    counted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "PACS Monthly Image Count"
+        verbose_name_plural = "PACS Monthly Image Counts"
+        ordering = ['-month', 'pacs_server']
+        constraints = [
+            models.UniqueConstraint(fields=['pacs_server', 'month'], name='unique_pacs_monthly_image_count')
+        ]
+
+    def __str__(self):
+        return f"{self.pacs_server.name} - {self.month.strftime('%B %Y')}: {self.total_images} images"
+
+
+class PacsDailyImageCount(models.Model):
+    """
+    Images and studies stored on one PACS server per StudyDate and modality
+
+    Each counted date has a row per modality plus a total row with an empty
+    modality. Filled by `manage.py backfill_pacs_image_counts` and on demand by
+    get_daily_image_counts (exam/utils.py), which recounts only today and
+    yesterday; reject-rate dashboards read the counts from here.
+    """
+    pacs_server = models.ForeignKey(
+        PacsServer,
+        on_delete=models.CASCADE,
+        related_name='daily_image_counts'
+    )
+    date = models.DateField()
+    modality = models.CharField(max_length=16, blank=True, default='', help_text="DICOM Modality, empty for the day total")
+    images = models.PositiveIntegerField(default=0)
+    studies = models.PositiveIntegerField(default=0)
+    counted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "PACS Daily Image Count"
+        verbose_name_plural = "PACS Daily Image Counts"
+        ordering = ['-date', 'pacs_server', 'modality']
+        constraints = [
+            models.UniqueConstraint(fields=['pacs_server', 'date', 'modality'], name='unique_pacs_daily_image_count')
+        ]
+        indexes = [
+            models.Index(fields=['date', 'modality']),
+        ]
+
+    def __str__(self):
+        return f"{self.pacs_server.name} - {self.date} {self.modality or 'all'}: {self.images} images"
+
+
 # ========== AI REPORTING MODELS ==========
 
 class AIGeneratedReport(auto_prefetch.Model):
@@ -1333,6 +1529,28 @@ class AIGeneratedReport(auto_prefetch.Model):
         help_text="List of warnings from AI processing pipeline"
     )
     
+    # Generation Progress (queued generation, see exam/ai_jobs.py)
+    generation_status = models.CharField(
+        max_length=20,
+        choices=[
+            ('queued', 'Queued'),
+            ('running', 'Generating'),
+            ('completed', 'Completed'),
+            ('failed', 'Failed'),
+        ],
+        default='completed',
+        db_index=True,
+        help_text="Whether the report is still waiting for or being generated by an AI worker"
+    )
+    generation_stage = models.CharField(
+        max_length=30, blank=True,
+        help_text="Current step of the generation pipeline (fetching_images, analyzing_images, ...)"
+    )
+    generation_progress = models.PositiveSmallIntegerField(
+        default=100,
+        help_text="Generation progress as percentage"
+    )
+    
     # Audit fields
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
@@ -1743,6 +1961,14 @@ class AIModelPerformance(models.Model):
         null=True, blank=True,
         help_text="Processing error rate as percentage"
     )
+    cache_hits = models.PositiveIntegerField(
+        default=0,
+        help_text="Inferences answered from the AI result cache"
+    )
+    cache_misses = models.PositiveIntegerField(
+        default=0,
+        help_text="Inferences sent to the model because no cached result existed"
+    )
     
     # Comments and Analysis
     performance_notes = models.TextField(
@@ -1772,7 +1998,13 @@ class AIModelPerformance(models.Model):
             models.UniqueConstraint(
                 fields=['model_version', 'analysis_date', 'modality'],
                 name='unique_performance_per_model_date_modality'
-            )
+            ),
+            # NULLs never conflict above; one all-modalities record per model and month
+            models.UniqueConstraint(
+                fields=['model_version', 'analysis_date'],
+                condition=models.Q(modality__isnull=True),
+                name='unique_performance_per_model_date_all_modalities'
+            ),
         ]
         indexes = [
             models.Index(fields=['model_version', 'analysis_date']),
@@ -1807,6 +2039,14 @@ class AIModelPerformance(models.Model):
         if self.total_reports_generated > 0:
             return (self.reports_modified / self.total_reports_generated) * 100
         return 0
+    
+    @property
+    def cache_hit_rate(self):
+        """Get the rate of inferences served from the AI result cache"""
+        lookups = self.cache_hits + self.cache_misses
+        if lookups > 0:
+            return (self.cache_hits / lookups) * 100
+        return 0
 
 
 class AIConfiguration(models.Model):
@@ -1882,6 +2122,32 @@ class AIConfiguration(models.Model):
         help_text="Enable maintenance mode (disable AI processing)"
     )
     
+    # Batch (pre-emptive) Reporting
+    enable_batch_reporting = models.BooleanField(
+        default=False,
+        help_text="Queue AI reports for completed examinations without waiting for a request"
+    )
+    batch_modalities = models.JSONField(
+        default=list, blank=True,
+        help_text="Modality abbreviations to report automatically (e.g. [\"CR\", \"DX\"]), empty for all"
+    )
+    batch_start_hour = models.PositiveSmallIntegerField(
+        default=20,
+        help_text="Hour (0-23) the off-peak batch window opens"
+    )
+    batch_end_hour = models.PositiveSmallIntegerField(
+        default=7,
+        help_text="Hour (0-23) the off-peak batch window closes, same as start for all day"
+    )
+    batch_concurrency = models.PositiveSmallIntegerField(
+        default=2,
+        help_text="Batch jobs queued or running at once"
+    )
+    batch_lookback_days = models.PositiveSmallIntegerField(
+        default=3,
+        help_text="Only examinations registered within this many days are batch reported"
+    )
+    
     # Audit fields
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
@@ -1912,6 +2178,144 @@ class AIConfiguration(models.Model):
         if not config:
             config = cls.objects.create()
         return config
+    
+    def batch_window_open(self, now=None) -> bool:
+        """Whether the off-peak batch window is open at the given (local) time"""
+        hour = timezone.localtime(now).hour
+        if self.batch_start_hour == self.batch_end_hour:
+            return True
+        if self.batch_start_hour < self.batch_end_hour:
+            return self.batch_start_hour <= hour < self.batch_end_hour
+        # Window over midnight, e.g. 20:00-07:00
+        return hour >= self.batch_start_hour or hour < self.batch_end_hour
+
+
+# ========== AI REPORT JOB QUEUE ==========
+
+AI_JOB_PRIORITY_CHOICES = [
+    (0, 'STAT'),
+    (1, 'High'),
+    (2, 'Medium'),
+    (3, 'Low'),
+    (4, 'Batch'),
+]
+
+
+class AIReportJob(auto_prefetch.Model):
+    """
+    Queued AI report generation
+
+    Created by the generate endpoints together with a placeholder
+    AIGeneratedReport, and processed by the run_ai_worker management command
+    (exam/ai_jobs.py) in priority order.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    pemeriksaan = auto_prefetch.ForeignKey(
+        Pemeriksaan,
+        on_delete=models.CASCADE,
+        related_name='ai_report_jobs',
+        help_text="Examination to generate the AI report for"
+    )
+    ai_report = auto_prefetch.ForeignKey(
+        AIGeneratedReport,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='jobs',
+        help_text="Report filled in by this job"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.PositiveSmallIntegerField(
+        choices=AI_JOB_PRIORITY_CHOICES, default=2,
+        help_text="Lower runs first, STAT examinations are 0"
+    )
+    model_name = models.CharField(
+        max_length=100,
+        help_text="Ollama vision model the job runs on, used for per-model concurrency limits"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, help_text="Worker processing the job")
+    error = models.TextField(blank=True)
+
+    requested_by = auto_prefetch.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='ai_report_jobs'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(auto_prefetch.Model.Meta):
+        verbose_name = "AI Report Job"
+        verbose_name_plural = "AI Report Jobs"
+        ordering = ['priority', 'created']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'created']),
+            models.Index(fields=['model_name', 'status']),
+        ]
+
+    def __str__(self):
+        return f"AI Job {self.pk} - {self.pemeriksaan.no_xray} ({self.status})"
+
+
+class DicomUploadJob(auto_prefetch.Model):
+    """
+    DICOM upload processed in the background
+
+    Created by upload_dicom_files when the client asks for a background
+    upload; the files are registered and sent to Orthanc by a thread of the
+    web process (exam/dicom_upload.py) while the client follows the progress.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    STAGE_CHOICES = [
+        ('queued', 'Queued'),
+        ('reading', 'Reading headers'),
+        ('registering', 'Registering study'),
+        ('uploading', 'Uploading to PACS'),
+        ('done', 'Done'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default='queued')
+    total_files = models.PositiveIntegerField(default=0)
+    uploaded_files = models.PositiveIntegerField(default=0)
+    failed_files = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True, help_text="Response data of a finished upload")
+    error = models.TextField(blank=True)
+    spool_dir = models.CharField(max_length=500, blank=True, help_text="Directory holding the uploaded files until the job finishes")
+
+    requested_by = auto_prefetch.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='dicom_upload_jobs'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(auto_prefetch.Model.Meta):
+        verbose_name = "DICOM Upload Job"
+        verbose_name_plural = "DICOM Upload Jobs"
+        ordering = ['-created']
+
+    def __str__(self):
+        return f"DICOM Upload {self.pk} - {self.uploaded_files}/{self.total_files} ({self.status})"
 
 
 # ========== MANUAL RADIOLOGY REPORT MODEL ==========
@@ -0,0 +1,354 @@
+"""
+Shared Orthanc PACS HTTP client
+
+Provides one pooled, keep-alive HTTP client per PACS server for the whole
+process. Every PACS view, utility and AI service should obtain its client
+through get_orthanc_client() instead of calling requests directly, so that
+Orthanc round trips reuse TCP connections and share retry/backoff policy.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+
+from .models import PacsServer
+
+logger = logging.getLogger(__name__)
+
+
+# Connection pool and retry defaults (override in settings.py)
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.3
+
+
+class OrthancPACSClient:
+    """
+    Client for interfacing with Orthanc PACS server
+    Handles DICOM image retrieval and metadata extraction over a pooled,
+    keep-alive session with retry/backoff for transient failures
+    """
+
+    def __init__(self, pacs_server: Optional[PacsServer] = None):
+        """
+        Initialize Orthanc client with PACS server configuration
+
+        Args:
+            pacs_server: PacsServer (or legacy PacsConfig) instance, defaults to primary server
+        """
+        if pacs_server is None:
+            pacs_server = PacsServer.objects.filter(is_primary=True, is_active=True).first()
+            if not pacs_server:
+                raise ValueError("No active primary PACS server configured")
+
+        self.pacs_server = pacs_server
+        self.base_url = pacs_server.orthancurl.rstrip('/')
+
+        # Timeouts are (connect, read) so a dead server fails fast
+        self.connect_timeout = getattr(settings, 'ORTHANC_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)
+        self.read_timeout = getattr(settings, 'ORTHANC_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)
+        self.timeout = (self.connect_timeout, self.read_timeout)
+
+        self.session = self._build_session()
+
+        logger.info(f"Initialized Orthanc client for {self.base_url}")
+
+    def _build_session(self) -> requests.Session:
+        """Create a keep-alive session with a sized connection pool and retry policy"""
+        retry = Retry(
+            total=getattr(settings, 'ORTHANC_MAX_RETRIES', DEFAULT_MAX_RETRIES),
+            backoff_factor=getattr(settings, 'ORTHANC_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF),
+            status_forcelist=(502, 503, 504),
+            # Orthanc's POST endpoints used here (/tools/find, /instances) are idempotent
+            allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=getattr(settings, 'ORTHANC_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS),
+            pool_maxsize=getattr(settings, 'ORTHANC_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE),
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'User-Agent': 'RIS-Orthanc-Client/1.0',
+            'Connection': 'keep-alive',
+        })
+        return session
+
+    # ========== Low-level HTTP helpers ==========
+
+    def url(self, path: str) -> str:
+        """Build an absolute Orthanc URL from a path such as '/studies/{id}'"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request to Orthanc through the pooled session"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def head(self, path: str, **kwargs) -> requests.Response:
+        return self.request('HEAD', path, **kwargs)
+
+    def find(self, level: str, query: Dict[str, Any], expand: bool = True,
+             limit: Optional[int] = None, **extra) -> requests.Response:
+        """
+        Run an Orthanc /tools/find query
+
+        Args:
+            level: 'Patient', 'Study', 'Series' or 'Instance'
+            query: DICOM tag filters
+            expand: Return full resources instead of IDs
+            limit: Maximum number of results
+            extra: Additional /tools/find options (e.g. RequestedTags)
+
+        Returns:
+            Raw response from Orthanc
+        """
+        body = {'Level': level, 'Query': query, 'Expand': expand}
+        if limit is not None:
+            body['Limit'] = limit
+        body.update(extra)
+        return self.post('/tools/find', json=body)
+
+    # ========== Resource helpers ==========
+
+    def get_study_info(self, study_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get study information from Orthanc
+
+        Args:
+            study_id: Orthanc study ID
+
+        Returns:
+            Study information dict or None if not found
+        """
+        try:
+            response = self.get(f"/studies/{study_id}")
+
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                logger.warning(f"Study {study_id} not found in PACS")
+                return None
+            else:
+                logger.error(f"Error getting study {study_id}: {response.status_code}")
+                return None
+
+        except requests.RequestException as e:
+            logger.error(f"Request error getting study {study_id}: {e}")
+            return None
+
+    def get_study_series(self, study_id: str) -> List[Dict[str, Any]]:
+        """
+        Get all series for a study
+
+        Args:
+            study_id: Orthanc study ID
+
+        Returns:
+            List of series information dicts
+        """
+        try:
+            # Orthanc returns the expanded series resources in one call
+            response = self.get(f"/studies/{study_id}/series")
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Error getting series for study {study_id}: {response.status_code}")
+                return []
+
+        except requests.RequestException as e:
+            logger.error(f"Request error getting series for study {study_id}: {e}")
+            return []
+
+    def get_series_instances(self, series_id: str) -> List[str]:
+        """
+        Get all instance IDs for a series
+
+        Args:
+            series_id: Orthanc series ID
+
+        Returns:
+            List of instance IDs
+        """
+        try:
+            response = self.get(f"/series/{series_id}")
+
+            if response.status_code == 200:
+                return response.json().get('Instances', [])
+            else:
+                logger.error(f"Error getting instances for series {series_id}: {response.status_code}")
+                return []
+
+        except requests.RequestException as e:
+            logger.error(f"Request error getting instances for series {series_id}: {e}")
+            return []
+
+    def get_instance_image(self, instance_id: str, format: str = 'png', max_size: Optional[int] = None) -> Optional[bytes]:
+        """
+        Get image data for an instance
+
+        Args:
+            instance_id: Orthanc instance ID
+            format: Image format ('png', 'jpeg', etc.)
+            max_size: Longest edge in pixels; Orthanc renders a scaled JPEG
+                (/rendered) instead of the full-size preview
+
+        Returns:
+            Image bytes or None if error
+        """
+        try:
+            if max_size:
+                response = self.get(
+                    f"/instances/{instance_id}/rendered",
+                    params={'width': max_size, 'height': max_size, 'smooth': 1},
+                    headers={'Accept': 'image/jpeg'}
+                )
+                if response.status_code == 200:
+                    return response.content
+                # Orthanc before 1.6 has no /rendered, fall back to the full-size preview
+                logger.debug(f"Rendered image unavailable for instance {instance_id}: {response.status_code}")
+
+            response = self.get(f"/instances/{instance_id}/preview")
+
+            if response.status_code == 200:
+                return response.content
+            else:
+                logger.error(f"Error getting image for instance {instance_id}: {response.status_code}")
+                return None
+
+        except requests.RequestException as e:
+            logger.error(f"Request error getting image for instance {instance_id}: {e}")
+            return None
+
+    def get_instance_dicom_tags(self, instance_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get DICOM tags for an instance
+
+        Args:
+            instance_id: Orthanc instance ID
+
+        Returns:
+            DICOM tags dict or None if error
+        """
+        try:
+            response = self.get(f"/instances/{instance_id}/tags")
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Error getting tags for instance {instance_id}: {response.status_code}")
+                return None
+
+        except requests.RequestException as e:
+            logger.error(f"Request error getting tags for instance {instance_id}: {e}")
+            return None
+
+    def find_study_by_accession(self, accession_number: str) -> Optional[str]:
+        """
+        Find study ID by accession number
+
+        Args:
+            accession_number: Study accession number
+
+        Returns:
+            Orthanc study ID or None if not found
+        """
+        try:
+            response = self.find('Study', {'AccessionNumber': accession_number}, expand=False)
+
+            if response.status_code == 200:
+                results = response.json()
+                if results:
+                    return results[0]  # Return first match
+                else:
+                    logger.info(f"No study found for accession {accession_number}")
+                    return None
+            else:
+                logger.error(f"Error finding study by accession {accession_number}: {response.status_code}")
+                return None
+
+        except requests.RequestException as e:
+            logger.error(f"Request error finding study by accession {accession_number}: {e}")
+            return None
+
+
+def instance_sort_key(instance: Dict[str, Any]) -> tuple:
+    """
+    Sort key ordering expanded instances by InstanceNumber
+
+    Falls back to Orthanc's IndexInSeries, then the instance ID, for instances
+    without a usable InstanceNumber.
+    """
+    try:
+        number = int(str(instance.get('MainDicomTags', {}).get('InstanceNumber', '')).strip())
+    except ValueError:
+        number = None
+    index = instance.get('IndexInSeries')
+    return (
+        number is None,
+        number if number is not None else 0,
+        index if isinstance(index, int) else 0,
+        instance.get('ID', ''),
+    )
+
+
+# ========== Process-wide client registry ==========
+
+_clients: Dict[tuple, OrthancPACSClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_orthanc_client(pacs_server=None) -> OrthancPACSClient:
+    """
+    Return the shared pooled client for a PACS server
+
+    Clients are created once per process and reused, keyed by server identity
+    and URL so that editing a server's orthancurl transparently gets a fresh pool.
+
+    Args:
+        pacs_server: PacsServer or legacy PacsConfig instance, defaults to primary server
+
+    Returns:
+        OrthancPACSClient instance
+    """
+    if pacs_server is None:
+        pacs_server = PacsServer.objects.filter(is_primary=True, is_active=True).first()
+        if not pacs_server:
+            raise ValueError("No active primary PACS server configured")
+
+    key = (type(pacs_server).__name__, pacs_server.pk, pacs_server.orthancurl.rstrip('/'))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = OrthancPACSClient(pacs_server)
+                _clients[key] = client
+    return client
+
+
+def reset_orthanc_clients():
+    """Close and forget all pooled clients (used by tests and after config changes)"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
@@ -4,10 +4,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from concurrent.futures import ThreadPoolExecutor, wait
 import requests
 import logging
+import time
 
 from .models import PacsServer
+from .orthanc_client import get_orthanc_client
+from .pacs_search import (
+    get_studies_details, get_study_modality, STUDY_REQUESTED_TAGS, DEFAULT_MULTI_SEARCH_DEADLINE
+)
 from .serializers import PacsServerSerializer, PacsServerListSerializer
 from staff.permissions import IsSuperUser
 
@@ -102,14 +109,8 @@ class PacsServerViewSet(viewsets.ModelViewSet):
         pacs_server = self.get_object()
         
         try:
-            import requests
-            from urllib.parse import urljoin
-            
             # Test basic connectivity to Orthanc
-            orthanc_url = pacs_server.orthancurl.rstrip('/')
-            test_url = urljoin(orthanc_url, '/system')
-            
-            response = requests.get(test_url, timeout=10)
+            response = get_orthanc_client(pacs_server).get('/system', timeout=10)
             
             if response.status_code == 200:
                 system_info = response.json()
@@ -167,7 +168,7 @@ class PacsServerViewSet(viewsets.ModelViewSet):
         for server in servers:
             try:
                 # Test connection to Orthanc server
-                response = requests.get(f"{server.orthancurl.rstrip('/')}/system", timeout=5)
+                response = get_orthanc_client(server).get('/system', timeout=5)
                 health_status[server.id] = {
                     'name': server.name,
                     'status': 'healthy' if response.status_code == 200 else 'unhealthy',
@@ -194,7 +195,26 @@ class MultiplePacsSearchView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
+        """
+        Search all (or selected) PACS servers concurrently
+        
+        Servers are queried in parallel under one global deadline (optional
+        "deadline" in seconds, at most PACS_MULTI_SEARCH_DEADLINE). Servers that
+        fail or miss the deadline are listed in server_errors and the studies
+        from the others are still returned, merged by studyDate.
+        """
         search_params = request.data.copy()  # Make a copy so we can modify it
+        
+        # A request may shorten the global deadline, never extend it
+        max_deadline = float(getattr(settings, 'PACS_MULTI_SEARCH_DEADLINE', DEFAULT_MULTI_SEARCH_DEADLINE))
+        try:
+            deadline = float(search_params.get('deadline', max_deadline))
+        except (TypeError, ValueError):
+            deadline = None
+        if deadline is None or not deadline > 0:
+            return Response({'error': 'deadline must be a positive number of seconds'}, status=400)
+        deadline = min(deadline, max_deadline)
+        
         server_ids = search_params.get('server_ids', [])
         
         # If no specific servers requested, search all active servers
@@ -214,10 +234,26 @@ class MultiplePacsSearchView(APIView):
         server_errors = {}
         servers_searched = []
         
-        for server in active_servers:
-            try:
-                # Search this PACS server
-                server_studies = self._search_single_pacs(server, search_params)
+        # Query all servers concurrently; a slow archive only costs the deadline
+        servers = list(active_servers)
+        if servers:
+            executor = ThreadPoolExecutor(max_workers=len(servers))
+            futures = {
+                executor.submit(self._timed_search, server, search_params, deadline): server
+                for server in servers
+            }
+            done, not_done = wait(futures, timeout=deadline)
+            # Don't block the response on servers still running past the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+            
+            for future in done:
+                server = futures[future]
+                try:
+                    server_studies, latency_ms = future.result()
+                except Exception as e:
+                    server_errors[server.name] = str(e)
+                    logger.error(f"Error searching PACS server {server.name}: {e}")
+                    continue
                 
                 # Add server info to each study
                 for study in server_studies:
@@ -225,11 +261,19 @@ class MultiplePacsSearchView(APIView):
                     study['pacs_server_name'] = server.name
                 
                 all_studies.extend(server_studies)
-                servers_searched.append({'id': server.id, 'name': server.name})
-                
-            except Exception as e:
-                server_errors[server.name] = str(e)
-                logger.error(f"Error searching PACS server {server.name}: {e}")
+                servers_searched.append({
+                    'id': server.id,
+                    'name': server.name,
+                    'latency_ms': latency_ms,
+                    'study_count': len(server_studies),
+                })
+            
+            for future in not_done:
+                server = futures[future]
+                server_errors[server.name] = f"Timed out after {deadline:g}s"
+                logger.warning(f"PACS server {server.name} missed the {deadline:g}s search deadline")
+            
+            servers_searched.sort(key=lambda x: x['latency_ms'])
         
         # Sort studies by study date (most recent first)
         all_studies.sort(key=lambda x: x.get('studyDate', ''), reverse=True)
@@ -245,6 +289,7 @@ class MultiplePacsSearchView(APIView):
             'total_count': len(all_studies),
             'server_errors': server_errors,
             'servers_searched': servers_searched,
+            'partial': bool(server_errors),
             'pagination_info': {
                 'per_server_limit': search_params.get('limit', 100) // max(1, active_servers.count()),
                 'total_limit': total_limit,
@@ -252,7 +297,13 @@ class MultiplePacsSearchView(APIView):
             }
         })
     
-    def _search_single_pacs(self, server: PacsServer, search_params: dict):
+    def _timed_search(self, server: PacsServer, search_params: dict, deadline: float):
+        """Run _search_single_pacs and return (studies, latency in ms)"""
+        started = time.monotonic()
+        studies = self._search_single_pacs(server, search_params, timeout=deadline)
+        return studies, round((time.monotonic() - started) * 1000)
+    
+    def _search_single_pacs(self, server: PacsServer, search_params: dict, timeout: float = 30):
         """
         Search a single PACS server with pagination support
         Based on the existing PacsSearchView logic
@@ -289,22 +340,24 @@ class MultiplePacsSearchView(APIView):
                 'Level': 'Study',
                 'Query': query,
                 'Expand': True,
-                'Limit': per_server_limit
+                'Limit': per_server_limit,
+                'RequestedTags': STUDY_REQUESTED_TAGS
             }
             
             # Query this Orthanc server
-            orthanc_url = server.orthancurl.rstrip('/')
-            response = requests.post(
-                f"{orthanc_url}/tools/find",
+            client = get_orthanc_client(server)
+            response = client.post(
+                "/tools/find",
                 json=orthanc_query,
-                timeout=30
+                timeout=(client.connect_timeout, timeout)
             )
             
             if not response.ok:
                 logger.error(f"Orthanc search failed for {server.name}: {response.status_code}")
-                return []
+                raise Exception(f"Orthanc query failed: {response.status_code}")
             
             studies_data = response.json()
+            study_details = get_studies_details(client, studies_data)
             
             # Format studies for frontend
             formatted_studies = []
@@ -324,78 +377,8 @@ class MultiplePacsSearchView(APIView):
                     if not isinstance(series_list, list):
                         series_list = []
                     
-                    # Extract modality from series (DICOM tag 0008,0060 is series-level)
-                    modality = 'Unknown'
-                    body_part_examined = None
-                    protocol_name = None
-                    acquisition_device_processing_description = None
-                    manufacturer = None
-                    
-                    # Try study-level ModalitiesInStudy first
-                    study_modalities = main_dicom_tags.get('ModalitiesInStudy', '')
-                    if study_modalities:
-                        modality = study_modalities.split(',')[0].strip()
-                    elif series_list:
-                        # If no study-level modality, try to get from first series
-                        try:
-                            first_series_id = series_list[0]
-                            series_response = requests.get(
-                                f"{orthanc_url}/series/{first_series_id}",
-                                timeout=5
-                            )
-                            if series_response.ok:
-                                series_data = series_response.json()
-                                series_modality = series_data.get('MainDicomTags', {}).get('Modality', '')
-                                if series_modality:
-                                    modality = series_modality
-                        except Exception as e:
-                            logger.debug(f"Failed to fetch series modality from {server.name}: {e}")
-                            pass
-                    
-                    # Extract additional DICOM fields from series and instance data
-                    if series_list:
-                        try:
-                            first_series_id = series_list[0]
-                            series_response = requests.get(
-                                f"{orthanc_url}/series/{first_series_id}",
-                                timeout=5
-                            )
-                            if series_response.ok:
-                                series_data = series_response.json()
-                                series_tags = series_data.get('MainDicomTags', {})
-                                
-                                # Try to get fields from series level first
-                                body_part_examined = series_tags.get('BodyPartExamined')
-                                protocol_name = series_tags.get('ProtocolName')
-                                acquisition_device_processing_description = series_tags.get('AcquisitionDeviceProcessingDescription')
-                                manufacturer = series_tags.get('Manufacturer')
-                                
-                                # If not found at series level, try instance level
-                                instances = series_data.get('Instances', [])
-                                if instances and (not body_part_examined or not protocol_name or not acquisition_device_processing_description or not manufacturer):
-                                    try:
-                                        first_instance_id = instances[0]
-                                        instance_response = requests.get(
-                                            f"{orthanc_url}/instances/{first_instance_id}",
-                                            timeout=5
-                                        )
-                                        if instance_response.ok:
-                                            instance_data = instance_response.json()
-                                            instance_tags = instance_data.get('MainDicomTags', {})
-                                            
-                                            # Use instance-level tags as fallback
-                                            if not body_part_examined:
-                                                body_part_examined = instance_tags.get('BodyPartExamined')
-                                            if not protocol_name:
-                                                protocol_name = instance_tags.get('ProtocolName')
-                                            if not acquisition_device_processing_description:
-                                                acquisition_device_processing_description = instance_tags.get('AcquisitionDeviceProcessingDescription')
-                                            if not manufacturer:
-                                                manufacturer = instance_tags.get('Manufacturer')
-                                    except Exception as e:
-                                        logger.debug(f"Failed to fetch instance tags from {server.name}: {e}")
-                        except Exception as e:
-                            logger.debug(f"Failed to fetch series tags from {server.name}: {e}")
+                    details = study_details.get(study.get('ID'), {})
+                    modality = details.get('modality') or get_study_modality(study) or 'Unknown'
                     
                     formatted_study = {
                         'id': study.get('ID', ''),
@@ -414,10 +397,10 @@ class MultiplePacsSearchView(APIView):
                         'accessionNumber': main_dicom_tags.get('AccessionNumber', ''),
                         
                         # Additional DICOM fields that frontend expects
-                        'bodyPartExamined': body_part_examined,
-                        'protocolName': protocol_name,
-                        'manufacturer': manufacturer,
-                        'acquisitionDeviceProcessingDescription': acquisition_device_processing_description,
+                        'bodyPartExamined': details.get('bodyPartExamined'),
+                        'protocolName': details.get('protocolName'),
+                        'manufacturer': details.get('manufacturer'),
+                        'acquisitionDeviceProcessingDescription': details.get('acquisitionDeviceProcessingDescription'),
                     }
                     
                     formatted_studies.append(formatted_study)
@@ -0,0 +1,165 @@
+"""
+PACS study search helpers
+
+Study-level /tools/find results only carry study tags, while the search UI
+also shows series/instance-level fields (modality, body part, protocol,
+manufacturer). This module fills those fields for a whole result page with
+one bounded, concurrent round of requests and caches the per-study result so
+that paging through the same search does not hit Orthanc again.
+"""
+
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+# Series/instance-level tags shown in the PACS browser
+SERIES_DETAIL_TAGS = [
+    'Modality',
+    'BodyPartExamined',
+    'ProtocolName',
+    'AcquisitionDeviceProcessingDescription',
+    'Manufacturer',
+    'ManufacturerModelName',
+]
+
+# Study-level tags Orthanc computes on request (Orthanc 1.11+)
+STUDY_REQUESTED_TAGS = ['ModalitiesInStudy']
+
+DEFAULT_SEARCH_WORKERS = 8
+DEFAULT_SEARCH_CACHE_TIMEOUT = 600  # 10 minutes
+DEFAULT_MULTI_SEARCH_DEADLINE = 20  # seconds for a multi-server search
+
+_DETAIL_FIELDS = {
+    'Modality': 'modality',
+    'BodyPartExamined': 'bodyPartExamined',
+    'ProtocolName': 'protocolName',
+    'AcquisitionDeviceProcessingDescription': 'acquisitionDeviceProcessingDescription',
+    'Manufacturer': 'manufacturer',
+    'ManufacturerModelName': 'manufacturerModelName',
+}
+
+
+def get_study_modality(study: Dict[str, Any]) -> str:
+    """
+    Return the first modality listed at study level, or '' if Orthanc did not provide one
+
+    Args:
+        study: Expanded study resource from /tools/find
+    """
+    modalities = (
+        study.get('RequestedTags', {}).get('ModalitiesInStudy')
+        or study.get('MainDicomTags', {}).get('ModalitiesInStudy', '')
+    )
+    return modalities.replace('\\', ',').split(',')[0].strip() if modalities else ''
+
+
+def _cache_key(client, study: Dict[str, Any]) -> str:
+    """Cache key for one study, invalidated whenever Orthanc updates the study"""
+    server = hashlib.md5(client.base_url.encode()).hexdigest()[:12]
+    return f"pacs_search_study:{server}:{study.get('ID', '')}:{study.get('LastUpdate', '')}"
+
+
+def _fetch_study_details(client, study: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resolve series/instance-level fields for one study
+
+    Uses a single /series/{id}?requestedTags= call on the first series; the
+    instance is only read when the server does not support requested tags.
+    """
+    details = {field: None for field in _DETAIL_FIELDS.values()}
+    details['modality'] = get_study_modality(study) or 'Unknown'
+
+    series_list = study.get('Series', [])
+    if not isinstance(series_list, list) or not series_list:
+        return details
+
+    tags = {}
+    series_response = client.get(
+        f"/series/{series_list[0]}",
+        params={'requestedTags': ';'.join(SERIES_DETAIL_TAGS)},
+        timeout=5
+    )
+    if not series_response.ok:
+        return details
+
+    series_data = series_response.json()
+    # Requested tags take precedence, then series main tags
+    tags.update({k: v for k, v in series_data.get('MainDicomTags', {}).items() if v})
+    tags.update({k: v for k, v in series_data.get('RequestedTags', {}).items() if v})
+
+    instances = series_data.get('Instances', [])
+    if instances and any(not tags.get(tag) for tag in SERIES_DETAIL_TAGS if tag != 'Modality'):
+        instance_response = client.get(f"/instances/{instances[0]}", timeout=5)
+        if instance_response.ok:
+            for tag, value in instance_response.json().get('MainDicomTags', {}).items():
+                if value and not tags.get(tag):
+                    tags[tag] = value
+
+    for tag, field in _DETAIL_FIELDS.items():
+        if tags.get(tag):
+            details[field] = tags[tag]
+    if details['modality'] == 'Unknown' and tags.get('Modality'):
+        details['modality'] = tags['Modality']
+
+    return details
+
+
+def get_studies_details(client, studies: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fill series/instance-level search fields for a page of studies
+
+    Cached studies are served from the Django cache; the rest are fetched
+    concurrently through the pooled client with a bounded worker count.
+
+    Args:
+        client: OrthancPACSClient for the server that returned the studies
+        studies: Expanded study resources from a Study-level /tools/find
+
+    Returns:
+        Dict mapping Orthanc study ID to its detail fields
+    """
+    studies = [study for study in studies if isinstance(study, dict) and study.get('ID')]
+    if not studies:
+        return {}
+
+    keys = {study['ID']: _cache_key(client, study) for study in studies}
+    cached = cache.get_many(list(keys.values()))
+    results = {study_id: cached[key] for study_id, key in keys.items() if key in cached}
+    missing = [study for study in studies if study['ID'] not in results]
+
+    if missing:
+        def fetch(study):
+            try:
+                return study, _fetch_study_details(client, study)
+            except Exception as e:
+                logger.debug(f"Failed to fetch series details for study {study.get('ID')}: {e}")
+                return study, None
+
+        max_workers = min(getattr(settings, 'PACS_SEARCH_WORKERS', DEFAULT_SEARCH_WORKERS), len(missing))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = list(executor.map(fetch, missing))
+
+        to_cache = {}
+        for study, details in fetched:
+            if details is None:
+                # Don't cache failures, fall back to study-level data for this response
+                details = {field: None for field in _DETAIL_FIELDS.values()}
+                details['modality'] = get_study_modality(study) or 'Unknown'
+            else:
+                to_cache[keys[study['ID']]] = details
+            results[study['ID']] = details
+
+        if to_cache:
+            cache.set_many(
+                to_cache,
+                getattr(settings, 'PACS_SEARCH_CACHE_TIMEOUT', DEFAULT_SEARCH_CACHE_TIMEOUT)
+            )
+
+    return results
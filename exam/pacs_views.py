@@ -14,6 +14,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .models import PacsConfig
+from .orthanc_client import get_orthanc_client
+from .dashboard_rollup import defer_rollups
+from .dicom_cache import dicom_file_cache
+from .study_manifest import get_study_manifest, get_manifest_series
+from .renditions import cached_thumbnail_response, render_thumbnail, rendition_cache, thumbnail_size
+from .pacs_search import get_studies_details, get_study_modality, STUDY_REQUESTED_TAGS
 from custom.katanama import titlecase
 from .utils import (
     find_or_create_patient, 
@@ -42,8 +48,12 @@ class PacsSearchView(APIView):
             "dateFrom": "YYYY-MM-DD",
             "dateTo": "YYYY-MM-DD",
             "modality": "CT|MR|CR|DR|etc",
-            "studyDescription": "search term"
+            "studyDescription": "search term",
+            "includeSeriesDetails": true
         }
+        
+        Set includeSeriesDetails to false to skip the series/instance-level
+        fields (modality falls back to ModalitiesInStudy) for the fastest search.
         """
         try:
             
@@ -52,7 +62,7 @@ class PacsSearchView(APIView):
             if not pacs_config:
                 return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            orthanc_url = pacs_config.orthancurl
+            client = get_orthanc_client(pacs_config)
             
             # Parse request data
             search_params = request.data
@@ -106,12 +116,13 @@ class PacsSearchView(APIView):
                 'Level': 'Study',
                 'Query': query,
                 'Expand': True,
-                'Limit': search_params.get('limit', 100)
+                'Limit': search_params.get('limit', 100),
+                'RequestedTags': STUDY_REQUESTED_TAGS
             }
             
             # Query Orthanc
-            orthanc_response = requests.post(
-                f"{orthanc_url}/tools/find",
+            orthanc_response = client.post(
+                "/tools/find",
                 headers={'Content-Type': 'application/json'},
                 json=orthanc_request,
                 timeout=30
@@ -124,92 +135,18 @@ class PacsSearchView(APIView):
             
             orthanc_results = orthanc_response.json()
             
-            # Debug: Print first study structure to understand available fields
-            if orthanc_results:
-                print(f"Sample Orthanc study structure: {orthanc_results[0]}")
+            # Series/instance-level fields for the whole page in one concurrent, cached pass
+            if search_params.get('includeSeriesDetails', True):
+                study_details = get_studies_details(client, orthanc_results)
+            else:
+                study_details = {}
             
             # Format results for frontend
             formatted_studies = []
             for study in orthanc_results:
-                # Extract modality from series (DICOM tag 0008,0060 is series-level)
-                modality = 'Unknown'
-                body_part_examined = None
-                protocol_name = None
-                acquisition_device_processing_description = None
-                manufacturer = None
-                manufacturer_model_name = None
-                
                 series_list = study.get('Series', [])
-                
-                # Try study-level ModalitiesInStudy first
-                study_modalities = study.get('MainDicomTags', {}).get('ModalitiesInStudy', '')
-                if study_modalities:
-                    modality = study_modalities.split(',')[0].strip()
-                elif series_list:
-                    # If no study-level modality, try to get from first series
-                    try:
-                        first_series_id = series_list[0]
-                        series_response = requests.get(
-                            f"{orthanc_url}/series/{first_series_id}",
-                            timeout=5
-                        )
-                        if series_response.ok:
-                            series_data = series_response.json()
-                            series_modality = series_data.get('MainDicomTags', {}).get('Modality', '')
-                            if series_modality:
-                                modality = series_modality
-                    except Exception as e:
-                        print(f"Failed to fetch series modality: {e}")
-                        # Keep modality as 'Unknown'
-                        pass
-                
-                # Extract new DICOM fields from series and instance data
-                if series_list:
-                    try:
-                        first_series_id = series_list[0]
-                        series_response = requests.get(
-                            f"{orthanc_url}/series/{first_series_id}",
-                            timeout=5
-                        )
-                        if series_response.ok:
-                            series_data = series_response.json()
-                            series_tags = series_data.get('MainDicomTags', {})
-                            
-                            # Try to get fields from series level first
-                            body_part_examined = series_tags.get('BodyPartExamined')
-                            protocol_name = series_tags.get('ProtocolName')
-                            acquisition_device_processing_description = series_tags.get('AcquisitionDeviceProcessingDescription')
-                            manufacturer = series_tags.get('Manufacturer')
-                            manufacturer_model_name = series_tags.get('ManufacturerModelName')
-                            
-                            # If not found at series level, try instance level
-                            instances = series_data.get('Instances', [])
-                            if instances and (not body_part_examined or not protocol_name or not acquisition_device_processing_description or not manufacturer or not manufacturer_model_name):
-                                try:
-                                    first_instance_id = instances[0]
-                                    instance_response = requests.get(
-                                        f"{orthanc_url}/instances/{first_instance_id}",
-                                        timeout=5
-                                    )
-                                    if instance_response.ok:
-                                        instance_data = instance_response.json()
-                                        instance_tags = instance_data.get('MainDicomTags', {})
-                                        
-                                        # Use instance-level tags as fallback
-                                        if not body_part_examined:
-                                            body_part_examined = instance_tags.get('BodyPartExamined')
-                                        if not protocol_name:
-                                            protocol_name = instance_tags.get('ProtocolName')
-                                        if not acquisition_device_processing_description:
-                                            acquisition_device_processing_description = instance_tags.get('AcquisitionDeviceProcessingDescription')
-                                        if not manufacturer:
-                                            manufacturer = instance_tags.get('Manufacturer')
-                                        if not manufacturer_model_name:
-                                            manufacturer_model_name = instance_tags.get('ManufacturerModelName')
-                                except Exception as e:
-                                    print(f"Failed to fetch instance tags for DICOM fields: {e}")
-                    except Exception as e:
-                        print(f"Failed to fetch series tags for DICOM fields: {e}")
+                details = study_details.get(study.get('ID'), {})
+                modality = details.get('modality') or get_study_modality(study) or 'Unknown'
                 
                 formatted_study = {
                     'id': study.get('ID', ''),
@@ -229,11 +166,11 @@ class PacsSearchView(APIView):
                     'referringPhysicianName': study.get('MainDicomTags', {}).get('ReferringPhysicianName', ''),
                     'operatorsName': study.get('MainDicomTags', {}).get('OperatorsName', ''),
                     # New DICOM fields
-                    'bodyPartExamined': body_part_examined,
-                    'protocolName': protocol_name,
-                    'acquisitionDeviceProcessingDescription': acquisition_device_processing_description,
-                    'manufacturer': manufacturer,
-                    'manufacturerModelName': manufacturer_model_name
+                    'bodyPartExamined': details.get('bodyPartExamined'),
+                    'protocolName': details.get('protocolName'),
+                    'acquisitionDeviceProcessingDescription': details.get('acquisitionDeviceProcessingDescription'),
+                    'manufacturer': details.get('manufacturer'),
+                    'manufacturerModelName': details.get('manufacturerModelName')
                 }
                 formatted_studies.append(formatted_study)
             
@@ -262,10 +199,10 @@ def pacs_stats(request):
         if not pacs_config:
             return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        orthanc_url = pacs_config.orthancurl
+        client = get_orthanc_client(pacs_config)
         
         # Get statistics from Orthanc
-        stats_response = requests.get(f"{orthanc_url}/statistics", timeout=10)
+        stats_response = client.get("/statistics", timeout=10)
         
         if stats_response.ok:
             stats = stats_response.json()
@@ -329,11 +266,11 @@ def import_legacy_study(request):
         if not pacs_config:
             return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        orthanc_url = pacs_config.orthancurl
+        client = get_orthanc_client(pacs_config)
         
         # Fetch study metadata from Orthanc
-        find_response = requests.post(
-            f"{orthanc_url}/tools/find",
+        find_response = client.post(
+            "/tools/find",
             headers={'Content-Type': 'application/json'},
             json={
                 'Level': 'Study',
@@ -360,7 +297,7 @@ def import_legacy_study(request):
         series_details = []
         for series_id in study_data.get('Series', []):
             try:
-                series_response = requests.get(f"{orthanc_url}/series/{series_id}", timeout=30)
+                series_response = client.get(f"/series/{series_id}", timeout=30)
                 if series_response.ok:
                     series_data = series_response.json()
                     series_tags = series_data.get('MainDicomTags', {})
@@ -369,7 +306,7 @@ def import_legacy_study(request):
                     instances = series_data.get('Instances', [])
                     instance_tags = {}
                     if instances:
-                        instance_response = requests.get(f"{orthanc_url}/instances/{instances[0]}", timeout=30)
+                        instance_response = client.get(f"/instances/{instances[0]}", timeout=30)
                         if instance_response.ok:
                             instance_data = instance_response.json()
                             instance_tags = instance_data.get('MainDicomTags', {})
@@ -483,7 +420,8 @@ def import_legacy_study(request):
                 'instance_count': series_detail['instance_count']
             }
 
-        with transaction.atomic():
+        # Mark the study date for a dashboard rollup rebuild once, not once per series
+        with transaction.atomic(), defer_rollups():
             # Enhanced DICOM date/time extraction for PACS import
             # Since we only have StudyDate/StudyTime from PACS, use those as ContentDate/ContentTime
             datetime_source = ""
@@ -632,12 +570,13 @@ class DicomImageProxyView(APIView):
                 return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
             orthanc_url = pacs_config.orthancurl
+            client = get_orthanc_client(pacs_config)
             
             # Build the Orthanc DICOM-web URL
             orthanc_dicom_url = f"{orthanc_url}/dicom-web/studies/{study_uid}/series/{series_uid}/instances/{instance_uid}"
             
             # Forward the request to Orthanc
-            orthanc_response = requests.get(orthanc_dicom_url, stream=True, timeout=30)
+            orthanc_response = client.session.get(orthanc_dicom_url, stream=True, timeout=30)
             
             if not orthanc_response.ok:
                 return Response({
@@ -672,178 +611,211 @@ class DicomImageProxyView(APIView):
 @permission_classes([IsAuthenticated])
 def dicom_instance_proxy(request, orthanc_id):
     """
-    Proxy for individual DICOM instances by Orthanc ID with improved reliability
+    Proxy for individual DICOM instances by Orthanc ID
+    
+    Makes a single conditional GET to Orthanc: If-None-Match and Range from the
+    viewer are passed through, and 304/206 responses are relayed as-is.
+    Transient connection failures are retried by the pooled client. Use
+    /api/pacs/instances/{orthanc_id}/health to diagnose a failing instance.
     
     URL format: /api/pacs/instances/{orthanc_id}/file
     """
-    import time
+    range_header = request.META.get('HTTP_RANGE')
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
     
-    max_retries = 3
-    retry_delay = 1.0  # seconds
+    # Instance content never changes for an Orthanc ID, so our own ETag can be
+    # answered without asking Orthanc
+    local_etag = dicom_file_cache.etag_for(orthanc_id, 'file')
+    if if_none_match and local_etag in [tag.strip() for tag in if_none_match.split(',')]:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = local_etag
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
     
-    for attempt in range(max_retries):
-        try:
-            # Get Orthanc URL from configuration
+    # Serve from the local instance cache without touching Orthanc
+    cached_response = dicom_file_cache.response(orthanc_id, 'file', range_header=range_header)
+    if cached_response is not None:
+        cached_response['Access-Control-Allow-Origin'] = '*'
+        cached_response['Cache-Control'] = 'public, max-age=3600'
+        return cached_response
+    
+    try:
+        # Get Orthanc URL from configuration
+        pacs_config = PacsConfig.objects.first()
+        if not pacs_config:
+            return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        client = get_orthanc_client(pacs_config)
+        
+        dicom_headers = {'Accept': 'application/dicom, */*'}
+        if range_header:
+            dicom_headers['Range'] = range_header
+        if if_none_match:
+            dicom_headers['If-None-Match'] = if_none_match
+        
+        orthanc_response = client.session.get(
+            client.url(f"/instances/{orthanc_id}/file"),
+            headers=dicom_headers,
+            stream=True,
+            timeout=(client.connect_timeout, 60)
+        )
+        
+        if orthanc_response.status_code == 304:
+            # Release the pooled connection, there is no body to stream
+            orthanc_response.close()
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            if 'ETag' in orthanc_response.headers:
+                response['ETag'] = orthanc_response.headers['ETag']
+            return response
+        
+        if not orthanc_response.ok:
+            orthanc_response.close()
+            return Response({
+                'error': f'Failed to fetch DICOM instance: {orthanc_response.status_code}',
+                'health_check': f'/api/pacs/instances/{orthanc_id}/health'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        content = orthanc_response.iter_content(chunk_size=16384)
+        if orthanc_response.status_code == 200:
+            # Only complete bodies go into the local instance cache
+            content = dicom_file_cache.stream_and_store(orthanc_id, 'file', content)
+        
+        response = StreamingHttpResponse(
+            content,
+            content_type='application/dicom',
+            status=orthanc_response.status_code
+        )
+        
+        # Copy relevant headers
+        for header in ['Content-Length', 'Content-Range', 'Accept-Ranges', 'Content-Disposition', 'Last-Modified', 'ETag']:
+            if header in orthanc_response.headers:
+                response[header] = orthanc_response.headers[header]
+        if 'ETag' not in response:
+            response['ETag'] = local_etag
+        
+        # Add CORS headers
+        response['Access-Control-Allow-Origin'] = '*'
+        response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+        response['Access-Control-Allow-Headers'] = 'Authorization, Content-Type, Range, If-None-Match'
+        
+        # Add cache control for better performance
+        response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
+        
+        return response
+        
+    except requests.exceptions.Timeout as e:
+        return Response({'error': f'Request timeout: {str(e)}'}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+    except requests.exceptions.ConnectionError as e:
+        return Response({'error': f'Connection error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except requests.exceptions.RequestException as e:
+        return Response({'error': f'Network error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except Exception as e:
+        return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dicom_instance_thumbnail(request, orthanc_id):
+    """
+    Serve a small cached thumbnail of an instance
+    
+    Rendered once (see renditions.py) and served from disk afterwards. The URL
+    identifies immutable content, so browsers may keep it for a year.
+    
+    URL format: /api/pacs/instances/{orthanc_id}/thumbnail?size=256
+    """
+    size = thumbnail_size(request.GET.get('size'))
+    response = cached_thumbnail_response(orthanc_id, size)
+    
+    if response is None:
+        pacs_server_id = request.GET.get('pacs_server_id')
+        if pacs_server_id:
+            from .models import PacsServer
+            try:
+                pacs_server = PacsServer.objects.get(id=pacs_server_id, is_active=True, is_deleted=False)
+            except PacsServer.DoesNotExist:
+                return Response({'error': f'PACS server {pacs_server_id} not found or inactive'}, status=status.HTTP_404_NOT_FOUND)
+            client = get_orthanc_client(pacs_server)
+        else:
             pacs_config = PacsConfig.objects.first()
             if not pacs_config:
                 return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            orthanc_url = pacs_config.orthancurl
-            
-            # Build the Orthanc instance file URL
-            orthanc_instance_url = f"{orthanc_url}/instances/{orthanc_id}/file"
-            
-            # Debug logging
-            print(f"DEBUG: Attempting to fetch DICOM instance")
-            print(f"  - Orthanc URL: {orthanc_url}")
-            print(f"  - Instance ID: {orthanc_id}")
-            print(f"  - Full URL: {orthanc_instance_url}")
-            print(f"  - Attempt: {attempt + 1}/{max_retries}")
-            
-            # Configure session with improved settings for remote servers
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'RIS-DICOM-Proxy/1.0',
-                'Accept': 'application/dicom, */*',
-                'Connection': 'keep-alive'
-            })
-            
-            # First, verify the instance exists and get content length
-            head_response = session.head(orthanc_instance_url, timeout=15)
-            print(f"DEBUG: HEAD response status: {head_response.status_code}")
-            if not head_response.ok:
-                # If 404, let's check if the instance exists at all
-                if head_response.status_code == 404:
-                    try:
-                        # Check if instance exists without /file suffix
-                        instance_info_url = f"{orthanc_url}/instances/{orthanc_id}"
-                        info_response = session.get(instance_info_url, timeout=10)
-                        print(f"DEBUG: Instance info check status: {info_response.status_code}")
-                        
-                        if info_response.status_code == 404:
-                            print(f"DEBUG: Instance {orthanc_id} does not exist on Orthanc server")
-                            # Let's also check if Orthanc server is reachable
-                            system_response = session.get(f"{orthanc_url}/system", timeout=5)
-                            print(f"DEBUG: Orthanc system check status: {system_response.status_code}")
-                            if system_response.ok:
-                                print("DEBUG: Orthanc server is reachable but instance not found")
-                            else:
-                                print("DEBUG: Orthanc server is not reachable")
-                        else:
-                            print(f"DEBUG: Instance exists but /file endpoint failed")
-                            if info_response.ok:
-                                instance_data = info_response.json()
-                                print(f"DEBUG: Instance info: {instance_data.get('MainDicomTags', {})}")
-                                
-                    except Exception as check_error:
-                        print(f"DEBUG: Error checking instance existence: {check_error}")
-                
-                if attempt < max_retries - 1:
-                    print(f"HEAD request failed (attempt {attempt + 1}/{max_retries}): {head_response.status_code}")
-                    time.sleep(retry_delay)
-                    continue
-                return Response({
-                    'error': f'DICOM instance not found: {head_response.status_code}'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
-            expected_length = head_response.headers.get('Content-Length')
-            if expected_length:
-                expected_length = int(expected_length)
-                # Basic sanity check - DICOM files should be at least 1KB
-                if expected_length < 1024:
-                    return Response({
-                        'error': f'Invalid DICOM file size: {expected_length} bytes'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Now fetch the actual content with streaming
-            orthanc_response = session.get(
-                orthanc_instance_url, 
-                stream=True, 
-                timeout=(15, 60)  # (connect timeout, read timeout)
-            )
-            
-            if not orthanc_response.ok:
-                if attempt < max_retries - 1:
-                    print(f"GET request failed (attempt {attempt + 1}/{max_retries}): {orthanc_response.status_code}")
-                    time.sleep(retry_delay)
-                    continue
-                return Response({
-                    'error': f'Failed to fetch DICOM instance: {orthanc_response.status_code}'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
-            # Validate content type
-            content_type = orthanc_response.headers.get('Content-Type', '')
-            if content_type and 'dicom' not in content_type.lower() and 'octet-stream' not in content_type.lower():
-                print(f"Warning: Unexpected content type: {content_type}")
-            
-            # Create a generator that validates data integrity
-            def validated_content_generator():
-                bytes_received = 0
-                try:
-                    for chunk in orthanc_response.iter_content(chunk_size=16384):  # Larger chunks for remote servers
-                        if chunk:  # Filter out keep-alive chunks
-                            bytes_received += len(chunk)
-                            yield chunk
-                    
-                    # Validate total size if we know the expected length
-                    if expected_length and bytes_received != expected_length:
-                        print(f"Warning: Size mismatch - expected {expected_length}, got {bytes_received}")
-                        
-                except Exception as e:
-                    print(f"Error during streaming: {e}")
-                    raise
-            
-            # Create streaming response
-            response = StreamingHttpResponse(
-                validated_content_generator(),
-                content_type='application/dicom'
-            )
-            
-            # Copy relevant headers
-            for header in ['Content-Length', 'Content-Disposition', 'Last-Modified', 'ETag']:
-                if header in orthanc_response.headers:
-                    response[header] = orthanc_response.headers[header]
-            
-            # Add CORS headers
-            response['Access-Control-Allow-Origin'] = '*'
-            response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-            response['Access-Control-Allow-Headers'] = 'Authorization, Content-Type'
-            
-            # Add cache control for better performance
-            response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
-            
-            return response
-            
-        except requests.exceptions.Timeout as e:
-            if attempt < max_retries - 1:
-                print(f"Timeout error (attempt {attempt + 1}/{max_retries}): {e}")
-                time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-                continue
-            return Response({'error': f'Request timeout: {str(e)}'}, status=status.HTTP_504_GATEWAY_TIMEOUT)
-            
-        except requests.exceptions.ConnectionError as e:
-            if attempt < max_retries - 1:
-                print(f"Connection error (attempt {attempt + 1}/{max_retries}): {e}")
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            return Response({'error': f'Connection error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-            
+            client = get_orthanc_client(pacs_config)
+        
+        try:
+            rendition = render_thumbnail(client, orthanc_id, size)
         except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"Request error (attempt {attempt + 1}/{max_retries}): {e}")
-                time.sleep(retry_delay)
-                continue
-            return Response({'error': f'Network error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-        except Exception as e:
-            print(f"Unexpected error (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-                continue
-            return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({'error': f'Network error: {str(e)}'}, status=status.HTTP_502_BAD_GATEWAY)
+        if rendition is None:
+            return Response({'error': f'Could not render instance {orthanc_id}'}, status=status.HTTP_404_NOT_FOUND)
+        
+        data, content_type = rendition
+        response = HttpResponse(data, content_type=content_type)
+        response['X-Cache'] = 'MISS'
     
-    # If we get here, all retries failed
-    return Response({'error': 'Failed to fetch DICOM data after multiple retries'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dicom_instance_health(request, orthanc_id):
+    """
+    Diagnose why an instance cannot be fetched
+    
+    Checks Orthanc reachability, whether the instance record exists and whether
+    its /file attachment is readable. Kept out of the proxy path so viewer
+    requests never pay for these extra round trips.
+    
+    URL format: /api/pacs/instances/{orthanc_id}/health
+    """
+    pacs_config = PacsConfig.objects.first()
+    if not pacs_config:
+        return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    client = get_orthanc_client(pacs_config)
+    checks = {
+        'orthanc_reachable': False,
+        'instance_exists': False,
+        'file_accessible': False,
+        'cached_locally': dicom_file_cache.get(orthanc_id, 'file') is not None,
+    }
+    details = {}
+    
+    try:
+        system_response = client.get("/system", timeout=5)
+        checks['orthanc_reachable'] = system_response.ok
+        
+        if system_response.ok:
+            info_response = client.get(f"/instances/{orthanc_id}", timeout=10)
+            checks['instance_exists'] = info_response.ok
+            details['instance_status'] = info_response.status_code
+            if info_response.ok:
+                details['main_dicom_tags'] = info_response.json().get('MainDicomTags', {})
+            
+            file_response = client.head(f"/instances/{orthanc_id}/file", timeout=15)
+            checks['file_accessible'] = file_response.ok
+            details['file_status'] = file_response.status_code
+            details['file_size'] = file_response.headers.get('Content-Length')
+    except requests.exceptions.RequestException as e:
+        details['error'] = str(e)
+    
+    if not checks['orthanc_reachable']:
+        diagnosis = 'Orthanc server is not reachable'
+    elif not checks['instance_exists']:
+        diagnosis = 'Instance does not exist on the Orthanc server'
+    elif not checks['file_accessible']:
+        diagnosis = 'Instance exists but its DICOM file is not accessible (check Orthanc storage)'
+    else:
+        diagnosis = 'Instance is accessible'
+    
+    return Response({
+        'orthanc_id': orthanc_id,
+        'healthy': checks['file_accessible'],
+        'checks': checks,
+        'details': details,
+        'diagnosis': diagnosis,
+    })
 
 
 @api_view(['GET'])
@@ -862,27 +834,28 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
             return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         orthanc_url = pacs_config.orthancurl
+        client = get_orthanc_client(pacs_config)
         
         print(f"DEBUG: Using alternative proxy for instance {orthanc_id}")
         
         # Strategy 1: Try DICOMweb endpoint like OHIF (works with PostgreSQL storage)
         try:
             print(f"DEBUG: Getting instance metadata for DICOMweb URL construction")
-            instance_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}", timeout=10)
+            instance_response = client.get(f"/instances/{orthanc_id}", timeout=10)
             if instance_response.ok:
                 instance_data = instance_response.json()
                 parent_series = instance_data.get('ParentSeries')
                 
                 if parent_series:
                     # Get series metadata
-                    series_response = requests.get(f"{orthanc_url}/series/{parent_series}", timeout=10)
+                    series_response = client.get(f"/series/{parent_series}", timeout=10)
                     if series_response.ok:
                         series_data = series_response.json()
                         parent_study = series_data.get('ParentStudy')
                         
                         if parent_study:
                             # Get study metadata
-                            study_response = requests.get(f"{orthanc_url}/studies/{parent_study}", timeout=10)
+                            study_response = client.get(f"/studies/{parent_study}", timeout=10)
                             if study_response.ok:
                                 study_data = study_response.json()
                                 
@@ -901,7 +874,7 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
                                         try:
                                             print(f"DEBUG: Trying DICOMweb endpoint: {dicomweb_url}")
                                             
-                                            dicomweb_response = requests.get(dicomweb_url, stream=True, timeout=30)
+                                            dicomweb_response = client.session.get(dicomweb_url, stream=True, timeout=30)
                                             if dicomweb_response.ok:
                                                 print(f"DEBUG: DICOMweb endpoint success: {dicomweb_url}")
                                                 
@@ -921,14 +894,15 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
                                                     print(f"DEBUG: Valid P10 format with sufficient content, using this endpoint")
                                                     
                                                     # Get fresh response with proper headers for DICOM streaming
-                                                    session = requests.Session()
-                                                    session.headers.update({
-                                                        'Accept': 'application/dicom',
-                                                        'Accept-Encoding': 'identity',  # Disable compression
-                                                        'User-Agent': 'RIS-DICOM-Viewer/1.0'
-                                                    })
-                                                    
-                                                    fresh_response = session.get(dicomweb_url, stream=True, timeout=60)
+                                                    fresh_response = client.session.get(
+                                                        dicomweb_url,
+                                                        headers={
+                                                            'Accept': 'application/dicom',
+                                                            'Accept-Encoding': 'identity',  # Disable compression
+                                                        },
+                                                        stream=True,
+                                                        timeout=60
+                                                    )
                                                     
                                                     if fresh_response.ok:
                                                         response = StreamingHttpResponse(
@@ -966,7 +940,7 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
         # Strategy 2: Try direct /file endpoint (in case it sometimes works)
         file_url = f"{orthanc_url}/instances/{orthanc_id}/file"
         try:
-            file_response = requests.get(file_url, stream=True, timeout=10)
+            file_response = client.session.get(file_url, stream=True, timeout=10)
             if file_response.ok:
                 print(f"DEBUG: /file endpoint worked unexpectedly")
                 response = StreamingHttpResponse(
@@ -992,7 +966,7 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
         try:
             print(f"DEBUG: Trying direct attachment for P10 format")
             attachment_url = f"{orthanc_url}/instances/{orthanc_id}/attachments/1/data"
-            attachment_response = requests.get(attachment_url, stream=True, timeout=30)
+            attachment_response = client.session.get(attachment_url, stream=True, timeout=30)
             if attachment_response.ok:
                 print(f"DEBUG: Attachment endpoint success")
                 
@@ -1010,14 +984,15 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
                     print(f"DEBUG: Attachment has proper P10 format with sufficient content")
                     
                     # Get fresh response with proper headers
-                    session = requests.Session()
-                    session.headers.update({
-                        'Accept': 'application/dicom',
-                        'Accept-Encoding': 'identity',  # Disable compression
-                        'User-Agent': 'RIS-DICOM-Viewer/1.0'
-                    })
-                    
-                    fresh_attachment_response = session.get(attachment_url, stream=True, timeout=60)
+                    fresh_attachment_response = client.session.get(
+                        attachment_url,
+                        headers={
+                            'Accept': 'application/dicom',
+                            'Accept-Encoding': 'identity',  # Disable compression
+                        },
+                        stream=True,
+                        timeout=60
+                    )
                     
                     if fresh_attachment_response.ok:
                         response = StreamingHttpResponse(
@@ -1056,7 +1031,7 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
         for endpoint_url in stone_endpoints:
             try:
                 print(f"DEBUG: Trying Stone Web Viewer endpoint: {endpoint_url}")
-                stone_response = requests.get(endpoint_url, stream=True, timeout=10)
+                stone_response = client.session.get(endpoint_url, stream=True, timeout=10)
                 if stone_response.ok:
                     print(f"DEBUG: Success with Stone endpoint: {endpoint_url}")
                     
@@ -1090,7 +1065,7 @@ def dicom_instance_dicomweb_proxy(request, orthanc_id):
             print(f"DEBUG: Attempting to reconstruct DICOM data from metadata")
             
             # Get full instance metadata
-            tags_response = requests.get(f"{orthanc_url}/instances/{orthanc_id}/tags", timeout=10)
+            tags_response = client.get(f"/instances/{orthanc_id}/tags", timeout=10)
             if tags_response.ok:
                 # For now, return error with detailed info about what endpoints are available
                 return Response({
@@ -1131,7 +1106,11 @@ def dicom_instance_raw_proxy(request, orthanc_id):
     
     URL format: /api/pacs/instances/{orthanc_id}/raw
     """
-    import time
+    cached_response = dicom_file_cache.response(orthanc_id, 'file')
+    if cached_response is not None:
+        cached_response['Access-Control-Allow-Origin'] = '*'
+        cached_response['Cache-Control'] = 'public, max-age=3600'
+        return cached_response
     
     try:
         # Get Orthanc URL from configuration
@@ -1140,6 +1119,7 @@ def dicom_instance_raw_proxy(request, orthanc_id):
             return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         orthanc_url = pacs_config.orthancurl
+        client = get_orthanc_client(pacs_config)
         
         print(f"DEBUG: Using raw proxy for instance {orthanc_id}")
         
@@ -1150,12 +1130,8 @@ def dicom_instance_raw_proxy(request, orthanc_id):
             f"{orthanc_url}/instances/{orthanc_id}"  # Raw instance data
         ]
         
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'RIS-DICOM-Proxy/1.0',
-            'Accept': 'application/dicom, application/octet-stream, */*',
-            'Connection': 'keep-alive'
-        })
+        session = client.session
+        dicom_headers = {'Accept': 'application/dicom, application/octet-stream, */*'}
         
         for i, endpoint_url in enumerate(endpoints_to_try):
             try:
@@ -1163,6 +1139,7 @@ def dicom_instance_raw_proxy(request, orthanc_id):
                 
                 orthanc_response = session.get(
                     endpoint_url, 
+                    headers=dicom_headers,
                     stream=True, 
                     timeout=(15, 60)
                 )
@@ -1176,11 +1153,13 @@ def dicom_instance_raw_proxy(request, orthanc_id):
                         print(f"DEBUG: Response too small ({content_length} bytes), trying next endpoint")
                         continue
                     
+                    # Only the /file endpoint is the DICOM instance itself, cache that one
+                    content = orthanc_response.iter_content(chunk_size=16384)
+                    if i == 0:
+                        content = dicom_file_cache.stream_and_store(orthanc_id, 'file', content)
+                    
                     # Create streaming response
-                    response = StreamingHttpResponse(
-                        orthanc_response.iter_content(chunk_size=16384),
-                        content_type='application/dicom'
-                    )
+                    response = StreamingHttpResponse(content, content_type='application/dicom')
                     
                     # Copy relevant headers
                     for header in ['Content-Length', 'Content-Disposition', 'Last-Modified']:
@@ -1224,91 +1203,35 @@ def get_study_image_ids(request, study_uid):
         if not pacs_config:
             return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        orthanc_url = pacs_config.orthancurl
-        
-        # Step 1: Find the Orthanc internal ID for the study
-        find_response = requests.post(
-            f"{orthanc_url}/tools/find",
-            headers={'Content-Type': 'application/json'},
-            json={
-                'Level': 'Study',
-                'Query': {
-                    'StudyInstanceUID': study_uid,
-                },
-                'Expand': True,
-            },
-            timeout=30
-        )
-        
-        if not find_response.ok:
-            return Response({
-                'error': f'Failed to find study {study_uid}. Status: {find_response.status_code}'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        find_result = find_response.json()
+        client = get_orthanc_client(pacs_config)
         
-        if not find_result or len(find_result) == 0:
+        # Study -> series -> instance tree, cached per study
+        manifest = get_study_manifest(client, study_uid)
+        if manifest is None:
             return Response({'error': f'Study not found: {study_uid}'}, status=status.HTTP_404_NOT_FOUND)
         
-        study_data = find_result[0]
         image_ids = []
         series_info = []
         
-        # Step 2: Build image IDs using Django proxy URLs
-        for series_id in study_data.get('Series', []):
-            series_response = requests.get(f"{orthanc_url}/series/{series_id}", timeout=30)
-            
-            if not series_response.ok:
-                print(f"DEBUG: Failed to fetch series {series_id}: {series_response.status_code}")
-                continue
-                
-            series_data = series_response.json()
-            series_instance_uid = series_data.get('MainDicomTags', {}).get('SeriesInstanceUID')
-            series_description = series_data.get('MainDicomTags', {}).get('SeriesDescription', 'Unknown')
+        api_url = request.build_absolute_uri('/').rstrip('/')  # Get base URL
+        for series_data in manifest['series']:
+            series_id = series_data['ID']
+            series_instance_uid = series_data['MainDicomTags'].get('SeriesInstanceUID')
+            series_description = series_data['MainDicomTags'].get('SeriesDescription', 'Unknown')
             
             if not series_instance_uid:
-                print(f"DEBUG: No SeriesInstanceUID for series {series_id}")
                 continue
             
-            series_instances = series_data.get('Instances', [])
-            print(f"DEBUG: Series {series_id} ({series_description}) has {len(series_instances)} instances")
-            
             series_image_ids = []
-            for instance_id in series_instances:
-                instance_response = requests.get(f"{orthanc_url}/instances/{instance_id}", timeout=30)
-                
-                if not instance_response.ok:
-                    print(f"DEBUG: Failed to fetch instance {instance_id}: {instance_response.status_code}")
+            for instance in series_data['Instances']:
+                if not instance['MainDicomTags'].get('SOPInstanceUID'):
                     continue
-                    
-                instance_data = instance_response.json()
-                sop_instance_uid = instance_data.get('MainDicomTags', {}).get('SOPInstanceUID')
                 
-                if series_instance_uid and sop_instance_uid:
-                    # Use Django proxy URL for direct instance file access
-                    api_url = request.build_absolute_uri('/').rstrip('/')  # Get base URL
-                    image_id = f"wadouri:{api_url}/api/pacs/instances/{instance_id}/file"
-                    
-                    # Skip instance verification since it's broken with PostgreSQL storage
-                    # Try both /file and DICOMweb approaches like OHIF
-                    print(f"DEBUG: Adding instance {instance_id} with fallback strategy (PostgreSQL storage compatible)")
-                    
-                    # OHIF-style first: Try DICOMweb endpoint as PRIMARY method  
-                    print(f"DEBUG: Using OHIF-style DICOMweb as primary for instance {instance_id}")
-                    # WADO-RS format: wadors:frames_url (this is what OHIF actually uses)
-                    # The frames endpoint should return the actual DICOM pixel data
-                    dicomweb_image_id = f"wadors:{api_url}/api/pacs/instances/{instance_id}/frames/1"
-                    image_ids.append(dicomweb_image_id)
-                    series_image_ids.append(dicomweb_image_id)
-                    print(f"DEBUG: Added primary DICOMweb frames endpoint for instance {instance_id} (OHIF-style)")
-                    
-                    # Note: We prioritize DICOMweb since OHIF proves it works reliably
-                    # Fallback to /file endpoint happens inside the dicomweb proxy if needed
-                    
-                    # Note: We don't verify if DICOMweb works here because OHIF proves it works
-                    # The actual verification happens when the image is loaded in the viewer
-                else:
-                    print(f"DEBUG: Missing UIDs for instance {instance_id}: series={series_instance_uid}, sop={sop_instance_uid}")
+                # OHIF-style WADO-RS frames URL through the Django proxy; the
+                # dicomweb proxy falls back to /file internally if needed
+                dicomweb_image_id = f"wadors:{api_url}/api/pacs/instances/{instance['ID']}/frames/1"
+                image_ids.append(dicomweb_image_id)
+                series_image_ids.append(dicomweb_image_id)
             
             series_info.append({
                 'seriesId': series_id,
@@ -1317,16 +1240,13 @@ def get_study_image_ids(request, study_uid):
                 'instanceCount': len(series_image_ids)
             })
         
-        print(f"DEBUG: Total image IDs generated: {len(image_ids)}")
-        print(f"DEBUG: Series breakdown: {series_info}")
-        
         # If no images found, this might be due to Orthanc database inconsistency
         if len(image_ids) == 0:
             print("DEBUG: No valid images found - checking for Orthanc database issues")
             
             # Test if this is a systemic instance access problem
-            test_instance_response = requests.post(
-                f"{orthanc_url}/tools/find",
+            test_instance_response = client.post(
+                "/tools/find",
                 headers={'Content-Type': 'application/json'},
                 json={'Level': 'Instance', 'Query': {}, 'Limit': 1},
                 timeout=10
@@ -1338,7 +1258,7 @@ def get_study_image_ids(request, study_uid):
                 if test_instances:
                     test_instance_id = test_instances[0]
                     # Test if we can access instance metadata at all
-                    test_instance_meta = requests.head(f"{orthanc_url}/instances/{test_instance_id}", timeout=5)
+                    test_instance_meta = client.head(f"/instances/{test_instance_id}", timeout=5)
                     if not test_instance_meta.ok:
                         systemic_instance_issue = True
                         print("DEBUG: Systemic Orthanc instance access issue detected - database inconsistency")
@@ -1373,11 +1293,6 @@ def get_study_image_ids(request, study_uid):
                     }
                 })
         
-        if len(image_ids) > 2:
-            print(f"DEBUG: Multi-image series detected - {len(image_ids)} total images")
-            print(f"DEBUG: First 3 image IDs: {image_ids[:3]}")
-            print(f"DEBUG: Last 3 image IDs: {image_ids[-3:]}")
-        
         return Response({
             'imageIds': image_ids,
             'total': len(image_ids),
@@ -1412,7 +1327,7 @@ def get_enhanced_study_metadata(request, study_uid):
             from .models import PacsServer
             try:
                 pacs_server = PacsServer.objects.get(id=pacs_server_id, is_active=True, is_deleted=False)
-                orthanc_url = pacs_server.orthancurl
+                client = get_orthanc_client(pacs_server)
             except PacsServer.DoesNotExist:
                 return Response({'error': f'PACS server {pacs_server_id} not found or inactive'}, status=status.HTTP_404_NOT_FOUND)
         else:
@@ -1420,92 +1335,71 @@ def get_enhanced_study_metadata(request, study_uid):
             pacs_config = PacsConfig.objects.first()
             if not pacs_config:
                 return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            orthanc_url = pacs_config.orthancurl
+            client = get_orthanc_client(pacs_config)
         
-        # Find the study
-        find_response = requests.post(
-            f"{orthanc_url}/tools/find",
-            headers={'Content-Type': 'application/json'},
-            json={
-                'Level': 'Study',
-                'Query': {'StudyInstanceUID': study_uid},
-                'Expand': True,
-            },
-            timeout=30
-        )
-        
-        
-        if not find_response.ok or not find_response.json():
+        manifest = get_study_manifest(client, study_uid)
+        if manifest is None:
             return Response({'error': f'Study not found: {study_uid}'}, status=status.HTTP_404_NOT_FOUND)
         
-        study_data = find_response.json()[0]
-        
         # Get detailed series information
         series_details = []
-        for series_id in study_data.get('Series', []):
+        for series_data in manifest['series']:
+            series_id = series_data['ID']
             try:
-                series_response = requests.get(f"{orthanc_url}/series/{series_id}", timeout=30)
-                if series_response.ok:
-                    series_data = series_response.json()
-                    series_tags = series_data.get('MainDicomTags', {})
-                    
-                    # Get first instance for additional metadata
-                    instances = series_data.get('Instances', [])
-                    instance_tags = {}
-                    if instances:
-                        instance_response = requests.get(f"{orthanc_url}/instances/{instances[0]}", timeout=30)
-                        if instance_response.ok:
-                            instance_data = instance_response.json()
-                            instance_tags = instance_data.get('MainDicomTags', {})
-                    
-                    # Parse examination details
-                    operators_name = instance_tags.get('OperatorsName', '') or series_tags.get('OperatorsName', '')
-                    modality = series_tags.get('Modality', 'CR')
-                    body_part = instance_tags.get('BodyPartExamined', '') or series_tags.get('BodyPartExamined', '')
-                    
-                    # Parse AcquisitionDeviceProcessingDescription
-                    acquisition_desc = instance_tags.get('AcquisitionDeviceProcessingDescription', '') or series_tags.get('AcquisitionDeviceProcessingDescription', '')
-                    series_description = series_tags.get('SeriesDescription', '')
-                    
-                    # Extract exam type and position
-                    exam_type = ''
-                    position = ''
-                    
-                    if acquisition_desc:
-                        parts = [part.strip() for part in acquisition_desc.split(',')]
-                        if len(parts) >= 1:
-                            exam_type = parts[0]
-                        if len(parts) >= 2:
-                            position = parts[1]
-                    elif series_description:
-                        exam_type = series_description
-                    
-                    if not exam_type and body_part:
-                        exam_type = body_part
-                    
-                    if not exam_type:
-                        exam_type = 'General Radiography'
-                    
-                    # Parse radiographer name
-                    radiographer_name = ''
-                    if operators_name:
-                        name_parts = operators_name.split('^')
-                        if len(name_parts) >= 2:
-                            radiographer_name = f"{name_parts[1]} {name_parts[0]}".strip()
-                        elif len(name_parts) == 1:
-                            radiographer_name = name_parts[0].strip()
-                    
-                    series_details.append({
-                        'series_id': series_id,
-                        'exam_type': exam_type,
-                        'position': position,
-                        'modality': modality,
-                        'body_part': body_part,
-                        'radiographer_name': radiographer_name,
-                        'instance_count': len(instances),
-                        'series_description': series_description,
-                        'acquisition_description': acquisition_desc
-                    })
+                series_tags = series_data['MainDicomTags']
+                
+                # First instance for additional metadata
+                instances = series_data['Instances']
+                instance_tags = instances[0]['MainDicomTags'] if instances else {}
+                
+                # Parse examination details
+                operators_name = instance_tags.get('OperatorsName', '') or series_tags.get('OperatorsName', '')
+                modality = series_tags.get('Modality', 'CR')
+                body_part = instance_tags.get('BodyPartExamined', '') or series_tags.get('BodyPartExamined', '')
+                
+                # Parse AcquisitionDeviceProcessingDescription
+                acquisition_desc = instance_tags.get('AcquisitionDeviceProcessingDescription', '') or series_tags.get('AcquisitionDeviceProcessingDescription', '')
+                series_description = series_tags.get('SeriesDescription', '')
+                
+                # Extract exam type and position
+                exam_type = ''
+                position = ''
+                
+                if acquisition_desc:
+                    parts = [part.strip() for part in acquisition_desc.split(',')]
+                    if len(parts) >= 1:
+                        exam_type = parts[0]
+                    if len(parts) >= 2:
+                        position = parts[1]
+                elif series_description:
+                    exam_type = series_description
+                
+                if not exam_type and body_part:
+                    exam_type = body_part
+                
+                if not exam_type:
+                    exam_type = 'General Radiography'
+                
+                # Parse radiographer name
+                radiographer_name = ''
+                if operators_name:
+                    name_parts = operators_name.split('^')
+                    if len(name_parts) >= 2:
+                        radiographer_name = f"{name_parts[1]} {name_parts[0]}".strip()
+                    elif len(name_parts) == 1:
+                        radiographer_name = name_parts[0].strip()
+                
+                series_details.append({
+                    'series_id': series_id,
+                    'exam_type': exam_type,
+                    'position': position,
+                    'modality': modality,
+                    'body_part': body_part,
+                    'radiographer_name': radiographer_name,
+                    'instance_count': len(instances),
+                    'series_description': series_description,
+                    'acquisition_description': acquisition_desc
+                })
             except Exception as e:
                 print(f"Error processing series {series_id}: {e}")
                 continue
@@ -1542,7 +1436,7 @@ def get_study_series_metadata(request, study_uid):
             from .models import PacsServer
             try:
                 pacs_server = PacsServer.objects.get(id=pacs_server_id, is_active=True, is_deleted=False)
-                orthanc_url = pacs_server.orthancurl
+                client = get_orthanc_client(pacs_server)
             except PacsServer.DoesNotExist:
                 return Response({'error': f'PACS server {pacs_server_id} not found or inactive'}, status=status.HTTP_404_NOT_FOUND)
         else:
@@ -1550,38 +1444,20 @@ def get_study_series_metadata(request, study_uid):
             pacs_config = PacsConfig.objects.first()
             if not pacs_config:
                 return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            orthanc_url = pacs_config.orthancurl
-        
-        # Find the study
-        find_response = requests.post(
-            f"{orthanc_url}/tools/find",
-            headers={'Content-Type': 'application/json'},
-            json={
-                'Level': 'Study',
-                'Query': {'StudyInstanceUID': study_uid},
-                'Expand': True,
-            },
-            timeout=30
-        )
+            client = get_orthanc_client(pacs_config)
         
-        if not find_response.ok or not find_response.json():
+        manifest = get_study_manifest(client, study_uid)
+        if manifest is None:
             return Response({'error': f'Study not found: {study_uid}'}, status=status.HTTP_404_NOT_FOUND)
         
-        study_data = find_response.json()[0]
-        
         # Process each series
         series_metadata = []
         
-        for series_id in study_data.get('Series', []):
+        for series_data in manifest['series']:
+            series_id = series_data['ID']
             try:
-                # Get series details
-                series_response = requests.get(f"{orthanc_url}/series/{series_id}", timeout=30)
-                if not series_response.ok:
-                    continue
-                    
-                series_data = series_response.json()
-                series_tags = series_data.get('MainDicomTags', {})
-                instances = series_data.get('Instances', [])
+                series_tags = series_data['MainDicomTags']
+                instances = [instance['ID'] for instance in series_data['Instances']]
                 
                 if not instances:
                     continue
@@ -1597,6 +1473,10 @@ def get_study_series_metadata(request, study_uid):
                 if pacs_server_id:
                     first_frame_url += f"?pacs_server_id={pacs_server_id}"
                 
+                thumbnail_url = f"{api_url}/api/pacs/instances/{first_instance_id}/thumbnail"
+                if pacs_server_id:
+                    thumbnail_url += f"?pacs_server_id={pacs_server_id}"
+                
                 # Extract series metadata
                 series_info = {
                     'seriesId': series_id,
@@ -1606,6 +1486,7 @@ def get_study_series_metadata(request, study_uid):
                     'modality': series_tags.get('Modality', 'OT'),
                     'imageCount': len(instances),
                     'firstImageUrl': first_frame_url,
+                    'thumbnailUrl': thumbnail_url,
                     'instances': [
                         {
                             'instanceId': instance_id,
@@ -1652,72 +1533,29 @@ def get_series_bulk_images(request, study_uid, series_uid):
         # Get Orthanc URL from configuration (with caching)
         from django.core.cache import cache
         
-        orthanc_url = cache.get('orthanc_url')
-        if not orthanc_url:
+        pacs_config = cache.get('pacs_config')
+        if not pacs_config:
             pacs_config = PacsConfig.objects.first()
             if not pacs_config:
                 return Response({'error': 'PACS configuration not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            orthanc_url = pacs_config.orthancurl
-            cache.set('orthanc_url', orthanc_url, 300)  # Cache for 5 minutes
+            cache.set('pacs_config', pacs_config, 300)  # Cache for 5 minutes
+        client = get_orthanc_client(pacs_config)
         
-        # Find the series
-        find_response = requests.post(
-            f"{orthanc_url}/tools/find",
-            headers={'Content-Type': 'application/json'},
-            json={
-                'Level': 'Series',
-                'Query': {'SeriesInstanceUID': series_uid},
-                'Expand': True,
-            },
-            timeout=30
-        )
-        
-        if not find_response.ok or not find_response.json():
+        manifest = get_study_manifest(client, study_uid)
+        series_data = get_manifest_series(manifest, series_uid) if manifest else None
+        if series_data is None:
             return Response({'error': f'Series not found: {series_uid}'}, status=status.HTTP_404_NOT_FOUND)
         
-        series_data = find_response.json()[0]
-        instances = series_data.get('Instances', [])
-        
-        if not instances:
+        if not series_data['Instances']:
             return Response({'error': f'No instances found in series: {series_uid}'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Efficiently get instance details using bulk operations
-        instance_details = []
-        
-        # Use concurrent requests to get instance metadata
-        import concurrent.futures
-        import threading
-        
-        def fetch_instance_metadata(instance_id):
-            try:
-                instance_response = requests.get(f"{orthanc_url}/instances/{instance_id}", timeout=5)
-                if instance_response.ok:
-                    instance_data = instance_response.json()
-                    instance_tags = instance_data.get('MainDicomTags', {})
-                    instance_number = int(instance_tags.get('InstanceNumber', 0)) if instance_tags.get('InstanceNumber') else 0
-                    
-                    return {
-                        'instanceId': instance_id,
-                        'instanceNumber': instance_number,
-                        'sopInstanceUid': instance_tags.get('SOPInstanceUID', '')
-                    }
-            except:
-                pass
-            
-            # Return basic info if fetch fails
-            return {
-                'instanceId': instance_id,
-                'instanceNumber': 0,
-                'sopInstanceUid': ''
-            }
-        
-        # Fetch metadata concurrently with max 10 workers to avoid overwhelming Orthanc
-        max_workers = min(10, len(instances))
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            instance_details = list(executor.map(fetch_instance_metadata, instances))
-        
-        # Sort by instance number
-        instance_details.sort(key=lambda x: x['instanceNumber'])
+        # Manifest instances are already sorted by InstanceNumber
+        instance_details = [
+            {
+                'instanceId': instance['ID'],
+                'sopInstanceUid': instance['MainDicomTags'].get('SOPInstanceUID', '')
+            } for instance in series_data['Instances']
+        ]
         
         # Apply pagination
         total_images = len(instance_details)
@@ -1769,10 +1607,11 @@ def pacs_health_check(request):
             return Response({"error": "PACS configuration not found"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         orthanc_url = pacs_config.orthancurl
+        client = get_orthanc_client(pacs_config)
         
         # Test basic connectivity
         start_time = time.time()
-        system_response = requests.get(f"{orthanc_url}/system", timeout=10)
+        system_response = client.get("/system", timeout=10)
         response_time = time.time() - start_time
         
         if not system_response.ok:
@@ -1786,12 +1625,12 @@ def pacs_health_check(request):
         system_info = system_response.json()
         
         # Test database connectivity by getting statistics
-        stats_response = requests.get(f"{orthanc_url}/statistics", timeout=10)
+        stats_response = client.get("/statistics", timeout=10)
         stats_info = stats_response.json() if stats_response.ok else None
         
         # Test a simple find operation
-        find_test_response = requests.post(
-            f"{orthanc_url}/tools/find",
+        find_test_response = client.post(
+            "/tools/find",
             headers={"Content-Type": "application/json"},
             json={
                 "Level": "Study",
@@ -1807,6 +1646,8 @@ def pacs_health_check(request):
             "success": True,
             "orthanc_url": orthanc_url,
             "response_time_ms": round(response_time * 1000, 2),
+            "dicom_cache": dicom_file_cache.stats(),
+            "rendition_cache": rendition_cache.stats(),
             "system_info": {
                 "version": system_info.get("Version"),
                 "name": system_info.get("Name"),
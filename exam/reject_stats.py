@@ -0,0 +1,216 @@
+"""
+Reject analysis statistics
+
+RejectAnalysisStatisticsView and RejectAnalysisTrendsView summarise the
+monthly RejectAnalysis records of a year. The monthly breakdown is one
+TruncMonth grouped query instead of an aggregate per month, and the results
+are cached per (year, modality):
+
+- Every cache key includes a version token; saving or deleting a
+  RejectAnalysis or RejectIncident replaces the token (exam/signals.py), so
+  all cached years and modalities are dropped at once. Statistics also
+  compare with the previous year, which is why a single year is not enough.
+- Entries otherwise expire after REJECT_STATS_CACHE_TIMEOUT.
+"""
+
+import calendar
+import uuid
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Case, Count, FloatField, Max, Min, Q, Sum, When
+from django.db.models.functions import TruncMonth
+
+from .models import RejectAnalysis, RejectIncident
+
+REJECT_STATS_VERSION_KEY = 'reject_stats_version'
+DEFAULT_REJECT_STATS_CACHE_TIMEOUT = 600  # seconds
+
+
+def _cache_timeout() -> int:
+    return getattr(settings, 'REJECT_STATS_CACHE_TIMEOUT', DEFAULT_REJECT_STATS_CACHE_TIMEOUT)
+
+
+def _version() -> str:
+    version = cache.get(REJECT_STATS_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(REJECT_STATS_VERSION_KEY, version, None):
+            version = cache.get(REJECT_STATS_VERSION_KEY, version)
+    return version
+
+
+def _cache_key(name: str, year: int, modality_id) -> str:
+    return f"reject_stats:{_version()}:{name}:{year}:{modality_id or 'all'}"
+
+
+def invalidate_reject_stats():
+    """Drop all cached reject statistics"""
+    cache.set(REJECT_STATS_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _cached(name: str, year: int, modality_id, compute):
+    key = _cache_key(name, year, modality_id)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, _cache_timeout())
+    return result
+
+
+def monthly_totals(analyses) -> Dict[int, Dict[str, Any]]:
+    """
+    Sum analyses per month in one grouped query
+
+    Returns:
+        {month number: {'avg_reject_rate', 'total_examinations', 'total_images',
+        'total_retakes', 'analyses_count'}}, months without analyses are absent
+    """
+    rows = (
+        analyses.annotate(month=TruncMonth('analysis_date'))
+        .values('month')
+        .annotate(
+            avg_reject_rate=Avg('reject_rate'),
+            total_examinations=Sum('total_examinations'),
+            total_images=Sum('total_images'),
+            total_retakes=Sum('total_retakes'),
+            analyses_count=Count('id')
+        )
+        .order_by('month')
+    )
+    return {row.pop('month').month: row for row in rows}
+
+
+def _year_analyses(year: int, modality_id=None):
+    analyses = RejectAnalysis.objects.filter(analysis_date__year=year)
+    if modality_id:
+        analyses = analyses.filter(modality_id=modality_id)
+    return analyses
+
+
+def compute_reject_statistics(year: int, modality_id=None) -> Dict[str, Any]:
+    """Annual summary, monthly and modality breakdowns, trend and top reasons for a year"""
+    analyses = _year_analyses(year, modality_id)
+
+    # Annual summary and DRL compliance
+    annual_stats = analyses.aggregate(
+        avg_reject_rate=Avg('reject_rate'),
+        max_reject_rate=Max('reject_rate'),
+        min_reject_rate=Min('reject_rate'),
+        total_examinations=Sum('total_examinations'),
+        total_images=Sum('total_images'),
+        total_retakes=Sum('total_retakes'),
+        analyses_count=Count('id'),
+        compliant_analyses=Count('id', filter=Q(drl_compliance=True)),
+        non_compliant_analyses=Count('id', filter=Q(drl_compliance=False))
+    )
+
+    # Monthly breakdown
+    months = monthly_totals(analyses)
+    monthly_data = []
+    for month in range(1, 13):
+        month_stats = months.get(month, {})
+        monthly_data.append({
+            'month': month,
+            'month_name': calendar.month_name[month],
+            'avg_reject_rate': round(month_stats.get('avg_reject_rate') or 0, 2),
+            'total_examinations': month_stats.get('total_examinations') or 0,
+            'total_images': month_stats.get('total_images') or 0,
+            'total_retakes': month_stats.get('total_retakes') or 0,
+            'analyses_count': month_stats.get('analyses_count') or 0
+        })
+
+    # Modality breakdown
+    modality_stats = RejectAnalysis.objects.filter(
+        analysis_date__year=year
+    ).values(
+        'modality__id',
+        'modality__nama',
+        'modality__singkatan'
+    ).annotate(
+        avg_reject_rate=Avg('reject_rate'),
+        total_examinations=Sum('total_examinations'),
+        total_images=Sum('total_images'),
+        total_retakes=Sum('total_retakes'),
+        analyses_count=Count('id'),
+        compliance_rate=Avg(
+            Case(
+                When(drl_compliance=True, then=1),
+                default=0,
+                output_field=FloatField()
+            )
+        ) * 100
+    ).order_by('-avg_reject_rate')
+
+    # Trend analysis (compare with previous year)
+    previous_year_stats = RejectAnalysis.objects.filter(
+        analysis_date__year=year - 1
+    ).aggregate(
+        avg_reject_rate=Avg('reject_rate')
+    )
+
+    trends = {}
+    if previous_year_stats['avg_reject_rate']:
+        current_avg = annual_stats['avg_reject_rate'] or 0
+        previous_avg = previous_year_stats['avg_reject_rate']
+        trends['reject_rate_change'] = round(
+            ((current_avg - previous_avg) / previous_avg) * 100, 2
+        )
+    else:
+        trends['reject_rate_change'] = None
+
+    compliance_rate = 0
+    if annual_stats['analyses_count'] > 0:
+        compliance_rate = (annual_stats['compliant_analyses'] / annual_stats['analyses_count']) * 100
+
+    # Top reject reasons (from incidents)
+    incidents = RejectIncident.objects.filter(analysis__analysis_date__year=year)
+    if modality_id:
+        incidents = incidents.filter(analysis__modality_id=modality_id)
+
+    top_reasons = incidents.values(
+        'reject_reason__id',
+        'reject_reason__reason',
+        'reject_reason__category__name',
+        'reject_reason__severity_level'
+    ).annotate(
+        incident_count=Count('id')
+    ).order_by('-incident_count')[:10]
+
+    return {
+        'year': year,
+        'annual_summary': {
+            'avg_reject_rate': round(annual_stats['avg_reject_rate'] or 0, 2),
+            'max_reject_rate': round(annual_stats['max_reject_rate'] or 0, 2),
+            'min_reject_rate': round(annual_stats['min_reject_rate'] or 0, 2),
+            'total_examinations': annual_stats['total_examinations'] or 0,
+            'total_images': annual_stats['total_images'] or 0,
+            'total_retakes': annual_stats['total_retakes'] or 0,
+            'analyses_count': annual_stats['analyses_count'],
+            'overall_reject_rate': round(
+                (annual_stats['total_retakes'] / annual_stats['total_images'] * 100)
+                if annual_stats['total_images'] else 0, 2
+            )
+        },
+        'monthly_breakdown': monthly_data,
+        'modality_breakdown': list(modality_stats),
+        'trends': trends,
+        'drl_compliance': {
+            'compliance_rate': round(compliance_rate, 2),
+            'total_analyses': annual_stats['analyses_count'],
+            'compliant_analyses': annual_stats['compliant_analyses'],
+            'non_compliant_analyses': annual_stats['non_compliant_analyses']
+        },
+        'top_reject_reasons': list(top_reasons)
+    }
+
+
+def get_reject_statistics(year: int, modality_id=None) -> Dict[str, Any]:
+    """Reject statistics for a year, from the cache when possible"""
+    return _cached('statistics', year, modality_id, lambda: compute_reject_statistics(year, modality_id))
+
+
+def get_monthly_reject_totals(year: int, modality_id=None) -> Dict[int, Dict[str, Any]]:
+    """monthly_totals for a year's analyses, from the cache when possible"""
+    return _cached('monthly', year, modality_id, lambda: monthly_totals(_year_analyses(year, modality_id)))
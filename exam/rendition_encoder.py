@@ -0,0 +1,22 @@
+"""
+Image encoding for thumbnail renditions
+
+Runs in the rendition process pool (exam/renditions.py). The pool starts its
+workers with the spawn method, so this module must stay importable without
+Django settings or the app registry: keep Django and model imports out of it.
+"""
+
+import io
+
+from PIL import Image
+
+
+def encode_image(data: bytes, size: int, fmt: str, quality: int) -> bytes:
+    """Downscale and encode an image"""
+    image = Image.open(io.BytesIO(data))
+    if image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    image.thumbnail((size, size))
+    output = io.BytesIO()
+    image.save(output, format=fmt.upper(), quality=quality)
+    return output.getvalue()
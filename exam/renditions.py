@@ -0,0 +1,200 @@
+"""
+Thumbnail renditions for the PACS browser and worklist grids
+
+Series thumbnails (the first instance of each series) are rendered once,
+written to a bounded on-disk cache (RENDITION_CACHE_DIR) and served with
+long-lived cache headers. Like the DICOM cache, entries are keyed by Orthanc
+instance ID, so a rendition never changes and never needs revalidation.
+
+Rendering:
+- Orthanc renders a small JPEG (/instances/{id}/rendered?width=&height=),
+  falling back to the full-size /preview PNG on servers without it.
+- Images are (re)encoded to RENDITION_FORMAT (WebP by default) and
+  downscaled with Pillow in a process pool (exam/rendition_encoder.py), so
+  encoding never runs in the request threads. The pool spawns its workers
+  rather than forking the multithreaded server process.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .dicom_cache import DicomFileCache
+from .rendition_encoder import encode_image
+from .study_manifest import get_study_manifest
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_THUMBNAIL_SIZE = 256
+THUMBNAIL_SIZES = (128, 256, 512)
+DEFAULT_RENDITION_FORMAT = 'webp'
+DEFAULT_RENDITION_QUALITY = 80
+DEFAULT_RENDITION_WORKERS = 2
+DEFAULT_RENDITION_CACHE_MAX_BYTES = 1024 ** 3  # 1 GB
+
+RENDITION_CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+
+
+class RenditionCache(DicomFileCache):
+    """DicomFileCache with its own directory and budget for rendered images"""
+
+    @property
+    def root(self) -> str:
+        return self._root or getattr(
+            settings, 'RENDITION_CACHE_DIR', os.path.join(settings.BASE_DIR, 'rendition_cache')
+        )
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return getattr(settings, 'RENDITION_CACHE_MAX_BYTES', DEFAULT_RENDITION_CACHE_MAX_BYTES)
+
+
+# Process-wide rendition cache
+rendition_cache = RenditionCache()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a process with running threads can deadlock the child
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'RENDITION_WORKERS', DEFAULT_RENDITION_WORKERS),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def thumbnail_size(value=None) -> int:
+    """Clamp a requested size to the nearest supported thumbnail size"""
+    try:
+        size = int(value) if value else getattr(settings, 'THUMBNAIL_SIZE', DEFAULT_THUMBNAIL_SIZE)
+    except (TypeError, ValueError):
+        size = DEFAULT_THUMBNAIL_SIZE
+    return min(THUMBNAIL_SIZES, key=lambda allowed: abs(allowed - size))
+
+
+def _kind(size: int, fmt: str) -> str:
+    return f"thumb-{size}.{fmt}"
+
+
+def cached_thumbnail_response(instance_id: str, size: int):
+    """Response for a cached thumbnail in any format, or None on a miss"""
+    for fmt, content_type in RENDITION_CONTENT_TYPES.items():
+        if os.path.exists(rendition_cache.path_for(instance_id, _kind(size, fmt))):
+            response = rendition_cache.response(instance_id, _kind(size, fmt), content_type)
+            if response is not None:
+                return response
+    return None
+
+
+def render_thumbnail(client, instance_id: str, size: int) -> Optional[Tuple[bytes, str]]:
+    """
+    Render, encode and cache the thumbnail for one instance
+
+    Args:
+        client: OrthancPACSClient for the server holding the instance
+        instance_id: Orthanc instance ID
+        size: Longest edge in pixels (one of THUMBNAIL_SIZES)
+
+    Returns:
+        (image bytes, content type), or None if Orthanc could not render it
+    """
+    fmt = 'jpeg'
+    response = client.get(
+        f"/instances/{instance_id}/rendered",
+        params={'width': size, 'height': size, 'smooth': 1},
+        headers={'Accept': 'image/jpeg'},
+        timeout=30
+    )
+    if not response.ok:
+        # Orthanc before 1.6 has no /rendered, use the full-size preview
+        response = client.get(f"/instances/{instance_id}/preview", timeout=30)
+        if not response.ok:
+            logger.warning(f"Orthanc could not render instance {instance_id}: {response.status_code}")
+            return None
+        fmt = 'png'
+    data = response.content
+
+    target = getattr(settings, 'RENDITION_FORMAT', DEFAULT_RENDITION_FORMAT)
+    if fmt != target or fmt == 'png':
+        quality = getattr(settings, 'RENDITION_QUALITY', DEFAULT_RENDITION_QUALITY)
+        try:
+            data = _get_pool().submit(encode_image, data, size, target, quality).result(timeout=30)
+            fmt = target
+        except Exception as e:
+            logger.warning(f"Failed to encode thumbnail for instance {instance_id}: {e}")
+
+    rendition_cache.store(instance_id, _kind(size, fmt), data)
+    return data, RENDITION_CONTENT_TYPES[fmt]
+
+
+def pregenerate_thumbnails(client, days: int = 1, size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Render series thumbnails for studies from the last few days
+
+    Args:
+        client: OrthancPACSClient for the server to scan
+        days: Number of days back from today (StudyDate)
+        size: Thumbnail size, THUMBNAIL_SIZE by default
+
+    Returns:
+        Counts of studies scanned, thumbnails rendered, already cached and failed
+    """
+    size = thumbnail_size(size)
+    today = date.today()
+    study_date = f"{(today - timedelta(days=days)).strftime('%Y%m%d')}-{today.strftime('%Y%m%d')}"
+    response = client.find('Study', {'StudyDate': study_date}, expand=True)
+    response.raise_for_status()
+    studies = response.json()
+
+    counts = {'studies': len(studies), 'rendered': 0, 'cached': 0, 'failed': 0}
+    pending = []
+    for study in studies:
+        study_uid = study.get('MainDicomTags', {}).get('StudyInstanceUID')
+        if not study_uid:
+            continue
+        try:
+            manifest = get_study_manifest(client, study_uid)
+        except Exception as e:
+            logger.warning(f"Skipping study {study_uid}: {e}")
+            continue
+        for series in (manifest or {}).get('series', []):
+            if not series['Instances']:
+                continue
+            instance_id = series['Instances'][0]['ID']
+            if any(os.path.exists(rendition_cache.path_for(instance_id, _kind(size, fmt)))
+                   for fmt in RENDITION_CONTENT_TYPES):
+                counts['cached'] += 1
+            else:
+                pending.append(instance_id)
+
+    def render(instance_id):
+        try:
+            return render_thumbnail(client, instance_id, size) is not None
+        except Exception as e:
+            logger.warning(f"Failed to render thumbnail for instance {instance_id}: {e}")
+            return False
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=getattr(settings, 'RENDITION_WORKERS', DEFAULT_RENDITION_WORKERS)) as executor:
+            for ok in executor.map(render, pending):
+                counts['rendered' if ok else 'failed'] += 1
+
+    return counts
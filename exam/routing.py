@@ -3,4 +3,6 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/dashboard/$', consumers.DashboardConsumer.as_asgi()),
+    re_path(r'ws/ai-reports/(?P<report_id>\d+)/stream/$', consumers.AIReportStreamConsumer.as_asgi()),
+    re_path(r'ws/dicom-uploads/(?P<job_id>\d+)/progress/$', consumers.DicomUploadProgressConsumer.as_asgi()),
 ]
\ No newline at end of file
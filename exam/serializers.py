@@ -2,7 +2,8 @@ from rest_framework import serializers
 from .models import (
     Modaliti, Part, Exam, Daftar, Pemeriksaan, PacsConfig, PacsServer, MediaDistribution,
     RejectCategory, RejectReason, RejectAnalysis, RejectIncident, RejectAnalysisTargetSettings,
-    AIGeneratedReport, RadiologistReport, ReportCollaboration, AIModelPerformance, AIConfiguration
+    AIGeneratedReport, RadiologistReport, ReportCollaboration, AIModelPerformance, AIConfiguration,
+    AIReportJob, DicomUploadJob, allocate_accession_numbers
 )
 from pesakit.models import Pesakit
 from wad.models import Ward
@@ -11,6 +12,7 @@ from wad.serializers import WardSerializer
 from staff.serializers import UserSerializer
 from django.contrib.auth import get_user_model
 from decimal import Decimal
+from .dashboard_rollup import defer_rollups
 
 User = get_user_model()
 
@@ -222,22 +224,28 @@ class GroupedExaminationSerializer(serializers.Serializer):
     def create(self, validated_data):
         examinations_data = validated_data.pop('examinations')
         
-        # Create the study
-        study = Daftar.objects.create(**validated_data)
-        
-        # Create examinations
-        examinations = []
-        for i, exam_data in enumerate(examinations_data, 1):
-            exam_data['daftar'] = study
-            exam_data['sequence_number'] = i
+        # Mark the registration date for a dashboard rollup rebuild once
+        with defer_rollups():
+            # Create the study
+            study = Daftar.objects.create(**validated_data)
             
-            # Set jxr from request context if available
-            request = self.context.get('request')
-            if request and hasattr(request, 'user') and not exam_data.get('jxr'):
-                exam_data['jxr'] = request.user
+            # Reserve all child accession numbers in one go
+            accessions = iter(allocate_accession_numbers(count=len(examinations_data)))
             
-            examination = Pemeriksaan.objects.create(**exam_data)
-            examinations.append(examination)
+            # Create examinations
+            examinations = []
+            for i, exam_data in enumerate(examinations_data, 1):
+                exam_data['daftar'] = study
+                exam_data['sequence_number'] = i
+                exam_data.setdefault('accession_number', next(accessions))
+                
+                # Set jxr from request context if available
+                request = self.context.get('request')
+                if request and hasattr(request, 'user') and not exam_data.get('jxr'):
+                    exam_data['jxr'] = request.user
+                
+                examination = Pemeriksaan.objects.create(**exam_data)
+                examinations.append(examination)
         
         return {
             'study': study,
@@ -1136,12 +1144,16 @@ class AIGeneratedReportSerializer(serializers.ModelSerializer):
             'reviewed_by', 'reviewed_by_name', 'reviewed_at', 'final_report',
             'orthanc_study_id', 'orthanc_series_ids', 'dicom_metadata',
             'processing_time_seconds', 'processing_errors', 'processing_warnings',
+            'generation_status', 'generation_stage', 'generation_progress',
             # Related field displays
             'examination_number', 'examination_accession', 'patient_name', 'patient_mrn',
             'modality_name', 'exam_name', 'is_completed', 'patient_name_prop', 'examination_type_prop',
             'created', 'modified'
         ]
-        read_only_fields = ['created', 'modified', 'is_completed', 'patient_name_prop', 'examination_type_prop']
+        read_only_fields = [
+            'created', 'modified', 'is_completed', 'patient_name_prop', 'examination_type_prop',
+            'generation_status', 'generation_stage', 'generation_progress'
+        ]
     
     def get_reviewed_by_name(self, obj):
         if obj.reviewed_by:
@@ -1323,6 +1335,7 @@ class AIModelPerformanceSerializer(serializers.ModelSerializer):
     # Computed properties
     approval_rate = serializers.ReadOnlyField()
     modification_rate = serializers.ReadOnlyField()
+    cache_hit_rate = serializers.ReadOnlyField()
     
     # Choice fields for frontend
     model_type_choices = serializers.SerializerMethodField()
@@ -1335,10 +1348,14 @@ class AIModelPerformanceSerializer(serializers.ModelSerializer):
             'reports_modified', 'reports_rejected', 'accuracy_rate', 'critical_findings_sensitivity',
             'false_positive_rate', 'average_processing_time', 'average_time_saved',
             'user_satisfaction_score', 'system_uptime_percentage', 'error_rate',
+            'cache_hits', 'cache_misses', 'cache_hit_rate',
             'performance_notes', 'improvement_actions', 'approval_rate', 'modification_rate',
             'created_by', 'created_by_name', 'created', 'modified'
         ]
-        read_only_fields = ['accuracy_rate', 'approval_rate', 'modification_rate', 'created', 'modified']
+        read_only_fields = [
+            'accuracy_rate', 'approval_rate', 'modification_rate', 'cache_hits', 'cache_misses',
+            'cache_hit_rate', 'created', 'modified'
+        ]
     
     def get_created_by_name(self, obj):
         if obj.created_by:
@@ -1399,7 +1416,9 @@ class AIConfigurationSerializer(serializers.ModelSerializer):
             'max_processing_time_seconds', 'confidence_threshold', 'critical_findings_threshold',
             'enable_qa_validation', 'require_peer_review_critical', 'auto_approve_routine_reports',
             'notify_on_critical_findings', 'notification_emails', 'enable_ai_reporting',
-            'maintenance_mode', 'modified_by', 'modified_by_name', 'created', 'modified'
+            'maintenance_mode', 'enable_batch_reporting', 'batch_modalities', 'batch_start_hour',
+            'batch_end_hour', 'batch_concurrency', 'batch_lookback_days',
+            'modified_by', 'modified_by_name', 'created', 'modified'
         ]
         read_only_fields = ['created', 'modified', 'modified_by_name']
     
@@ -1424,6 +1443,12 @@ class AIConfigurationSerializer(serializers.ModelSerializer):
         if max_processing_time is not None and max_processing_time <= 0:
             raise serializers.ValidationError("Maximum processing time must be greater than 0")
         
+        # Validate batch window
+        for field in ('batch_start_hour', 'batch_end_hour'):
+            hour = data.get(field)
+            if hour is not None and hour > 23:
+                raise serializers.ValidationError("Batch window hours must be between 0 and 23")
+        
         # Validate notification emails
         notification_emails = data.get('notification_emails', [])
         if notification_emails:
@@ -1461,7 +1486,7 @@ class AIGeneratedReportListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'examination_number', 'patient_name', 'exam_name', 'ai_model_version',
             'confidence_score', 'requires_urgent_review', 'review_status', 'reviewed_by_name',
-            'reviewed_at', 'created'
+            'reviewed_at', 'generation_status', 'generation_progress', 'created'
         ]
     
     def get_reviewed_by_name(self, obj):
@@ -1789,12 +1814,16 @@ class AIGeneratedReportSerializer(serializers.ModelSerializer):
             'reviewed_by', 'reviewed_by_name', 'reviewed_at', 'final_report',
             'orthanc_study_id', 'orthanc_series_ids', 'dicom_metadata',
             'processing_time_seconds', 'processing_errors', 'processing_warnings',
+            'generation_status', 'generation_stage', 'generation_progress',
             # Related field displays
             'examination_number', 'examination_accession', 'patient_name', 'patient_mrn',
             'modality_name', 'exam_name', 'is_completed', 'patient_name_prop', 'examination_type_prop',
             'created', 'modified'
         ]
-        read_only_fields = ['created', 'modified', 'is_completed', 'patient_name_prop', 'examination_type_prop']
+        read_only_fields = [
+            'created', 'modified', 'is_completed', 'patient_name_prop', 'examination_type_prop',
+            'generation_status', 'generation_stage', 'generation_progress'
+        ]
     
     def get_reviewed_by_name(self, obj):
         if obj.reviewed_by:
@@ -1976,6 +2005,7 @@ class AIModelPerformanceSerializer(serializers.ModelSerializer):
     # Computed properties
     approval_rate = serializers.ReadOnlyField()
     modification_rate = serializers.ReadOnlyField()
+    cache_hit_rate = serializers.ReadOnlyField()
     
     # Choice fields for frontend
     model_type_choices = serializers.SerializerMethodField()
@@ -1988,10 +2018,14 @@ class AIModelPerformanceSerializer(serializers.ModelSerializer):
             'reports_modified', 'reports_rejected', 'accuracy_rate', 'critical_findings_sensitivity',
             'false_positive_rate', 'average_processing_time', 'average_time_saved',
             'user_satisfaction_score', 'system_uptime_percentage', 'error_rate',
+            'cache_hits', 'cache_misses', 'cache_hit_rate',
             'performance_notes', 'improvement_actions', 'approval_rate', 'modification_rate',
             'created_by', 'created_by_name', 'created', 'modified'
         ]
-        read_only_fields = ['accuracy_rate', 'approval_rate', 'modification_rate', 'created', 'modified']
+        read_only_fields = [
+            'accuracy_rate', 'approval_rate', 'modification_rate', 'cache_hits', 'cache_misses',
+            'cache_hit_rate', 'created', 'modified'
+        ]
     
     def get_created_by_name(self, obj):
         if obj.created_by:
@@ -2052,7 +2086,9 @@ class AIConfigurationSerializer(serializers.ModelSerializer):
             'max_processing_time_seconds', 'confidence_threshold', 'critical_findings_threshold',
             'enable_qa_validation', 'require_peer_review_critical', 'auto_approve_routine_reports',
             'notify_on_critical_findings', 'notification_emails', 'enable_ai_reporting',
-            'maintenance_mode', 'modified_by', 'modified_by_name', 'created', 'modified'
+            'maintenance_mode', 'enable_batch_reporting', 'batch_modalities', 'batch_start_hour',
+            'batch_end_hour', 'batch_concurrency', 'batch_lookback_days',
+            'modified_by', 'modified_by_name', 'created', 'modified'
         ]
         read_only_fields = ['created', 'modified', 'modified_by_name']
     
@@ -2077,6 +2113,12 @@ class AIConfigurationSerializer(serializers.ModelSerializer):
         if max_processing_time is not None and max_processing_time <= 0:
             raise serializers.ValidationError("Maximum processing time must be greater than 0")
         
+        # Validate batch window
+        for field in ('batch_start_hour', 'batch_end_hour'):
+            hour = data.get(field)
+            if hour is not None and hour > 23:
+                raise serializers.ValidationError("Batch window hours must be between 0 and 23")
+        
         # Validate notification emails
         notification_emails = data.get('notification_emails', [])
         if notification_emails:
@@ -2114,7 +2156,7 @@ class AIGeneratedReportListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'examination_number', 'patient_name', 'exam_name', 'ai_model_version',
             'confidence_score', 'requires_urgent_review', 'review_status', 'reviewed_by_name',
-            'reviewed_at', 'created'
+            'reviewed_at', 'generation_status', 'generation_progress', 'created'
         ]
     
     def get_reviewed_by_name(self, obj):
@@ -2139,4 +2181,34 @@ class RadiologistReportListSerializer(serializers.ModelSerializer):
         ]
     
     def get_radiologist_name(self, obj):
-        return f"{obj.radiologist.first_name} {obj.radiologist.last_name}".strip()
\ No newline at end of file
+        return f"{obj.radiologist.first_name} {obj.radiologist.last_name}".strip()
+
+
+class AIReportJobSerializer(serializers.ModelSerializer):
+    """Serializer for queued AI report generation jobs (polled by the reporting UI)"""
+    examination_number = serializers.CharField(source='pemeriksaan.no_xray', read_only=True)
+    priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    generation_stage = serializers.CharField(source='ai_report.generation_stage', read_only=True, default='')
+    generation_progress = serializers.IntegerField(source='ai_report.generation_progress', read_only=True, default=None)
+
+    class Meta:
+        model = AIReportJob
+        fields = [
+            'id', 'pemeriksaan', 'examination_number', 'ai_report', 'status', 'priority', 'priority_display',
+            'model_name', 'attempts', 'error', 'generation_stage', 'generation_progress',
+            'created', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class DicomUploadJobSerializer(serializers.ModelSerializer):
+    """Serializer for background DICOM uploads (polled by the upload UI)"""
+    stage_display = serializers.CharField(source='get_stage_display', read_only=True)
+
+    class Meta:
+        model = DicomUploadJob
+        fields = [
+            'id', 'status', 'stage', 'stage_display', 'total_files', 'uploaded_files', 'failed_files',
+            'result', 'error', 'created', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
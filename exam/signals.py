@@ -0,0 +1,138 @@
+"""
+Signal handlers for the exam app
+
+Keep the dashboard data current as patients, registrations and examinations
+are created, updated or deleted:
+- The affected exam dates are marked pending in the daily rollup
+  (exam/dashboard_rollup.py) inside the same transaction as the change; the
+  next dashboard read rebuilds them.
+- The cached dashboard statistics (exam/dashboard_stats.py) count new rows
+  once their transaction commits, and are dropped on updates and deletes.
+- After the commit the new counters are broadcast to open dashboards over the
+  DashboardConsumer WebSocket group.
+- Cached reject statistics (exam/reject_stats.py) are dropped once a change to
+  a reject analysis or incident commits.
+"""
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+import logging
+
+from pesakit.models import Pesakit
+from .models import Daftar, Pemeriksaan, RejectAnalysis, RejectIncident
+from .dashboard_rollup import local_date, mark_days_pending
+from .dashboard_stats import record_new_row, invalidate_dashboard_stats, broadcast_dashboard_stats
+from .reject_stats import invalidate_reject_stats
+
+logger = logging.getLogger(__name__)
+
+
+def _after_commit(update):
+    """Apply a stats cache update once the transaction commits, then push it to dashboards"""
+    def run():
+        update()
+        broadcast_dashboard_stats()
+    transaction.on_commit(run)
+
+
+# Patients
+@receiver(pre_save, sender=Pesakit)
+def store_original_patient_dimensions(sender, instance, raw=False, **kwargs):
+    instance._rollup_original = None
+    if instance.pk and not raw:
+        instance._rollup_original = (
+            Pesakit.objects.filter(pk=instance.pk).values_list('jantina', 'tarikh_lahir', 'umur').first()
+        )
+
+
+@receiver(post_save, sender=Pesakit)
+def patient_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        _after_commit(lambda: record_new_row('patients', instance.created))
+        return
+    original = getattr(instance, '_rollup_original', None)
+    if original and original != (instance.jantina, instance.tarikh_lahir, instance.umur):
+        # Gender/age group may have changed for every registration of this patient
+        mark_days_pending(local_date(tarikh) for tarikh in Daftar.objects.filter(pesakit=instance).values_list('tarikh', flat=True))
+
+
+# Registrations
+@receiver(pre_save, sender=Daftar)
+def store_original_registration_date(sender, instance, raw=False, **kwargs):
+    instance._rollup_original_tarikh = None
+    if instance.pk and not raw:
+        instance._rollup_original_tarikh = (
+            Daftar.objects.filter(pk=instance.pk).values_list('tarikh', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Daftar)
+def registration_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    days = {local_date(instance.tarikh)}
+    original_tarikh = getattr(instance, '_rollup_original_tarikh', None)
+    if original_tarikh:
+        days.add(local_date(original_tarikh))
+    mark_days_pending(days)
+
+    if created:
+        completed = instance.study_status == 'COMPLETED'
+        _after_commit(lambda: record_new_row('registrations', instance.tarikh, completed=completed))
+    else:
+        # Status or date may have changed
+        _after_commit(invalidate_dashboard_stats)
+
+
+@receiver(post_delete, sender=Daftar)
+def registration_deleted(sender, instance, **kwargs):
+    mark_days_pending([local_date(instance.tarikh)])
+    _after_commit(invalidate_dashboard_stats)
+
+
+# Examinations
+@receiver(post_save, sender=Pemeriksaan)
+def examination_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        tarikh = instance.daftar.tarikh
+    except Exception as e:
+        logger.warning(f"Dashboard stats not updated for examination {instance.pk}: {e}")
+        _after_commit(invalidate_dashboard_stats)
+        return
+    mark_days_pending([local_date(tarikh)])
+    if created:
+        _after_commit(lambda: record_new_row('examinations', tarikh))
+
+
+@receiver(post_delete, sender=Pemeriksaan)
+def examination_deleted(sender, instance, **kwargs):
+    try:
+        mark_days_pending([local_date(instance.daftar.tarikh)])
+    except ObjectDoesNotExist:
+        pass  # Deleted with its registration, which marks the date itself
+    _after_commit(invalidate_dashboard_stats)
+
+
+@receiver(post_delete, sender=Pesakit)
+def patient_deleted(sender, instance, **kwargs):
+    _after_commit(invalidate_dashboard_stats)
+
+
+# Reject analysis
+@receiver(post_save, sender=RejectAnalysis)
+@receiver(post_save, sender=RejectIncident)
+def reject_data_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(invalidate_reject_stats)
+
+
+@receiver(post_delete, sender=RejectAnalysis)
+@receiver(post_delete, sender=RejectIncident)
+def reject_data_deleted(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_reject_stats)
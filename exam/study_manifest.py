@@ -0,0 +1,155 @@
+"""
+Study manifest cache
+
+The viewer endpoints (image IDs, enhanced metadata, series metadata, bulk
+series images) all need the same study -> series -> instance tree. A manifest
+is built once per study from two Orthanc calls (/studies/{id}/series and
+/studies/{id}/instances) and kept in the Django cache, keyed by PACS server
+and StudyInstanceUID.
+
+Freshness:
+- Within the fresh window the manifest is served with no Orthanc calls at all
+  (STUDY_MANIFEST_TTL for stable studies, STUDY_MANIFEST_UNSTABLE_TTL while
+  Orthanc still reports IsStable=false).
+- After that, one /tools/find revalidates it: an unchanged LastUpdate keeps the
+  tree, otherwise it is rebuilt.
+- Entries are dropped entirely after STUDY_MANIFEST_MAX_AGE.
+"""
+
+import logging
+import time
+from typing import Dict, Optional, Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .orthanc_client import instance_sort_key
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MANIFEST_TTL = 300  # 5 minutes for stable studies
+DEFAULT_MANIFEST_UNSTABLE_TTL = 15  # Study still receiving instances
+DEFAULT_MANIFEST_MAX_AGE = 86400  # 1 day
+
+
+def _manifest_key(pacs_server, study_uid: str) -> str:
+    return f"study_manifest:{type(pacs_server).__name__}:{pacs_server.pk}:{study_uid}"
+
+
+def _fresh_until(study: Dict[str, Any]) -> float:
+    if study.get('IsStable', True):
+        ttl = getattr(settings, 'STUDY_MANIFEST_TTL', DEFAULT_MANIFEST_TTL)
+    else:
+        ttl = getattr(settings, 'STUDY_MANIFEST_UNSTABLE_TTL', DEFAULT_MANIFEST_UNSTABLE_TTL)
+    return time.time() + ttl
+
+
+def _find_study(client, study_uid: str) -> Optional[Dict[str, Any]]:
+    """Look up the expanded study resource, None if the PACS doesn't have it"""
+    response = client.find('Study', {'StudyInstanceUID': study_uid}, expand=True)
+    if not response.ok:
+        # Reported to the viewer as an unknown study, like before the manifest cache
+        logger.warning(f"Study lookup for {study_uid} failed: {response.status_code}")
+        return None
+    results = response.json()
+    return results[0] if results else None
+
+
+def build_study_manifest(client, study: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the series/instance tree for an expanded study resource
+
+    Args:
+        client: OrthancPACSClient for the server holding the study
+        study: Expanded study resource from /tools/find
+
+    Returns:
+        Manifest dict with 'study' and 'series' (in study order, each with
+        'Instances' sorted by InstanceNumber)
+    """
+    series_response = client.get(f"/studies/{study['ID']}/series")
+    series_response.raise_for_status()
+    instances_response = client.get(f"/studies/{study['ID']}/instances")
+    instances_response.raise_for_status()
+
+    instances_by_series = {}
+    for instance in instances_response.json():
+        instances_by_series.setdefault(instance.get('ParentSeries'), []).append({
+            'ID': instance.get('ID'),
+            'MainDicomTags': instance.get('MainDicomTags', {}),
+            'IndexInSeries': instance.get('IndexInSeries'),
+        })
+
+    series_order = {series_id: index for index, series_id in enumerate(study.get('Series', []))}
+    series_list = []
+    for series in sorted(series_response.json(),
+                         key=lambda s: series_order.get(s.get('ID'), len(series_order))):
+        series_list.append({
+            'ID': series.get('ID'),
+            'MainDicomTags': series.get('MainDicomTags', {}),
+            'Instances': sorted(instances_by_series.get(series.get('ID'), []), key=instance_sort_key),
+        })
+
+    return {
+        'study': {
+            'ID': study.get('ID'),
+            'MainDicomTags': study.get('MainDicomTags', {}),
+            'PatientMainDicomTags': study.get('PatientMainDicomTags', {}),
+            'Series': study.get('Series', []),
+            'LastUpdate': study.get('LastUpdate'),
+            'IsStable': study.get('IsStable', True),
+        },
+        'series': series_list,
+        'fresh_until': _fresh_until(study),
+    }
+
+
+def get_study_manifest(client, study_uid: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached manifest for a study, building or revalidating it as needed
+
+    Args:
+        client: OrthancPACSClient for the server holding the study
+        study_uid: StudyInstanceUID
+
+    Returns:
+        Manifest dict, or None if the study is not in the PACS (or the lookup
+        was refused)
+
+    Raises:
+        requests.RequestException: Orthanc could not be reached
+    """
+    key = _manifest_key(client.pacs_server, study_uid)
+    manifest = cache.get(key)
+    if manifest and manifest['fresh_until'] > time.time():
+        return manifest
+
+    study = _find_study(client, study_uid)
+    if study is None:
+        cache.delete(key)
+        return None
+
+    if manifest and manifest['study'].get('LastUpdate') == study.get('LastUpdate') and study.get('IsStable', True):
+        # Unchanged since it was built, just extend the fresh window
+        manifest['study']['IsStable'] = True
+        manifest['fresh_until'] = _fresh_until(study)
+    else:
+        logger.debug(f"Building study manifest for {study_uid}")
+        manifest = build_study_manifest(client, study)
+
+    cache.set(key, manifest, getattr(settings, 'STUDY_MANIFEST_MAX_AGE', DEFAULT_MANIFEST_MAX_AGE))
+    return manifest
+
+
+def get_manifest_series(manifest: Dict[str, Any], series_uid: str) -> Optional[Dict[str, Any]]:
+    """Find a series in a manifest by SeriesInstanceUID"""
+    for series in manifest['series']:
+        if series['MainDicomTags'].get('SeriesInstanceUID') == series_uid:
+            return series
+    return None
+
+
+def invalidate_study_manifest(pacs_server, study_uid: str):
+    """Drop a cached manifest after instances were uploaded to the study"""
+    cache.delete(_manifest_key(pacs_server, study_uid))
@@ -0,0 +1,72 @@
+"""
+Unit tests for the accession number allocator
+
+Tests AccessionSequence seeding, block reservation and the Daftar/Pemeriksaan
+save() integration.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import (
+    AccessionSequence, Daftar, Exam, Modaliti, Part, Pemeriksaan,
+    allocate_accession_numbers, generate_study_accession, peek_accession_number
+)
+from pesakit.models import Pesakit
+from wad.models import Ward
+
+User = get_user_model()
+
+
+class AccessionAllocatorTest(TestCase):
+    """Test allocate_accession_numbers and the generate_* wrappers"""
+
+    def setUp(self):
+        self.year = timezone.now().year
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.patient = Pesakit.objects.create(nama='Test Patient', nric='990101-01-1234', jantina='L', jxr=self.user)
+        self.ward = Ward.objects.create(wad='Test Ward')
+        modaliti = Modaliti.objects.create(nama='X-Ray', singkatan='XR')
+        self.exam = Exam.objects.create(exam='Chest X-Ray', modaliti=modaliti, part=Part.objects.create(part='CHEST'))
+
+    def _study(self, **kwargs):
+        return Daftar.objects.create(pesakit=self.patient, rujukan=self.ward, modality='XR', jxr=self.user, **kwargs)
+
+    def test_sequence_per_modality(self):
+        """Each modality has its own counter"""
+        self.assertEqual(generate_study_accession('XR'), f'KKP{self.year}XR0000001')
+        self.assertEqual(generate_study_accession('XR'), f'KKP{self.year}XR0000002')
+        self.assertEqual(generate_study_accession('CT'), f'KKP{self.year}CT0000001')
+
+    def test_seeded_from_existing_accessions(self):
+        """A new sequence continues after the highest accession already saved"""
+        self._study(parent_accession_number=f'KKP{self.year}XR0000041')
+        self._study(parent_accession_number=f'KKP{self.year}XR0000007')
+        AccessionSequence.objects.all().delete()
+
+        self.assertEqual(generate_study_accession('XR'), f'KKP{self.year}XR0000042')
+
+    def test_block_allocation(self):
+        """A block for bulk import is contiguous and not handed out again"""
+        block = allocate_accession_numbers(count=3)
+        self.assertEqual([int(acc[-10:]) for acc in block], [1, 2, 3])
+        self.assertEqual(allocate_accession_numbers()[0], f'KKP{self.year}0000000004')
+
+    def test_peek_does_not_reserve(self):
+        """Form previews show the next number without consuming it"""
+        self.assertEqual(peek_accession_number(), f'KKP{self.year}0000000001')
+        self.assertEqual(peek_accession_number(), f'KKP{self.year}0000000001')
+        study = self._study()
+        exam = Pemeriksaan.objects.create(daftar=study, exam=self.exam, jxr=self.user)
+        self.assertEqual(exam.accession_number, f'KKP{self.year}0000000001')
+
+    def test_cost_independent_of_volume(self):
+        """Allocating does not read existing accessions once the sequence exists"""
+        for _ in range(5):
+            self._study()
+        with CaptureQueriesContext(connection) as queries:
+            generate_study_accession('XR')
+        self.assertFalse(any('exam_daftar' in query['sql'] for query in queries.captured_queries))
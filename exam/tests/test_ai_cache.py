@@ -0,0 +1,86 @@
+"""
+Unit tests for the AI result cache
+
+Tests that identical inferences are answered from the cache, that images,
+models and prompt versions change the key, and that hits and misses are
+counted in AIModelPerformance.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+
+from ..ai_cache import ai_result_cache_key, record_cache_lookup
+from ..ai_services import OllamaAIService
+from ..models import AIConfiguration, AIModelPerformance
+
+
+class AIResultCacheTest(TestCase):
+    """Test OllamaAIService inference through the AI result cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.config = AIConfiguration.get_current_config()
+        with patch('exam.ai_services.requests.get', return_value=MagicMock(status_code=200)):
+            self.service = OllamaAIService(self.config)
+        self.metadata = {'modality': 'CR', 'study_description': 'CHEST PA'}
+
+    def tearDown(self):
+        cache.clear()
+
+    def _generated(self, text):
+        return {'success': True, 'response': text, 'model': 'm', 'processing_time': 4.0, 'token_count': 10}
+
+    def test_repeat_analysis_served_from_cache(self):
+        with patch.object(self.service, '_generate_with_ollama',
+                          return_value=self._generated('CONFIDENCE LEVEL: 80%')) as generate:
+            first = self.service.analyze_images([b'image-1'], self.metadata)
+            streamed = []
+            second = self.service.analyze_images([b'image-1'], self.metadata, on_text=streamed.append)
+            self.service.analyze_images([b'image-2'], self.metadata)
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual(second['confidence_score'], first['confidence_score'])
+        self.assertEqual(second['processing_time'], 0.0)
+        self.assertEqual(streamed, ['CONFIDENCE LEVEL: 80%'])
+
+        performance = AIModelPerformance.objects.get(model_version=self.config.vision_language_model)
+        self.assertEqual(performance.model_type, 'vision_language')
+        self.assertEqual((performance.cache_hits, performance.cache_misses), (1, 2))
+        self.assertEqual(performance.analysis_date.day, 1)
+
+    def test_failures_not_cached(self):
+        failed = {'success': False, 'error': 'timeout', 'processing_time': 60}
+        with patch.object(self.service, '_generate_with_ollama', return_value=failed) as generate:
+            self.service.generate_report({'findings': 'Clear'}, self.metadata)
+            self.service.generate_report({'findings': 'Clear'}, self.metadata)
+        self.assertEqual(generate.call_count, 2)
+
+    @override_settings(AI_RESULT_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        with patch.object(self.service, '_generate_with_ollama', return_value=self._generated('APPROVE')) as generate:
+            self.service.quality_assurance_check({'full_report': 'FINDINGS: Clear'})
+            self.service.quality_assurance_check({'full_report': 'FINDINGS: Clear'})
+        self.assertEqual(generate.call_count, 2)
+
+    def test_key_includes_model_and_prompt_version(self):
+        key = ai_result_cache_key('llava-med:7b', 'prompt', [b'image'])
+        self.assertNotEqual(key, ai_result_cache_key('llava:13b', 'prompt', [b'image']))
+        with patch('exam.ai_cache.AI_PROMPT_VERSION', 2):
+            self.assertNotEqual(key, ai_result_cache_key('llava-med:7b', 'prompt', [b'image']))
+
+    def test_one_all_modalities_record_per_month(self):
+        record_cache_lookup('llava-med:7b', 'vision_language', hit=False)
+        performance = AIModelPerformance.objects.get(model_version='llava-med:7b')
+
+        # A concurrent create of the same record conflicts, so record_cache_lookup falls back to the update
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AIModelPerformance.objects.create(
+                model_version='llava-med:7b', model_type='vision_language', analysis_date=performance.analysis_date
+            )
+        record_cache_lookup('llava-med:7b', 'vision_language', hit=True)
+
+        performance.refresh_from_db()
+        self.assertEqual((performance.cache_hits, performance.cache_misses), (1, 1))
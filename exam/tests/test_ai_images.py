@@ -0,0 +1,80 @@
+"""
+Unit tests for DICOM image preparation for AI analysis
+
+Tests that DICOMProcessor fetches the study tree once, downloads the selected
+instances in parallel at the model's input size and keeps their order.
+"""
+
+import threading
+import time
+from unittest.mock import Mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..ai_services import DICOMProcessor
+
+
+def fake_orthanc_client(series):
+    client = Mock()
+    client.get_study_info.return_value = {
+        'MainDicomTags': {'AccessionNumber': 'KKP1'},
+        'PatientMainDicomTags': {'PatientID': 'P1'},
+        'Series': [item['ID'] for item in series],
+        'CountInstances': sum(len(item['Instances']) for item in series),
+    }
+    client.get_study_series.return_value = series
+    client.get_instance_dicom_tags.side_effect = lambda instance_id: {'SOPInstanceUID': instance_id}
+    return client
+
+
+class PrepareImagesForAITest(SimpleTestCase):
+    """Test DICOMProcessor.prepare_images_for_ai"""
+
+    def setUp(self):
+        self.series = [
+            {'ID': 's1', 'MainDicomTags': {'Modality': 'CR'}, 'Instances': ['a1', 'a2', 'a3']},
+            {'ID': 's2', 'MainDicomTags': {'Modality': 'CR'}, 'Instances': ['b1', 'b2', 'b3', 'b4']},
+            {'ID': 's3', 'MainDicomTags': {'Modality': 'DX'}, 'Instances': []},
+        ]
+
+    def test_study_tree_fetched_once(self):
+        client = fake_orthanc_client(self.series)
+        client.get_instance_image.side_effect = lambda instance_id, max_size=None: instance_id.encode()
+
+        result = DICOMProcessor(client, max_workers=2, image_size=336).prepare_images_for_ai('study-1')
+
+        self.assertTrue(result['success'])
+        client.get_study_info.assert_called_once_with('study-1')
+        client.get_study_series.assert_called_once_with('study-1')
+        client.get_series_instances.assert_not_called()
+        # Largest series first, middle instance of each
+        self.assertEqual([image['instance_id'] for image in result['images']], ['b3', 'a2'])
+        self.assertEqual(result['modalities'], ['CR', 'DX'])
+        self.assertEqual(result['metadata']['modality'], 'CR')
+        client.get_instance_image.assert_any_call('b3', max_size=336)
+
+    def test_instances_downloaded_in_parallel(self):
+        series = [{'ID': f's{n}', 'MainDicomTags': {}, 'Instances': [f'i{n}']} for n in range(4)]
+        client = fake_orthanc_client(series)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def get_image(instance_id, max_size=None):
+            with lock:
+                active.append(instance_id)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(instance_id)
+            return None if instance_id == 'i1' else b'jpeg'
+
+        client.get_instance_image.side_effect = get_image
+
+        with override_settings(AI_IMAGE_FETCH_WORKERS=4, AI_IMAGE_INPUT_SIZE=0):
+            result = DICOMProcessor(client).prepare_images_for_ai('study-1')
+
+        self.assertGreater(max(peak), 1)
+        # Failed downloads are skipped, the rest keep their order
+        self.assertEqual([image['instance_id'] for image in result['images']], ['i0', 'i2', 'i3'])
+        client.get_instance_image.assert_any_call('i0', max_size=None)
@@ -0,0 +1,235 @@
+"""
+Unit tests for the AI report job queue
+
+Tests enqueueing with placeholder reports, priority and per-model claiming,
+job execution with progress, stale job recovery and the generate endpoints.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..ai_jobs import (
+    claim_next_job, enqueue_ai_report, requeue_stale_jobs, run_job, cancel_job, schedule_batch_reports
+)
+from ..models import AIConfiguration, AIGeneratedReport, AIReportJob, Daftar, Exam, Modaliti, Part, Pemeriksaan
+from pesakit.models import Pesakit
+from wad.models import Ward
+
+User = get_user_model()
+
+
+class AIJobTestMixin:
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.patient = Pesakit.objects.create(nama='Test Patient', nric='990101-01-1234', jantina='L', jxr=self.user)
+        self.ward = Ward.objects.create(wad='Test Ward')
+        modaliti = Modaliti.objects.create(nama='X-Ray', singkatan='XR')
+        self.exam = Exam.objects.create(exam='Chest X-Ray', modaliti=modaliti, part=Part.objects.create(part='CHEST'))
+        self.config = AIConfiguration.get_current_config()
+
+    def _examination(self, priority='MEDIUM', exam=None, exam_status='SCHEDULED'):
+        study = Daftar.objects.create(
+            pesakit=self.patient, rujukan=self.ward, modality='XR', jxr=self.user, study_priority=priority
+        )
+        return Pemeriksaan.objects.create(
+            daftar=study, exam=exam or self.exam, jxr=self.user, exam_status=exam_status
+        )
+
+
+class AIJobQueueTest(AIJobTestMixin, TestCase):
+    """Test enqueue_ai_report, claim_next_job and run_job"""
+
+    def test_enqueue_creates_placeholder(self):
+        examination = self._examination()
+        job = enqueue_ai_report(examination, requested_by=self.user)
+
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.model_name, self.config.vision_language_model)
+        self.assertEqual(job.ai_report.generation_status, 'queued')
+        # A second request returns the active job
+        self.assertEqual(enqueue_ai_report(examination).pk, job.pk)
+        self.assertEqual(AIGeneratedReport.objects.filter(pemeriksaan=examination).count(), 1)
+
+    def test_stat_examinations_first(self):
+        routine = enqueue_ai_report(self._examination('LOW'))
+        stat = enqueue_ai_report(self._examination('STAT'))
+
+        self.assertEqual(stat.priority, 0)
+        with override_settings(AI_MODEL_CONCURRENCY_DEFAULT=2):
+            self.assertEqual(claim_next_job('worker-1').pk, stat.pk)
+            self.assertEqual(claim_next_job('worker-1').pk, routine.pk)
+
+    def test_model_concurrency_limit(self):
+        """Jobs for a model at its limit stay queued"""
+        first = enqueue_ai_report(self._examination())
+        second = enqueue_ai_report(self._examination())
+
+        with override_settings(AI_MODEL_CONCURRENCY={self.config.vision_language_model: 1}):
+            self.assertEqual(claim_next_job('worker-1').pk, first.pk)
+            self.assertIsNone(claim_next_job('worker-2'))
+            AIReportJob.objects.filter(pk=first.pk).update(status='completed')
+            self.assertEqual(claim_next_job('worker-2').pk, second.pk)
+
+    @patch('exam.ai_services.AIReportingService')
+    def test_run_job_fills_placeholder(self, service_class):
+        examination = self._examination()
+        job = enqueue_ai_report(examination)
+        stages = []
+
+        def generate(pemeriksaan, ai_report=None, progress=None):
+            progress('analyzing_images', 20)
+            stages.append(AIGeneratedReport.objects.get(pk=ai_report.pk).generation_stage)
+            ai_report.generated_report = 'FINDINGS: Normal'
+            ai_report.generation_status = 'completed'
+            ai_report.save()
+            return ai_report
+
+        service_class.return_value.generate_ai_report.side_effect = generate
+        job = run_job(claim_next_job('worker-1'))
+
+        self.assertEqual(job.status, 'completed')
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(stages, ['analyzing_images'])
+        self.assertEqual(job.ai_report.generated_report, 'FINDINGS: Normal')
+
+    @patch('exam.ai_services.AIReportingService', side_effect=RuntimeError('PACS not configured'))
+    def test_run_job_failure(self, service_class):
+        enqueue_ai_report(self._examination())
+        job = run_job(claim_next_job('worker-1'))
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('PACS not configured', job.error)
+        self.assertEqual(job.ai_report.generation_status, 'failed')
+
+    @patch('exam.ai_services.AIReportingService')
+    def test_run_job_records_report_failure(self, service_class):
+        job = enqueue_ai_report(self._examination())
+
+        def generate(pemeriksaan, ai_report=None, progress=None):
+            ai_report.generated_report = 'AI report generation failed: Ollama timed out'
+            ai_report.generation_status = 'failed'
+            ai_report.save()
+            return ai_report
+
+        service_class.return_value.generate_ai_report.side_effect = generate
+        job = run_job(claim_next_job('worker-1'))
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'AI report generation failed: Ollama timed out')
+
+    def test_stale_jobs_requeued(self):
+        job = enqueue_ai_report(self._examination())
+        claim_next_job('worker-1')
+        AIReportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+        # Out of attempts
+        claim_next_job('worker-2')
+        AIReportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_cancel(self):
+        job = enqueue_ai_report(self._examination())
+        self.assertTrue(cancel_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'cancelled')
+        self.assertIsNone(job.ai_report)
+        self.assertFalse(cancel_job(job))
+
+
+class AIJobBatchTest(AIJobTestMixin, TestCase):
+    """Test schedule_batch_reports"""
+
+    def setUp(self):
+        super().setUp()
+        self.config.enable_batch_reporting = True
+        self.config.batch_modalities = ['XR']
+        self.config.batch_start_hour = 20
+        self.config.batch_end_hour = 7
+        self.config.batch_concurrency = 2
+        self.config.save()
+        self.night = timezone.make_aware(datetime(2025, 3, 4, 23, 0))
+
+    def test_batch_window(self):
+        self.assertTrue(self.config.batch_window_open(self.night))
+        self.assertTrue(self.config.batch_window_open(self.night.replace(hour=6)))
+        self.assertFalse(self.config.batch_window_open(self.night.replace(hour=12)))
+
+    def test_queues_completed_examinations_up_to_concurrency(self):
+        first = self._examination(exam_status='COMPLETED')
+        second = self._examination(exam_status='COMPLETED')
+        third = self._examination(exam_status='COMPLETED')
+        self._examination()  # Not completed
+        ct = Exam.objects.create(
+            exam='CT Brain', modaliti=Modaliti.objects.create(nama='CT Scan', singkatan='CT'), part=self.exam.part
+        )
+        self._examination(exam=ct, exam_status='COMPLETED')  # Modality not configured
+
+        self.assertEqual(schedule_batch_reports(self.night), 2)
+        jobs = AIReportJob.objects.order_by('created')
+        self.assertEqual([job.pemeriksaan_id for job in jobs], [first.pk, second.pk])
+        self.assertEqual({job.priority for job in jobs}, {4})
+
+        # Concurrency reached, then the next examination once a slot frees up
+        self.assertEqual(schedule_batch_reports(self.night), 0)
+        jobs.filter(pemeriksaan=first).update(status='completed')
+        self.assertEqual(schedule_batch_reports(self.night), 1)
+        self.assertTrue(AIReportJob.objects.filter(pemeriksaan=third).exists())
+        self.assertEqual(schedule_batch_reports(self.night), 0)
+
+    def test_waits_for_off_peak_and_requested_jobs(self):
+        self._examination(exam_status='COMPLETED')
+        self.assertEqual(schedule_batch_reports(self.night.replace(hour=12)), 0)
+
+        enqueue_ai_report(self._examination(), requested_by=self.user)
+        self.assertEqual(schedule_batch_reports(self.night), 0)
+
+        self.config.enable_batch_reporting = False
+        self.config.save()
+        AIReportJob.objects.update(status='completed')
+        self.assertEqual(schedule_batch_reports(self.night), 0)
+
+
+class AIJobAPITest(AIJobTestMixin, TestCase):
+    """Test the generate endpoints queue jobs instead of generating in the request"""
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_superuser = True
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @patch('exam.ai_services.AIReportingService')
+    def test_generate_queues_job(self, service_class):
+        examination = self._examination()
+        response = self.client.post(
+            '/api/ai-reporting/generate/', {'examination_number': examination.no_xray}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 202)
+        service_class.assert_not_called()
+        job_id = response.data['job']['id']
+        self.assertEqual(response.data['report']['generation_status'], 'queued')
+
+        poll = self.client.get(f'/api/ai-reporting/jobs/{job_id}/')
+        self.assertEqual(poll.status_code, 200)
+        self.assertEqual(poll.data['status'], 'queued')
+
+        # Already queued
+        response = self.client.post(
+            '/api/ai-reporting/ai-reports/generate_report/', {'pemeriksaan_id': examination.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['generation_status'], 'queued')
@@ -0,0 +1,126 @@
+"""
+Unit tests for streamed AI report generation
+
+Tests reading Ollama's NDJSON stream, relaying partial text to the report's
+channel-layer group and the AIReportStreamConsumer WebSocket.
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from ..ai_services import OllamaAIService
+from ..ai_streaming import ReportStreamRelay, ai_report_stream_group
+from ..routing import websocket_urlpatterns
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def ndjson_response(chunks, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+    response.iter_lines.return_value = [json.dumps(chunk).encode() for chunk in chunks]
+    response.__enter__.return_value = response
+    return response
+
+
+class OllamaStreamingTest(SimpleTestCase):
+    """Test OllamaAIService._generate_with_ollama with on_text"""
+
+    def setUp(self):
+        config = MagicMock(ollama_server_url='http://ollama:11434', max_processing_time_seconds=60)
+        with patch('exam.ai_services.requests.get', return_value=MagicMock(status_code=200)):
+            self.service = OllamaAIService(config)
+
+    @patch('exam.ai_services.requests.post')
+    def test_stream_accumulates_text(self, post):
+        post.return_value = ndjson_response([
+            {'response': 'FINDINGS:', 'done': False},
+            {'response': ' Clear lungs.', 'done': False},
+            {'response': '', 'done': True, 'eval_count': 3, 'prompt_eval_count': 12},
+        ])
+        seen = []
+
+        result = self.service._generate_with_ollama('meditron:7b', 'prompt', on_text=seen.append)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['response'], 'FINDINGS: Clear lungs.')
+        self.assertEqual(result['token_count'], 3)
+        self.assertEqual(seen, ['FINDINGS:', 'FINDINGS: Clear lungs.'])
+        self.assertTrue(post.call_args.kwargs['json']['stream'])
+        self.assertTrue(post.call_args.kwargs['stream'])
+
+    @patch('exam.ai_services.requests.post')
+    def test_stream_error_chunk(self, post):
+        post.return_value = ndjson_response([{'error': 'model not found'}])
+
+        result = self.service._generate_with_ollama('missing:7b', 'prompt', on_text=lambda text: None)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'model not found')
+
+    @patch('exam.ai_services.requests.post')
+    def test_without_on_text_is_not_streamed(self, post):
+        post.return_value = MagicMock(status_code=200, json=lambda: {'response': 'Done', 'eval_count': 1})
+
+        result = self.service._generate_with_ollama('meditron:7b', 'prompt')
+
+        self.assertEqual(result['response'], 'Done')
+        self.assertFalse(post.call_args.kwargs['json']['stream'])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ReportStreamRelayTest(SimpleTestCase):
+    """Test partial text relayed to the report group and the WebSocket consumer"""
+
+    def setUp(self):
+        cache.clear()
+        self.parse_sections = OllamaAIService._parse_report_sections.__get__(MagicMock())
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_partial_messages_throttled_with_sections(self):
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(ai_report_stream_group(7), channel)
+
+        relay = ReportStreamRelay(7, parse_sections=self.parse_sections)
+        relay.partial('generating_report', 'FINDINGS:\nClear lungs.')
+        relay.partial('generating_report', 'FINDINGS:\nClear lungs.\nIMPRESSION:')  # Within the interval
+        relay.done('completed')
+
+        partial = async_to_sync(channel_layer.receive)(channel)['message']
+        self.assertEqual(partial['type'], 'partial')
+        self.assertEqual(partial['sections']['findings'], 'Clear lungs.')
+        done = async_to_sync(channel_layer.receive)(channel)['message']
+        self.assertEqual(done, {'type': 'done', 'generation_status': 'completed'})
+
+    async def test_consumer_requires_authentication(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/ai-reports/7/stream/')
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    @patch('rest_framework_simplejwt.tokens.AccessToken')
+    async def test_consumer_catches_up_and_relays(self, access_token):
+        relay = ReportStreamRelay(7, parse_sections=self.parse_sections)
+        await cache.aset(relay.cache_key, {'type': 'partial', 'stage': 'analyzing_images', 'text': 'Technical'})
+
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/ai-reports/7/stream/?token=abc')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        access_token.assert_called_once_with('abc')
+        self.assertEqual((await communicator.receive_json_from())['text'], 'Technical')
+
+        await get_channel_layer().group_send(ai_report_stream_group(7), {
+            'type': 'report.stream', 'message': {'type': 'done', 'generation_status': 'completed'}
+        })
+        self.assertEqual((await communicator.receive_json_from())['type'], 'done')
+        await communicator.disconnect()
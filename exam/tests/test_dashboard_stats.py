@@ -0,0 +1,340 @@
+"""
+Unit tests for the cached dashboard statistics
+
+Tests the per-period counts, incremental updates of the cached snapshot, the
+daily rollup behind them, the demographics query and the live updates sent to
+DashboardConsumer WebSockets.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..dashboard_rollup import (
+    day_range, defer_rollups, distribution, get_period_dates, local_date, rebuild_day, rebuild_pending_days
+)
+from ..consumers import DashboardConsumer, sampler
+from ..dashboard_stats import (
+    DASHBOARD_BROADCAST_LOCK_KEY, DASHBOARD_BROADCAST_PENDING_KEY, DASHBOARD_GROUP, broadcast_dashboard_stats,
+    get_dashboard_stats, compute_dashboard_stats, compute_demographics, send_pending_dashboard_stats
+)
+from ..models import (
+    Daftar, DashboardDailyRollup, DashboardRollupDate, DashboardRollupPendingDate, Exam, Modaliti, Part, Pemeriksaan
+)
+from pesakit.models import Pesakit
+from wad.models import Ward
+
+User = get_user_model()
+
+
+class DashboardStatsTest(TestCase):
+    """Test get_dashboard_stats"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.ward = Ward.objects.create(wad='Test Ward')
+        modaliti = Modaliti.objects.create(nama='X-Ray', singkatan='XR')
+        self.exam = Exam.objects.create(exam='Chest X-Ray', modaliti=modaliti, part=Part.objects.create(part='CHEST'))
+        self.patient = Pesakit.objects.create(nama='Test Patient', nric='990101-01-1234', jantina='L', jxr=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _register(self, tarikh, exams=1, **kwargs):
+        study = Daftar.objects.create(pesakit=self.patient, rujukan=self.ward, tarikh=tarikh, jxr=self.user, **kwargs)
+        for _ in range(exams):
+            Pemeriksaan.objects.create(daftar=study, exam=self.exam, jxr=self.user)
+        return study
+
+    def test_period_counts(self):
+        """Rows are counted in the periods their dates fall into"""
+        now = timezone.now()
+        self._register(now, exams=2, study_status='COMPLETED')
+        self._register(now - timedelta(days=10))
+        self._register(now - timedelta(days=400))
+
+        stats = compute_dashboard_stats(now)['stats']
+
+        self.assertEqual(stats['today']['registrations'], 1)
+        self.assertEqual(stats['today']['examinations'], 2)
+        self.assertEqual(stats['today']['studies_completed'], 1)
+        self.assertEqual(stats['week']['examinations'], 2)
+        self.assertEqual(stats['month']['registrations'], 2)
+        self.assertEqual(stats['all_time']['registrations'], 3)
+        self.assertEqual(stats['all_time']['examinations'], 4)
+        self.assertEqual(stats['all_time']['patients'], 1)
+        self.assertEqual(stats['today']['cases_per_day'], 2.0)
+
+    def test_recount_queries(self):
+        """A recount is a pending-date check and three aggregate queries, a cached read is none"""
+        with CaptureQueriesContext(connection) as queries:
+            get_dashboard_stats()
+        self.assertEqual(len(queries.captured_queries), 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            get_dashboard_stats()
+        self.assertEqual(len(queries.captured_queries), 0)
+
+    def test_new_rows_update_cached_snapshot(self):
+        """Created rows are added to the cache without a recount"""
+        before = get_dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._register(timezone.now(), exams=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            after = get_dashboard_stats()
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertEqual(after['today']['registrations'], before['today']['registrations'] + 1)
+        self.assertEqual(after['week']['examinations'], before['week']['examinations'] + 3)
+        self.assertEqual(after['all_time']['examinations'], before['all_time']['examinations'] + 3)
+        self.assertEqual(after, compute_dashboard_stats()['stats'])
+
+    def test_status_change_invalidates(self):
+        """Updating a registration forces a recount"""
+        study = self._register(timezone.now())
+        get_dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            study.study_status = 'COMPLETED'
+            study.save()
+
+        self.assertEqual(get_dashboard_stats()['today']['studies_completed'], 1)
+
+
+class DashboardDemographicsTest(TestCase):
+    """Test compute_demographics and Pesakit.tarikh_lahir"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def _patient(self, nric, **kwargs):
+        return Pesakit.objects.create(nama='Test', nric=nric, jxr=self.user, **kwargs)
+
+    def test_tarikh_lahir_derived_on_save(self):
+        """NRIC dates are stored with the right century, umur ages are estimated"""
+        self.assertEqual(self._patient('600101-01-1234').tarikh_lahir.year, 1960)
+        self.assertEqual(self._patient('150101-01-1234').tarikh_lahir.year, 2015)
+        patient = self._patient('A1234567', umur='40Y')
+        self.assertEqual(patient.tarikh_lahir.year, timezone.localdate().year - 40)
+        self.assertIsNone(self._patient('B7654321').tarikh_lahir)
+
+    def test_single_query_buckets(self):
+        """Age, gender and race buckets for all periods come from one query"""
+        self._patient('150101-01-1234', jantina='P', bangsa='Cina')
+        self._patient('800101-01-1235')
+        self._patient('500101-01-1235')
+        self._patient('A1234567', umur='tua')
+
+        with CaptureQueriesContext(connection) as queries:
+            demographics = compute_demographics()['by_period']
+        self.assertEqual(len(queries.captured_queries), 1)
+
+        all_time = demographics['all_time']
+        self.assertEqual({g['range']: g['count'] for g in all_time['age_groups']}, {'0-17': 1, '18-65': 2, '65+': 1})
+        self.assertEqual({g['gender']: g['count'] for g in all_time['gender']}, {'M': 3, 'F': 1})
+        self.assertEqual({r['race']: r['percentage'] for r in all_time['race']}, {'Melayu': 75.0, 'Cina': 25.0})
+        self.assertEqual(demographics['today'], all_time)
+
+
+class DashboardRollupTest(TestCase):
+    """Test the daily rollup behind the dashboard endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.ward = Ward.objects.create(wad='Test Ward')
+        self.xr = Modaliti.objects.create(nama='X-Ray', singkatan='XR')
+        self.ct = Modaliti.objects.create(nama='CT Scan', singkatan='CT')
+        chest = Part.objects.create(part='CHEST')
+        self.chest_xr = Exam.objects.create(exam='Chest X-Ray', modaliti=self.xr, part=chest)
+        self.chest_ct = Exam.objects.create(exam='CT Thorax', modaliti=self.ct, part=chest)
+        self.patient = Pesakit.objects.create(nama='Test Patient', nric='990101-01-1234', jantina='L', jxr=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _register(self, tarikh, exams):
+        study = Daftar.objects.create(pesakit=self.patient, rujukan=self.ward, tarikh=tarikh, jxr=self.user)
+        for exam in exams:
+            Pemeriksaan.objects.create(daftar=study, exam=exam, jxr=self.user)
+        return study
+
+    def _totals(self, **filters):
+        if not filters:
+            rebuild_pending_days()
+        rows = DashboardDailyRollup.objects.filter(**filters)
+        return {
+            field: sum(rows.values_list(field, flat=True))
+            for field in ('examinations', 'registrations', 'studies_completed')
+        }
+
+    def test_rollup_follows_changes(self):
+        """Creates, status changes and deletes are reflected in the rollup"""
+        study = self._register(timezone.now(), [self.chest_xr, self.chest_ct])
+        self._register(timezone.now() - timedelta(days=3), [self.chest_xr])
+        self.assertEqual(self._totals(), {'examinations': 3, 'registrations': 2, 'studies_completed': 0})
+
+        study.study_status = 'COMPLETED'
+        study.save()
+        self.assertEqual(self._totals()['studies_completed'], 1)
+
+        study.pemeriksaan.first().delete()
+        self.assertEqual(self._totals()['examinations'], 2)
+        study.delete()
+        self.assertEqual(self._totals(), {'examinations': 1, 'registrations': 1, 'studies_completed': 0})
+
+    def test_modality_distribution(self):
+        """Endpoints sum rollup rows per dimension"""
+        self._register(timezone.now(), [self.chest_xr, self.chest_xr, self.chest_ct])
+        self._register(timezone.now() - timedelta(days=40), [self.chest_ct])
+
+        modalities = distribution('modaliti__nama', 'modality', get_period_dates())
+
+        self.assertEqual(
+            [(m['modality'], m['count'], m['percentage']) for m in modalities['today']],
+            [('X-RAY', 2, 66.7), ('CT SCAN', 1, 33.3)]
+        )
+        self.assertEqual({m['modality']: m['count'] for m in modalities['all_time']}, {'X-RAY': 2, 'CT SCAN': 2})
+        self.assertEqual(modalities['month'], modalities['today'])
+
+    def test_writes_only_mark_dates_pending(self):
+        """Saves leave the rollup rows alone and queue their date for the next read"""
+        with CaptureQueriesContext(connection) as queries:
+            study = self._register(timezone.now(), [self.chest_xr])
+        self.assertFalse(any('exam_dashboarddailyrollup' in q['sql'] for q in queries.captured_queries))
+        self.assertTrue(DashboardRollupPendingDate.objects.filter(date=local_date(study.tarikh)).exists())
+
+        self.assertEqual(self._totals()['examinations'], 1)
+        self.assertFalse(DashboardRollupPendingDate.objects.exists())
+
+        # Patient saves that keep gender and age leave the rollup alone
+        self.patient.nama = 'Renamed Patient'
+        self.patient.save()
+        self.assertFalse(DashboardRollupPendingDate.objects.exists())
+        self.patient.jantina = 'P'
+        self.patient.save()
+        self.assertEqual(list(DashboardRollupPendingDate.objects.values_list('date', flat=True)), [local_date(study.tarikh)])
+
+    def test_defer_rollups_marks_once(self):
+        """A bulk registration marks its date once"""
+        with CaptureQueriesContext(connection) as queries, defer_rollups():
+            self._register(timezone.now(), [self.chest_xr] * 5)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "exam_dashboardrolluppendingdate"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self._totals()['examinations'], 5)
+
+    def test_rebuild_counts_local_day(self):
+        """A date is rebuilt from the registrations of that local day only, under its lock row"""
+        day = timezone.localdate() - timedelta(days=5)
+        start, end = day_range(day)
+        self._register(start, [self.chest_xr])
+        self._register(end - timedelta(seconds=1), [self.chest_ct])
+        self._register(end, [self.chest_xr])
+
+        DashboardDailyRollup.objects.all().delete()
+        rebuild_day(day)
+        self.assertEqual(self._totals(date=day), {'examinations': 2, 'registrations': 2, 'studies_completed': 0})
+        self.assertFalse(DashboardRollupPendingDate.objects.filter(date=day).exists())
+        self.assertTrue(DashboardRollupDate.objects.filter(date=day).exists())
+
+    def test_rebuild_command(self):
+        """The management command reproduces the signal-maintained rollup"""
+        self._register(timezone.now(), [self.chest_xr])
+        self._register(timezone.now() - timedelta(days=100), [self.chest_ct, self.chest_xr])
+        expected = self._totals()
+        DashboardDailyRollup.objects.all().delete()
+
+        call_command('rebuild_dashboard_rollups', '--all', stdout=StringIO())
+
+        self.assertEqual(self._totals(), expected)
+
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, DASHBOARD_SAMPLE_INTERVAL=60)
+class DashboardBroadcastTest(TestCase):
+    """Test the counters pushed to the dashboard group from model signals"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.ward = Ward.objects.create(wad='Test Ward')
+        self.patient = Pesakit.objects.create(nama='Test Patient', nric='990101-01-1234', jantina='L', jxr=self.user)
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(DASHBOARD_GROUP, self.channel)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _receive(self):
+        return async_to_sync(self.channel_layer.receive)(self.channel)
+
+    def test_registration_broadcasts_counters(self):
+        """A new registration sends the updated counters after commit"""
+        get_dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Daftar.objects.create(pesakit=self.patient, rujukan=self.ward, tarikh=timezone.now(), jxr=self.user)
+
+        message = self._receive()
+        self.assertEqual(message['type'], 'dashboard.update')
+        self.assertEqual(message['message_type'], 'dashboard_stats')
+        self.assertEqual(message['data']['today']['registrations'], 1)
+
+    def test_broadcasts_are_throttled(self):
+        """Changes within one interval are left for the sampler's trailing update"""
+        broadcast_dashboard_stats()
+        broadcast_dashboard_stats()
+        self.assertEqual(self._receive()['message_type'], 'dashboard_stats')
+        self.assertTrue(cache.get(DASHBOARD_BROADCAST_PENDING_KEY))
+
+        self.assertTrue(send_pending_dashboard_stats())
+        self.assertEqual(self._receive()['message_type'], 'dashboard_stats')
+        self.assertFalse(send_pending_dashboard_stats())
+
+    @override_settings(DASHBOARD_LIVE_UPDATES=False)
+    def test_disabled(self):
+        broadcast_dashboard_stats()
+        self.assertIsNone(cache.get(DASHBOARD_BROADCAST_LOCK_KEY))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, DASHBOARD_SAMPLE_INTERVAL=60)
+class DashboardConsumerTest(SimpleTestCase):
+    """Test DashboardConsumer group delivery and the shared sampler"""
+
+    async def test_group_messages_and_shared_sampler(self):
+        first = WebsocketCommunicator(DashboardConsumer.as_asgi(), '/ws/dashboard/')
+        second = WebsocketCommunicator(DashboardConsumer.as_asgi(), '/ws/dashboard/')
+        self.assertTrue((await first.connect())[0])
+        self.assertTrue((await second.connect())[0])
+
+        # Two connections, one sampler task
+        self.assertEqual(sampler.subscribers, 2)
+        task = sampler.task
+        self.assertIsNotNone(task)
+
+        await get_channel_layer().group_send(DASHBOARD_GROUP, {
+            'type': 'dashboard.update', 'message_type': 'system_resources', 'data': {'cpu_usage_percent': 5.0}
+        })
+        for communicator in (first, second):
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': 'system_resources', 'data': {'cpu_usage_percent': 5.0}}
+            )
+
+        await first.disconnect()
+        self.assertIs(sampler.task, task)
+        await second.disconnect()
+        self.assertEqual(sampler.subscribers, 0)
+        self.assertIsNone(sampler.task)
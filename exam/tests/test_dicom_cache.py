@@ -0,0 +1,141 @@
+"""
+Unit tests for the local DICOM instance/frame cache
+
+Tests stream-through storage, LRU eviction and hit-rate counters of
+DicomFileCache, and cache use by the frame proxy.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch, Mock
+
+from django.test import TestCase, RequestFactory, override_settings
+
+from ..dicom_cache import DicomFileCache, parse_range_header, RangeNotSatisfiable
+from ..models import PacsConfig
+from ..orthanc_client import reset_orthanc_clients
+
+
+class DicomFileCacheTest(TestCase):
+    """Test DicomFileCache storage and eviction"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = DicomFileCache(root=self.root, max_bytes=1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _store(self, orthanc_id, data, kind='file'):
+        return b''.join(self.cache.stream_and_store(orthanc_id, kind, [data[:10], data[10:]]))
+
+    def test_stream_and_store_passes_through(self):
+        """Chunks reach the caller unchanged and are committed to disk"""
+        data = b'D' * 300
+        self.assertEqual(self._store('abc-123', data), data)
+        with open(self.cache.path_for('abc-123'), 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_aborted_stream_not_committed(self):
+        """A download that stops early leaves no entry"""
+        stream = self.cache.stream_and_store('abc-123', 'file', [b'a' * 100, b'b' * 100])
+        next(stream)
+        stream.close()
+        self.assertIsNone(self.cache.get('abc-123'))
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.path_for('abc-123'))), [])
+
+    def test_hit_rate_counters(self):
+        """Misses and hits are counted"""
+        self.assertIsNone(self.cache.get('abc-123'))
+        self._store('abc-123', b'x' * 100)
+        self.assertIsNotNone(self.cache.get('abc-123'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted once over budget"""
+        self._store('old', b'o' * 400)
+        self._store('used', b'u' * 400)
+        past = time.time() - 100
+        os.utime(self.cache.path_for('old'), (past, past))
+        os.utime(self.cache.path_for('used'), (past + 1, past + 1))
+        # Touch 'old' so 'used' becomes the least recently used entry
+        self.cache.get('old')
+
+        self._store('new', b'n' * 400)
+
+        self.assertIsNotNone(self.cache.get('old'))
+        self.assertIsNotNone(self.cache.get('new'))
+        self.assertIsNone(self.cache.get('used'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_range_response_from_cache(self):
+        """A single byte range is served as 206 from the cached file"""
+        self._store('abc-123', bytes(range(200)))
+        response = self.cache.response('abc-123', range_header='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, bytes(range(10, 20)))
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/200')
+
+    def test_parse_range_header(self):
+        """Open-ended, suffix and invalid ranges"""
+        self.assertEqual(parse_range_header('bytes=100-', 200), (100, 199))
+        self.assertEqual(parse_range_header('bytes=-50', 200), (150, 199))
+        self.assertEqual(parse_range_header('bytes=0-999', 200), (0, 199))
+        self.assertIsNone(parse_range_header('bytes=0-1,5-6', 200))
+        self.assertIsNone(parse_range_header('items=0-1', 200))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range_header('bytes=500-600', 200)
+
+    def test_ids_are_sanitised(self):
+        """Path components from the URL cannot escape the cache root"""
+        path = self.cache.path_for('../../etc/passwd')
+        self.assertTrue(os.path.abspath(path).startswith(os.path.abspath(self.root)))
+
+
+class FrameProxyCacheTest(TestCase):
+    """Test configurable_dicom_frames serving from the cache"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        reset_orthanc_clients()
+        PacsConfig.objects.create(
+            orthancurl='http://orthanc.example.com:8042',
+            viewrurl='http://orthanc.example.com:3000/viewer'
+        )
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        reset_orthanc_clients()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_second_request_served_from_cache(self, mock_get):
+        """A cached frame is served without any Orthanc request"""
+        from ..configurable_pacs_views import configurable_dicom_frames
+
+        def orthanc_get(path, **kwargs):
+            if path.endswith('/frames/0/raw'):
+                response = Mock(ok=True, status_code=200)
+                response.iter_content.return_value = iter([b'p' * 2048])
+                return response
+            response = Mock(ok=True, status_code=200)
+            response.json.return_value = {'MainDicomTags': {'NumberOfFrames': '1'}}
+            return response
+        mock_get.side_effect = orthanc_get
+
+        with override_settings(DICOM_CACHE_DIR=self.root):
+            request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer token')
+            first = configurable_dicom_frames(request, 'instance-1', 1)
+            self.assertEqual(b''.join(first.streaming_content), b'p' * 2048)
+            calls = mock_get.call_count
+
+            second = configurable_dicom_frames(request, 'instance-1', 1)
+            self.assertEqual(b''.join(second.streaming_content), b'p' * 2048)
+            second.close()
+
+        self.assertEqual(mock_get.call_count, calls)
+        self.assertEqual(second['X-Cache'], 'HIT')
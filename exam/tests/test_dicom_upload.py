@@ -0,0 +1,261 @@
+"""
+Unit tests for the DICOM upload pipeline
+
+Tests header-only parsing, concurrent upload to Orthanc over the pooled
+client, the synchronous upload endpoint and background upload jobs with their
+progress stream.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import pydicom
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, SecondaryCaptureImageStorage, generate_uid
+from rest_framework.test import APIClient
+
+from ..dicom_upload import dicom_upload_cache_key, read_dicom_header, run_upload_job, upload_to_orthanc
+from ..models import Daftar, DicomUploadJob, PacsConfig, Pemeriksaan
+from ..orthanc_client import OrthancPACSClient, reset_orthanc_clients
+from ..routing import websocket_urlpatterns
+
+User = get_user_model()
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def dicom_file(instance_number=1, **tags):
+    """A small secondary capture instance as bytes"""
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = SecondaryCaptureImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = SecondaryCaptureImageStorage
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.PatientName = 'UPLOAD^PATIENT'
+    ds.PatientID = '900101015554'
+    ds.PatientSex = 'F'
+    ds.StudyInstanceUID = '1.2.826.0.1.3680043.8.498.1'
+    ds.SeriesInstanceUID = '1.2.826.0.1.3680043.8.498.1.1'
+    ds.StudyDate = '20250801'
+    ds.AccessionNumber = '42'
+    ds.Modality = 'CR'
+    ds.BodyPartExamined = 'CHEST'
+    ds.InstanceNumber = instance_number
+    ds.Rows = ds.Columns = 2
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = 'MONOCHROME2'
+    ds.BitsAllocated = ds.BitsStored = 8
+    ds.HighBit = 7
+    ds.PixelRepresentation = 0
+    ds.PixelData = b'\0' * 4
+    for keyword, value in tags.items():
+        setattr(ds, keyword, value)
+
+    buffer = BytesIO()
+    pydicom.dcmwrite(buffer, ds, enforce_file_format=True)
+    return buffer.getvalue()
+
+
+def orthanc_response(status_code=200, orthanc_id='abc'):
+    return MagicMock(status_code=status_code, json=lambda: {'ID': orthanc_id, 'Status': 'Success'})
+
+
+class DicomUploadPipelineTest(TestCase):
+    """Test read_dicom_header and upload_to_orthanc"""
+
+    def setUp(self):
+        reset_orthanc_clients()
+        PacsConfig.objects.create(
+            orthancurl='http://orthanc.example.com:8042',
+            viewrurl='http://orthanc.example.com:3000/viewer'
+        )
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        reset_orthanc_clients()
+
+    def spool(self, name, content):
+        path = os.path.join(self.spool_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return {'filename': name, 'temp_path': path}
+
+    def test_header_read_stops_before_pixels(self):
+        file_data = self.spool('one.dcm', dicom_file())
+
+        dcm = read_dicom_header(file_data['temp_path'])
+
+        self.assertEqual(dcm.PatientID, '900101015554')
+        self.assertEqual(dcm.BodyPartExamined, 'CHEST')
+        self.assertNotIn('PixelData', dcm)
+
+    @patch.object(OrthancPACSClient, 'post', autospec=True)
+    def test_upload_posts_raw_instances_in_order(self, post):
+        files = [self.spool(f'{number}.dcm', dicom_file(number)) for number in range(5)]
+        post.side_effect = lambda client, path, data, headers: (
+            orthanc_response(500) if data == open(files[2]['temp_path'], 'rb').read() else orthanc_response()
+        )
+        seen = []
+
+        results = upload_to_orthanc(files, on_result=seen.append)
+
+        self.assertEqual([result['filename'] for result in results], [f'{number}.dcm' for number in range(5)])
+        self.assertEqual([result['status'] for result in results], ['uploaded', 'uploaded', 'failed', 'uploaded', 'uploaded'])
+        self.assertEqual(results[2]['error'], 'HTTP 500')
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(post.call_count, 5)
+        self.assertEqual(post.call_args.args[1], '/instances')
+        self.assertEqual(post.call_args.kwargs['headers'], {'Content-Type': 'application/dicom'})
+
+    @patch('exam.dicom_upload.invalidate_study_manifest')
+    @patch.object(OrthancPACSClient, 'post', autospec=True)
+    def test_upload_drops_cached_study_manifests(self, post, invalidate):
+        files = [dict(self.spool(f'{number}.dcm', dicom_file(number)), study_instance_uid='1.2.3') for number in range(2)]
+        post.return_value = orthanc_response()
+
+        upload_to_orthanc(files)
+
+        invalidate.assert_called_once_with(PacsConfig.objects.get(), '1.2.3')
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class UploadDicomFilesViewTest(TestCase):
+    """Test upload_dicom_files in synchronous and background mode"""
+
+    def setUp(self):
+        cache.clear()
+        reset_orthanc_clients()
+        PacsConfig.objects.create(
+            orthancurl='http://orthanc.example.com:8042',
+            viewrurl='http://orthanc.example.com:3000/viewer'
+        )
+        self.user = User.objects.create_user(username='radiographer', password='testpass123', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+        reset_orthanc_clients()
+
+    def upload_files(self, count=3):
+        return [
+            SimpleUploadedFile(f'image{number}.dcm', dicom_file(number), content_type='application/dicom')
+            for number in range(count)
+        ]
+
+    @patch('audit.signals.get_current_user', return_value=None)  # A failed audit insert would break the test transaction
+    @patch.object(OrthancPACSClient, 'post', autospec=True, return_value=orthanc_response())
+    def test_synchronous_upload(self, post, current_user):
+        response = self.client.post('/api/upload/dicom/', {'dicom_files': self.upload_files()}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['examination_count'], 3)
+        self.assertEqual(response.data['data']['daftars_created'], 1)
+        self.assertEqual(response.data['data']['pacs_status'], 'uploaded')
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(Pemeriksaan.objects.count(), 3)
+
+    def test_invalid_file_rejected(self):
+        bad = SimpleUploadedFile('notes.txt', b'not a dicom file')
+
+        response = self.client.post('/api/upload/dicom/', {'dicom_files': [bad]}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid DICOM file: notes.txt')
+        self.assertFalse(Daftar.objects.exists())
+
+    @patch.object(OrthancPACSClient, 'post', autospec=True, return_value=orthanc_response())
+    def test_background_upload(self, post):
+        executor = MagicMock()
+
+        def run_now(fn, *args):
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+        executor.submit.side_effect = run_now
+
+        with patch('exam.dicom_upload._job_executor', return_value=executor), \
+                patch('exam.dicom_upload.close_old_connections'), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/upload/dicom/', {'dicom_files': self.upload_files(), 'background': 'true'}, format='multipart'
+            )
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job']['id']
+        self.assertEqual(response.data['job']['status'], 'queued')
+        self.assertEqual(response.data['progress_url'], f'/ws/dicom-uploads/{job_id}/progress/')
+
+        status_response = self.client.get(f'/api/upload/dicom/jobs/{job_id}/')
+        self.assertEqual(status_response.data['status'], 'completed')
+        self.assertEqual(status_response.data['uploaded_files'], 3)
+        self.assertEqual(status_response.data['result']['data']['examination_count'], 3)
+        self.assertEqual(cache.get(dicom_upload_cache_key(job_id)), {'type': 'done', 'status': 'completed', 'error': ''})
+
+    def test_stale_running_job_failed(self):
+        job = DicomUploadJob.objects.create(total_files=1, status='running', requested_by=self.user)
+        DicomUploadJob.objects.filter(pk=job.pk).update(heartbeat_at='2000-01-01T00:00:00Z')
+
+        response = self.client.get(f'/api/upload/dicom/jobs/{job.pk}/')
+
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertEqual(response.data['error'], 'Upload worker stopped responding')
+
+    def test_stale_queued_job_failed(self):
+        spool_dir = tempfile.mkdtemp()
+        job = DicomUploadJob.objects.create(total_files=1, spool_dir=spool_dir, requested_by=self.user)
+        DicomUploadJob.objects.filter(pk=job.pk).update(created='2000-01-01T00:00:00Z')
+
+        response = self.client.get(f'/api/upload/dicom/jobs/{job.pk}/')
+
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertFalse(os.path.exists(spool_dir))
+
+        # A worker picking the job up afterwards leaves it failed
+        with patch('exam.dicom_upload.close_old_connections'):
+            run_upload_job(job.pk, spool_dir, [], {}, self.user.pk)
+        self.assertEqual(DicomUploadJob.objects.get(pk=job.pk).status, 'failed')
+
+    def test_job_hidden_from_other_users(self):
+        job = DicomUploadJob.objects.create(total_files=1, requested_by=self.user)
+        other = User.objects.create_user(username='clerk', password='testpass123')
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.client.get(f'/api/upload/dicom/jobs/{job.pk}/').status_code, 404)
+
+        DicomUploadJob.objects.filter(pk=job.pk).update(requested_by=other)
+        self.assertEqual(self.client.get(f'/api/upload/dicom/jobs/{job.pk}/').status_code, 200)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class DicomUploadProgressConsumerTest(SimpleTestCase):
+    """Test the upload progress WebSocket"""
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('rest_framework_simplejwt.tokens.AccessToken')
+    async def test_consumer_catches_up(self, access_token):
+        progress = {'type': 'progress', 'stage': 'uploading', 'total': 3, 'read': 3, 'uploaded': 1, 'failed': 0}
+        await cache.aset(dicom_upload_cache_key(9), progress)
+
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/dicom-uploads/9/progress/?token=abc')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_json_from(), progress)
+        await communicator.disconnect()
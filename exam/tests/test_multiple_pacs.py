@@ -7,7 +7,7 @@ for managing and searching across multiple PACS servers.
 
 import json
 from unittest.mock import patch, Mock, MagicMock
-from django.test import TestCase, TransactionTestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
@@ -383,8 +383,8 @@ class MultiplePacsSearchTest(APITestCase):
         refresh = RefreshToken.for_user(user)
         return str(refresh.access_token)
     
-    @patch('exam.pacs_management_views.requests.post')
-    @patch('exam.pacs_management_views.requests.get')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
     def test_multiple_pacs_search_success(self, mock_get, mock_post):
         """Test successful multiple PACS search"""
         # Mock Orthanc find request
@@ -424,7 +424,7 @@ class MultiplePacsSearchTest(APITestCase):
         self.assertEqual(study['protocolName'], 'CHEST CT')
         self.assertEqual(study['manufacturer'], 'SIEMENS')
     
-    @patch('exam.pacs_management_views.requests.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
     def test_multiple_pacs_search_with_server_error(self, mock_post):
         """Test multiple PACS search with one server failing"""
         # First server succeeds, second fails
@@ -443,7 +443,7 @@ class MultiplePacsSearchTest(APITestCase):
         self.assertEqual(len(response.data['studies']), 1)  # Only from successful server
         self.assertEqual(len(response.data['server_errors']), 1)  # One server error
     
-    @patch('exam.pacs_management_views.requests.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
     def test_multiple_pacs_search_pagination(self, mock_post):
         """Test pagination in multiple PACS search"""
         # Return multiple studies from each server
@@ -484,7 +484,7 @@ class MultiplePacsSearchTest(APITestCase):
         self.assertEqual(len(response.data['studies']), 0)
         self.assertEqual(len(response.data['servers_searched']), 0)
     
-    @patch('exam.pacs_management_views.requests.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
     def test_multiple_pacs_search_specific_servers(self, mock_post):
         """Test multiple PACS search with specific server IDs"""
         mock_post.return_value.ok = True
@@ -504,6 +504,94 @@ class MultiplePacsSearchTest(APITestCase):
         self.assertEqual(response.data['servers_searched'][0]['id'], self.server1.id)
 
 
+class MultiplePacsSearchDeadlineTest(TestCase):
+    """Test concurrent fan-out and deadline handling of MultiplePacsSearchView"""
+    
+    def setUp(self):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from ..pacs_management_views import MultiplePacsSearchView
+        
+        self.user = User.objects.create_user(username='deadlineuser', password='testpass123')
+        self.fast = PacsServer.objects.create(
+            name='Fast PACS',
+            orthancurl='http://fast.example.com:8042',
+            viewrurl='http://fast.example.com:3000/viewer',
+            is_active=True,
+            is_primary=True
+        )
+        self.slow = PacsServer.objects.create(
+            name='Slow PACS',
+            orthancurl='http://slow.example.com:8042',
+            viewrurl='http://slow.example.com:3000/viewer',
+            is_active=True
+        )
+        self.view = MultiplePacsSearchView.as_view()
+        self.factory = APIRequestFactory()
+        self.force_authenticate = force_authenticate
+    
+    def _post(self, data):
+        request = self.factory.post('/api/pacs/search-multiple/', data, format='json')
+        self.force_authenticate(request, user=self.user)
+        return self.view(request)
+    
+    @staticmethod
+    def _fake_search(view, server, search_params, timeout=30):
+        import time
+        if server.name == 'Slow PACS':
+            time.sleep(1)
+            return [{'id': 'slow-study', 'studyDate': '20240301'}]
+        return [
+            {'id': 'fast-old', 'studyDate': '20230101'},
+            {'id': 'fast-new', 'studyDate': '20240201'},
+        ]
+    
+    def test_slow_server_reported_as_partial(self):
+        """A server past the deadline is reported; other results are returned"""
+        from ..pacs_management_views import MultiplePacsSearchView
+        with patch.object(MultiplePacsSearchView, '_search_single_pacs', autospec=True,
+                          side_effect=self._fake_search):
+            response = self._post({'limit': 50, 'deadline': 0.2})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['partial'])
+        self.assertIn('Slow PACS', response.data['server_errors'])
+        self.assertEqual([s['id'] for s in response.data['studies']], ['fast-new', 'fast-old'])
+        self.assertEqual(len(response.data['servers_searched']), 1)
+        self.assertIn('latency_ms', response.data['servers_searched'][0])
+    
+    def test_results_merged_by_study_date(self):
+        """All servers within the deadline are merged newest first"""
+        from ..pacs_management_views import MultiplePacsSearchView
+        with patch.object(MultiplePacsSearchView, '_search_single_pacs', autospec=True,
+                          side_effect=self._fake_search):
+            response = self._post({'limit': 50, 'deadline': 5})
+        
+        self.assertFalse(response.data['partial'])
+        self.assertEqual(
+            [s['id'] for s in response.data['studies']],
+            ['slow-study', 'fast-new', 'fast-old']
+        )
+        self.assertEqual(response.data['studies'][0]['pacs_server_name'], 'Slow PACS')
+        self.assertEqual(len(response.data['servers_searched']), 2)
+    
+    def test_invalid_deadline_rejected(self):
+        """Non-numeric, null and non-positive deadlines return 400"""
+        for deadline in ['abc', None, 0, -1]:
+            response = self._post({'limit': 50, 'deadline': deadline})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, deadline)
+    
+    @override_settings(PACS_MULTI_SEARCH_DEADLINE=0.2)
+    def test_deadline_capped_by_setting(self):
+        """A larger requested deadline does not extend the configured one"""
+        from ..pacs_management_views import MultiplePacsSearchView
+        with patch.object(MultiplePacsSearchView, '_search_single_pacs', autospec=True,
+                          side_effect=self._fake_search):
+            response = self._post({'limit': 50, 'deadline': 3600})
+        
+        self.assertTrue(response.data['partial'])
+        self.assertIn('Slow PACS', response.data['server_errors'])
+
+
 class PacsHealthCheckTest(APITestCase):
     """Test PACS Server health check functionality"""
     
@@ -532,7 +620,7 @@ class PacsHealthCheckTest(APITestCase):
         refresh = RefreshToken.for_user(user)
         return str(refresh.access_token)
     
-    @patch('exam.pacs_management_views.requests.get')
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
     def test_health_check_healthy_server(self, mock_get):
         """Test health check for healthy server"""
         mock_response = Mock()
@@ -552,7 +640,7 @@ class PacsHealthCheckTest(APITestCase):
         self.assertTrue(server_health['is_active'])
         self.assertTrue(server_health['is_primary'])
     
-    @patch('exam.pacs_management_views.requests.get')
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
     def test_health_check_unreachable_server(self, mock_get):
         """Test health check for unreachable server"""
         mock_get.side_effect = ConnectionError("Connection failed")
@@ -0,0 +1,144 @@
+"""
+Unit tests for the shared Orthanc HTTP client
+
+Tests connection pool reuse, per-server client registry and request helpers
+of OrthancPACSClient with mocked HTTP sessions.
+"""
+
+from unittest.mock import patch, Mock
+
+from django.test import TestCase, override_settings
+
+from ..models import PacsServer
+from ..orthanc_client import (
+    OrthancPACSClient, get_orthanc_client, reset_orthanc_clients, instance_sort_key
+)
+
+
+class OrthancClientRegistryTest(TestCase):
+    """Test get_orthanc_client process-wide registry"""
+
+    def setUp(self):
+        reset_orthanc_clients()
+        self.primary = PacsServer.objects.create(
+            name='Primary PACS',
+            orthancurl='http://primary.example.com:8042/',
+            viewrurl='http://primary.example.com:3000/viewer',
+            is_active=True,
+            is_primary=True
+        )
+        self.secondary = PacsServer.objects.create(
+            name='Secondary PACS',
+            orthancurl='http://secondary.example.com:8042',
+            viewrurl='http://secondary.example.com:3000/viewer',
+            is_active=True
+        )
+
+    def tearDown(self):
+        reset_orthanc_clients()
+
+    def test_same_server_reuses_client(self):
+        """Repeated lookups return the same pooled client"""
+        first = get_orthanc_client(self.primary)
+        second = get_orthanc_client(PacsServer.objects.get(pk=self.primary.pk))
+        self.assertIs(first, second)
+        self.assertIs(first.session, second.session)
+
+    def test_each_server_gets_own_client(self):
+        """Different servers do not share a client"""
+        self.assertIsNot(get_orthanc_client(self.primary), get_orthanc_client(self.secondary))
+
+    def test_default_is_primary_server(self):
+        """No argument resolves to the primary server"""
+        client = get_orthanc_client()
+        self.assertEqual(client.base_url, 'http://primary.example.com:8042')
+
+    def test_url_change_creates_new_client(self):
+        """Editing orthancurl yields a fresh client"""
+        old_client = get_orthanc_client(self.secondary)
+        self.secondary.orthancurl = 'http://moved.example.com:8042'
+        self.secondary.save()
+        new_client = get_orthanc_client(self.secondary)
+        self.assertIsNot(old_client, new_client)
+        self.assertEqual(new_client.base_url, 'http://moved.example.com:8042')
+
+    def test_no_primary_server_raises(self):
+        """Missing primary server is reported as ValueError"""
+        PacsServer.objects.update(is_primary=False)
+        with self.assertRaises(ValueError):
+            get_orthanc_client()
+
+
+class OrthancClientRequestTest(TestCase):
+    """Test OrthancPACSClient request helpers"""
+
+    def setUp(self):
+        self.server = PacsServer.objects.create(
+            name='Test PACS',
+            orthancurl='http://test.example.com:8042',
+            viewrurl='http://test.example.com:3000/viewer',
+            is_active=True,
+            is_primary=True
+        )
+
+    @override_settings(ORTHANC_POOL_MAXSIZE=7, ORTHANC_MAX_RETRIES=4)
+    def test_pool_and_retry_configuration(self):
+        """Adapter picks up pool size and retry settings"""
+        client = OrthancPACSClient(self.server)
+        adapter = client.session.get_adapter('http://test.example.com:8042/system')
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter.max_retries.total, 4)
+
+    def test_request_uses_base_url_and_default_timeout(self):
+        """Paths are joined to the server URL with the configured timeout"""
+        client = OrthancPACSClient(self.server)
+        with patch.object(client.session, 'request', return_value=Mock(status_code=200)) as mock_request:
+            client.get('/studies/abc')
+        mock_request.assert_called_once_with(
+            'GET', 'http://test.example.com:8042/studies/abc', timeout=client.timeout
+        )
+
+    def test_find_builds_query_body(self):
+        """find() posts a /tools/find body"""
+        client = OrthancPACSClient(self.server)
+        with patch.object(client, 'post') as mock_post:
+            client.find('Study', {'AccessionNumber': 'KKP1'}, expand=False, limit=5)
+        mock_post.assert_called_once_with('/tools/find', json={
+            'Level': 'Study',
+            'Query': {'AccessionNumber': 'KKP1'},
+            'Expand': False,
+            'Limit': 5,
+        })
+
+    def test_get_series_instances_returns_ids(self):
+        """Series instance lookup returns Orthanc instance IDs"""
+        client = OrthancPACSClient(self.server)
+        response = Mock(status_code=200)
+        response.json.return_value = {'ID': 'series-1', 'Instances': ['i1', 'i2']}
+        with patch.object(client, 'get', return_value=response):
+            self.assertEqual(client.get_series_instances('series-1'), ['i1', 'i2'])
+
+    def test_get_instance_image_rendered_at_model_size(self):
+        """max_size asks Orthanc for a scaled rendering, falling back to the preview"""
+        client = OrthancPACSClient(self.server)
+        responses = [Mock(status_code=404), Mock(status_code=200, content=b'png')]
+        with patch.object(client, 'get', side_effect=responses) as mock_get:
+            self.assertEqual(client.get_instance_image('i1', max_size=336), b'png')
+        self.assertEqual(mock_get.call_args_list[0].args, ('/instances/i1/rendered',))
+        self.assertEqual(mock_get.call_args_list[0].kwargs['params']['width'], 336)
+        self.assertEqual(mock_get.call_args_list[1].args, ('/instances/i1/preview',))
+
+class InstanceSortKeyTest(TestCase):
+    """Test instance_sort_key ordering"""
+
+    def test_orders_by_instance_number(self):
+        """Numeric InstanceNumber wins; missing numbers go last by IndexInSeries"""
+        instances = [
+            {'ID': 'c', 'MainDicomTags': {'InstanceNumber': '10'}},
+            {'ID': 'x', 'MainDicomTags': {}, 'IndexInSeries': 2},
+            {'ID': 'a', 'MainDicomTags': {'InstanceNumber': '2'}},
+            {'ID': 'y', 'MainDicomTags': {'InstanceNumber': 'abc'}, 'IndexInSeries': 1},
+            {'ID': 'b', 'MainDicomTags': {'InstanceNumber': ' 3 '}},
+        ]
+        ordered = [instance['ID'] for instance in sorted(instances, key=instance_sort_key)]
+        self.assertEqual(ordered, ['a', 'b', 'c', 'y', 'x'])
@@ -0,0 +1,100 @@
+"""
+Unit tests for PACS study search helpers
+
+Tests series-level field enrichment and the per-study details cache with a
+mocked Orthanc client.
+"""
+
+from unittest.mock import Mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..pacs_search import get_studies_details, get_study_modality
+
+
+def _response(data, ok=True):
+    response = Mock(ok=ok, status_code=200 if ok else 500)
+    response.json.return_value = data
+    return response
+
+
+class PacsSearchDetailsTest(TestCase):
+    """Test get_studies_details"""
+
+    def setUp(self):
+        cache.clear()
+        self.client_mock = Mock(base_url='http://test.example.com:8042')
+        self.study = {
+            'ID': 'study-1',
+            'LastUpdate': '20250101T120000',
+            'MainDicomTags': {},
+            'RequestedTags': {'ModalitiesInStudy': 'CT\\SR'},
+            'Series': ['series-1', 'series-2'],
+        }
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_series_requested_tags_single_request(self):
+        """All fields come from one series request when Orthanc returns them"""
+        self.client_mock.get.return_value = _response({
+            'MainDicomTags': {'Modality': 'CT', 'Manufacturer': 'GE'},
+            'RequestedTags': {
+                'BodyPartExamined': 'CHEST',
+                'ProtocolName': 'CHEST PA',
+                'AcquisitionDeviceProcessingDescription': 'CHEST',
+                'ManufacturerModelName': 'Revolution',
+            },
+            'Instances': ['instance-1'],
+        })
+
+        details = get_studies_details(self.client_mock, [self.study])['study-1']
+
+        self.assertEqual(self.client_mock.get.call_count, 1)
+        self.assertEqual(details['modality'], 'CT')
+        self.assertEqual(details['bodyPartExamined'], 'CHEST')
+        self.assertEqual(details['manufacturer'], 'GE')
+        self.assertEqual(details['manufacturerModelName'], 'Revolution')
+
+    def test_instance_fallback_for_missing_fields(self):
+        """Instance tags fill fields the series does not carry"""
+        self.client_mock.get.side_effect = [
+            _response({'MainDicomTags': {'Modality': 'CR'}, 'Instances': ['instance-1']}),
+            _response({'MainDicomTags': {'BodyPartExamined': 'SKULL', 'Manufacturer': 'Fuji'}}),
+        ]
+
+        details = get_studies_details(self.client_mock, [self.study])['study-1']
+
+        self.assertEqual(self.client_mock.get.call_count, 2)
+        self.assertEqual(details['bodyPartExamined'], 'SKULL')
+        self.assertEqual(details['manufacturer'], 'Fuji')
+        self.assertIsNone(details['protocolName'])
+
+    def test_details_cached_until_study_updates(self):
+        """Repeated pages are served from cache; a new LastUpdate refetches"""
+        self.client_mock.get.return_value = _response({'MainDicomTags': {}, 'Instances': []})
+
+        get_studies_details(self.client_mock, [self.study])
+        get_studies_details(self.client_mock, [self.study])
+        self.assertEqual(self.client_mock.get.call_count, 1)
+
+        updated = dict(self.study, LastUpdate='20250102T080000')
+        get_studies_details(self.client_mock, [updated])
+        self.assertEqual(self.client_mock.get.call_count, 2)
+
+    def test_failed_fetch_not_cached(self):
+        """Errors fall back to study-level modality and are retried next time"""
+        self.client_mock.get.side_effect = Exception('connection reset')
+
+        details = get_studies_details(self.client_mock, [self.study])['study-1']
+        self.assertEqual(details['modality'], 'CT')
+
+        get_studies_details(self.client_mock, [self.study])
+        self.assertEqual(self.client_mock.get.call_count, 2)
+
+    def test_get_study_modality(self):
+        """ModalitiesInStudy is read from requested or main tags"""
+        self.assertEqual(get_study_modality(self.study), 'CT')
+        self.assertEqual(get_study_modality({'MainDicomTags': {'ModalitiesInStudy': 'MR,CT'}}), 'MR')
+        self.assertEqual(get_study_modality({'MainDicomTags': {}}), '')
@@ -0,0 +1,538 @@
+"""
+Unit tests for PACS browser/viewer API views
+
+Tests Orthanc request patterns of the study viewer endpoints with a mocked
+Orthanc client.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest.mock import patch, Mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..models import PacsConfig
+from ..orthanc_client import reset_orthanc_clients
+from .. import pacs_views
+
+
+User = get_user_model()
+
+
+def _response(data, ok=True, status_code=200):
+    response = Mock(ok=ok, status_code=status_code)
+    response.json.return_value = data
+    return response
+
+
+class PacsViewTestCase(TestCase):
+    """Shared fixtures for PACS view tests"""
+
+    def setUp(self):
+        reset_orthanc_clients()
+        cache.clear()
+        self.user = User.objects.create_user(username='viewer', password='testpass123')
+        self.pacs_config = PacsConfig.objects.create(
+            orthancurl='http://orthanc.example.com:8042',
+            viewrurl='http://orthanc.example.com:3000/viewer'
+        )
+        self.factory = APIRequestFactory()
+
+        self.study = {
+            'ID': 'study-1', 'Series': ['series-b', 'series-a'], 'MainDicomTags': {},
+            'LastUpdate': '20250101T120000', 'IsStable': True
+        }
+        self.series = [
+            {'ID': 'series-a', 'MainDicomTags': {'SeriesInstanceUID': '1.2.a', 'SeriesDescription': 'A', 'SeriesNumber': '2'}},
+            {'ID': 'series-b', 'MainDicomTags': {'SeriesInstanceUID': '1.2.b', 'SeriesDescription': 'B', 'SeriesNumber': '1'}},
+        ]
+        self.instances = [
+            {'ID': 'b-2', 'ParentSeries': 'series-b', 'MainDicomTags': {'SOPInstanceUID': '1.b.2', 'InstanceNumber': '2'}},
+            {'ID': 'a-1', 'ParentSeries': 'series-a', 'MainDicomTags': {'SOPInstanceUID': '1.a.1', 'InstanceNumber': '1'}},
+            {'ID': 'b-10', 'ParentSeries': 'series-b', 'MainDicomTags': {'SOPInstanceUID': '1.b.10', 'InstanceNumber': '10'}},
+            {'ID': 'b-1', 'ParentSeries': 'series-b', 'MainDicomTags': {'SOPInstanceUID': '1.b.1', 'InstanceNumber': '1'}},
+        ]
+
+    def tearDown(self):
+        reset_orthanc_clients()
+        cache.clear()
+
+    def _get(self, view, path, **kwargs):
+        request = self.factory.get(path)
+        force_authenticate(request, user=self.user)
+        return view(request, **kwargs)
+
+    def _orthanc_get(self, path, **kwargs):
+        routes = {
+            '/studies/study-1/series': self.series,
+            '/studies/study-1/instances': self.instances,
+        }
+        if path in routes:
+            return _response(routes[path])
+        return _response({}, ok=False, status_code=404)
+
+
+class StudyImageIdsTest(PacsViewTestCase):
+    """Test get_study_image_ids"""
+
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_image_ids_batched_and_ordered(self, mock_get, mock_post):
+        """Whole study resolves in a fixed number of calls, ordered by InstanceNumber"""
+        mock_post.return_value = _response([self.study])
+        mock_get.side_effect = self._orthanc_get
+
+        response = self._get(pacs_views.get_study_image_ids, '/api/pacs/studies/1.2.3/image-ids/', study_uid='1.2.3')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(
+            [image_id.split('/instances/')[1] for image_id in response.data['imageIds']],
+            ['b-1/frames/1', 'b-2/frames/1', 'b-10/frames/1', 'a-1/frames/1']
+        )
+        self.assertTrue(response.data['imageIds'][0].startswith('wadors:http://testserver/api/pacs/instances/'))
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_study_not_found(self, mock_post):
+        """Unknown StudyInstanceUID returns 404"""
+        mock_post.return_value = _response([])
+
+        response = self._get(pacs_views.get_study_image_ids, '/api/pacs/studies/9.9/image-ids/', study_uid='9.9')
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_failed_lookup_is_not_found(self, mock_post):
+        """A refused /tools/find is a 404, not a server error"""
+        mock_post.return_value = _response({}, ok=False, status_code=400)
+
+        response = self._get(pacs_views.get_study_image_ids, '/api/pacs/studies/9.9/image-ids/', study_uid='9.9')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class StudyManifestTest(PacsViewTestCase):
+    """Test the study manifest cache behind the viewer endpoints"""
+
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_reopening_study_makes_no_orthanc_calls(self, mock_get, mock_post):
+        """All viewer endpoints share one manifest build"""
+        mock_post.return_value = _response([self.study])
+        mock_get.side_effect = self._orthanc_get
+
+        self._get(pacs_views.get_study_image_ids, '/', study_uid='1.2.3')
+        self.assertEqual((mock_post.call_count, mock_get.call_count), (1, 2))
+
+        image_ids = self._get(pacs_views.get_study_image_ids, '/', study_uid='1.2.3')
+        series = self._get(pacs_views.get_study_series_metadata, '/', study_uid='1.2.3')
+        enhanced = self._get(pacs_views.get_enhanced_study_metadata, '/', study_uid='1.2.3')
+        bulk = self._get(pacs_views.get_series_bulk_images, '/?start=1&count=2', study_uid='1.2.3', series_uid='1.2.b')
+
+        self.assertEqual((mock_post.call_count, mock_get.call_count), (1, 2))
+        self.assertEqual(image_ids.data['total'], 4)
+        self.assertEqual([s['seriesId'] for s in series.data['series']], ['series-b', 'series-a'])
+        self.assertEqual(series.data['series'][0]['imageCount'], 3)
+        self.assertEqual(enhanced.data['total_series'], 2)
+        self.assertEqual([image['orthancId'] for image in bulk.data['images']], ['b-2', 'b-10'])
+        self.assertFalse(bulk.data['hasMore'])
+
+    @override_settings(STUDY_MANIFEST_TTL=0)
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_revalidation_by_last_update(self, mock_get, mock_post):
+        """Expired manifests are revalidated with one find and rebuilt only if the study changed"""
+        mock_post.return_value = _response([self.study])
+        mock_get.side_effect = self._orthanc_get
+
+        self._get(pacs_views.get_study_image_ids, '/', study_uid='1.2.3')
+        self._get(pacs_views.get_study_image_ids, '/', study_uid='1.2.3')
+        self.assertEqual((mock_post.call_count, mock_get.call_count), (2, 2))
+
+        mock_post.return_value = _response([dict(self.study, LastUpdate='20250102T090000')])
+        self._get(pacs_views.get_study_image_ids, '/', study_uid='1.2.3')
+        self.assertEqual((mock_post.call_count, mock_get.call_count), (3, 4))
+
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_unknown_series_returns_404(self, mock_get, mock_post):
+        """Bulk images for a series not in the study is a 404"""
+        mock_post.return_value = _response([self.study])
+        mock_get.side_effect = self._orthanc_get
+
+        response = self._get(pacs_views.get_series_bulk_images, '/', study_uid='1.2.3', series_uid='9.9')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class DicomInstanceProxyTest(PacsViewTestCase):
+    """Test dicom_instance_proxy conditional/range pass-through"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_settings = override_settings(DICOM_CACHE_DIR=self.cache_dir)
+        self.cache_settings.enable()
+
+    def tearDown(self):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().tearDown()
+
+    def _proxy(self, **headers):
+        request = self.factory.get('/api/pacs/instances/inst-1/file', **headers)
+        force_authenticate(request, user=self.user)
+        return pacs_views.dicom_instance_proxy(request, orthanc_id='inst-1')
+
+    def _orthanc_file(self, status_code=200, body=b'', headers=None):
+        response = Mock(ok=status_code < 400, status_code=status_code, headers=headers or {})
+        response.iter_content.return_value = iter([body])
+        return response
+
+    @patch('requests.Session.head')
+    @patch('requests.Session.get')
+    def test_single_get_without_preflight(self, mock_get, mock_head):
+        """One GET, no HEAD, and the body is cached for the next request"""
+        mock_get.return_value = self._orthanc_file(body=b'D' * 2048, headers={'Content-Length': '2048'})
+
+        response = self._proxy()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'D' * 2048)
+        mock_head.assert_not_called()
+        self.assertEqual(mock_get.call_count, 1)
+
+        cached = self._proxy()
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(b''.join(cached.streaming_content), b'D' * 2048)
+        cached.close()
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_range_passed_through(self, mock_get):
+        """Range goes to Orthanc and a 206 is relayed without caching"""
+        mock_get.return_value = self._orthanc_file(
+            status_code=206, body=b'abc',
+            headers={'Content-Range': 'bytes 0-2/2048', 'Content-Length': '3'}
+        )
+
+        response = self._proxy(HTTP_RANGE='bytes=0-2')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 0-2/2048')
+        self.assertEqual(mock_get.call_args.kwargs['headers']['Range'], 'bytes=0-2')
+        b''.join(response.streaming_content)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'in', 'inst-1', 'file')))
+
+    @patch('requests.Session.get')
+    def test_matching_etag_answered_locally(self, mock_get):
+        """If-None-Match with the instance ETag is a 304 without an Orthanc call"""
+        response = self._proxy(HTTP_IF_NONE_MATCH='"inst-1-file"')
+
+        self.assertEqual(response.status_code, 304)
+        mock_get.assert_not_called()
+
+    @patch('requests.Session.get')
+    def test_upstream_not_modified_releases_connection(self, mock_get):
+        """A 304 from Orthanc is relayed and its streamed response closed"""
+        upstream = self._orthanc_file(status_code=304, headers={'ETag': '"orthanc-etag"'})
+        mock_get.return_value = upstream
+
+        response = self._proxy(HTTP_IF_NONE_MATCH='"orthanc-etag"')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], '"orthanc-etag"')
+        upstream.close.assert_called_once()
+
+    @patch('requests.Session.get')
+    def test_not_found_points_to_health_check(self, mock_get):
+        """Failures return immediately with the diagnostics path"""
+        mock_get.return_value = self._orthanc_file(status_code=404)
+
+        response = self._proxy()
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['health_check'], '/api/pacs/instances/inst-1/health')
+        self.assertEqual(mock_get.call_count, 1)
+
+
+class EndpointStrategyTest(PacsViewTestCase):
+    """Test remembered endpoint strategies and memoised UID lookups"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_settings = override_settings(DICOM_CACHE_ENABLED=False)
+        self.cache_settings.enable()
+
+    def tearDown(self):
+        self.cache_settings.disable()
+        super().tearDown()
+
+    def _frame(self, orthanc_id):
+        from ..configurable_pacs_views import configurable_dicom_frames
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer token')
+        return configurable_dicom_frames(request, orthanc_id, 1)
+
+    def _stream(self, ok=True, status_code=200):
+        response = Mock(ok=ok, status_code=status_code)
+        response.iter_content.return_value = iter([b'x' * 10])
+        return response
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_working_frame_strategy_remembered(self, mock_get):
+        """After raw frames fail once, later frames go straight to /file"""
+        def orthanc_get(path, **kwargs):
+            if path.endswith('/raw'):
+                return self._stream(ok=False, status_code=404)
+            return self._stream()
+        mock_get.side_effect = orthanc_get
+
+        first = self._frame('inst-1')
+        self.assertEqual(first['Content-Type'], 'application/dicom')
+        self.assertEqual(mock_get.call_count, 2)
+
+        mock_get.reset_mock()
+        self._frame('inst-2')
+        mock_get.assert_called_once()
+        self.assertTrue(mock_get.call_args.args[0].endswith('/instances/inst-2/file'))
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_rejected_frame_responses_closed(self, mock_get):
+        """Streamed responses from failed strategies are closed, not leaked"""
+        rejected = self._stream(ok=False, status_code=404)
+        served = self._stream()
+        mock_get.side_effect = lambda path, **kwargs: rejected if path.endswith('/raw') else served
+
+        self._frame('inst-1')
+
+        rejected.close.assert_called_once()
+        served.close.assert_not_called()
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_instance_uids_memoised(self, mock_get):
+        """Series/study UIDs are looked up once per series"""
+        from ..configurable_pacs_views import _get_instance_uids
+
+        def orthanc_get(path, **kwargs):
+            if path.startswith('/instances/'):
+                sop = path.rsplit('/', 1)[1]
+                return _response({'ParentSeries': 'series-1', 'MainDicomTags': {'SOPInstanceUID': f'1.{sop}'}})
+            if path == '/series/series-1':
+                return _response({'ParentStudy': 'study-1', 'MainDicomTags': {'SeriesInstanceUID': '1.2'}})
+            return _response({'MainDicomTags': {'StudyInstanceUID': '1.1'}})
+        mock_get.side_effect = orthanc_get
+        client = pacs_views.get_orthanc_client(self.pacs_config)
+
+        self.assertEqual(_get_instance_uids(client, 'a'), ('1.1', '1.2', '1.a'))
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(_get_instance_uids(client, 'b'), ('1.1', '1.2', '1.b'))
+        self.assertEqual(mock_get.call_count, 4)
+        self.assertEqual(_get_instance_uids(client, 'a'), ('1.1', '1.2', '1.a'))
+        self.assertEqual(mock_get.call_count, 4)
+
+    @patch('exam.configurable_pacs_views._try_file_endpoint')
+    @patch('exam.configurable_pacs_views._try_attachment_endpoint')
+    @patch('exam.configurable_pacs_views._try_dicomweb_endpoint')
+    def test_auto_detect_strategy_remembered(self, mock_dicomweb, mock_attachment, mock_file):
+        """Auto-detect probes once, then uses the working endpoint directly"""
+        from ..configurable_pacs_views import _try_auto_detect_endpoint
+        mock_dicomweb.return_value = Mock(status_code=404)
+        mock_attachment.return_value = Mock(status_code=200)
+        client = pacs_views.get_orthanc_client(self.pacs_config)
+
+        _try_auto_detect_endpoint(client, 'inst-1')
+        _try_auto_detect_endpoint(client, 'inst-2')
+
+        self.assertEqual(mock_dicomweb.call_count, 1)
+        self.assertEqual(mock_attachment.call_count, 2)
+        mock_file.assert_not_called()
+
+
+class SeriesFramesBatchTest(PacsViewTestCase):
+    """Test the multipart series frames endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_settings = override_settings(DICOM_CACHE_DIR=self.cache_dir)
+        self.cache_settings.enable()
+
+    def tearDown(self):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().tearDown()
+
+    def _orthanc_get(self, path, **kwargs):
+        if path.endswith('/frames/0/raw'):
+            orthanc_id = path.split('/')[2]
+            response = Mock(ok=True, status_code=200)
+            response.iter_content.return_value = iter([f'pixels-{orthanc_id}'.encode()])
+            return response
+        return super()._orthanc_get(path, **kwargs)
+
+    def _frames(self, query=''):
+        from ..configurable_pacs_views import configurable_series_frames
+        response = self._get(configurable_series_frames, f'/frames{query}', study_uid='1.2.3', series_uid='1.2.b')
+        return response
+
+    def _parts(self, response):
+        boundary = response['Content-Type'].split('boundary=')[1]
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.endswith(f'--{boundary}--\r\n'.encode()))
+        parts = []
+        for chunk in body.split(f'--{boundary}'.encode())[1:-1]:
+            headers, _, data = chunk.strip(b'\r\n').partition(b'\r\n\r\n')
+            parts.append((headers.decode(), data))
+        return parts
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_range_returns_frames_in_order(self, mock_post, mock_get):
+        """start/count selects instances in InstanceNumber order"""
+        mock_post.return_value = _response([self.study])
+        mock_get.side_effect = self._orthanc_get
+
+        response = self._frames('?start=1&count=5')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('multipart/related; type="application/octet-stream"'))
+        parts = self._parts(response)
+        self.assertEqual([data for _, data in parts], [b'pixels-b-2', b'pixels-b-10'])
+        self.assertIn('Content-Location: /api/pacs/instances/b-2/frames/1', parts[0][0])
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_instance_list_uses_frame_cache(self, mock_post, mock_get):
+        """Listed instances are served from the frame cache on the second request"""
+        mock_post.return_value = _response([self.study])
+        mock_get.side_effect = self._orthanc_get
+
+        # a-1 belongs to another series and is ignored
+        first = self._parts(self._frames('?instances=b-10,b-1,a-1'))
+        self.assertEqual([data for _, data in first], [b'pixels-b-10', b'pixels-b-1'])
+
+        mock_get.reset_mock()
+        second = self._parts(self._frames('?instances=b-10,b-1'))
+        self.assertEqual(first, second)
+        mock_get.assert_not_called()
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_unknown_series(self, mock_post, mock_get):
+        """A series not in the study is a 404"""
+        from ..configurable_pacs_views import configurable_series_frames
+        mock_post.return_value = _response([self.study])
+        mock_get.side_effect = self._orthanc_get
+
+        response = self._get(configurable_series_frames, '/frames', study_uid='1.2.3', series_uid='9.9')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class InlineExecutor:
+    """Stands in for the rendition process pool"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ThumbnailTest(PacsViewTestCase):
+    """Test cached thumbnail renditions"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_settings = override_settings(RENDITION_CACHE_DIR=self.cache_dir)
+        self.cache_settings.enable()
+        # Fake image bytes fail to encode and are stored as Orthanc returned them
+        self.pool = patch('exam.renditions._get_pool', return_value=InlineExecutor())
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.stop()
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().tearDown()
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_rendered_once_then_served_from_disk(self, mock_get):
+        """The second request is served from the rendition cache with long-lived headers"""
+        rendered = Mock(ok=True, status_code=200, content=b'jpeg-bytes')
+        mock_get.return_value = rendered
+
+        first = self._get(pacs_views.dicom_instance_thumbnail, '/thumbnail?size=200', orthanc_id='b-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], 'image/jpeg')
+        self.assertEqual(mock_get.call_args.args[0], '/instances/b-1/rendered')
+        self.assertEqual(mock_get.call_args.kwargs['params']['width'], 256)
+
+        mock_get.reset_mock()
+        second = self._get(pacs_views.dicom_instance_thumbnail, '/thumbnail', orthanc_id='b-1')
+        self.assertEqual(b''.join(second.streaming_content), b'jpeg-bytes')
+        second.close()
+        mock_get.assert_not_called()
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertIn('immutable', second['Cache-Control'])
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_encoded_to_rendition_format(self, mock_get):
+        """Orthanc's image is downscaled and re-encoded as WebP"""
+        rendered = io.BytesIO()
+        Image.new('L', (600, 400)).save(rendered, format='JPEG')
+        mock_get.return_value = Mock(ok=True, status_code=200, content=rendered.getvalue())
+
+        response = self._get(pacs_views.dicom_instance_thumbnail, '/thumbnail?size=128', orthanc_id='b-1')
+
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        thumbnail = Image.open(io.BytesIO(response.content))
+        self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (128, 85)))
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    def test_preview_fallback(self, mock_get):
+        """Servers without /rendered fall back to the PNG preview"""
+        def orthanc_get(path, **kwargs):
+            if path.endswith('/rendered'):
+                return Mock(ok=False, status_code=404)
+            return Mock(ok=True, status_code=200, content=b'png-bytes')
+        mock_get.side_effect = orthanc_get
+
+        response = self._get(pacs_views.dicom_instance_thumbnail, '/thumbnail', orthanc_id='b-1')
+
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, b'png-bytes')
+
+    @patch('exam.orthanc_client.OrthancPACSClient.get')
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_pregenerate_renders_first_instance_per_series(self, mock_post, mock_get):
+        """Recent studies get one thumbnail per series, cached ones are skipped"""
+        from ..renditions import pregenerate_thumbnails
+        self.study['MainDicomTags'] = {'StudyInstanceUID': '1.2.3'}
+        mock_post.return_value = _response([self.study])
+
+        def orthanc_get(path, **kwargs):
+            if path.endswith('/rendered'):
+                return Mock(ok=True, status_code=200, content=b'jpeg-bytes')
+            return self._orthanc_get(path, **kwargs)
+        mock_get.side_effect = orthanc_get
+        client = pacs_views.get_orthanc_client(self.pacs_config)
+
+        counts = pregenerate_thumbnails(client, days=1)
+        self.assertEqual((counts['rendered'], counts['cached']), (2, 0))
+        rendered = sorted(c.args[0] for c in mock_get.call_args_list if c.args[0].endswith('/rendered'))
+        self.assertEqual(rendered, ['/instances/a-1/rendered', '/instances/b-1/rendered'])
+
+        counts = pregenerate_thumbnails(client, days=1)
+        self.assertEqual((counts['rendered'], counts['cached']), (0, 2))
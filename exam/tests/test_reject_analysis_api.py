@@ -734,6 +734,66 @@ class RejectIncidentAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class RejectIncidentBulkDailyCreateTest(APITestCase):
+    """Test the bulk-daily-create upsert of daily reject entries"""
+    
+    url = '/api/reject-incidents/bulk-daily-create/'
+    
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username='tech',
+            password='testpass123',
+            is_staff=True
+        )
+        category = RejectCategory.objects.create(
+            name='Exposure Errors',
+            category_type='HUMAN_FAULTS'
+        )
+        self.reasons = [
+            RejectReason.objects.create(category=category, reason=f'Reason {number}')
+            for number in range(3)
+        ]
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff_user)
+    
+    def post_rejects(self, rejects, day='2025-08-03'):
+        return self.client.post(self.url, {'date': day, 'rejects': rejects}, format='json')
+    
+    def test_creates_then_updates_entries(self):
+        """Test resubmitting a date updates its entries in place"""
+        response = self.post_rejects({str(reason.id): 2 for reason in self.reasons})
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['incidents_created'], 6)
+        self.assertEqual(RejectIncident.objects.count(), 3)
+        
+        response = self.post_rejects({str(self.reasons[0].id): 5})
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(RejectIncident.objects.count(), 3)
+        incident = RejectIncident.objects.get(reject_reason=self.reasons[0])
+        self.assertEqual(incident.retake_count, 5)
+        self.assertEqual(incident.daily_entry_date, date(2025, 8, 3))
+        self.assertEqual(incident.notes, 'Daily reject entry - Reason 0 (count: 5)')
+        
+        self.post_rejects({str(self.reasons[0].id): 1}, day='2025-08-04')
+        self.assertEqual(RejectIncident.objects.count(), 4)
+    
+    def test_query_count_independent_of_reasons(self):
+        """Test reasons are validated and written in a fixed number of queries"""
+        with self.assertNumQueries(4):  # in_bulk, savepoint, upsert, release
+            self.post_rejects({str(reason.id): 1 for reason in self.reasons})
+    
+    def test_unknown_reason_writes_nothing(self):
+        """Test an unknown reason is rejected before any entry is saved"""
+        response = self.post_rejects({str(self.reasons[0].id): 1, '9999': 2})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Reject reason 9999 not found')
+        self.assertFalse(RejectIncident.objects.exists())
+
+
 class RejectAnalysisStatisticsAPITest(APITestCase):
     """Test RejectAnalysis statistics endpoint"""
     
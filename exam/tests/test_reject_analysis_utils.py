@@ -6,17 +6,20 @@ functions with mocked PACS/Orthanc API responses and error handling.
 """
 
 import json
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from io import StringIO
 from unittest.mock import patch, Mock, MagicMock
 from requests.exceptions import ConnectionError, Timeout, HTTPError
 
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 from ..models import (
-    RejectAnalysis, PacsServer, Modaliti, Exam, Pemeriksaan, Daftar
+    RejectAnalysis, PacsServer, PacsMonthlyImageCount, PacsDailyImageCount, Modaliti, Exam, Pemeriksaan, Daftar
 )
-from ..utils import get_orthanc_monthly_images, calculate_reject_analysis_from_pacs
+from ..utils import get_orthanc_monthly_images, get_daily_image_counts, calculate_reject_analysis_from_pacs
 from pesakit.models import Pesakit
 
 User = get_user_model()
@@ -54,48 +57,27 @@ class GetOrthancMonthlyImagesTest(TestCase):
             include_in_reject_analysis=False
         )
         
-        # Mock DICOM data
-        self.mock_study_data = {
-            'ID': 'study-123',
-            'MainDicomTags': {
-                'StudyDate': '20240115',  # January 15, 2024
-                'StudyInstanceUID': '1.2.3.4.5.6.7.8.9',
-                'StudyDescription': 'Chest X-Ray'
-            },
-            'Series': ['series-1', 'series-2']
-        }
-        
-        self.mock_series_data = {
+        # Mock series-level /tools/find results
+        self.cr_series = {
             'ID': 'series-1',
-            'MainDicomTags': {
-                'Modality': 'CR',
-                'SeriesDescription': 'Chest AP'
-            },
+            'ParentStudy': 'study-123',
+            'MainDicomTags': {'Modality': 'CR', 'SeriesDescription': 'Chest AP'},
             'Instances': ['instance-1', 'instance-2']
         }
-        
-        self.mock_out_of_range_study = {
-            'ID': 'study-456',
-            'MainDicomTags': {
-                'StudyDate': '20240215',  # February 15, 2024 (out of range)
-                'StudyInstanceUID': '1.2.3.4.5.6.7.8.10'
-            },
-            'Series': ['series-3']
+        self.ct_series = {
+            'ID': 'series-2',
+            'ParentStudy': 'study-123',
+            'MainDicomTags': {'Modality': 'CT'},
+            'Instances': ['instance-3', 'instance-4', 'instance-5']
         }
     
-    @patch('exam.utils.requests.get')
-    def test_successful_query_single_server(self, mock_get):
+    def _find_response(self, series_list):
+        return Mock(ok=True, status_code=200, json=lambda: series_list)
+    
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_successful_query_single_server(self, mock_post):
         """Test successful query of a single PACS server"""
-        # Mock responses
-        mock_responses = [
-            # Studies list
-            Mock(ok=True, json=lambda: ['study-123']),
-            # Study details
-            Mock(ok=True, json=lambda: self.mock_study_data),
-            # Series details
-            Mock(ok=True, json=lambda: self.mock_series_data)
-        ]
-        mock_get.side_effect = mock_responses
+        mock_post.return_value = self._find_response([self.cr_series])
         
         result = get_orthanc_monthly_images(
             year=2024, 
@@ -117,23 +99,41 @@ class GetOrthancMonthlyImagesTest(TestCase):
         self.assertEqual(modality_breakdown['CR']['images'], 2)
         self.assertEqual(modality_breakdown['CR']['studies'], 1)
     
-    @patch('exam.utils.requests.get')
-    def test_multiple_servers_query(self, mock_get):
-        """Test querying multiple PACS servers"""
-        # Mock responses for both servers
-        mock_responses = [
-            # First server studies list
-            Mock(ok=True, json=lambda: ['study-123']),
-            # First server study details
-            Mock(ok=True, json=lambda: self.mock_study_data),
-            # First server series details
-            Mock(ok=True, json=lambda: self.mock_series_data),
-            # Second server studies list (different server same pattern)
-            Mock(ok=True, json=lambda: ['study-456']),
-            Mock(ok=True, json=lambda: self.mock_study_data),
-            Mock(ok=True, json=lambda: self.mock_series_data)
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_date_range_find_query(self, mock_post):
+        """Test that one series-level find filtered by StudyDate is sent"""
+        mock_post.return_value = self._find_response([self.cr_series])
+        
+        get_orthanc_monthly_images(year=2024, month=2, pacs_server=self.active_server, refresh=True)
+        
+        mock_post.assert_called_once()
+        self.assertEqual(mock_post.call_args.args, ('/tools/find',))
+        body = mock_post.call_args.kwargs['json']
+        self.assertEqual(body['Level'], 'Series')
+        self.assertEqual(body['Query'], {'StudyDate': '20240201-20240229'})
+        self.assertTrue(body['Expand'])
+    
+    @patch('exam.utils.PACS_FIND_PAGE_SIZE', 1)
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_paged_find(self, mock_post):
+        """Test that full pages are followed with Since"""
+        mock_post.side_effect = [
+            self._find_response([self.cr_series]),
+            self._find_response([self.ct_series]),
+            self._find_response([]),
         ]
-        mock_get.side_effect = mock_responses
+        
+        result = get_orthanc_monthly_images(year=2024, month=1, pacs_server=self.active_server)
+        
+        self.assertEqual([call.kwargs['json']['Since'] for call in mock_post.call_args_list], [0, 1, 2])
+        self.assertEqual(result['total_images'], 5)
+        # Both series belong to the same study
+        self.assertEqual(result['total_studies'], 1)
+    
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_multiple_servers_query(self, mock_post):
+        """Test querying multiple PACS servers"""
+        mock_post.return_value = self._find_response([self.cr_series])
         
         # Create another active server
         server2 = PacsServer.objects.create(
@@ -151,66 +151,40 @@ class GetOrthancMonthlyImagesTest(TestCase):
         self.assertEqual(result['total_studies'], 2)
         self.assertEqual(result['total_images'], 4)
     
-    @patch('exam.utils.requests.get')
-    def test_date_filtering(self, mock_get):
-        """Test that studies outside date range are filtered out"""
-        # Mock responses with studies both in and out of range
-        mock_responses = [
-            # Studies list
-            Mock(ok=True, json=lambda: ['study-123', 'study-456']),
-            # In-range study
-            Mock(ok=True, json=lambda: self.mock_study_data),
-            Mock(ok=True, json=lambda: self.mock_series_data),
-            # Out-of-range study
-            Mock(ok=True, json=lambda: self.mock_out_of_range_study),
-        ]
-        mock_get.side_effect = mock_responses
-        
-        result = get_orthanc_monthly_images(
-            year=2024, 
-            month=1,  # January
-            pacs_server=self.active_server
-        )
-        
-        # Should only count the January study
-        self.assertEqual(result['total_studies'], 1)
-        self.assertEqual(result['total_images'], 2)
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_closed_month_counts_stored(self, mock_post):
+        """Test that closed months are counted once and then read locally"""
+        mock_post.return_value = self._find_response([self.cr_series, self.ct_series])
+        
+        first = get_orthanc_monthly_images(year=2024, month=1, modality='CR', pacs_server=self.active_server)
+        second = get_orthanc_monthly_images(year=2024, month=1, modality='CT', pacs_server=self.active_server)
+        
+        mock_post.assert_called_once()
+        self.assertEqual(first['total_images'], 2)
+        self.assertEqual(second['total_images'], 3)
+        stored = PacsMonthlyImageCount.objects.get(pacs_server=self.active_server, month=date(2024, 1, 1))
+        self.assertEqual(stored.total_images, 5)
+        
+        get_orthanc_monthly_images(year=2024, month=1, pacs_server=self.active_server, refresh=True)
+        self.assertEqual(mock_post.call_count, 2)
+    
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_current_month_not_stored(self, mock_post):
+        """Test that the running month is queried every time"""
+        mock_post.return_value = self._find_response([self.cr_series])
+        today = date.today()
+        
+        get_orthanc_monthly_images(year=today.year, month=today.month, modality='CR', pacs_server=self.active_server)
+        get_orthanc_monthly_images(year=today.year, month=today.month, modality='CR', pacs_server=self.active_server)
+        
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_post.call_args.kwargs['json']['Query']['Modality'], 'CR')
+        self.assertFalse(PacsMonthlyImageCount.objects.exists())
     
-    @patch('exam.utils.requests.get')
-    def test_modality_filtering(self, mock_get):
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_modality_filtering(self, mock_post):
         """Test filtering by specific modality"""
-        # Mock series with different modalities
-        cr_series = {
-            'ID': 'series-cr',
-            'MainDicomTags': {'Modality': 'CR'},
-            'Instances': ['instance-1', 'instance-2']
-        }
-        ct_series = {
-            'ID': 'series-ct',
-            'MainDicomTags': {'Modality': 'CT'},
-            'Instances': ['instance-3', 'instance-4', 'instance-5']
-        }
-        
-        study_with_multiple_modalities = {
-            'ID': 'study-multi',
-            'MainDicomTags': {
-                'StudyDate': '20240115',
-                'StudyInstanceUID': '1.2.3.4.5.6.7.8.11'
-            },
-            'Series': ['series-cr', 'series-ct']
-        }
-        
-        mock_responses = [
-            # Studies list
-            Mock(ok=True, json=lambda: ['study-multi']),
-            # Study details
-            Mock(ok=True, json=lambda: study_with_multiple_modalities),
-            # CR series
-            Mock(ok=True, json=lambda: cr_series),
-            # CT series
-            Mock(ok=True, json=lambda: ct_series)
-        ]
-        mock_get.side_effect = mock_responses
+        mock_post.return_value = self._find_response([self.cr_series, self.ct_series])
         
         # Filter by CR modality only
         result = get_orthanc_monthly_images(
@@ -224,15 +198,15 @@ class GetOrthancMonthlyImagesTest(TestCase):
         modality_breakdown = result['modality_breakdown']
         self.assertIn('CR', modality_breakdown)
         self.assertEqual(modality_breakdown['CR']['images'], 2)
+        self.assertEqual(result['total_images'], 2)
         
         # CT should not be included when filtering for CR
-        if 'CT' in modality_breakdown:
-            self.assertEqual(modality_breakdown['CT']['images'], 0)
+        self.assertNotIn('CT', modality_breakdown)
     
-    @patch('exam.utils.requests.get')
-    def test_connection_error_handling(self, mock_get):
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_connection_error_handling(self, mock_post):
         """Test handling of connection errors"""
-        mock_get.side_effect = ConnectionError("Connection failed")
+        mock_post.side_effect = ConnectionError("Connection failed")
         
         result = get_orthanc_monthly_images(
             year=2024, 
@@ -244,13 +218,15 @@ class GetOrthancMonthlyImagesTest(TestCase):
         self.assertEqual(result['total_studies'], 0)
         self.assertIn('warnings', result)
         self.assertTrue(len(result['warnings']) > 0)
+        # Failed counts are not stored
+        self.assertFalse(PacsMonthlyImageCount.objects.exists())
     
-    @patch('exam.utils.requests.get')
-    def test_http_error_handling(self, mock_get):
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_http_error_handling(self, mock_post):
         """Test handling of HTTP errors"""
         mock_response = Mock()
         mock_response.raise_for_status.side_effect = HTTPError("404 Not Found")
-        mock_get.return_value = mock_response
+        mock_post.return_value = mock_response
         
         result = get_orthanc_monthly_images(
             year=2024, 
@@ -262,10 +238,10 @@ class GetOrthancMonthlyImagesTest(TestCase):
         self.assertEqual(result['total_studies'], 0)
         self.assertIn('warnings', result)
     
-    @patch('exam.utils.requests.get')
-    def test_timeout_handling(self, mock_get):
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_timeout_handling(self, mock_post):
         """Test handling of request timeouts"""
-        mock_get.side_effect = Timeout("Request timed out")
+        mock_post.side_effect = Timeout("Request timed out")
         
         result = get_orthanc_monthly_images(
             year=2024, 
@@ -300,36 +276,11 @@ class GetOrthancMonthlyImagesTest(TestCase):
         self.assertEqual(result['total_studies'], 0)
         self.assertIn('error', result)
     
-    @patch('exam.utils.requests.get')
-    def test_invalid_study_date_handling(self, mock_get):
-        """Test handling of studies with invalid or missing dates"""
-        invalid_date_study = {
-            'ID': 'study-invalid',
-            'MainDicomTags': {
-                'StudyDate': 'invalid-date',  # Invalid format
-                'StudyInstanceUID': '1.2.3.4.5.6.7.8.12'
-            },
-            'Series': ['series-1']
-        }
-        
-        missing_date_study = {
-            'ID': 'study-missing',
-            'MainDicomTags': {
-                'StudyInstanceUID': '1.2.3.4.5.6.7.8.13'
-                # StudyDate missing
-            },
-            'Series': ['series-2']
-        }
-        
-        mock_responses = [
-            # Studies list
-            Mock(ok=True, json=lambda: ['study-invalid', 'study-missing']),
-            # Invalid date study
-            Mock(ok=True, json=lambda: invalid_date_study),
-            # Missing date study
-            Mock(ok=True, json=lambda: missing_date_study)
-        ]
-        mock_get.side_effect = mock_responses
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_empty_series_ignored(self, mock_post):
+        """Test that series without instances do not count as studies"""
+        empty_series = {'ID': 'series-empty', 'ParentStudy': 'study-empty', 'MainDicomTags': {'Modality': 'CR'}}
+        mock_post.return_value = self._find_response([empty_series])
         
         result = get_orthanc_monthly_images(
             year=2024, 
@@ -337,12 +288,10 @@ class GetOrthancMonthlyImagesTest(TestCase):
             pacs_server=self.active_server
         )
         
-        # Should skip both invalid studies
         self.assertEqual(result['total_studies'], 0)
         self.assertEqual(result['total_images'], 0)
     
-    @patch('exam.utils.requests.get')
-    def test_partial_server_failure(self, mock_get):
+    def test_partial_server_failure(self):
         """Test handling when some servers fail but others succeed"""
         # Create two servers
         server2 = PacsServer.objects.create(
@@ -355,22 +304,13 @@ class GetOrthancMonthlyImagesTest(TestCase):
         )
         
         # First server succeeds, second server fails
-        def side_effect_func(*args, **kwargs):
-            url = args[0]
-            if 'active.example.com' in url:
-                if '/studies' in url and not url.endswith('/studies'):
-                    return Mock(ok=True, json=lambda: self.mock_study_data)
-                elif url.endswith('/studies'):
-                    return Mock(ok=True, json=lambda: ['study-123'])
-                elif '/series/' in url:
-                    return Mock(ok=True, json=lambda: self.mock_series_data)
-            elif 'second.example.com' in url:
+        def post(client, path, **kwargs):
+            if 'second.example.com' in client.base_url:
                 raise ConnectionError("Second server failed")
-            return Mock(ok=True, json=lambda: [])
+            return self._find_response([self.cr_series])
         
-        mock_get.side_effect = side_effect_func
-        
-        result = get_orthanc_monthly_images(year=2024, month=1)
+        with patch('exam.orthanc_client.OrthancPACSClient.post', autospec=True, side_effect=post):
+            result = get_orthanc_monthly_images(year=2024, month=1)
         
         # Should have data from successful server
         self.assertEqual(result['total_studies'], 1)
@@ -381,6 +321,74 @@ class GetOrthancMonthlyImagesTest(TestCase):
         self.assertTrue(len(result['warnings']) > 0)
 
 
+class GetDailyImageCountsTest(TestCase):
+    """Test get_daily_image_counts and the PACS daily image count backfill"""
+    
+    def setUp(self):
+        self.server = PacsServer.objects.create(
+            name='Active PACS',
+            orthancurl='http://active.example.com:8042',
+            viewrurl='http://active.example.com:3000/viewer',
+            is_active=True,
+            include_in_reject_analysis=True
+        )
+        self.series = [
+            {'ID': 's1', 'ParentStudy': 'st1', 'MainDicomTags': {'Modality': 'CR'}, 'Instances': ['i1', 'i2']},
+            {'ID': 's2', 'ParentStudy': 'st2', 'MainDicomTags': {'Modality': 'CT'}, 'Instances': ['i3']},
+        ]
+    
+    def _find_response(self):
+        return Mock(ok=True, status_code=200, json=lambda: self.series)
+    
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_past_dates_counted_once(self, mock_post):
+        """Test that a past date is queried once and then read locally"""
+        mock_post.return_value = self._find_response()
+        day = date(2024, 1, 15)
+        
+        self.assertEqual(get_daily_image_counts([day]), {day: 3})
+        self.assertEqual(get_daily_image_counts([day], modality='CR'), {day: 2})
+        
+        mock_post.assert_called_once()
+        self.assertEqual(mock_post.call_args.kwargs['json']['Query'], {'StudyDate': '20240115-20240115'})
+        self.assertEqual(PacsDailyImageCount.objects.filter(date=day).count(), 3)
+    
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_today_refreshed_when_stale(self, mock_post):
+        """Test that today's counts are recounted after the refresh interval"""
+        mock_post.return_value = self._find_response()
+        today = timezone.localdate()
+        
+        get_daily_image_counts([today])
+        get_daily_image_counts([today])
+        self.assertEqual(mock_post.call_count, 1)
+        
+        PacsDailyImageCount.objects.update(counted_at=timezone.now() - timedelta(hours=1))
+        get_daily_image_counts([today])
+        self.assertEqual(mock_post.call_count, 2)
+    
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_failed_dates_not_stored(self, mock_post):
+        """Test that PACS errors count as zero and are retried next time"""
+        mock_post.side_effect = ConnectionError("Connection failed")
+        day = date(2024, 1, 15)
+        
+        self.assertEqual(get_daily_image_counts([day]), {day: 0})
+        self.assertFalse(PacsDailyImageCount.objects.exists())
+    
+    @patch('exam.orthanc_client.OrthancPACSClient.post')
+    def test_backfill_command(self, mock_post):
+        """Test that the backfill counts missing dates only"""
+        mock_post.return_value = self._find_response()
+        
+        call_command('backfill_pacs_image_counts', '--from', '2024-01-01', '--to', '2024-01-10', stdout=StringIO())
+        self.assertEqual(mock_post.call_count, 10)
+        self.assertEqual(PacsDailyImageCount.objects.filter(modality='').count(), 10)
+        
+        call_command('backfill_pacs_image_counts', '--from', '2024-01-01', '--to', '2024-01-11', stdout=StringIO())
+        self.assertEqual(mock_post.call_count, 11)
+
+
 class CalculateRejectAnalysisFromPacsTest(TestCase):
     """Test calculate_reject_analysis_from_pacs function"""
     
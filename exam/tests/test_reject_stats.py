@@ -0,0 +1,124 @@
+"""
+Unit tests for cached reject analysis statistics
+
+Tests the grouped monthly breakdown, the per (year, modality) cache and its
+invalidation when reject analyses change, and the trends endpoint built on it.
+"""
+
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Modaliti, RejectAnalysis
+from ..reject_stats import compute_reject_statistics, get_monthly_reject_totals, get_reject_statistics
+
+User = get_user_model()
+
+
+class RejectStatisticsTest(TestCase):
+    """Test compute_reject_statistics and the cached accessors"""
+
+    def setUp(self):
+        cache.clear()
+        self.xray = Modaliti.objects.create(nama='X-Ray', singkatan='XR')
+        self.ct = Modaliti.objects.create(nama='CT Scan', singkatan='CT')
+        RejectAnalysis.objects.create(
+            analysis_date=date(2024, 1, 1), modality=self.xray,
+            total_examinations=100, total_images=120, total_retakes=6
+        )
+        RejectAnalysis.objects.create(
+            analysis_date=date(2024, 1, 1), modality=self.ct,
+            total_examinations=50, total_images=80, total_retakes=12
+        )
+        RejectAnalysis.objects.create(
+            analysis_date=date(2024, 3, 1), modality=self.xray,
+            total_examinations=110, total_images=130, total_retakes=13
+        )
+        RejectAnalysis.objects.create(
+            analysis_date=date(2023, 3, 1), modality=self.xray,
+            total_examinations=90, total_images=100, total_retakes=4
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_monthly_breakdown_grouped(self):
+        with self.assertNumQueries(5):
+            stats = compute_reject_statistics(2024)
+
+        january, february, march = stats['monthly_breakdown'][:3]
+        self.assertEqual(len(stats['monthly_breakdown']), 12)
+        self.assertEqual(january['total_images'], 200)
+        self.assertEqual(january['total_retakes'], 18)
+        self.assertEqual(january['analyses_count'], 2)
+        self.assertEqual(january['avg_reject_rate'], 10.0)  # (5.00 + 15.00) / 2
+        self.assertEqual(february['analyses_count'], 0)
+        self.assertEqual(february['total_images'], 0)
+        self.assertEqual(march['month_name'], 'March')
+        self.assertEqual(march['total_retakes'], 13)
+        self.assertEqual(stats['annual_summary']['analyses_count'], 3)
+        self.assertEqual(stats['drl_compliance']['non_compliant_analyses'], 2)  # Over the 8% target
+        self.assertIsNotNone(stats['trends']['reject_rate_change'])
+
+    def test_modality_filter(self):
+        months = get_monthly_reject_totals(2024, self.xray.id)
+
+        self.assertEqual(set(months), {1, 3})
+        self.assertEqual(months[1]['total_images'], 120)
+
+    def test_cached_until_analysis_saved(self):
+        get_reject_statistics(2024)
+        with self.assertNumQueries(0):
+            get_reject_statistics(2024)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RejectAnalysis.objects.create(
+                analysis_date=date(2024, 2, 1), modality=self.xray,
+                total_examinations=10, total_images=10, total_retakes=1
+            )
+
+        stats = get_reject_statistics(2024)
+        self.assertEqual(stats['monthly_breakdown'][1]['total_images'], 10)
+
+    def test_previous_year_change_invalidates(self):
+        get_reject_statistics(2024)
+        analysis = RejectAnalysis.objects.get(analysis_date=date(2023, 3, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            analysis.delete()
+
+        self.assertIsNone(get_reject_statistics(2024)['trends']['reject_rate_change'])
+
+
+class RejectAnalysisTrendsViewTest(TestCase):
+    """Test the trends endpoint on the cached monthly totals"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='quality_manager', password='testpass123', is_staff=True)
+        self.modaliti = Modaliti.objects.create(nama='X-Ray', singkatan='XR')
+        RejectAnalysis.objects.create(
+            analysis_date=date(2024, 2, 1), modality=self.modaliti,
+            total_examinations=100, total_images=200, total_retakes=6
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_trends(self):
+        response = self.client.get('/api/reject-analysis/trends/', {'year': 2024, 'months': 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([month['month_num'] for month in response.data], [1, 2, 3])
+        february = response.data[1]
+        self.assertEqual(february['month'], 'February')
+        self.assertEqual(february['total_rejects'], 6)
+        self.assertEqual(february['reject_rate'], 3.0)
+        self.assertEqual(february['target_rate'], 5.0)
+        self.assertTrue(february['meets_target'])
+        self.assertEqual(response.data[0]['total_examinations'], 0)
@@ -6,7 +6,7 @@ from .views import (
     DaftarViewSet, PemeriksaanViewSet, MediaDistributionViewSet,
     RegistrationWorkflowView, MWLWorklistView,
     GroupedExaminationView, GroupedMWLView, PositionChoicesView,
-    DicomWorklistExportView, upload_dicom_files,
+    DicomWorklistExportView, upload_dicom_files, dicom_upload_job_status,
     DashboardStatsAPIView, DashboardDemographicsAPIView, 
     DashboardModalityStatsAPIView, DashboardStorageAPIView,
     DashboardConfigAPIView, DashboardBodypartsExamTypesAPIView,
@@ -17,8 +17,8 @@ from .views import (
 from .settings_views import PacsConfigListCreateAPIView, PacsConfigDetailAPIView, get_current_pacs_config, get_pacs_orthanc_url
 from .pacs_management_views import PacsServerViewSet, MultiplePacsSearchView, PacsUploadDestinationsView
 from .examination_views import ExaminationListAPIView, ExaminationDetailAPIView
-from .pacs_views import PacsSearchView, pacs_stats, import_legacy_study, DicomImageProxyView, dicom_instance_proxy, get_study_image_ids, get_enhanced_study_metadata, pacs_health_check, dicom_instance_raw_proxy, dicom_instance_dicomweb_proxy, get_study_series_metadata, get_series_bulk_images
-from .configurable_pacs_views import configurable_dicom_instance_proxy, configurable_dicom_metadata, configurable_dicom_frames
+from .pacs_views import PacsSearchView, pacs_stats, import_legacy_study, DicomImageProxyView, dicom_instance_proxy, get_study_image_ids, get_enhanced_study_metadata, pacs_health_check, dicom_instance_raw_proxy, dicom_instance_dicomweb_proxy, dicom_instance_health, dicom_instance_thumbnail, get_study_series_metadata, get_series_bulk_images
+from .configurable_pacs_views import configurable_dicom_instance_proxy, configurable_dicom_metadata, configurable_dicom_frames, configurable_series_frames
 
 from . import api
 # from .export import export_xls
@@ -118,15 +118,19 @@ urlpatterns = [
     path('pacs/instances/<str:orthanc_id>/metadata', configurable_dicom_metadata, name='dicom-instance-metadata'),
     path('pacs/instances/<str:orthanc_id>/frames/<int:frame_number>', configurable_dicom_frames, name='dicom-instance-frames'),
     path('pacs/instances/<str:orthanc_id>/raw', dicom_instance_raw_proxy, name='dicom-instance-raw-proxy'),
+    path('pacs/instances/<str:orthanc_id>/health', dicom_instance_health, name='dicom-instance-health'),
+    path('pacs/instances/<str:orthanc_id>/thumbnail', dicom_instance_thumbnail, name='dicom-instance-thumbnail'),
     path('pacs/studies/<str:study_uid>/image-ids/', get_study_image_ids, name='get-study-image-ids'),
     path('pacs/studies/<str:study_uid>/enhanced-metadata/', get_enhanced_study_metadata, name='get-enhanced-study-metadata'),
     
     # CT Scan Bulk Retrieval API endpoints (NEW)
     path('pacs/studies/<str:study_uid>/series/', get_study_series_metadata, name='get-study-series-metadata'),
     path('pacs/studies/<str:study_uid>/series/<str:series_uid>/images/bulk', get_series_bulk_images, name='get-series-bulk-images'),
+    path('pacs/studies/<str:study_uid>/series/<str:series_uid>/frames', configurable_series_frames, name='series-frames-batch'),
     
     # DICOM Upload API endpoint
     path('upload/dicom/', upload_dicom_files, name='upload-dicom-files'),
+    path('upload/dicom/jobs/<int:job_id>/', dicom_upload_job_status, name='dicom-upload-job-status'),
     
     # Dashboard API endpoints
     path('dashboard/stats/', DashboardStatsAPIView.as_view(), name='dashboard-stats'),
@@ -640,23 +640,92 @@ def update_patient_race_if_empty(patient):
     return False
 
 
-def get_orthanc_monthly_images(year, month, modality=None, pacs_server=None):
+PACS_FIND_PAGE_SIZE = 1000
+DEFAULT_PACS_MONTH_CLOSE_DAYS = 7
+
+
+def count_orthanc_series_images(client, start_dicom, end_dicom, modality=None):
+    """
+    Count images and studies per modality for a StudyDate range on one PACS
+
+    Uses series-level /tools/find queries filtered by StudyDate (and
+    Modality), paged with Since/Limit; each expanded series carries its
+    Modality, ParentStudy and Instances, so no per-study requests are needed.
+    Raises requests.RequestException on PACS errors.
+
+    Args:
+        client (OrthancPACSClient): Client of the PACS server
+        start_dicom (str): First StudyDate (YYYYMMDD)
+        end_dicom (str): Last StudyDate (YYYYMMDD)
+        modality (str, optional): Only count series of this modality
+
+    Returns:
+        dict: total_images, total_studies, modality_breakdown
+    """
+    query = {'StudyDate': f"{start_dicom}-{end_dicom}"}
+    if modality:
+        query['Modality'] = modality
+
+    studies = set()
+    modality_studies = {}
+    modality_breakdown = {}
+    total_images = 0
+    since = 0
+
+    while True:
+        response = client.find('Series', query, expand=True, limit=PACS_FIND_PAGE_SIZE, Since=since)
+        response.raise_for_status()
+        series_list = response.json()
+
+        for series in series_list:
+            instance_count = len(series.get('Instances', []))
+            if not instance_count:
+                continue
+            series_modality = series.get('MainDicomTags', {}).get('Modality') or 'UN'
+            study_id = series.get('ParentStudy')
+
+            counts = modality_breakdown.setdefault(series_modality, {'images': 0, 'studies': 0})
+            counts['images'] += instance_count
+            total_images += instance_count
+            studies.add(study_id)
+            modality_studies.setdefault(series_modality, set()).add(study_id)
+
+        if len(series_list) < PACS_FIND_PAGE_SIZE:
+            break
+        since += PACS_FIND_PAGE_SIZE
+
+    for series_modality, study_ids in modality_studies.items():
+        modality_breakdown[series_modality]['studies'] = len(study_ids)
+
+    return {
+        'total_images': total_images,
+        'total_studies': len(studies),
+        'modality_breakdown': modality_breakdown
+    }
+
+
+def get_orthanc_monthly_images(year, month, modality=None, pacs_server=None, refresh=False):
     """
     Get monthly image counts from Orthanc PACS servers for reject analysis
     
+    Counts of closed months (ended more than PACS_MONTH_CLOSE_DAYS ago) are
+    stored per server in PacsMonthlyImageCount and read from there afterwards.
+    
     Args:
         year (int): Year for analysis
         month (int): Month for analysis (1-12)
         modality (str, optional): Filter by specific modality
         pacs_server (PacsServer, optional): Specific PACS server to query
+        refresh (bool): Query the PACS even if counts are stored
         
     Returns:
         dict: Statistics containing total_images, total_studies, modality_breakdown
     """
     import requests
     import calendar
-    from datetime import datetime, date
-    from exam.models import PacsServer
+    from datetime import date, timedelta
+    from exam.models import PacsServer, PacsMonthlyImageCount
+    from exam.orthanc_client import get_orthanc_client
     
     # Get target month date range
     start_date = date(year, month, 1)
@@ -667,6 +736,10 @@ def get_orthanc_monthly_images(year, month, modality=None, pacs_server=None):
     start_dicom = start_date.strftime('%Y%m%d')
     end_dicom = end_date.strftime('%Y%m%d')
     
+    # Late images for a month still arrive for a few days after it ends
+    close_days = getattr(settings, 'PACS_MONTH_CLOSE_DAYS', DEFAULT_PACS_MONTH_CLOSE_DAYS)
+    month_closed = end_date + timedelta(days=close_days) < timezone.localdate()
+    
     # Get PACS servers to query
     if pacs_server:
         pacs_servers = [pacs_server]
@@ -684,6 +757,13 @@ def get_orthanc_monthly_images(year, month, modality=None, pacs_server=None):
             'error': 'No active PACS servers configured for reject analysis'
         }
     
+    stored_counts = {}
+    if month_closed and not refresh:
+        stored_counts = {
+            count.pacs_server_id: count
+            for count in PacsMonthlyImageCount.objects.filter(pacs_server__in=pacs_servers, month=start_date)
+        }
+    
     total_images = 0
     total_studies = 0
     modality_breakdown = {}
@@ -691,97 +771,36 @@ def get_orthanc_monthly_images(year, month, modality=None, pacs_server=None):
     
     for server in pacs_servers:
         try:
-            # Build Orthanc API URL
-            base_url = server.orthancurl.rstrip('/')
-            
-            # Query studies for the month
-            studies_url = f"{base_url}/studies"
-            
-            # Get all studies (Orthanc doesn't support date filtering directly)
-            response = requests.get(studies_url, timeout=30)
-            response.raise_for_status()
-            
-            study_ids = response.json()
-            
-            monthly_studies = []
-            server_images = 0
-            server_modality_breakdown = {}
+            stored = stored_counts.get(server.pk)
+            if stored is not None:
+                server_counts = {
+                    'total_images': stored.total_images,
+                    'total_studies': stored.total_studies,
+                    'modality_breakdown': stored.modality_breakdown
+                }
+            else:
+                client = get_orthanc_client(server)
+                # Closed months are counted for all modalities so the stored row serves every filter
+                server_counts = count_orthanc_series_images(
+                    client, start_dicom, end_dicom, None if month_closed else modality
+                )
+                if month_closed:
+                    PacsMonthlyImageCount.objects.update_or_create(
+                        pacs_server=server, month=start_date, defaults=server_counts
+                    )
             
-            # Filter studies by date and modality
-            for study_id in study_ids:
-                try:
-                    # Get study metadata
-                    study_url = f"{base_url}/studies/{study_id}"
-                    study_response = requests.get(study_url, timeout=10)
-                    study_response.raise_for_status()
-                    
-                    study_data = study_response.json()
-                    main_dicom_tags = study_data.get('MainDicomTags', {})
-                    
-                    # Check study date
-                    study_date = main_dicom_tags.get('StudyDate', '')
-                    if not study_date or len(study_date) != 8:
-                        continue
-                    
-                    # Filter by date range
-                    if not (start_dicom <= study_date <= end_dicom):
-                        continue
-                    
-                    # Get modality from series
-                    series_ids = study_data.get('Series', [])
-                    study_modalities = set()
-                    study_image_count = 0
-                    
-                    for series_id in series_ids:
-                        try:
-                            series_url = f"{base_url}/series/{series_id}"
-                            series_response = requests.get(series_url, timeout=10)
-                            series_response.raise_for_status()
-                            
-                            series_data = series_response.json()
-                            series_tags = series_data.get('MainDicomTags', {})
-                            series_modality = series_tags.get('Modality', 'UN')
-                            
-                            # Filter by modality if specified
-                            if modality and series_modality != modality:
-                                continue
-                            
-                            study_modalities.add(series_modality)
-                            
-                            # Count instances (images) in this series
-                            instance_count = len(series_data.get('Instances', []))
-                            study_image_count += instance_count
-                            
-                            # Update modality breakdown
-                            if series_modality not in server_modality_breakdown:
-                                server_modality_breakdown[series_modality] = {
-                                    'images': 0,
-                                    'studies': 0
-                                }
-                            server_modality_breakdown[series_modality]['images'] += instance_count
-                            
-                        except requests.RequestException:
-                            # Skip problematic series but continue
-                            continue
-                    
-                    # Only count study if it matches our criteria
-                    if study_image_count > 0 and (not modality or modality in study_modalities):
-                        monthly_studies.append(study_id)
-                        server_images += study_image_count
-                        
-                        # Update study counts for modalities
-                        for mod in study_modalities:
-                            if not modality or mod == modality:
-                                if mod in server_modality_breakdown:
-                                    server_modality_breakdown[mod]['studies'] += 1
-                
-                except requests.RequestException:
-                    # Skip problematic studies but continue
-                    continue
+            if modality:
+                counts = server_counts['modality_breakdown'].get(modality, {'images': 0, 'studies': 0})
+                server_images, server_studies = counts['images'], counts['studies']
+                server_modality_breakdown = {modality: counts} if counts['images'] else {}
+            else:
+                server_images = server_counts['total_images']
+                server_studies = server_counts['total_studies']
+                server_modality_breakdown = server_counts['modality_breakdown']
             
             # Aggregate results from this server
             total_images += server_images
-            total_studies += len(monthly_studies)
+            total_studies += server_studies
             
             # Merge modality breakdowns
             for mod, counts in server_modality_breakdown.items():
@@ -790,7 +809,7 @@ def get_orthanc_monthly_images(year, month, modality=None, pacs_server=None):
                 modality_breakdown[mod]['images'] += counts['images']
                 modality_breakdown[mod]['studies'] += counts['studies']
             
-            print(f"DEBUG: PACS {server.name} - Found {server_images} images in {len(monthly_studies)} studies for {year}-{month:02d}")
+            print(f"DEBUG: PACS {server.name} - Found {server_images} images in {server_studies} studies for {year}-{month:02d}")
             
         except requests.RequestException as e:
             error_msg = f"Failed to query PACS server {server.name}: {str(e)}"
@@ -817,6 +836,140 @@ def get_orthanc_monthly_images(year, month, modality=None, pacs_server=None):
     return result
 
 
+DEFAULT_PACS_IMAGE_COUNT_WORKERS = 4
+DEFAULT_PACS_DAILY_COUNT_REFRESH_SECONDS = 300
+
+
+def reject_analysis_pacs_servers():
+    """Active PACS servers included in reject analysis"""
+    from exam.models import PacsServer
+    return list(PacsServer.objects.filter(is_active=True, include_in_reject_analysis=True))
+
+
+def query_pacs_daily_images(server, day):
+    """
+    Count one server's images for a StudyDate (PACS only, nothing is stored)
+
+    Args:
+        server (PacsServer): Server to query
+        day (date): StudyDate to count
+
+    Returns:
+        dict: Counts as returned by count_orthanc_series_images
+    """
+    from exam.orthanc_client import get_orthanc_client
+
+    dicom_date = day.strftime('%Y%m%d')
+    return count_orthanc_series_images(get_orthanc_client(server), dicom_date, dicom_date)
+
+
+def store_pacs_daily_images(server, day, counts):
+    """Replace the PacsDailyImageCount rows of a server and date with new counts"""
+    from exam.models import PacsDailyImageCount
+
+    rows = [PacsDailyImageCount(
+        pacs_server=server, date=day, modality='',
+        images=counts['total_images'], studies=counts['total_studies']
+    )]
+    rows += [
+        PacsDailyImageCount(
+            pacs_server=server, date=day, modality=modality[:16],
+            images=modality_counts['images'], studies=modality_counts['studies']
+        )
+        for modality, modality_counts in counts['modality_breakdown'].items()
+    ]
+    with transaction.atomic():
+        PacsDailyImageCount.objects.filter(pacs_server=server, date=day).delete()
+        PacsDailyImageCount.objects.bulk_create(rows)
+
+
+def count_pacs_daily_images(pairs, workers=None):
+    """
+    Count and store images for many (server, date) pairs
+
+    The PACS queries run on a thread pool; the counts are stored from the
+    calling thread as they complete.
+
+    Args:
+        pairs (list): (PacsServer, date) tuples
+        workers (int, optional): Parallel PACS queries, PACS_IMAGE_COUNT_WORKERS by default
+
+    Returns:
+        list: (server, date, error) for the pairs that failed
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not pairs:
+        return []
+    workers = workers or getattr(settings, 'PACS_IMAGE_COUNT_WORKERS', DEFAULT_PACS_IMAGE_COUNT_WORKERS)
+
+    def query(pair):
+        try:
+            return query_pacs_daily_images(*pair), None
+        except Exception as e:
+            return None, str(e)
+
+    failures = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(pairs)), thread_name_prefix='pacs-count') as executor:
+        for (server, day), (counts, error) in zip(pairs, executor.map(query, pairs)):
+            if error:
+                print(f"ERROR: Failed to count images on PACS server {server.name} for {day}: {error}")
+                failures.append((server, day, error))
+            else:
+                store_pacs_daily_images(server, day, counts)
+    return failures
+
+
+def get_daily_image_counts(dates, modality=None):
+    """
+    Image counts per date from PacsDailyImageCount, summed over reject analysis servers
+
+    Dates never counted are counted once; today and yesterday (images may
+    still be arriving) are recounted when older than
+    PACS_DAILY_COUNT_REFRESH_SECONDS. Older dates are only read locally.
+
+    Args:
+        dates (iterable): Dates to count
+        modality (str, optional): DICOM Modality, all modalities by default
+
+    Returns:
+        dict: {date: images}
+    """
+    from datetime import timedelta
+    from django.db.models import Sum
+    from exam.models import PacsDailyImageCount
+
+    dates = sorted(set(dates))
+    servers = reject_analysis_pacs_servers()
+    if not dates or not servers:
+        return {day: 0 for day in dates}
+
+    today = timezone.localdate()
+    recent = {today, today - timedelta(days=1)}
+    stale_before = timezone.now() - timedelta(
+        seconds=getattr(settings, 'PACS_DAILY_COUNT_REFRESH_SECONDS', DEFAULT_PACS_DAILY_COUNT_REFRESH_SECONDS)
+    )
+    counted = {
+        (row['pacs_server_id'], row['date']): row['counted_at']
+        for row in PacsDailyImageCount.objects.filter(
+            pacs_server__in=servers, date__in=dates, modality=''
+        ).values('pacs_server_id', 'date', 'counted_at')
+    }
+    pairs = []
+    for server in servers:
+        for day in dates:
+            counted_at = counted.get((server.pk, day))
+            if counted_at is None or (day in recent and counted_at < stale_before):
+                pairs.append((server, day))
+    count_pacs_daily_images(pairs)
+
+    images = dict(
+        PacsDailyImageCount.objects.filter(pacs_server__in=servers, date__in=dates, modality=modality or '')
+        .values('date').annotate(total=Sum('images')).order_by().values_list('date', 'total')
+    )
+    return {day: images.get(day, 0) for day in dates}
+
+
 def calculate_reject_analysis_from_pacs(analysis_date, modality, auto_save=True):
     """
     Calculate reject analysis statistics by querying PACS servers
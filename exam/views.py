@@ -17,9 +17,9 @@ from django.views.decorators.http import require_POST
 from django_htmx.http import trigger_client_event, push_url
 
 from exam.models import (
-    Pemeriksaan, Daftar, Exam, Modaliti, Part, Region, generate_exam_accession, 
+    Pemeriksaan, Daftar, Exam, Modaliti, Part, Region, peek_accession_number, 
     MediaDistribution, RejectCategory, RejectReason, RejectAnalysis, RejectIncident,
-    RejectAnalysisTargetSettings
+    RejectAnalysisTargetSettings, DicomUploadJob
 )
 from pesakit.models import Pesakit
 from exam.models import PacsConfig, DashboardConfig
@@ -53,16 +53,17 @@ from .serializers import (
     MediaDistributionCollectionSerializer, RejectCategorySerializer,
     RejectReasonSerializer, RejectAnalysisSerializer, RejectAnalysisListSerializer,
     RejectIncidentSerializer, RejectAnalysisTargetSettingsSerializer,
-    RejectAnalysisTargetSettingsDetailSerializer
+    RejectAnalysisTargetSettingsDetailSerializer, DicomUploadJobSerializer
 )
 import os
-import tempfile
-import pydicom
+import shutil
 from django.core.files.storage import default_storage
 from django.conf import settings
 import requests
 
 from .dicom_mwl import mwl_service
+from .dashboard_stats import get_dashboard_stats, compute_demographics
+from .dashboard_rollup import distribution, get_period_dates
 from pesakit.serializers import PesakitSerializer
 
 class ModalitiViewSet(viewsets.ModelViewSet):
@@ -505,7 +506,7 @@ def senarai_bcs(request):
 def tambah_bcs(request):
     tajuk = 'Daftar Pemeriksaan'
     form = BcsForm(request.POST or None, initial={'jxr': request.user})
-    noxraybaru = generate_exam_accession()
+    noxraybaru = peek_accession_number()
     examform = DaftarForm(request.POST or None, initial={'no_xray': noxraybaru})
     hantar_url = reverse("bcs:bcs-tambah")
     data = {
@@ -651,7 +652,7 @@ def del_exam(request, pk=None):
 
 @login_required
 def tambah_exam(request, pk=None):
-    noxraybaru = generate_exam_accession()
+    noxraybaru = peek_accession_number()
     examform = DaftarForm(request.POST or None, initial={'no_xray': noxraybaru})
     bcs = Daftar.objects.get(pk=pk)
     if request.method == "POST":
@@ -1022,7 +1023,13 @@ def upload_dicom_files(request):
     3. Creates/links patient record
     4. Creates study registration
     5. Stores files in Orthanc PACS
+    
+    With background=true the upload runs after responding: the response
+    carries a job to poll at upload/dicom/jobs/<id>/ or follow over the
+    ws/dicom-uploads/<id>/progress/ WebSocket (see exam/dicom_upload.py).
     """
+    from .dicom_upload import DicomUploadError, process_dicom_upload, spool_uploaded_files, start_upload_job
+    
     try:
         # Get uploaded files
         uploaded_files = request.FILES.getlist('dicom_files')
@@ -1042,569 +1049,32 @@ def upload_dicom_files(request):
             'ward_id': request.data.get('ward_id'),
         }
         
-        processed_files = []
-        patient_info = None
-        study_instance_uid = None
-        
-        # Process each uploaded file
-        for uploaded_file in uploaded_files:
-            try:
-                # Validate DICOM file
-                with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                    for chunk in uploaded_file.chunks():
-                        temp_file.write(chunk)
-                    temp_file_path = temp_file.name
-                
-                # Parse DICOM metadata
-                try:
-                    dcm = pydicom.dcmread(temp_file_path)
-                except Exception as e:
-                    os.unlink(temp_file_path)
-                    return Response({
-                        'success': False,
-                        'error': f'Invalid DICOM file: {uploaded_file.name}',
-                        'message': f'File format error: {str(e)}'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Extract patient information from first file
-                if patient_info is None:
-                    patient_info = {
-                        'patient_id': getattr(dcm, 'PatientID', ''),
-                        'patient_name': str(getattr(dcm, 'PatientName', '')).replace('^', ' '),
-                        'patient_birth_date': getattr(dcm, 'PatientBirthDate', ''),
-                        'patient_sex': getattr(dcm, 'PatientSex', ''),
-                    }
-                    study_instance_uid = getattr(dcm, 'StudyInstanceUID', '')
-                
-                # Extract comprehensive DICOM metadata (same approach as PACS Browser import)
-                patient_name = str(getattr(dcm, 'PatientName', 'Unknown')).replace('^', ' ')
-                patient_id = getattr(dcm, 'PatientID', '')
-                patient_birth_date = getattr(dcm, 'PatientBirthDate', '')  # YYYYMMDD format
-                patient_sex = getattr(dcm, 'PatientSex', '')  # M/F
-                patient_age = getattr(dcm, 'PatientAge', '')  # e.g., "034Y"
-                study_description = getattr(dcm, 'StudyDescription', '')
-                referring_physician = str(getattr(dcm, 'ReferringPhysicianName', '')).replace('^', ' ')
-                accession_number = getattr(dcm, 'AccessionNumber', '')
-                modality = getattr(dcm, 'Modality', 'OT')
-                
-                # Extract additional tags for custom accession generation
-                requesting_service = getattr(dcm, 'RequestingService', '')
-                institution_name = getattr(dcm, 'InstitutionName', '')
-                study_date = getattr(dcm, 'StudyDate', '')
-                
-                # Extract examination-specific DICOM tags
-                body_part_examined = getattr(dcm, 'BodyPartExamined', '')
-                acquisition_device_processing_description = getattr(dcm, 'AcquisitionDeviceProcessingDescription', '')
-                operators_name = str(getattr(dcm, 'OperatorsName', '')).replace('^', ' ')
-                patient_position = getattr(dcm, 'PatientPosition', '')
-                view_position = getattr(dcm, 'ViewPosition', '')
-                series_description = getattr(dcm, 'SeriesDescription', '')
-                laterality = getattr(dcm, 'Laterality', '')  # L/R
-                
-                # Extract DICOM Date/Time with multiple fallback options and track source
-                date_source = ""
-                time_source = ""
-                
-                # Find best available date
-                if getattr(dcm, 'ContentDate', ''):
-                    content_date = dcm.ContentDate
-                    date_source = "ContentDate"
-                elif getattr(dcm, 'StudyDate', ''):
-                    content_date = dcm.StudyDate
-                    date_source = "StudyDate"
-                elif getattr(dcm, 'SeriesDate', ''):
-                    content_date = dcm.SeriesDate
-                    date_source = "SeriesDate"
-                elif getattr(dcm, 'AcquisitionDate', ''):
-                    content_date = dcm.AcquisitionDate
-                    date_source = "AcquisitionDate"
-                elif getattr(dcm, 'InstanceCreationDate', ''):
-                    content_date = dcm.InstanceCreationDate
-                    date_source = "InstanceCreationDate"
-                else:
-                    content_date = ""
-                
-                # Find best available time
-                if getattr(dcm, 'ContentTime', ''):
-                    content_time = dcm.ContentTime
-                    time_source = "ContentTime"
-                elif getattr(dcm, 'StudyTime', ''):
-                    content_time = dcm.StudyTime
-                    time_source = "StudyTime"
-                elif getattr(dcm, 'SeriesTime', ''):
-                    content_time = dcm.SeriesTime
-                    time_source = "SeriesTime"
-                elif getattr(dcm, 'AcquisitionTime', ''):
-                    content_time = dcm.AcquisitionTime
-                    time_source = "AcquisitionTime"
-                elif getattr(dcm, 'InstanceCreationTime', ''):
-                    content_time = dcm.InstanceCreationTime
-                    time_source = "InstanceCreationTime"
-                else:
-                    content_time = ""
-                
-                # Create datetime source description
-                if date_source and time_source:
-                    datetime_source = f"{date_source}/{time_source}"
-                elif date_source:
-                    datetime_source = f"{date_source} (no time)"
-                else:
-                    datetime_source = ""
-                
-                print(f"DEBUG: DICOM Date/Time extraction for {uploaded_file.name}:")
-                print(f"  Final content_date: {content_date} (from {date_source})")
-                print(f"  Final content_time: {content_time} (from {time_source})")
-                print(f"  DateTime source: {datetime_source}")
-                
-                # Store metadata for processing
-                file_metadata = {
-                    'filename': uploaded_file.name,
-                    'temp_path': temp_file_path,
-                    'patient_name': patient_name,
-                    'patient_id': patient_id,
-                    'patient_birth_date': patient_birth_date,
-                    'patient_sex': patient_sex,
-                    'patient_age': patient_age,
-                    'study_instance_uid': getattr(dcm, 'StudyInstanceUID', ''),
-                    'series_instance_uid': getattr(dcm, 'SeriesInstanceUID', ''),
-                    'sop_instance_uid': getattr(dcm, 'SOPInstanceUID', ''),
-                    'modality': modality,
-                    'study_date': getattr(dcm, 'StudyDate', ''),
-                    'study_time': getattr(dcm, 'StudyTime', ''),
-                    'study_description': study_description,
-                    'series_description': series_description,
-                    'referring_physician': referring_physician,
-                    'accession_number': accession_number,
-                    'requesting_service': requesting_service,
-                    'institution_name': institution_name,
-                    'study_date': study_date,
-                    'instance_number': getattr(dcm, 'InstanceNumber', 1),
-                    # Examination-specific metadata
-                    'body_part_examined': body_part_examined,
-                    'acquisition_device_processing_description': acquisition_device_processing_description,
-                    'operators_name': operators_name,
-                    'patient_position': patient_position,
-                    'view_position': view_position,
-                    'laterality': laterality,
-                    # DICOM Content Date/Time
-                    'content_date': content_date,
-                    'content_time': content_time,
-                    'datetime_source': datetime_source,
-                }
-                processed_files.append(file_metadata)
-                
-            except Exception as e:
-                # Clean up temp file on error
-                if 'temp_file_path' in locals():
-                    try:
-                        os.unlink(temp_file_path)
-                    except:
-                        pass
-                return Response({
-                    'success': False,
-                    'error': f'Error processing {uploaded_file.name}',
-                    'message': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Import shared utilities
-        from .utils import (
-            generate_custom_accession,
-            find_or_create_patient,
-            create_daftar_for_study,
-            create_pemeriksaan_from_dicom
-        )
-        
-        # Use shared patient creation function with manual override support
-        def find_or_create_patient_with_override(file_metadata):
-            """Wrapper for shared function with manual patient ID override"""
-            manual_patient_id = registration_data.get('patient_id')
-            return find_or_create_patient(file_metadata, manual_patient_id)
-
-        # Process each file individually to ensure separate patients get separate daftars
-        all_results = {
-            'patients': {},
-            'daftars': {},
-            'examinations': []
-        }
+        if str(request.data.get('background', '')).lower() in ('1', 'true', 'yes'):
+            job = start_upload_job(uploaded_files, registration_data, request.user)
+            return Response({
+                'success': True,
+                'message': f'Queued {job.total_files} DICOM files for upload',
+                'job': DicomUploadJobSerializer(job).data,
+                'progress_url': f'/ws/dicom-uploads/{job.pk}/progress/'
+            }, status=status.HTTP_202_ACCEPTED)
         
+        spool_dir, files = spool_uploaded_files(uploaded_files)
         try:
-            for file_metadata in processed_files:
-                # Get patient for this specific file  
-                patient = find_or_create_patient_with_override(file_metadata)
-                patient_key = f"{patient.nric}_{patient.nama}"
-                all_results['patients'][patient_key] = patient
-                
-                # Generate accession for this file
-                accession_number = generate_custom_accession(file_metadata)
-                
-                # Create or find Daftar for this patient/study
-                study_instance_uid = file_metadata.get('study_instance_uid', '')
-                daftar_key = f"{patient.id}_{study_instance_uid or accession_number}"
-                
-                print(f"DEBUG: Daftar key: {daftar_key}")
-                print(f"DEBUG: Study UID: '{study_instance_uid}', Accession: '{accession_number}'")
-                
-                if daftar_key in all_results['daftars']:
-                    daftar = all_results['daftars'][daftar_key]
-                    print(f"DEBUG: Using existing daftar: {daftar.id}")
-                else:
-                    print(f"DEBUG: Creating new daftar for patient {patient.id}")
-                    # Create new daftar for this patient/study
-                    modality_name = registration_data.get('modality') or file_metadata.get('modality', 'OT')
-                    referring_physician = (registration_data.get('referring_physician') or 
-                                         file_metadata.get('referring_physician') or 'Upload')
-                    study_description = (registration_data.get('study_description') or 
-                                       file_metadata.get('study_description') or 'Uploaded Study')
-                    
-                    # Parse StudyDate from DICOM or fallback to today
-                    study_date_str = file_metadata.get('study_date', '')
-                    if study_date_str and len(study_date_str) == 8:
-                        try:
-                            # Convert DICOM date format (YYYYMMDD) to Django datetime
-                            from datetime import datetime
-                            study_date = datetime.strptime(study_date_str, '%Y%m%d').date()
-                            tarikh = timezone.make_aware(datetime.combine(study_date, datetime.min.time()))
-                        except ValueError:
-                            # Invalid date format, use today
-                            tarikh = timezone.now()
-                    else:
-                        # No valid StudyDate, use today
-                        tarikh = timezone.now()
-                    
-                    print(f"DEBUG: About to create daftar with pesakit={patient.id}, modality='{modality_name}', study_uid='{study_instance_uid}', accession='{accession_number}', study_date='{study_date_str}'")
-                    daftar = Daftar.objects.create(
-                        pesakit=patient,
-                        pemohon=referring_physician,
-                        study_description=study_description,
-                        modality=modality_name,
-                        study_instance_uid=study_instance_uid,
-                        parent_accession_number=accession_number or None,
-                        accession_number=accession_number or None,
-                        jxr=request.user,
-                        study_status='COMPLETED',
-                        tarikh=tarikh
-                    )
-                    print(f"DEBUG: Created daftar ID {daftar.id} for patient {patient.id} with accession '{daftar.parent_accession_number}'")
-                    
-                    # Add ward if specified
-                    if registration_data.get('ward_id'):
-                        try:
-                            from wad.models import Ward
-                            ward = Ward.objects.get(id=registration_data['ward_id'])
-                            daftar.rujukan = ward
-                            daftar.save()
-                        except Ward.DoesNotExist:
-                            pass
-                    
-                    all_results['daftars'][daftar_key] = daftar
-            
-            # Create examination records (Pemeriksaan) - parse DICOM metadata like PACS Browser import
-            created_examinations = []
-            from exam.models import Exam, Part, Pemeriksaan
-            
-            # Helper function to parse examination details from DICOM metadata
-            def parse_dicom_examination_details(file_metadata):
-                body_part = file_metadata.get('body_part_examined', '').upper()
-                acquisition_desc = file_metadata.get('acquisition_device_processing_description', '')
-                modality = file_metadata.get('modality', 'OT')
-                
-                # Parse exam type and position from AcquisitionDeviceProcessingDescription
-                # e.g., "CHEST,ERECT P->A" -> exam_type="CHEST", position="PA ERECT"
-                exam_type = body_part or modality  # Default to body part or modality
-                position = file_metadata.get('patient_position', '')
-                
-                if acquisition_desc:
-                    # Parse acquisition description (e.g., "CHEST,ERECT P->A")
-                    parts = acquisition_desc.split(',')
-                    if len(parts) >= 1:
-                        exam_type = parts[0].strip().upper()
-                    if len(parts) >= 2:
-                        pos_desc = parts[1].strip()
-                        # Parse position description (e.g., "ERECT P->A" -> "PA ERECT")
-                        if 'P->A' in pos_desc or 'P-A' in pos_desc:
-                            position = f"PA {pos_desc.replace('P->A', '').replace('P-A', '').strip()}"
-                        elif 'A->P' in pos_desc or 'A-P' in pos_desc:
-                            position = f"AP {pos_desc.replace('A->P', '').replace('A-P', '').strip()}"
-                        elif 'LAT' in pos_desc.upper():
-                            position = f"LAT {pos_desc.replace('LAT', '').strip()}"
-                        else:
-                            position = pos_desc
-                
-                # Get radiographer name
-                radiographer_name = file_metadata.get('operators_name', '').strip()
-                
-                # Get laterality (L/R)
-                laterality = file_metadata.get('laterality', '').upper()
-                
-                return {
-                    'exam_type': (exam_type or f"{modality} Study").strip(),
-                    'body_part': body_part.strip() if body_part else '',
-                    'position': position.strip() if position else '',
-                    'laterality': laterality.strip() if laterality else '',
-                    'radiographer_name': radiographer_name.strip() if radiographer_name else '',
-                    'modality': modality.strip() if modality else 'OT'
-                }
-            
-            # Now create examination for each file and daftar
-            for file_metadata in processed_files:
-                # Get the daftar for this file
-                patient = find_or_create_patient(file_metadata)
-                study_instance_uid = file_metadata.get('study_instance_uid', '')
-                accession_number = generate_custom_accession(file_metadata)
-                daftar_key = f"{patient.id}_{study_instance_uid or accession_number}"
-                daftar = all_results['daftars'][daftar_key]
-                print(f"DEBUG: Processing file: {file_metadata['filename']}")
-                exam_details = parse_dicom_examination_details(file_metadata)
-                print(f"DEBUG: Parsed exam details: {exam_details}")
-                
-                # Find or create modality (ensure it exists)
-                file_modality_name = exam_details['modality']
-                file_modality, _ = Modaliti.objects.get_or_create(
-                    nama=file_modality_name,
-                    defaults={'singkatan': file_modality_name[:5]}
-                )
-                
-                # Find or create body part
-                part = None
-                if exam_details['body_part']:
-                    part, _ = Part.objects.get_or_create(
-                        part=exam_details['body_part']
-                    )
-                
-                # Find or create exam type - handle constraint with atomic transaction
-                from django.db import transaction
-                
-                try:
-                    with transaction.atomic():
-                        exam, created = Exam.objects.get_or_create(
-                            exam=exam_details['exam_type'],
-                            modaliti=file_modality,
-                            part=part,
-                            defaults={'catatan': 'Created from DICOM upload'}
-                        )
-                        print(f"DEBUG: Exam {'created' if created else 'found'}: {exam.id} - {exam.exam}/{exam.modaliti.nama}/{exam.part.part if exam.part else None}")
-                except Exception as e:
-                    print(f"DEBUG: Exam creation failed: {e}")
-                    print(f"DEBUG: Trying to find existing exam: {exam_details['exam_type']}/{file_modality.nama}/{part.part if part else None}")
-                    
-                    # Debug: Check what exams exist with similar names
-                    similar_exams = Exam.objects.filter(exam__icontains='CHEST')
-                    print(f"DEBUG: Found {similar_exams.count()} exams containing 'CHEST':")
-                    for se in similar_exams[:5]:  # Show first 5
-                        print(f"  - ID:{se.id} '{se.exam}' | Modality:{se.modaliti.nama}({se.modaliti.id}) | Part:{se.part.part if se.part else None}({se.part.id if se.part else None})")
-                    
-                    # Check modality and part values
-                    print(f"DEBUG: Our values - Modality:{file_modality.nama}({file_modality.id}) | Part:{part.part if part else None}({part.id if part else None})")
-                    
-                    # Try exact match with different queries
-                    exam = Exam.objects.filter(
-                        exam=exam_details['exam_type'],
-                        modaliti=file_modality,
-                        part=part
-                    ).first()
-                    
-                    if exam:
-                        print(f"DEBUG: Found existing exam after error: {exam.id}")
-                    else:
-                        # Try without part filter in case part is the issue
-                        exam_no_part = Exam.objects.filter(
-                            exam=exam_details['exam_type'],
-                            modaliti=file_modality,
-                            part__isnull=True
-                        ).first()
-                        
-                        if exam_no_part:
-                            print(f"DEBUG: Found exam without part: {exam_no_part.id}")
-                            exam = exam_no_part
-                        else:
-                            print(f"DEBUG: Still no exam found, this is definitely a database issue")
-                            # Just use any CHEST exam with same modality as fallback
-                            fallback_exam = Exam.objects.filter(
-                                exam__iexact='CHEST',
-                                modaliti=file_modality
-                            ).first()
-                            
-                            if fallback_exam:
-                                print(f"DEBUG: Using fallback exam: {fallback_exam.id}")
-                                exam = fallback_exam
-                            else:
-                                raise Exception(f"Cannot create or find any suitable exam for: {exam_details['exam_type']}/{file_modality.nama}/{part.part if part else None}")
-                
-                # Map position to patient_position
-                patient_position_mapped = None
-                if exam_details['position']:
-                    pos = exam_details['position'].upper()
-                    position_map = {
-                        'AP': 'AP',
-                        'PA': 'PA', 
-                        'LAT': 'LAT',
-                        'LATERAL': 'LAT',
-                        'LEFT': 'LATERAL_LEFT',
-                        'RIGHT': 'LATERAL_RIGHT',
-                        'OBL': 'OBLIQUE',
-                        'OBLIQUE': 'OBLIQUE'
-                    }
-                    for key, value in position_map.items():
-                        if key in pos:
-                            patient_position_mapped = value
-                            break
-                    if not patient_position_mapped:
-                        patient_position_mapped = exam_details['position']
-                
-                # Find radiographer user
-                radiographer = request.user  # Default to uploading user
-                if exam_details['radiographer_name']:
-                    try:
-                        from django.contrib.auth import get_user_model
-                        User = get_user_model()
-                        # Try to find user by name parts
-                        name_parts = exam_details['radiographer_name'].split()
-                        if len(name_parts) >= 1:
-                            radiographer = User.objects.filter(
-                                first_name__icontains=name_parts[0]
-                            ).first() or request.user
-                    except:
-                        pass
-                
-                # Build comprehensive notes from DICOM metadata
-                notes_parts = [f"File: {file_metadata['filename']}"]
-                if file_metadata.get('series_description'):
-                    notes_parts.append(f"Series: {file_metadata['series_description']}")
-                if exam_details['laterality']:
-                    notes_parts.append(f"Laterality: {exam_details['laterality']}")
-                if file_metadata.get('acquisition_device_processing_description'):
-                    notes_parts.append(f"Acquisition: {file_metadata['acquisition_device_processing_description']}")
-                if exam_details['radiographer_name']:
-                    notes_parts.append(f"Operator: {exam_details['radiographer_name']}")
-                
-                # Create examination record
-                print(f"DEBUG: About to create Pemeriksaan for daftar {daftar.id}, exam {exam.id}")
-                pemeriksaan = Pemeriksaan.objects.create(
-                    daftar=daftar,
-                    exam=exam,
-                    accession_number=accession_number or None,
-                    no_xray=accession_number or f"UPL{timezone.now().strftime('%Y%m%d%H%M%S')}_{len(all_results['examinations'])+1}",
-                    patient_position=patient_position_mapped,
-                    catatan=", ".join(notes_parts),
-                    jxr=radiographer,
-                    exam_status='COMPLETED'
-                )
-                print(f"DEBUG: Created Pemeriksaan ID {pemeriksaan.id} with accession '{pemeriksaan.accession_number}'")
-                all_results['examinations'].append(pemeriksaan)
-            
-        except Exception as e:
-            # Clean up temp files on error
-            for file_data in processed_files:
-                try:
-                    os.unlink(file_data['temp_path'])
-                except:
-                    pass
+            message, data = process_dicom_upload(files, registration_data, request.user)
+        except DicomUploadError as e:
             return Response({
                 'success': False,
-                'error': 'Failed to create study registration',
-                'message': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Upload files to Orthanc PACS
-        uploaded_instances = []
-        try:
-            # Get PACS configuration
-            pacs_config = PacsConfig.objects.first()
-            if not pacs_config:
-                raise Exception("PACS server not configured")
-            
-            orthanc_url = pacs_config.orthancurl.rstrip('/')
-            
-            for file_data in processed_files:
-                try:
-                    # Upload to Orthanc
-                    with open(file_data['temp_path'], 'rb') as dicom_file:
-                        response = requests.post(
-                            f"{orthanc_url}/instances",
-                            files={'file': dicom_file},
-                            timeout=30
-                        )
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            uploaded_instances.append({
-                                'filename': file_data['filename'],
-                                'orthanc_id': result.get('ID'),
-                                'status': 'uploaded'
-                            })
-                        else:
-                            uploaded_instances.append({
-                                'filename': file_data['filename'],
-                                'status': 'failed',
-                                'error': f'HTTP {response.status_code}'
-                            })
-                            
-                except Exception as upload_error:
-                    uploaded_instances.append({
-                        'filename': file_data['filename'],
-                        'status': 'failed',
-                        'error': str(upload_error)
-                    })
-                
-        except Exception as e:
-            # PACS upload failed, but registration was successful
-            pass
-        
-        # Link to PACS study (same as PACS Browser import)
-        if created_examinations and uploaded_instances:
-            try:
-                from exam.models import PacsExam
-                # Create PacsExam link for the first examination
-                first_uploaded = next((i for i in uploaded_instances if i['status'] == 'uploaded'), None)
-                if first_uploaded:
-                    PacsExam.objects.create(
-                        exam=created_examinations[0],  # OneToOneField to first Pemeriksaan
-                        orthanc_id=first_uploaded.get('orthanc_id', ''),
-                        study_id=study_instance_uid,
-                        study_instance=study_instance_uid
-                    )
-            except Exception as pacs_link_error:
-                # Non-critical error - continue
-                logger.warning(f"Failed to create PACS link: {pacs_link_error}")
-        
-        # Clean up temporary files
-        for file_data in processed_files:
-            try:
-                os.unlink(file_data['temp_path'])
-            except:
-                pass
-        
-        # Prepare response
-        success_count = len([i for i in uploaded_instances if i['status'] == 'uploaded'])
-        total_count = len(uploaded_instances)
+                'error': e.error,
+                'message': e.message
+            }, status=e.status_code)
+        finally:
+            # Clean up temporary files
+            shutil.rmtree(spool_dir, ignore_errors=True)
         
         return Response({
             'success': True,
-            'message': f'Successfully processed {success_count}/{total_count} DICOM files for {len(all_results["patients"])} patients',
-            'data': {
-                'patients_created': len(all_results["patients"]),
-                'patients': [
-                    {
-                        'id': patient.id,
-                        'name': patient.nama,
-                        'nric': patient.nric,
-                        'mrn': patient.mrn
-                    } for patient in all_results["patients"].values()
-                ],
-                'daftars_created': len(all_results["daftars"]),
-                'daftars': [
-                    {
-                        'id': daftar.id,
-                        'patient_id': daftar.pesakit.id,
-                        'accession_number': daftar.parent_accession_number,
-                        'study_instance_uid': daftar.study_instance_uid
-                    } for daftar in all_results["daftars"].values()
-                ],
-                'examination_ids': [exam.id for exam in all_results["examinations"]],
-                'examination_count': len(all_results["examinations"]),
-                'uploaded_files': uploaded_instances,
-                'pacs_status': 'uploaded' if success_count > 0 else 'failed'
-            }
+            'message': message,
+            'data': data
         }, status=status.HTTP_201_CREATED)
         
     except Exception as e:
@@ -1616,6 +1086,21 @@ def upload_dicom_files(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dicom_upload_job_status(request, job_id):
+    """Progress and, once finished, the result of a background DICOM upload"""
+    from .dicom_upload import fail_stale_upload_jobs
+    
+    fail_stale_upload_jobs()
+    jobs = DicomUploadJob.objects.all()
+    if not request.user.is_staff:
+        # The result carries patient details; only the uploader may poll it
+        jobs = jobs.filter(requested_by=request.user)
+    job = get_object_or_404(jobs, pk=job_id)
+    return Response(DicomUploadJobSerializer(job).data)
+
+
 # Dashboard API Views
 class DashboardStatsAPIView(APIView):
     """
@@ -1626,96 +1111,9 @@ class DashboardStatsAPIView(APIView):
     renderer_classes = [JSONRenderer]
     
     def get(self, request):
-        from django.db.models import Count
-        from datetime import datetime, timedelta
-        
-        # Get current time
-        now = timezone.now()
-        today = now.date()
-        
-        # Define time periods
-        periods = {
-            'today': {
-                'start': timezone.make_aware(datetime.combine(today, datetime.min.time())),
-                'end': timezone.make_aware(datetime.combine(today, datetime.max.time()))
-            },
-            'week': {
-                'start': now - timedelta(days=7),
-                'end': now
-            },
-            'month': {
-                'start': now - timedelta(days=30),
-                'end': now
-            },
-            'year': {
-                'start': timezone.make_aware(datetime(now.year, 1, 1)),
-                'end': timezone.make_aware(datetime(now.year, 12, 31, 23, 59, 59))
-            }
-        }
-        
-        stats = {}
-        
-        for period_name, period_range in periods.items():
-            # Patient count (use created date for patients as they don't have exam dates)
-            patients_count = Pesakit.objects.filter(
-                created__range=[period_range['start'], period_range['end']]
-            ).count()
-            
-            # Registration count (use tarikh/exam date instead of created date)
-            registrations_count = Daftar.objects.filter(
-                tarikh__range=[period_range['start'], period_range['end']]
-            ).count()
-            
-            # Examination count (use daftar's tarikh/exam date via foreign key)
-            examinations_count = Pemeriksaan.objects.filter(
-                daftar__tarikh__range=[period_range['start'], period_range['end']]
-            ).count()
-            
-            # Completed studies count (use tarikh/exam date instead of created date)
-            completed_studies = Daftar.objects.filter(
-                tarikh__range=[period_range['start'], period_range['end']],
-                study_status='COMPLETED'
-            ).count()
-            
-            # Calculate cases per day - use actual days in period
-            if period_name == 'today':
-                days_in_period = 1
-            elif period_name == 'week':
-                days_in_period = 7
-            elif period_name == 'month':
-                days_in_period = 30
-            elif period_name == 'year':
-                days_in_period = 365
-            
-            cases_per_day = round(examinations_count / days_in_period, 1) if days_in_period > 0 else 0
-            
-            stats[period_name] = {
-                'patients': patients_count,
-                'registrations': registrations_count,
-                'examinations': examinations_count,
-                'studies_completed': completed_studies,
-                'cases_per_day': cases_per_day
-            }
-        
-        # All time stats
-        all_examinations = Pemeriksaan.objects.count()
-        # Calculate all-time cases per day based on data span
-        first_exam = Pemeriksaan.objects.order_by('created').first()
-        if first_exam:
-            total_days = (now - first_exam.created).days or 1
-            all_time_cases_per_day = round(all_examinations / total_days, 1)
-        else:
-            all_time_cases_per_day = 0
-        
-        stats['all_time'] = {
-            'patients': Pesakit.objects.count(),
-            'registrations': Daftar.objects.count(),
-            'examinations': all_examinations,
-            'studies_completed': Daftar.objects.filter(study_status='COMPLETED').count(),
-            'cases_per_day': all_time_cases_per_day
-        }
-        
-        return Response(stats)
+        # Conditional aggregation (one query per model), cached and kept
+        # current by the signal handlers in exam/signals.py
+        return Response(get_dashboard_stats())
 
 
 class DashboardDemographicsAPIView(APIView):
@@ -1727,192 +1125,8 @@ class DashboardDemographicsAPIView(APIView):
     renderer_classes = [JSONRenderer]
     
     def get(self, request):
-        from datetime import datetime, timedelta
-        
-        # Get current time
-        now = timezone.now()
-        today = now.date()
-        
-        # Define time periods
-        periods = {
-            'today': {
-                'start': timezone.make_aware(datetime.combine(today, datetime.min.time())),
-                'end': timezone.make_aware(datetime.combine(today, datetime.max.time()))
-            },
-            'week': {
-                'start': now - timedelta(days=7),
-                'end': now
-            },
-            'month': {
-                'start': now - timedelta(days=30),
-                'end': now
-            },
-            'year': {
-                'start': timezone.make_aware(datetime(now.year, 1, 1)),
-                'end': timezone.make_aware(datetime(now.year, 12, 31, 23, 59, 59))
-            }
-        }
-        
-        demographics = {'by_period': {}}
-        
-        for period_name, period_range in periods.items():
-            # Get patients in this period
-            patients = Pesakit.objects.filter(
-                created__range=[period_range['start'], period_range['end']]
-            )
-            
-            total_patients = patients.count()
-            
-            if total_patients == 0:
-                demographics['by_period'][period_name] = {
-                    'age_groups': [],
-                    'gender': [],
-                    'race': []
-                }
-                continue
-            
-            # Age groups calculation
-            age_groups = {'0-17': 0, '18-65': 0, '65+': 0}
-            
-            for patient in patients:
-                if patient.t_lahir:  # If we can calculate age from NRIC
-                    age = patient.kira_umur
-                    if age < 18:
-                        age_groups['0-17'] += 1
-                    elif age <= 65:
-                        age_groups['18-65'] += 1
-                    else:
-                        age_groups['65+'] += 1
-                else:
-                    # If no birth date, try to parse umur field
-                    if patient.umur:
-                        try:
-                            age_str = patient.umur.replace('Y', '').replace('y', '').strip()
-                            age = int(age_str)
-                            if age < 18:
-                                age_groups['0-17'] += 1
-                            elif age <= 65:
-                                age_groups['18-65'] += 1
-                            else:
-                                age_groups['65+'] += 1
-                        except (ValueError, AttributeError):
-                            # Default to adult if we can't determine age
-                            age_groups['18-65'] += 1
-            
-            age_groups_list = [
-                {
-                    'range': age_range,
-                    'count': count,
-                    'percentage': round((count / total_patients) * 100, 1) if total_patients > 0 else 0
-                }
-                for age_range, count in age_groups.items()
-            ]
-            
-            # Gender distribution
-            gender_stats = patients.values('jantina').annotate(count=Count('jantina'))
-            gender_list = []
-            for gender_stat in gender_stats:
-                gender_display = 'M' if gender_stat['jantina'] == 'L' else 'F'
-                gender_list.append({
-                    'gender': gender_display,
-                    'count': gender_stat['count'],
-                    'percentage': round((gender_stat['count'] / total_patients) * 100, 1)
-                })
-            
-            # Race distribution
-            race_stats = patients.values('bangsa').annotate(count=Count('bangsa'))
-            race_list = [
-                {
-                    'race': race_stat['bangsa'],
-                    'count': race_stat['count'],
-                    'percentage': round((race_stat['count'] / total_patients) * 100, 1)
-                }
-                for race_stat in race_stats
-            ]
-            
-            demographics['by_period'][period_name] = {
-                'age_groups': age_groups_list,
-                'gender': gender_list,
-                'race': race_list
-            }
-        
-        # Add all_time demographics
-        all_patients = Pesakit.objects.all()
-        total_all_patients = all_patients.count()
-        
-        if total_all_patients > 0:
-            # Age groups calculation for all time
-            age_groups_all = {'0-17': 0, '18-65': 0, '65+': 0}
-            
-            for patient in all_patients:
-                if patient.t_lahir:  # If we can calculate age from NRIC
-                    age = patient.kira_umur
-                    if age < 18:
-                        age_groups_all['0-17'] += 1
-                    elif age <= 65:
-                        age_groups_all['18-65'] += 1
-                    else:
-                        age_groups_all['65+'] += 1
-                else:
-                    # If no birth date, try to parse umur field
-                    if patient.umur:
-                        try:
-                            age_str = patient.umur.replace('Y', '').replace('y', '').strip()
-                            age = int(age_str)
-                            if age < 18:
-                                age_groups_all['0-17'] += 1
-                            elif age <= 65:
-                                age_groups_all['18-65'] += 1
-                            else:
-                                age_groups_all['65+'] += 1
-                        except (ValueError, AttributeError):
-                            # Default to adult if we can't determine age
-                            age_groups_all['18-65'] += 1
-            
-            age_groups_all_list = [
-                {
-                    'range': age_range,
-                    'count': count,
-                    'percentage': round((count / total_all_patients) * 100, 1) if total_all_patients > 0 else 0
-                }
-                for age_range, count in age_groups_all.items()
-            ]
-            
-            # Gender distribution for all time
-            gender_stats_all = all_patients.values('jantina').annotate(count=Count('jantina'))
-            gender_all_list = []
-            for gender_stat in gender_stats_all:
-                gender_display = 'M' if gender_stat['jantina'] == 'L' else 'F'
-                gender_all_list.append({
-                    'gender': gender_display,
-                    'count': gender_stat['count'],
-                    'percentage': round((gender_stat['count'] / total_all_patients) * 100, 1)
-                })
-            
-            # Race distribution for all time
-            race_stats_all = all_patients.values('bangsa').annotate(count=Count('bangsa'))
-            race_all_list = [
-                {
-                    'race': race_stat['bangsa'],
-                    'count': race_stat['count'],
-                    'percentage': round((race_stat['count'] / total_all_patients) * 100, 1)
-                }
-                for race_stat in race_stats_all
-            ]
-            
-            demographics['by_period']['all_time'] = {
-                'age_groups': age_groups_all_list,
-                'gender': gender_all_list,
-                'race': race_all_list
-            }
-        else:
-            demographics['by_period']['all_time'] = {
-                'age_groups': [],
-                'gender': [],
-                'race': []
-            }
-        
-        return Response(demographics)
+        # One grouped query on the stored tarikh_lahir/jantina/bangsa columns
+        return Response(compute_demographics())
 
 
 class DashboardModalityStatsAPIView(APIView):
@@ -1923,86 +1137,9 @@ class DashboardModalityStatsAPIView(APIView):
     renderer_classes = [JSONRenderer]
     
     def get(self, request):
-        from datetime import datetime, timedelta
-        
-        # Get current time
-        now = timezone.now()
-        today = now.date()
-        
-        # Define time periods
-        periods = {
-            'today': {
-                'start': timezone.make_aware(datetime.combine(today, datetime.min.time())),
-                'end': timezone.make_aware(datetime.combine(today, datetime.max.time()))
-            },
-            'week': {
-                'start': now - timedelta(days=7),
-                'end': now
-            },
-            'month': {
-                'start': now - timedelta(days=30),
-                'end': now
-            },
-            'year': {
-                'start': timezone.make_aware(datetime(now.year, 1, 1)),
-                'end': timezone.make_aware(datetime(now.year, 12, 31, 23, 59, 59))
-            }
-        }
-        
-        modality_stats = {'by_period': {}}
-        
-        for period_name, period_range in periods.items():
-            # Get examinations in this period with modality info
-            examinations = Pemeriksaan.objects.filter(
-                created__range=[period_range['start'], period_range['end']]
-            ).select_related('exam__modaliti')
-            
-            total_exams = examinations.count()
-            
-            if total_exams == 0:
-                modality_stats['by_period'][period_name] = []
-                continue
-            
-            # Group by modality
-            modality_counts = examinations.values('exam__modaliti__nama').annotate(
-                count=Count('exam__modaliti__nama')
-            ).order_by('-count')
-            
-            modality_list = [
-                {
-                    'modality': modality['exam__modaliti__nama'],
-                    'count': modality['count'],
-                    'percentage': round((modality['count'] / total_exams) * 100, 1)
-                }
-                for modality in modality_counts
-            ]
-            
-            modality_stats['by_period'][period_name] = modality_list
-        
-        # Add all_time modality stats
-        all_examinations = Pemeriksaan.objects.all().select_related('exam__modaliti')
-        total_all_exams = all_examinations.count()
-        
-        if total_all_exams > 0:
-            # Group by modality for all time
-            all_modality_counts = all_examinations.values('exam__modaliti__nama').annotate(
-                count=Count('exam__modaliti__nama')
-            ).order_by('-count')
-            
-            all_modality_list = [
-                {
-                    'modality': modality['exam__modaliti__nama'],
-                    'count': modality['count'],
-                    'percentage': round((modality['count'] / total_all_exams) * 100, 1)
-                }
-                for modality in all_modality_counts
-            ]
-            
-            modality_stats['by_period']['all_time'] = all_modality_list
-        else:
-            modality_stats['by_period']['all_time'] = []
-        
-        return Response(modality_stats)
+        # Sums of the daily rollup, grouped by modality
+        periods = get_period_dates()
+        return Response({'by_period': distribution('modaliti__nama', 'modality', periods)})
 
 
 class DashboardStorageAPIView(APIView):
@@ -2313,139 +1450,17 @@ class DashboardBodypartsExamTypesAPIView(APIView):
     renderer_classes = [JSONRenderer]
     
     def get(self, request):
-        from datetime import datetime, timedelta
-        from django.db.models import Count
-        
-        # Get current time
-        now = timezone.now()
-        today = now.date()
-        
-        # Define time periods
-        periods = {
-            'today': {
-                'start': timezone.make_aware(datetime.combine(today, datetime.min.time())),
-                'end': timezone.make_aware(datetime.combine(today, datetime.max.time()))
-            },
-            'week': {
-                'start': now - timedelta(days=7),
-                'end': now
-            },
-            'month': {
-                'start': now - timedelta(days=30),
-                'end': now
-            },
-            'year': {
-                'start': timezone.make_aware(datetime(now.year, 1, 1)),
-                'end': timezone.make_aware(datetime(now.year, 12, 31, 23, 59, 59))
-            }
-        }
-        
-        bodyparts_exam_stats = {'by_period': {}}
-        
-        for period_name, period_range in periods.items():
-            # Get examinations in this period
-            examinations = Pemeriksaan.objects.filter(
-                created__range=[period_range['start'], period_range['end']]
-            )
-            
-            total_examinations = examinations.count()
-            
-            if total_examinations == 0:
-                bodyparts_exam_stats['by_period'][period_name] = {
-                    'bodyparts': [],
-                    'exam_types': []
-                }
-                continue
-            
-            # Body parts distribution (using Part model through Exam)
-            bodyparts_stats = examinations.values('exam__part__part').annotate(
-                count=Count('exam__part__part')
-            ).order_by('-count')
-            
-            bodyparts_list = []
-            for bodypart_stat in bodyparts_stats:
-                bodypart_name = bodypart_stat['exam__part__part'] or 'Unknown'
-                count = bodypart_stat['count']
-                percentage = round((count / total_examinations) * 100, 1)
-                
-                bodyparts_list.append({
-                    'bodypart': bodypart_name,
-                    'count': count,
-                    'percentage': percentage
-                })
-            
-            # Exam types distribution (using Exam model)
-            exam_types_stats = examinations.values('exam__exam').annotate(
-                count=Count('exam__exam')
-            ).order_by('-count')
-            
-            exam_types_list = []
-            for exam_type_stat in exam_types_stats:
-                exam_name = exam_type_stat['exam__exam'] or 'Unknown'
-                count = exam_type_stat['count']
-                percentage = round((count / total_examinations) * 100, 1)
-                
-                exam_types_list.append({
-                    'exam_type': exam_name,
-                    'count': count,
-                    'percentage': percentage
-                })
-            
-            bodyparts_exam_stats['by_period'][period_name] = {
-                'bodyparts': bodyparts_list,
-                'exam_types': exam_types_list
-            }
+        # Sums of the daily rollup, grouped by body part and by exam
+        periods = get_period_dates()
+        bodyparts = distribution('part__part', 'bodypart', periods, unknown='Unknown')
+        exam_types = distribution('exam__exam', 'exam_type', periods, unknown='Unknown')
         
-        # Add all_time stats
-        all_examinations = Pemeriksaan.objects.all()
-        total_all_examinations = all_examinations.count()
-        
-        if total_all_examinations > 0:
-            # All time body parts
-            all_bodyparts_stats = all_examinations.values('exam__part__part').annotate(
-                count=Count('exam__part__part')
-            ).order_by('-count')
-            
-            all_bodyparts_list = []
-            for bodypart_stat in all_bodyparts_stats:
-                bodypart_name = bodypart_stat['exam__part__part'] or 'Unknown'
-                count = bodypart_stat['count']
-                percentage = round((count / total_all_examinations) * 100, 1)
-                
-                all_bodyparts_list.append({
-                    'bodypart': bodypart_name,
-                    'count': count,
-                    'percentage': percentage
-                })
-            
-            # All time exam types
-            all_exam_types_stats = all_examinations.values('exam__exam').annotate(
-                count=Count('exam__exam')
-            ).order_by('-count')
-            
-            all_exam_types_list = []
-            for exam_type_stat in all_exam_types_stats:
-                exam_name = exam_type_stat['exam__exam'] or 'Unknown'
-                count = exam_type_stat['count']
-                percentage = round((count / total_all_examinations) * 100, 1)
-                
-                all_exam_types_list.append({
-                    'exam_type': exam_name,
-                    'count': count,
-                    'percentage': percentage
-                })
-            
-            bodyparts_exam_stats['by_period']['all_time'] = {
-                'bodyparts': all_bodyparts_list,
-                'exam_types': all_exam_types_list
-            }
-        else:
-            bodyparts_exam_stats['by_period']['all_time'] = {
-                'bodyparts': [],
-                'exam_types': []
+        return Response({
+            'by_period': {
+                period: {'bodyparts': bodyparts[period], 'exam_types': exam_types[period]}
+                for period in bodyparts
             }
-        
-        return Response(bodyparts_exam_stats)
+        })
 
 
 class MediaDistributionViewSet(viewsets.ModelViewSet):
@@ -3041,6 +2056,7 @@ class RejectIncidentViewSet(viewsets.ModelViewSet):
         from django.db.models import Count, Q
         from datetime import datetime, timedelta
         from collections import defaultdict
+        from .utils import get_daily_image_counts
         
         # Parse date filters
         start_date = request.query_params.get('start_date')
@@ -3098,7 +2114,15 @@ class RejectIncidentViewSet(viewsets.ModelViewSet):
             daily_data[date_str]['categories'][category_name] += count
             daily_data[date_str]['reasons'][reason_id] = count
         
-        # Get real image counts from PACS for each date
+        # Image counts per date, read from the stored PACS daily counts
+        modality_id = request.query_params.get('modality_id')
+        modality = None
+        if modality_id:
+            modality = Modaliti.objects.filter(pk=modality_id).values_list('singkatan', flat=True).first()
+        image_counts = get_daily_image_counts(
+            [datetime.strptime(date_str, '%Y-%m-%d').date() for date_str in daily_data], modality=modality
+        )
+        
         result = []
         for date_str, data in daily_data.items():
             categories = [
@@ -3108,8 +2132,7 @@ class RejectIncidentViewSet(viewsets.ModelViewSet):
             
             total_rejects = data['total_rejects']
             
-            # Get real image count from PACS for this date
-            total_images = self.get_daily_image_count_from_pacs(date_str)
+            total_images = image_counts[datetime.strptime(date_str, '%Y-%m-%d').date()]
             
             reject_percentage = (total_rejects / total_images * 100) if total_images > 0 else 0
             
@@ -3126,65 +2149,13 @@ class RejectIncidentViewSet(viewsets.ModelViewSet):
     
     def get_daily_image_count_from_pacs(self, date_str):
         """
-        Get total image count for a specific date from PACS/Orthanc
+        Get total image count for a specific date from the stored PACS daily counts
         """
+        from .utils import get_daily_image_counts
+        
         try:
-            import requests
-            from .models import PacsServer
-            
-            # Get primary PACS server
-            pacs_server = PacsServer.objects.filter(is_active=True, is_primary=True).first()
-            if not pacs_server:
-                # Fallback to any active server
-                pacs_server = PacsServer.objects.filter(is_active=True).first()
-            
-            if not pacs_server:
-                print(f"No active PACS server found for date {date_str}")
-                return 0
-            
-            orthanc_url = pacs_server.orthancurl.rstrip('/')
-            
-            # Query Orthanc for studies on this date
-            query = {
-                'StudyDate': date_str.replace('-', '')  # DICOM format: YYYYMMDD
-            }
-            
-            orthanc_request = {
-                'Level': 'Study',
-                'Query': query,
-                'Expand': True
-            }
-            
-            response = requests.post(
-                f"{orthanc_url}/tools/find",
-                headers={'Content-Type': 'application/json'},
-                json=orthanc_request,
-                timeout=10
-            )
-            
-            if not response.ok:
-                print(f"Orthanc query failed for {date_str}: {response.status_code}")
-                return 0
-            
-            studies = response.json()
-            total_instances = 0
-            
-            # Count instances (images) in each study
-            for study in studies:
-                study_id = study.get('ID', '')
-                if study_id:
-                    # Get instance count for this study
-                    instances_response = requests.get(
-                        f"{orthanc_url}/studies/{study_id}/instances",
-                        timeout=10
-                    )
-                    if instances_response.ok:
-                        instances = instances_response.json()
-                        total_instances += len(instances)
-            
-            print(f"Found {total_instances} images for date {date_str}")
-            return total_instances
-            
+            day = datetime.strptime(date_str, '%Y-%m-%d').date()
+            return get_daily_image_counts([day])[day]
         except Exception as e:
             print(f"Error getting PACS image count for {date_str}: {e}")
             return 0
@@ -3229,46 +2200,52 @@ class RejectIncidentViewSet(viewsets.ModelViewSet):
                 datetime.combine(reject_date, time(12, 0, 0))
             )
             
-            total_count = 0
-            
-            # SIMPLE CRUD: Just update_or_create for each reason
+            counts = {}
             for reason_id_str, count in rejects.items():
                 try:
-                    reason_id = int(reason_id_str)
-                    count = int(count)
-                    
-                    # Verify the reason exists
-                    try:
-                        reason = RejectReason.objects.get(id=reason_id)
-                    except RejectReason.DoesNotExist:
-                        return Response(
-                            {'error': f'Reject reason {reason_id} not found'}, 
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                    
-                    # SIMPLE: update_or_create - no conditional logic!
-                    incident, created = RejectIncident.objects.update_or_create(
-                        reject_date__date=reject_date,
-                        reject_reason=reason,
-                        reported_by=request.user,
-                        examination__isnull=True,
-                        defaults={
-                            'reject_date': reject_datetime,
-                            'retake_count': count,
-                            'notes': f'Daily reject entry - {reason.reason} (count: {count})'
-                        }
-                    )
-                    
-                    action = "Created" if created else "Updated"
-                    print(f"{action} {reason.reason}: count = {count}")
-                    total_count += count
-                
+                    counts[int(reason_id_str)] = int(count)
                 except (ValueError, TypeError):
                     return Response(
                         {'error': f'Invalid reason_id or count: {reason_id_str}={count}'}, 
                         status=status.HTTP_400_BAD_REQUEST
                     )
             
+            # Verify the reasons exist
+            reasons = RejectReason.objects.in_bulk(list(counts))
+            for reason_id in counts:
+                if reason_id not in reasons:
+                    return Response(
+                        {'error': f'Reject reason {reason_id} not found'}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            
+            # One upsert for the day's entries, keyed by date, reason and reporter
+            from django.db import transaction
+            from .reject_stats import invalidate_reject_stats
+            
+            incidents = [
+                RejectIncident(
+                    daily_entry_date=reject_date,
+                    reject_date=reject_datetime,
+                    reject_reason=reasons[reason_id],
+                    reported_by=request.user,
+                    retake_count=count,
+                    notes=f'Daily reject entry - {reasons[reason_id].reason} (count: {count})'
+                )
+                for reason_id, count in counts.items()
+            ]
+            with transaction.atomic():
+                RejectIncident.objects.bulk_create(
+                    incidents,
+                    update_conflicts=True,
+                    unique_fields=['daily_entry_date', 'reject_reason', 'reported_by'],
+                    update_fields=['reject_date', 'retake_count', 'notes', 'modified']
+                )
+                # bulk_create sends no post_save, so drop the cached statistics here
+                transaction.on_commit(invalidate_reject_stats)
+            
+            total_count = sum(counts.values())
+            
             message = f'Successfully saved daily rejects (total: {total_count})'
                 
             return Response({
@@ -3360,9 +2337,7 @@ class RejectAnalysisStatisticsView(APIView):
     
     def get(self, request):
         """Get comprehensive reject analysis statistics"""
-        from django.db.models import Avg, Max, Min, Count
-        from datetime import datetime, timedelta
-        import calendar
+        from .reject_stats import get_reject_statistics
         
         # Get query parameters
         year = request.query_params.get('year', timezone.now().year)
@@ -3373,145 +2348,7 @@ class RejectAnalysisStatisticsView(APIView):
         except (ValueError, TypeError):
             year = timezone.now().year
         
-        # Base queryset
-        analyses = RejectAnalysis.objects.filter(analysis_date__year=year)
-        
-        if modality_id:
-            analyses = analyses.filter(modality_id=modality_id)
-        
-        # Annual summary
-        annual_stats = analyses.aggregate(
-            avg_reject_rate=Avg('reject_rate'),
-            max_reject_rate=Max('reject_rate'),
-            min_reject_rate=Min('reject_rate'),
-            total_examinations=models.Sum('total_examinations'),
-            total_images=models.Sum('total_images'),
-            total_retakes=models.Sum('total_retakes'),
-            analyses_count=Count('id')
-        )
-        
-        # Monthly breakdown
-        monthly_data = []
-        for month in range(1, 13):
-            month_analyses = analyses.filter(analysis_date__month=month)
-            month_stats = month_analyses.aggregate(
-                avg_reject_rate=Avg('reject_rate'),
-                total_examinations=models.Sum('total_examinations'),
-                total_images=models.Sum('total_images'),
-                total_retakes=models.Sum('total_retakes'),
-                analyses_count=Count('id')
-            )
-            
-            monthly_data.append({
-                'month': month,
-                'month_name': calendar.month_name[month],
-                'avg_reject_rate': round(month_stats['avg_reject_rate'] or 0, 2),
-                'total_examinations': month_stats['total_examinations'] or 0,
-                'total_images': month_stats['total_images'] or 0,
-                'total_retakes': month_stats['total_retakes'] or 0,
-                'analyses_count': month_stats['analyses_count']
-            })
-        
-        # Modality breakdown
-        modality_stats = RejectAnalysis.objects.filter(
-            analysis_date__year=year
-        ).values(
-            'modality__id',
-            'modality__nama',
-            'modality__singkatan'
-        ).annotate(
-            avg_reject_rate=Avg('reject_rate'),
-            total_examinations=models.Sum('total_examinations'),
-            total_images=models.Sum('total_images'),
-            total_retakes=models.Sum('total_retakes'),
-            analyses_count=Count('id'),
-            compliance_rate=Avg(
-                models.Case(
-                    models.When(drl_compliance=True, then=1),
-                    default=0,
-                    output_field=models.FloatField()
-                )
-            ) * 100
-        ).order_by('-avg_reject_rate')
-        
-        # Trend analysis (compare with previous year)
-        previous_year = year - 1
-        previous_year_stats = RejectAnalysis.objects.filter(
-            analysis_date__year=previous_year
-        ).aggregate(
-            avg_reject_rate=Avg('reject_rate'),
-            total_examinations=models.Sum('total_examinations'),
-            total_retakes=models.Sum('total_retakes')
-        )
-        
-        # Calculate trends
-        trends = {}
-        if previous_year_stats['avg_reject_rate']:
-            current_avg = annual_stats['avg_reject_rate'] or 0
-            previous_avg = previous_year_stats['avg_reject_rate']
-            trends['reject_rate_change'] = round(
-                ((current_avg - previous_avg) / previous_avg) * 100, 2
-            )
-        else:
-            trends['reject_rate_change'] = None
-        
-        # DRL compliance summary
-        compliance_stats = analyses.aggregate(
-            total_analyses=Count('id'),
-            compliant_analyses=Count('id', filter=models.Q(drl_compliance=True)),
-            non_compliant_analyses=Count('id', filter=models.Q(drl_compliance=False))
-        )
-        
-        compliance_rate = 0
-        if compliance_stats['total_analyses'] > 0:
-            compliance_rate = (
-                compliance_stats['compliant_analyses'] / 
-                compliance_stats['total_analyses']
-            ) * 100
-        
-        # Top reject reasons (from incidents)
-        incidents = RejectIncident.objects.filter(
-            analysis__analysis_date__year=year
-        )
-        
-        if modality_id:
-            incidents = incidents.filter(analysis__modality_id=modality_id)
-        
-        top_reasons = incidents.values(
-            'reject_reason__id',
-            'reject_reason__reason',
-            'reject_reason__category__name',
-            'reject_reason__severity_level'
-        ).annotate(
-            incident_count=Count('id')
-        ).order_by('-incident_count')[:10]
-        
-        return Response({
-            'year': year,
-            'annual_summary': {
-                'avg_reject_rate': round(annual_stats['avg_reject_rate'] or 0, 2),
-                'max_reject_rate': round(annual_stats['max_reject_rate'] or 0, 2),
-                'min_reject_rate': round(annual_stats['min_reject_rate'] or 0, 2),
-                'total_examinations': annual_stats['total_examinations'] or 0,
-                'total_images': annual_stats['total_images'] or 0,
-                'total_retakes': annual_stats['total_retakes'] or 0,
-                'analyses_count': annual_stats['analyses_count'],
-                'overall_reject_rate': round(
-                    (annual_stats['total_retakes'] / annual_stats['total_images'] * 100) 
-                    if annual_stats['total_images'] else 0, 2
-                )
-            },
-            'monthly_breakdown': monthly_data,
-            'modality_breakdown': list(modality_stats),
-            'trends': trends,
-            'drl_compliance': {
-                'compliance_rate': round(compliance_rate, 2),
-                'total_analyses': compliance_stats['total_analyses'],
-                'compliant_analyses': compliance_stats['compliant_analyses'],
-                'non_compliant_analyses': compliance_stats['non_compliant_analyses']
-            },
-            'top_reject_reasons': list(top_reasons)
-        })
+        return Response(get_reject_statistics(year, modality_id))
 
 
 class RejectAnalysisTrendsView(APIView):
@@ -3522,9 +2359,8 @@ class RejectAnalysisTrendsView(APIView):
     
     def get(self, request):
         """Get reject analysis trends data for chart visualization"""
-        from django.db.models import Avg, Count
-        from datetime import datetime
         import calendar
+        from .reject_stats import get_monthly_reject_totals
         
         # Get query parameters
         year = request.query_params.get('year', timezone.now().year)
@@ -3538,45 +2374,35 @@ class RejectAnalysisTrendsView(APIView):
             year = timezone.now().year
             months = 12
         
-        # Base queryset
-        analyses = RejectAnalysis.objects.filter(analysis_date__year=year)
+        monthly_totals = get_monthly_reject_totals(year, modality_id)
         
-        if modality_id:
-            analyses = analyses.filter(modality_id=modality_id)
+        # Get dynamic target rate from settings
+        try:
+            target_settings = RejectAnalysisTargetSettings.objects.first()
+            target_rate = target_settings.overall_target if target_settings else 5.0  # Default to 5.0% if no settings found
+        except Exception:
+            target_rate = 5.0  # Fallback to 5.0% if any error occurs
         
         # Monthly trend data
         trend_data = []
         for month in range(1, min(months + 1, 13)):
-            month_analyses = analyses.filter(analysis_date__month=month)
-            month_stats = month_analyses.aggregate(
-                avg_reject_rate=Avg('reject_rate'),
-                total_examinations=models.Sum('total_examinations'),
-                total_images=models.Sum('total_images'),
-                total_retakes=models.Sum('total_retakes'),
-                analyses_count=Count('id')
-            )
+            month_stats = monthly_totals.get(month, {})
             
             # Calculate actual reject rate from totals if available
             actual_reject_rate = 0
-            if month_stats['total_images'] and month_stats['total_retakes']:
+            if month_stats.get('total_images') and month_stats.get('total_retakes'):
                 actual_reject_rate = (month_stats['total_retakes'] / month_stats['total_images']) * 100
-            elif month_stats['avg_reject_rate']:
+            elif month_stats.get('avg_reject_rate'):
                 actual_reject_rate = month_stats['avg_reject_rate']
             
-            # Get dynamic target rate from settings
-            try:
-                target_settings = RejectAnalysisTargetSettings.objects.first()
-                target_rate = target_settings.overall_target if target_settings else 5.0  # Default to 5.0% if no settings found
-            except Exception:
-                target_rate = 5.0  # Fallback to 5.0% if any error occurs
             meets_target = actual_reject_rate <= target_rate
             
             trend_data.append({
                 'month': calendar.month_name[month],
                 'year': year,
                 'month_num': month,
-                'total_examinations': month_stats['total_examinations'] or 0,
-                'total_rejects': month_stats['total_retakes'] or 0,
+                'total_examinations': month_stats.get('total_examinations') or 0,
+                'total_rejects': month_stats.get('total_retakes') or 0,
                 'reject_rate': round(actual_reject_rate, 2),
                 'target_rate': target_rate,
                 'meets_target': meets_target
@@ -0,0 +1 @@
+# Management module for pesakit app
\ No newline at end of file
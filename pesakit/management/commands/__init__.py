@@ -0,0 +1 @@
+# Management commands for pesakit app
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Management command to fill Pesakit.tarikh_lahir for existing patients
+Usage: python manage.py backfill_tarikh_lahir [--batch-size 1000] [--dry-run]
+
+New and edited patients get tarikh_lahir in Pesakit.save(); run this once
+after migrating so the dashboard demographics include older records.
+"""
+
+from django.core.management.base import BaseCommand
+from pesakit.models import Pesakit
+
+
+class Command(BaseCommand):
+    help = 'Derive and store date of birth (tarikh_lahir) for existing patients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of patients written per query',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many patients would be updated without making changes',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        queryset = Pesakit.objects.only('id', 'nric', 'umur', 'created', 'tarikh_lahir').order_by('id')
+        total_patients = queryset.count()
+        self.stdout.write(f"Checking {total_patients} patients")
+
+        updated_count = 0
+        batch = []
+        for i, patient in enumerate(queryset.iterator(chunk_size=batch_size), 1):
+            tarikh_lahir = patient.derive_tarikh_lahir()
+            if tarikh_lahir != patient.tarikh_lahir:
+                patient.tarikh_lahir = tarikh_lahir
+                batch.append(patient)
+                updated_count += 1
+
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    Pesakit.objects.bulk_update(batch, ['tarikh_lahir'])
+                batch = []
+            if i % 10000 == 0:
+                self.stdout.write(f"Processed {i}/{total_patients} patients...")
+
+        if batch and not dry_run:
+            Pesakit.objects.bulk_update(batch, ['tarikh_lahir'])
+
+        action = 'Would update' if dry_run else 'Updated'
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} tarikh_lahir for {updated_count} of {total_patients} patients")
+        )
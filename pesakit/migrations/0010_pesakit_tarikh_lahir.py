@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pesakit', '0009_pesakit_alamat_pesakit_email_pesakit_telefon_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesakit',
+            name='tarikh_lahir',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pesakit',
+            name='jantina',
+            field=models.CharField(choices=[('L', 'Lelaki'), ('P', 'Perempuan')], db_index=True, default='L', max_length=2),
+        ),
+    ]
@@ -31,8 +31,10 @@ class Pesakit(models.Model):
     )
     nama = models.CharField(max_length=50, null=True, blank=False)
     bangsa = models.CharField(max_length=15, choices=bangsa_list, default='Melayu')
-    jantina = models.CharField(max_length=2, choices=jantina_list, default='L')
+    jantina = models.CharField(max_length=2, choices=jantina_list, default='L', db_index=True)
     umur = models.CharField(max_length=10, blank=True, null=True)
+    # Derived in save() from NRIC (or estimated from umur) for SQL age grouping
+    tarikh_lahir = models.DateField(blank=True, null=True, editable=False, db_index=True)
     alamat = models.TextField(blank=True, null=True, verbose_name="Address")
     telefon = models.CharField(max_length=20, blank=True, null=True, verbose_name="Phone Number")
     email = models.EmailField(blank=True, null=True, verbose_name="Email Address")
@@ -65,9 +67,32 @@ class Pesakit(models.Model):
             # Auto-populate MRN with NRIC if MRN is empty
             if not self.mrn:
                 self.mrn = self.nric
+        self.tarikh_lahir = self.derive_tarikh_lahir()
 
         super(Pesakit, self).save(*args, **kwargs)
 
+    def derive_tarikh_lahir(self):
+        """
+        Date of birth from the NRIC, or estimated from umur when there is no NRIC date
+
+        An umur-only age is anchored to the registration date, so the stored
+        date of birth keeps the patient ageing like an NRIC-derived one.
+        """
+        lahir = self.t_lahir
+        if lahir:
+            return lahir
+        if not self.umur:
+            return None
+        try:
+            age = int(self.umur.replace('Y', '').replace('y', '').strip())
+        except ValueError:
+            return None
+        rujukan = (self.created or datetime.now()).date()
+        try:
+            return rujukan.replace(year=rujukan.year - age)
+        except ValueError:  # 29 February
+            return rujukan.replace(year=rujukan.year - age, day=28)
+
     @property
     def ic(self):
         ic = self.nric
@@ -80,9 +105,15 @@ class Pesakit(models.Model):
         tlahir = self.nric[:6]
         try:
             lahir = datetime.strptime(tlahir, "%y%m%d").date()
-            return lahir
         except ValueError:
             return None
+        # strptime puts 00-68 in the 2000s; a birth date can't be in the future
+        if lahir > date.today():
+            try:
+                lahir = lahir.replace(year=lahir.year - 100)
+            except ValueError:  # 29 February in a non-leap century
+                lahir = lahir.replace(year=lahir.year - 100, day=28)
+        return lahir
 
     @property
     def kira_umur(self):
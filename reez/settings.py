@@ -225,11 +225,69 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000  # Allow many files in one upload
 
+# DICOM upload pipeline (exam/dicom_upload.py)
+DICOM_UPLOAD_WORKERS = 4  # files sent to Orthanc at once per upload
+DICOM_UPLOAD_JOB_WORKERS = 2  # background uploads run at once per process
+DICOM_UPLOAD_PROGRESS_INTERVAL = 0.5  # seconds between progress updates
+DICOM_UPLOAD_JOB_STALE_SECONDS = 600  # running jobs without progress this long are marked failed
+DICOM_UPLOAD_SPOOL_DIR = None  # where uploads are spooled, system temp dir by default
+
 # DICOM Configuration
 DICOM_ORG_ROOT = '1.2.826.0.1.3680043.8.498'  # Example organization root UID
 DICOM_AE_TITLE = 'RIS_MWL_SCP'  # Application Entity title for MWL server
 DICOM_MWL_PORT = 11112  # Default port for MWL server
 
+# Orthanc HTTP client (shared keep-alive pool per PACS server)
+ORTHANC_POOL_CONNECTIONS = 4  # Distinct hosts kept in the pool
+ORTHANC_POOL_MAXSIZE = 20  # Concurrent keep-alive connections per host
+ORTHANC_CONNECT_TIMEOUT = 5  # seconds
+ORTHANC_READ_TIMEOUT = 30  # seconds
+ORTHANC_MAX_RETRIES = 2  # Retries on connection errors and 502/503/504
+ORTHANC_RETRY_BACKOFF = 0.3  # Exponential backoff factor between retries
+
+# PACS study search (series-level field enrichment)
+PACS_SEARCH_WORKERS = 8  # Concurrent Orthanc requests per search page
+PACS_SEARCH_CACHE_TIMEOUT = 600  # seconds, per-study details cache
+PACS_MULTI_SEARCH_DEADLINE = 20  # seconds, global deadline for multi-server search
+PACS_MONTH_CLOSE_DAYS = 7  # days after a month ends before its reject analysis image counts are stored
+PACS_IMAGE_COUNT_WORKERS = 4  # parallel PACS queries when counting daily images (backfill_pacs_image_counts)
+PACS_DAILY_COUNT_REFRESH_SECONDS = 300  # recount today/yesterday's stored image counts after this long
+REJECT_STATS_CACHE_TIMEOUT = 600  # seconds; cached reject statistics are also dropped on every reject analysis change
+
+# Study manifest cache (study -> series -> instance tree for viewer endpoints)
+STUDY_MANIFEST_TTL = 300  # seconds served without asking Orthanc (stable studies)
+STUDY_MANIFEST_UNSTABLE_TTL = 15  # seconds, while Orthanc is still receiving the study
+STUDY_MANIFEST_MAX_AGE = 86400  # seconds before the cached tree is dropped
+
+# Local DICOM instance/frame cache for the viewer proxies (LRU by file mtime)
+DICOM_CACHE_ENABLED = True
+DICOM_CACHE_DIR = os.path.join(BASE_DIR, 'dicom_cache')
+DICOM_CACHE_MAX_BYTES = 5 * 1024 ** 3  # 5 GB
+
+# Remembered PACS endpoint strategy (auto-detect) and memoised instance UIDs
+ENDPOINT_STRATEGY_TTL = 600  # seconds before the preferred endpoint order is probed again
+INSTANCE_UID_CACHE_TIMEOUT = 86400  # seconds, Orthanc ID -> study/series/SOP UIDs
+
+# Multipart batch frame retrieval (series frames endpoint)
+FRAME_BATCH_MAX_FRAMES = 200  # frames per multipart response
+FRAME_BATCH_PREFETCH = 4  # frames fetched from Orthanc ahead of the one being streamed
+
+# Thumbnail renditions (exam/renditions.py, pregenerate_thumbnails command)
+RENDITION_CACHE_DIR = os.path.join(BASE_DIR, 'rendition_cache')
+RENDITION_CACHE_MAX_BYTES = 1024 ** 3  # 1 GB
+RENDITION_FORMAT = 'webp'  # 'webp' or 'jpeg', needs Pillow; Orthanc's JPEG is kept otherwise
+RENDITION_QUALITY = 80
+RENDITION_WORKERS = 2  # encoder processes
+THUMBNAIL_SIZE = 256
+
+# Dashboard statistics cache (exam/dashboard_stats.py), new rows are added incrementally
+DASHBOARD_STATS_CACHE_TIMEOUT = 300  # seconds before a full recount
+
+# Live dashboard WebSocket (exam/consumers.py): one sampler per process, counters pushed from signals
+DASHBOARD_LIVE_UPDATES = True
+DASHBOARD_SAMPLE_INTERVAL = 2  # seconds between system resource samples and stats broadcasts
+DASHBOARD_STORAGE_INTERVAL = 10  # seconds between storage samples
+
 # Audit Trail Configuration
 AUDIT_LOG_RETENTION_DAYS = 730  # 2 years retention period for compliance
 AUDIT_LOG_CLEANUP_BATCH_SIZE = 1000  # Batch size for cleanup operations
@@ -312,6 +370,21 @@ AI_NOTIFICATION_EMAILS = os.environ.get('AI_NOTIFICATION_EMAILS', '').split(',')
 AI_REPORTING_ENABLED = os.environ.get('AI_REPORTING_ENABLED', 'True').lower() == 'true'
 AI_MAINTENANCE_MODE = os.environ.get('AI_MAINTENANCE_MODE', 'False').lower() == 'true'
 
+# AI Report Job Queue (exam/ai_jobs.py), processed by `python manage.py run_ai_worker`
+AI_WORKER_CONCURRENCY = int(os.environ.get('AI_WORKER_CONCURRENCY', '2'))  # jobs per worker process
+AI_MODEL_CONCURRENCY = {}  # {ollama model name: max parallel requests}, others use the default
+AI_MODEL_CONCURRENCY_DEFAULT = int(os.environ.get('AI_MODEL_CONCURRENCY_DEFAULT', '1'))
+AI_JOB_POLL_INTERVAL = 2  # seconds between queue polls when idle
+AI_JOB_STALE_SECONDS = 120  # requeue running jobs without a worker heartbeat
+AI_JOB_MAX_ATTEMPTS = 2
+AI_BATCH_SCHEDULE_INTERVAL = 60  # seconds between batch report scheduling runs (AIConfiguration batch settings)
+AI_REPORT_JOBS_INLINE = os.environ.get('AI_REPORT_JOBS_INLINE', 'False').lower() == 'true'  # generate in the request (no worker)
+AI_STREAM_REPORTS = True  # relay Ollama output to ws/ai-reports/<id>/stream/ while generating
+AI_STREAM_INTERVAL = 0.25  # seconds between partial text messages
+AI_IMAGE_FETCH_WORKERS = 4  # parallel Orthanc image/tag downloads per study
+AI_IMAGE_INPUT_SIZE = 336  # longest edge in pixels sent to the vision model, match its input size (0 = full preview)
+AI_RESULT_CACHE_TIMEOUT = 7 * 24 * 3600  # seconds AI inference results are reused (exam/ai_cache.py), 0 disables
+
 # Cache Configuration for AI Services
 CACHES = {
     'default': {
@@ -311,12 +311,70 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 
+# DICOM upload pipeline
+DICOM_UPLOAD_WORKERS = int(os.environ.get('DICOM_UPLOAD_WORKERS', '4'))
+DICOM_UPLOAD_JOB_WORKERS = int(os.environ.get('DICOM_UPLOAD_JOB_WORKERS', '2'))
+DICOM_UPLOAD_PROGRESS_INTERVAL = float(os.environ.get('DICOM_UPLOAD_PROGRESS_INTERVAL', '0.5'))
+DICOM_UPLOAD_JOB_STALE_SECONDS = int(os.environ.get('DICOM_UPLOAD_JOB_STALE_SECONDS', '600'))
+DICOM_UPLOAD_SPOOL_DIR = os.environ.get('DICOM_UPLOAD_SPOOL_DIR') or None
+
 # ========== DICOM CONFIGURATION ==========
 
 DICOM_ORG_ROOT = os.environ.get('DICOM_ORG_ROOT', '1.2.826.0.1.3680043.8.498')
 DICOM_AE_TITLE = os.environ.get('DICOM_AE_TITLE', 'RIS_PROD_SCP')
 DICOM_MWL_PORT = int(os.environ.get('DICOM_MWL_PORT', '11112'))
 
+# Orthanc HTTP client (shared keep-alive pool per PACS server)
+ORTHANC_POOL_CONNECTIONS = int(os.environ.get('ORTHANC_POOL_CONNECTIONS', '4'))
+ORTHANC_POOL_MAXSIZE = int(os.environ.get('ORTHANC_POOL_MAXSIZE', '32'))
+ORTHANC_CONNECT_TIMEOUT = float(os.environ.get('ORTHANC_CONNECT_TIMEOUT', '5'))
+ORTHANC_READ_TIMEOUT = float(os.environ.get('ORTHANC_READ_TIMEOUT', '30'))
+ORTHANC_MAX_RETRIES = int(os.environ.get('ORTHANC_MAX_RETRIES', '2'))
+ORTHANC_RETRY_BACKOFF = float(os.environ.get('ORTHANC_RETRY_BACKOFF', '0.3'))
+
+# PACS study search (series-level field enrichment)
+PACS_SEARCH_WORKERS = int(os.environ.get('PACS_SEARCH_WORKERS', '8'))
+PACS_SEARCH_CACHE_TIMEOUT = int(os.environ.get('PACS_SEARCH_CACHE_TIMEOUT', '600'))
+PACS_MULTI_SEARCH_DEADLINE = float(os.environ.get('PACS_MULTI_SEARCH_DEADLINE', '20'))
+PACS_MONTH_CLOSE_DAYS = int(os.environ.get('PACS_MONTH_CLOSE_DAYS', '7'))
+PACS_IMAGE_COUNT_WORKERS = int(os.environ.get('PACS_IMAGE_COUNT_WORKERS', '4'))
+PACS_DAILY_COUNT_REFRESH_SECONDS = int(os.environ.get('PACS_DAILY_COUNT_REFRESH_SECONDS', '300'))
+REJECT_STATS_CACHE_TIMEOUT = int(os.environ.get('REJECT_STATS_CACHE_TIMEOUT', '600'))
+
+# Study manifest cache (study -> series -> instance tree for viewer endpoints)
+STUDY_MANIFEST_TTL = int(os.environ.get('STUDY_MANIFEST_TTL', '300'))
+STUDY_MANIFEST_UNSTABLE_TTL = int(os.environ.get('STUDY_MANIFEST_UNSTABLE_TTL', '15'))
+STUDY_MANIFEST_MAX_AGE = int(os.environ.get('STUDY_MANIFEST_MAX_AGE', '86400'))
+
+# Local DICOM instance/frame cache for the viewer proxies (LRU by file mtime)
+DICOM_CACHE_ENABLED = os.environ.get('DICOM_CACHE_ENABLED', 'True').lower() == 'true'
+DICOM_CACHE_DIR = os.environ.get('DICOM_CACHE_DIR', '/var/cache/ris/dicom')
+DICOM_CACHE_MAX_BYTES = int(os.environ.get('DICOM_CACHE_MAX_BYTES', str(20 * 1024 ** 3)))
+
+# Remembered PACS endpoint strategy (auto-detect) and memoised instance UIDs
+ENDPOINT_STRATEGY_TTL = int(os.environ.get('ENDPOINT_STRATEGY_TTL', '600'))
+INSTANCE_UID_CACHE_TIMEOUT = int(os.environ.get('INSTANCE_UID_CACHE_TIMEOUT', '86400'))
+
+# Multipart batch frame retrieval (series frames endpoint)
+FRAME_BATCH_MAX_FRAMES = int(os.environ.get('FRAME_BATCH_MAX_FRAMES', '200'))
+FRAME_BATCH_PREFETCH = int(os.environ.get('FRAME_BATCH_PREFETCH', '4'))
+
+# Thumbnail renditions (exam/renditions.py, pregenerate_thumbnails command)
+RENDITION_CACHE_DIR = os.environ.get('RENDITION_CACHE_DIR', '/var/cache/ris/renditions')
+RENDITION_CACHE_MAX_BYTES = int(os.environ.get('RENDITION_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+RENDITION_FORMAT = os.environ.get('RENDITION_FORMAT', 'webp')
+RENDITION_QUALITY = int(os.environ.get('RENDITION_QUALITY', '80'))
+RENDITION_WORKERS = int(os.environ.get('RENDITION_WORKERS', '2'))
+THUMBNAIL_SIZE = int(os.environ.get('THUMBNAIL_SIZE', '256'))
+
+# Dashboard statistics cache (exam/dashboard_stats.py), new rows are added incrementally
+DASHBOARD_STATS_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_STATS_CACHE_TIMEOUT', '300'))
+
+# Live dashboard WebSocket (exam/consumers.py): one sampler per process, counters pushed from signals
+DASHBOARD_LIVE_UPDATES = os.environ.get('DASHBOARD_LIVE_UPDATES', 'True').lower() == 'true'
+DASHBOARD_SAMPLE_INTERVAL = int(os.environ.get('DASHBOARD_SAMPLE_INTERVAL', '2'))
+DASHBOARD_STORAGE_INTERVAL = int(os.environ.get('DASHBOARD_STORAGE_INTERVAL', '10'))
+
 # ========== AI SYSTEM CONFIGURATION ==========
 
 # Ollama Server Configuration
@@ -351,6 +409,26 @@ AI_NOTIFICATION_EMAILS = [
 AI_REPORTING_ENABLED = os.environ.get('AI_REPORTING_ENABLED', 'True').lower() == 'true'
 AI_MAINTENANCE_MODE = os.environ.get('AI_MAINTENANCE_MODE', 'False').lower() == 'true'
 
+# AI Report Job Queue (exam/ai_jobs.py), processed by `python manage.py run_ai_worker`
+AI_WORKER_CONCURRENCY = int(os.environ.get('AI_WORKER_CONCURRENCY', str(AI_MAX_CONCURRENT_REQUESTS)))
+AI_MODEL_CONCURRENCY = {
+    model.strip(): int(limit)
+    for model, _, limit in (
+        item.rpartition('=') for item in os.environ.get('AI_MODEL_CONCURRENCY', '').split(',') if '=' in item
+    )
+}  # e.g. "llava-med:7b=2,meditron:7b=1"
+AI_MODEL_CONCURRENCY_DEFAULT = int(os.environ.get('AI_MODEL_CONCURRENCY_DEFAULT', '1'))
+AI_JOB_POLL_INTERVAL = int(os.environ.get('AI_JOB_POLL_INTERVAL', '2'))
+AI_JOB_STALE_SECONDS = int(os.environ.get('AI_JOB_STALE_SECONDS', '120'))
+AI_JOB_MAX_ATTEMPTS = int(os.environ.get('AI_JOB_MAX_ATTEMPTS', '2'))
+AI_BATCH_SCHEDULE_INTERVAL = int(os.environ.get('AI_BATCH_SCHEDULE_INTERVAL', '60'))
+AI_REPORT_JOBS_INLINE = os.environ.get('AI_REPORT_JOBS_INLINE', 'False').lower() == 'true'
+AI_STREAM_REPORTS = os.environ.get('AI_STREAM_REPORTS', 'True').lower() == 'true'
+AI_STREAM_INTERVAL = float(os.environ.get('AI_STREAM_INTERVAL', '0.25'))
+AI_IMAGE_FETCH_WORKERS = int(os.environ.get('AI_IMAGE_FETCH_WORKERS', '4'))
+AI_IMAGE_INPUT_SIZE = int(os.environ.get('AI_IMAGE_INPUT_SIZE', '336'))
+AI_RESULT_CACHE_TIMEOUT = int(os.environ.get('AI_RESULT_CACHE_TIMEOUT', str(7 * 24 * 3600)))
+
 # ========== AUDIT TRAIL CONFIGURATION ==========
 
 AUDIT_LOG_RETENTION_DAYS = int(os.environ.get('AUDIT_LOG_RETENTION_DAYS', '730'))
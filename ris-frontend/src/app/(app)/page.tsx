@@ -340,12 +340,15 @@ export default function Dashboard() {
       try {
         const dashboardUpdate = JSON.parse(event.data);
         
-        // ONLY update system resources and storage - NEVER touch chart data
+        // ONLY update system resources, storage and counters - NEVER touch chart data
         if (dashboardUpdate.type === 'system_resources') {
           setStorageInfo(prev => ({
             ...prev,
             system_resources: dashboardUpdate.data
           }));
+        } else if (dashboardUpdate.type === 'dashboard_stats') {
+          // Period counters pushed by the server as registrations/exams change
+          setStats(dashboardUpdate.data || {});
         } else if (dashboardUpdate.type === 'storage_info') {
           setStorageInfo(prev => ({
             ...prev,
@@ -45,6 +45,7 @@ interface SeriesData {
   modality: string;
   imageCount: number;
   firstImageUrl: string;
+  thumbnailUrl: string;
   instances: Array<{
     instanceId: string;
     frameUrl: string;
@@ -239,46 +240,40 @@ const SeriesThumbnail: React.FC<SeriesThumbnailProps> = ({
   loadingProgress, 
   onClick 
 }) => {
-  const thumbRef = useRef<HTMLDivElement>(null);
-  const [isLoaded, setIsLoaded] = useState(false);
+  const [thumbnailSrc, setThumbnailSrc] = useState<string | null>(null);
   const [error, setError] = useState(false);
+  const isLoaded = thumbnailSrc !== null;
 
   useEffect(() => {
-    const element = thumbRef.current;
-    if (!element) return;
+    let objectUrl: string | null = null;
+    let cancelled = false;
 
+    // Small cached rendition from the server instead of decoding the DICOM here
     const loadThumbnail = async () => {
       try {
-        await initializeCornerstone();
-        
-        const engine = new RenderingEngine(`thumb-${series.seriesId}`);
-        const viewportId = `thumbViewport-${series.seriesId}`;
-        
-        const viewportInput = {
-          viewportId,
-          element: element,
-          type: ViewportType.STACK,
-        };
-
-        engine.enableElement(viewportInput);
-        const viewport = engine.getViewport(viewportId);
-        
-        // Load first image for thumbnail
-        const firstImageUrl = `wadors:${series.firstImageUrl}`;
-        await (viewport as any).setStack([firstImageUrl], 0);
-        
-        viewport.resetCamera();
-        viewport.render();
-        
-        setIsLoaded(true);
+        const response = await AuthService.authenticatedFetch(series.thumbnailUrl);
+        if (!response.ok) {
+          throw new Error(`Failed to fetch thumbnail: ${response.status}`);
+        }
+        const blob = await response.blob();
+        if (cancelled) return;
+        objectUrl = URL.createObjectURL(blob);
+        setThumbnailSrc(objectUrl);
       } catch (err) {
         console.error('Thumbnail load error:', err);
-        setError(true);
+        if (!cancelled) setError(true);
       }
     };
 
+    setThumbnailSrc(null);
+    setError(false);
     loadThumbnail();
-  }, [series]);
+
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [series.thumbnailUrl]);
 
   return (
     <div
@@ -292,10 +287,16 @@ const SeriesThumbnail: React.FC<SeriesThumbnailProps> = ({
       `}
       style={{ width: '180px', height: '140px' }}
     >
-      <div
-        ref={thumbRef}
-        className="w-full h-24 bg-black rounded-t-md"
-      />
+      <div className="w-full h-24 bg-black rounded-t-md flex items-center justify-center overflow-hidden">
+        {thumbnailSrc && (
+          // eslint-disable-next-line @next/next/no-img-element -- blob URL of an authenticated fetch
+          <img
+            src={thumbnailSrc}
+            alt={series.seriesDescription || `Series ${series.seriesNumber}`}
+            className="max-w-full max-h-full object-contain"
+          />
+        )}
+      </div>
       
       {/* Progress bar overlay */}
       {loadingProgress > 0 && loadingProgress < 100 && (